@@ -340,6 +340,23 @@ def war_room_final_decision_filter(market_data: Dict[str, Any]) -> str:
                 final_action = "HOLD"
             reason_chain.append("Event: POSITION_UNWIND_RISK → 포지션 과열 → 증가 억제")
 
+        elif sew_event == "CROSS_ASSET_SHOCK":
+            final_action = "REDUCE"
+            final_exposure = int(final_exposure * 0.7)
+            reason_chain.append("Event: CROSS_ASSET_SHOCK → 다자산 동시 극단 움직임 → 익스포저 축소")
+
+        elif sew_event == "SECTOR_WIDE_SELLOFF":
+            if final_action in ["INCREASE", "ADD", "EARLY BUY"]:
+                final_action = "HOLD"
+            final_exposure = int(final_exposure * 0.8)
+            reason_chain.append("Event: SECTOR_WIDE_SELLOFF → 섹터 전반 매도 → 증가 억제")
+
+        elif sew_event == "GLOBAL_RISK_CONTAGION":
+            if final_action in ["INCREASE", "ADD", "EARLY BUY"]:
+                final_action = "HOLD"
+            final_exposure = int(final_exposure * 0.85)
+            reason_chain.append("Event: GLOBAL_RISK_CONTAGION → 국가 ETF 동반 약세 → 증가 억제")
+
         elif sew_event == "VOL_CRUSH_SQUEEZE":
             reason_chain.append("Event: VOL_CRUSH_SQUEEZE → 변동성 압축 상승 → 추격 주의")
 
@@ -2,13 +2,37 @@ from __future__ import annotations
 from typing import Dict, Any, Optional, List, Tuple
 from scripts.data_processing import download_all_etfs_and_save
 from scripts.data_processing import load_etf_data_from_csv
+from scripts.market_snapshot import MarketSnapshot
+from scripts.market_backend import get_market_backend
+from scripts.bar_archive import archive_frame
+from scripts.drift_engine import DRIFT_TICKERS, compute_drift, drift_as_of, live_window
+from scripts.price_panel import SOURCE_PRECEDENCE, get_price_panel
+from scripts.correlation_engine import engine_pair_breaks
 from sklearn.metrics.pairwise import cosine_similarity
 from portfolio.save_portfolio import save_paper_portfolio
 from filters.growth_sustainability import growth_sustainability_filter
 from filters.flow_authenticity import flow_authenticity_filter
 from filters.leadership_breadth import leadership_breadth_filter
 from filters.positioning_stress import positioning_stress_filter
-from filters.participation_quality import classify_participation_quality, mode_policy
+from scripts.sector_allocation_engine import (
+    SECTOR_ETF,
+    SECTORS,
+    allocation_inputs_from_market_data,
+    allocation_inputs_path,
+    cap_records,
+    execution_ceiling_weights,
+    ordered_weights,
+    rank_persistence_step,
+    raw_sector_rank,
+    rebalance_threshold_kernel,
+    record_allocation_inputs,
+    row_dict,
+    scores_from_kernel,
+    sector_flow_notes,
+    sector_score_drivers,
+    sector_score_kernel,
+    tactical_weight_kernel,
+)
 
 import numpy as np
 from pathlib import Path
@@ -880,6 +904,14 @@ def drift_monitor_filter(market_data: Dict[str, Any]) -> str:
 # -------------------------------------------------------------------
 # 6.5) Correlation Break Monitor (stabilized v2.0)
 # -------------------------------------------------------------------
+# 당일 부호 heuristic + correlation engine(20d vs long-run) 통계적 이탈
+CORR65_PAIRS = [
+    ("US10Y", "SPY"), ("US10Y", "QQQ"),
+    ("VIX", "SPY"), ("VIX", "QQQ"),
+    ("DXY", "SPY"), ("DXY", "QQQ"),
+    ("HYG", "SPY"),
+]
+
 def correlation_break_filter(market_data: Dict[str, Any]) -> str:
     state = correlation_break_state(market_data)
 
@@ -972,6 +1004,11 @@ def correlation_break_state(market_data: Dict[str, Any]) -> Dict[str, Any]:
             breaks.append("DXY ↑ but Technology ↑")
             score += 1
 
+    # 상관계수 자체의 이탈 (market_data["CORR_ENGINE"], 없으면 skip)
+    for reason in engine_pair_breaks(market_data, CORR65_PAIRS):
+        breaks.append(reason)
+        score += 1
+
     return {
         "break": len(breaks) > 0,
         "score": score,
@@ -982,6 +1019,13 @@ def correlation_break_state(market_data: Dict[str, Any]) -> Dict[str, Any]:
 # -------------------------------------------------------------------
 # 6.6) Sector Correlation Break Monitor (stabilized v2.0)
 # -------------------------------------------------------------------
+CORR66_PAIRS = [
+    ("US10Y", "XLF"), ("US10Y", "XLRE"), ("US10Y", "XLK"),
+    ("WTI", "XLE"),
+    ("VIX", "XLF"),
+    ("DXY", "XLK"),
+]
+
 def sector_correlation_break_filter(market_data: Dict[str, Any]) -> str:
     state = sector_correlation_break_state(market_data)
 
@@ -1078,6 +1122,10 @@ def sector_correlation_break_state(market_data: Dict[str, Any]) -> Dict[str, Any
             breaks.append("DXY ↑ but XLK ↑")
             score += 1
 
+    for reason in engine_pair_breaks(market_data, CORR66_PAIRS):
+        breaks.append(reason)
+        score += 1
+
     breakdown_type = "NONE"
 
     if len(breaks) > 0:
@@ -1130,6 +1178,20 @@ def _get_series(market_data: Dict[str, Any], key: str) -> Dict[str, Any]:
     if market_data is None:
         market_data = {}
 
+    # MarketSnapshot이면 float 배열에서 바로 읽는다 (dict 파싱 생략)
+    if isinstance(market_data, MarketSnapshot) and market_data.has_column(key):
+        today = market_data.today(key)
+        prev = market_data.prev(key)
+        pct = market_data.pct_change(key)
+
+        delta = None
+        if today is not None and prev is not None:
+            delta = today - prev
+            if pct is None and prev != 0:
+                pct = (delta / prev) * 100.0
+
+        return {"today": today, "prev": prev, "pct_change": pct, "delta": delta}
+
     raw = market_data.get(key)
 
     if isinstance(raw, dict):
@@ -1762,6 +1824,11 @@ def policy_filter_with_expectations(market_data: Dict[str, Any]) -> str:
     else:
         exp_line = f"Expectations: unsupported type={type(expectations_raw).__name__}"
 
+    # signal cache 경유 시 staleness 표시 (last-good 값 사용 중인지)
+    exp_cache = market_data.get("_EXP_CACHE")
+    if isinstance(exp_cache, dict) and exp_cache.get("stale") and exp_cache.get("age_hours") is not None:
+        exp_line += f" [{exp_cache.get('status')} cache, {exp_cache['age_hours']:.1f}h old]"
+
     # ---- 6) report ----
     lines = []
     lines.append("### 🏛️ 3) Policy Filter (with Expectations)")
@@ -2199,18 +2266,11 @@ def attach_country_risk_layer(
     window: int = GEO_WINDOW,
 ) -> Dict[str, Any]:
     """
-    country_etf_data_combined.csv 에서 전체 국가 ETF 데이터를 읽어
+    공용 price panel(data/price_panel)에서 국가 ETF close를 읽어
     각 ETF별 급락 여부 / z-score를 계산
+    - source는 country_etf_data_combined.csv 원본 close (SOURCE_PRECEDENCE["country_risk"], splice 없음)
+    - panel을 못 읽으면 combined CSV 직접 로드
     """
-    file_path = "data/country_etf_data_combined.csv"
-    all_etf_data = load_etf_data_from_csv(file_path)
-
-    if all_etf_data.empty:
-        print("[ERROR] No combined ETF data found.")
-        return market_data
-
-    all_etf_data = all_etf_data.sort_index()
-
     country_etf_list = [
         "EIS",
         "SPY",
@@ -2223,6 +2283,21 @@ def attach_country_risk_layer(
         "BND",
     ]
 
+    try:
+        all_etf_data = get_price_panel(Path("data")).frame(
+            country_etf_list, precedence=SOURCE_PRECEDENCE["country_risk"]
+        )
+        all_etf_data = all_etf_data.loc[:, all_etf_data.notna().any()]
+    except Exception as e:
+        print(f"[WARN] price panel unavailable ({e}) → combined CSV")
+        all_etf_data = load_etf_data_from_csv("data/country_etf_data_combined.csv")
+
+    if all_etf_data.empty:
+        print("[ERROR] No combined ETF data found.")
+        return market_data
+
+    all_etf_data = all_etf_data.sort_index()
+
     # ✅ 방향성 정의
     upside_risk_assets = {"GLD", "VXX"}  # 상승이 stress
     downside_risk_assets = {"EIS", "SPY", "EEM", "EMB", "FXI", "EWJ", "BND"}  # 하락이 stress
@@ -2978,105 +3053,30 @@ def attach_geo_similarity_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
     market_data["GEO_EW"] = geo
     return market_data
 
-def attach_drift_data_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
+def attach_drift_data_layer(market_data: Dict[str, Any], as_of: Any = None) -> Dict[str, Any]:
     """
     Drift v3 (with ATR normalization)
     - 15m / 30m / 1H / 4H / 1D / 5D returns
     - ATR 기반 정규화 포함
+    - live: download 결과를 bar archive(data/bars)에 적재하면서 계산
+    - as_of 지정 시: archive만 사용한 point-in-time 계산 (backtest replay, network 없음)
     """
 
-    import yfinance as yf
-    import pandas as pd
-
-    drift_tickers = {
-        "SPY": "SPY",
-        "WTI": "CL=F",
-        "DXY": "DX-Y.NYB",
-        "GOLD": "GC=F",
-    
-        # Credit / Risk participation
-        "HYG": "HYG",
-        "LQD": "LQD",
-    
-        # EM / China
-        "EEM": "EEM",
-        "FXI": "FXI",
-    
-        # Sector leadership
-        "XLK": "XLK",
-        "XLI": "XLI",
-        "XLF": "XLF",
-        "XLY": "XLY",
-    
-        # Defensive comparison
-        "XLP": "XLP",
-        "XLU": "XLU",
-
-    }
-    drift_data = {}
-
-    # -----------------------------
-    # Helpers
-    # -----------------------------
-    def safe_ret(curr, past):
-        try:
-            if curr is None or past is None or past == 0:
-                return None
-            return ((curr / past) - 1.0) * 100.0
-        except Exception:
-            return None
-
-    def extract_close_series(df):
-        if df is None or df.empty:
-            return None
-
-        try:
-            if isinstance(df.columns, pd.MultiIndex):
-                close_cols = [c for c in df.columns if str(c[0]).lower() == "close"]
-                if not close_cols:
-                    return None
-                s = df[close_cols]
-                if isinstance(s, pd.DataFrame):
-                    s = s.squeeze()
-            else:
-                if "Close" not in df.columns:
-                    return None
-                s = df["Close"]
-
-            if isinstance(s, pd.DataFrame):
-                s = s.squeeze()
-
-            s = pd.to_numeric(s, errors="coerce").dropna()
-            if s.empty:
-                return None
+    if as_of is not None:
+        drift_data = drift_as_of(as_of)
+        market_data["DRIFT_DATA"] = drift_data
 
-            return s
-        except Exception:
-            return None
-
-    def calculate_atr(df, period=14):
-        try:
-            high = df["High"]
-            low = df["Low"]
-            close = df["Close"]
-
-            tr1 = high - low
-            tr2 = (high - close.shift(1)).abs()
-            tr3 = (low - close.shift(1)).abs()
-
-            tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            atr = tr.rolling(period).mean()
+        print("[DRIFT_DATA KEYS]", sorted(drift_data.keys()), "as_of=", as_of)
+        return market_data
 
-            return atr
-        except Exception:
-            return None
+    windows = {}
 
     # -----------------------------
     # Main loop
     # -----------------------------
-    for name, ticker in drift_tickers.items():
+    for name, ticker in DRIFT_TICKERS.items():
         try:
-            intraday = yf.download(
+            intraday = get_market_backend().download(
                 ticker,
                 period="7d",
                 interval="15m",
@@ -3085,7 +3085,7 @@ def attach_drift_data_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
                 threads=False,
             )
 
-            daily = yf.download(
+            daily = get_market_backend().download(
                 ticker,
                 period="3mo",
                 interval="1d",
@@ -3094,52 +3094,15 @@ def attach_drift_data_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
                 threads=False,
             )
 
-            intraday_close = extract_close_series(intraday)
-            daily_close = extract_close_series(daily)
-
-            if intraday_close is None or daily_close is None:
-                drift_data[name] = {}
-                continue
-
-            curr = float(intraday_close.iloc[-1])
-
-            # intraday
-            m15 = float(intraday_close.iloc[-2]) if len(intraday_close) >= 2 else None
-            m30 = float(intraday_close.iloc[-3]) if len(intraday_close) >= 3 else None
-            h1 = float(intraday_close.iloc[-5]) if len(intraday_close) >= 5 else None
-            h4 = float(intraday_close.iloc[-17]) if len(intraday_close) >= 17 else None
-
-            # daily
-            d1 = float(daily_close.iloc[-2]) if len(daily_close) >= 2 else None
-            d5 = float(daily_close.iloc[-6]) if len(daily_close) >= 6 else None
-
-            # ATR
-            atr_series = calculate_atr(daily)
-            atr_latest = float(atr_series.iloc[-1]) if atr_series is not None else None
-
-            def norm(ret):
-                try:
-                    if ret is None or atr_latest is None or atr_latest == 0:
-                        return None
-                    return ret / atr_latest
-                except Exception:
-                    return None
-
-            drift_data[name] = {
-                "ret_15m": safe_ret(curr, m15),
-                "ret_30m": safe_ret(curr, m30),
-                "ret_1h": safe_ret(curr, h1),
-                "ret_4h": safe_ret(curr, h4),
-                "ret_1d": safe_ret(curr, d1),
-                "ret_5d": safe_ret(curr, d5),
-                "atr": atr_latest,
-                "norm_1d": norm(safe_ret(curr, d1)),
-                "norm_5d": norm(safe_ret(curr, d5)),
-            }
+            windows[name] = live_window(
+                archive_frame(ticker, "15m", intraday),
+                archive_frame(ticker, "1d", daily),
+            )
 
         except Exception:
-            drift_data[name] = {}
+            windows[name] = None
 
+    drift_data = compute_drift(windows)
     market_data["DRIFT_DATA"] = drift_data
     
     print("[DRIFT_DATA KEYS]", sorted(drift_data.keys()))
@@ -3421,14 +3384,40 @@ def pseudo_gamma_filter(market_data: Dict[str, Any]) -> str:
     sew_state = str(market_data.get("SEW_STATUS", "N/A") or "N/A").upper()
     sew_event_type = str(market_data.get("SEW_EVENT_TYPE", "N/A") or "N/A").upper()
 
+    gex = market_data.get("GEX", {}) or {}
+    gex_regime = str(gex.get("regime", "UNKNOWN") or "UNKNOWN").upper()
+
     gamma_state = "UNKNOWN"
     gamma_bias = ""
     strategy = ""
 
+    # -------------------------
+    # 0️⃣ Real GEX (strike-level option chain) 우선
+    # -------------------------
+    if gex_regime == "LONG_GAMMA":
+        if drift_score <= 1:
+            gamma_state = "🟢 POSITIVE GAMMA"
+            gamma_bias = "Net dealer GEX > 0 / 딜러 long gamma가 변동성 흡수"
+            strategy = "눌림 매수 / 추격 금지"
+        else:
+            gamma_state = "🟡 POSITIVE-TRANSITION"
+            gamma_bias = "딜러 long gamma이나 Drift가 형성 중"
+            strategy = "초기 방향성 관찰 / 과도한 추격 금지"
+
+    elif gex_regime == "SHORT_GAMMA":
+        if drift_score >= 2:
+            gamma_state = "🔴 NEGATIVE GAMMA"
+            gamma_bias = "Net dealer GEX < 0 / 딜러 hedge가 추세를 가속"
+            strategy = "추세 추종 / 빠른 대응"
+        else:
+            gamma_state = "🟡 TRANSITION"
+            gamma_bias = "딜러 short gamma 구간이나 방향성 확정 전"
+            strategy = "리스크 축소 / 신호 확인"
+
     # -------------------------
     # 1️⃣ Positive Gamma Zone
     # -------------------------
-    if vix_level is not None and vix_level < 18:
+    elif vix_level is not None and vix_level < 18:
         if drift_score <= 1:
             gamma_state = "🟢 POSITIVE GAMMA"
             gamma_bias = "Mean-reverting / 딜러가 변동성 흡수"
@@ -3467,7 +3456,11 @@ def pseudo_gamma_filter(market_data: Dict[str, Any]) -> str:
     # -------------------------
     # 4️⃣ Dealer Gamma Bias Note
     # -------------------------
-    if dealer_gamma_bias < 0.5:
+    if gex_regime == "SHORT_GAMMA":
+        dealer_gamma_note = "RUN RISK / dealer short gamma (GEX)"
+    elif gex_regime == "LONG_GAMMA":
+        dealer_gamma_note = "STABILIZING / dealer long gamma (GEX)"
+    elif dealer_gamma_bias < 0.5:
         dealer_gamma_note = "RUN RISK / dealer gamma proxy weak"
     elif dealer_gamma_bias > 1.5:
         dealer_gamma_note = "STABILIZING / dealer gamma proxy supportive"
@@ -3498,18 +3491,31 @@ def pseudo_gamma_filter(market_data: Dict[str, Any]) -> str:
     market_data["GAMMA_STATE"] = gamma_state
     market_data["GAMMA_COMBO"] = combo_signal
     market_data["DEALER_GAMMA_NOTE"] = dealer_gamma_note
+    market_data["GAMMA_SOURCE_USED"] = "GEX" if gex_regime in ["LONG_GAMMA", "SHORT_GAMMA"] else "PSEUDO"
 
     # -------------------------
     # Output
     # -------------------------
     lines = []
     lines.append("### ⚡ 7.3) Pseudo Gamma Filter")
-    lines.append("- **정의:** 옵션 데이터 없이 시장의 감마 환경을 추론")
-    lines.append("- **주의:** Dealer Gamma Bias 숫자와 Pseudo Gamma State는 서로 다른 레이어")
+    if gex_regime in ["LONG_GAMMA", "SHORT_GAMMA"]:
+        lines.append("- **정의:** SPY option chain strike-level dealer GEX + Drift로 감마 환경 판단")
+    else:
+        lines.append("- **정의:** 옵션 데이터 없이 시장의 감마 환경을 추론")
+        lines.append("- **주의:** Dealer Gamma Bias 숫자와 Pseudo Gamma State는 서로 다른 레이어")
     lines.append("")
 
     lines.append(f"- **Pseudo Gamma State:** {gamma_state}")
     lines.append(f"- **Dealer Gamma Bias:** {dealer_gamma_bias:.2f} ({dealer_gamma_note})")
+    if gex_regime in ["LONG_GAMMA", "SHORT_GAMMA"]:
+        lines.append(
+            f"- **Dealer GEX:** {gex.get('total_gex_bn')}bn per 1% / "
+            f"Zero-Gamma {gex.get('zero_gamma', 'N/A')} "
+            f"(spot {gex.get('spot', 'N/A')}, {gex.get('flip_distance_pct', 'N/A')}%)"
+        )
+        lines.append(f"- **Call Wall / Put Wall:** {gex.get('call_wall', 'N/A')} / {gex.get('put_wall', 'N/A')}")
+        if gex.get("regime_conflict"):
+            lines.append("- **⚠️ GEX Conflict:** spot vs zero-gamma 위치와 총 GEX 부호가 반대 → regime은 총 GEX 부호 기준")
     lines.append(f"- **Bias:** {gamma_bias}")
     lines.append(f"- **Strategy:** {strategy}")
     lines.append("")
@@ -4702,7 +4708,7 @@ def volatility_controlled_exposure_filter(market_data: Dict[str, Any]) -> str:
         hard_deadman = True
         hard_deadman_reason = "Structural Credit Stress"
     
-    elif macro_narrative == "STAGFLATION_RISK" and cross_asset_tape.get("VIX_Z", 0) >= 3:
+    elif macro_narrative == "STAGFLATION_RISK" and (_to_float(cross_asset_tape.get("VIX_Z")) or 0) >= 3:
         hard_deadman = True
         hard_deadman_reason = "Stagflation Shock + Volatility Spike"
 
@@ -4848,6 +4854,28 @@ def volatility_controlled_exposure_filter(market_data: Dict[str, Any]) -> str:
         elif hy_pct >= 5:
             exposure *= 0.93
             brake_drivers.append("HY OAS Rising")        
+
+    # --------------------------------------------------
+    # 5.5️⃣ Ex-ante Vol Target (EWMA covariance, 직전 allocation 기준)
+    # --------------------------------------------------
+    risk_model = market_data.get("RISK_MODEL", {}) or {}
+    vol_target_exposure = None
+    vol_target_suggestion = None
+    risk_coverage = _to_float(risk_model.get("coverage"))
+    coverage_ok = risk_coverage is not None and risk_coverage >= float(risk_model.get("min_coverage", 0.8))
+    if risk_model.get("available") and coverage_ok:
+        vol_target_exposure = _to_float(risk_model.get("vol_target_exposure"))
+        if vol_target_exposure is not None and exposure > vol_target_exposure:
+            if risk_model.get("hard_cap"):
+                exposure = vol_target_exposure
+                brake_drivers.append(
+                    f"Ex-ante Vol Target ({risk_model.get('basket_vol', 0):.1f}% > {risk_model.get('target_vol', 0):.0f}%)"
+                )
+            else:
+                # 기본: allocation은 그대로 두고 권고치만 리포트에 노출
+                vol_target_suggestion = vol_target_exposure
+    market_data["VOL_TARGET_EXPOSURE"] = vol_target_exposure
+    market_data["VOL_TARGET_SUGGESTION"] = vol_target_suggestion
     
     # --------------------------------------------------
     # 6️⃣ Confidence Scaling
@@ -4978,6 +5006,31 @@ def volatility_controlled_exposure_filter(market_data: Dict[str, Any]) -> str:
     lines.append(f"- **Base Risk Budget (13):** {risk_budget:.0f}")
     lines.append(f"- **VIX Level:** {vix_display} ({vol_state}) | **Change:** {vix_pct_display}")
 
+    if risk_model.get("available"):
+        lines.append(
+            f"- **Ex-ante Vol (EWMA):** {risk_model['ex_ante_vol']:.1f}% "
+            f"(basket {risk_model['basket_vol']:.1f}% / target {risk_model['target_vol']:.0f}%) "
+            f"| **Vol-target Exposure:** {risk_model['vol_target_exposure']}% "
+            f"| **Coverage:** {risk_coverage or 0.0:.0%} "
+            f"({risk_model.get('covered_weight', 0.0):.3f} / {risk_model.get('invested_weight', 0.0):.3f})"
+        )
+        if not coverage_ok:
+            lines.append(
+                f"- **Vol-target:** coverage {risk_coverage or 0.0:.0%} < {float(risk_model.get('min_coverage', 0.8)):.0%} "
+                f"→ 공분산 없는 보유 ETF 비중이 커서 권고 생략"
+            )
+        if vol_target_suggestion is not None:
+            lines.append(
+                f"- **Vol-target Suggestion:** exposure ≤ {vol_target_suggestion:.0f}% 권고 "
+                f"(advisory, 미적용 — VOL_TARGET_HARD_CAP=1 시 hard cap)"
+            )
+        top_risk = list((risk_model.get("by_group") or {}).items())[:3]
+        if top_risk:
+            lines.append(
+                "- **Risk Contribution:** "
+                + ", ".join(f"{name} {info['share'] * 100:.0f}%" for name, info in top_risk)
+            )
+
     if hard_deadman:
         lines.append("- **🚨 STATUS:** HARD DEAD MAN'S SWITCH ACTIVATED")
         lines.append(f"- **Reason:** {hard_deadman_reason}")
@@ -5320,40 +5373,6 @@ def dynamic_vix_threshold(market_data: Dict[str, Any]) -> Tuple[int, str, str]:
         return (0, "VOLATILITY NORMAL", f"absolute mode: VIX {current_vix:.1f}")
 
 
-def determine_cash_return_policy(
-    market_quality_context: Dict[str, Any],
-    participation_mode: str,
-) -> bool:
-    """
-    Decide whether capped residual equity budget should be returned to cash.
-    """
-
-    hard_cash_modes = {
-        "COMPRESSED_SQUEEZE",
-        "VOL_STRUCTURE_DEFENSE",
-        "FAILED_BREADTH_MODE",
-        "CAP_RESTRICTED",
-        "DEFENSIVE_SELECTIVE",
-    }
-
-    if participation_mode in hard_cash_modes:
-        return True
-
-    participation_signal = market_quality_context.get("participation_signal", "WEAK")
-    positioning_state = market_quality_context.get("positioning_state", "NORMAL")
-    vol_structure = market_quality_context.get("vol_structure", "NORMAL")
-
-    if participation_signal == "FAILED":
-        return True
-
-    if positioning_state in ["STRESSED", "SQUEEZE_RISK"]:
-        return True
-
-    if vol_structure in ["INVERTED_SHORT_TERM", "DISLOCATION"]:
-        return True
-
-    return False
-
 def build_tactical_allocation(
     score: Dict[str, float],
     ow_sorted: list,
@@ -5368,6 +5387,8 @@ def build_tactical_allocation(
 ) -> Dict[str, Any]:
     """
     18.5) Tactical Asset Allocation Builder - v4.1
+    dict 입력 -> tactical_weight_kernel 1 row (history와 같은 kernel)
+    ow_sorted는 score에서 같은 규칙(-score, sector)으로 다시 정렬됨
     """
 
     # -------------------------
@@ -5378,420 +5399,67 @@ def build_tactical_allocation(
     macro_profile = str(macro_profile or "BALANCED").upper()
     market_quality_context = market_quality_context or {}
 
-    quality_meta = classify_participation_quality(market_quality_context) if market_quality_context else {
-        "participation_quality": "NEUTRAL_PARTICIPATION",
-        "participation_quality_score": 0,
-        "participation_mode": "BALANCED",
-    }
-    
-	
-    participation_mode = quality_meta["participation_mode"]
-    policy = mode_policy.get(participation_mode, mode_policy["BALANCED"])
-
-    print("[DEBUG][18_PARTICIPATION_META]", quality_meta)
-    print("[DEBUG][18_POLICY]", participation_mode, policy)
-
-    cash_return_required = determine_cash_return_policy(
-        market_quality_context,
-        participation_mode,
+    delev = bool(deleveraging_required and prev_exposure is not None)
+
+    weighted = tactical_weight_kernel(
+        score=np.array([[float(score.get(s, 0)) for s in SECTORS]]),
+        classification=np.array([[sector_classification.get(s, "ALIGNED") for s in SECTORS]], dtype=object),
+        div_flags=np.array([[divergence_flags.get(s, "ALIGNED") for s in SECTORS]], dtype=object),
+        momentum=np.array([[float(momentum_scores.get(s, 0)) for s in SECTORS]]),
+        total_exposure=np.array([float(total_exposure)]),
+        prev_exposure=np.array([float(prev_exposure) if delev else float(total_exposure)]),
+        deleveraging=np.array([delev]),
+        macro_profile=np.array([macro_profile], dtype=object),
+        quality=[market_quality_context],
     )
 
-    print(
-        "[DEBUG][18_CASH_POLICY]",
-        participation_mode,
-        cash_return_required,
-    )
-    
-    sector_style_map = {
-        "Technology": "HIGH_BETA",
-        "Communication Services": "HIGH_BETA",
-        "Real Estate": "HIGH_BETA",
-
-        "Consumer Discretionary": "CYCLICAL",
-        "Industrials": "CYCLICAL",
-        "Materials": "CYCLICAL",
-        "Energy": "CYCLICAL",
-        "Financials": "CYCLICAL",
-
-        "Consumer Staples": "DEFENSIVE",
-        "Health Care": "DEFENSIVE",
-        "Utilities": "DEFENSIVE",
-    }
+    quality_meta = weighted["participation"][0]
+    participation_mode = quality_meta["participation_mode"]
 
-    # 🔥 NameError 방지: 함수 전체 스코프 최상단
-    cap_applied = []
+    print("[DEBUG][18_PARTICIPATION_META]", {
+        k: quality_meta[k]
+        for k in ["participation_quality", "participation_quality_score", "participation_mode"]
+    })
+    print("[DEBUG][18_POLICY]", participation_mode, quality_meta["policy"])
+    print("[DEBUG][18_CASH_POLICY]", participation_mode, quality_meta["cash_return_required"])
 
-    # -------------------------
-    # 1) Positive score universe
-    # -------------------------
-    positive_scores = {
-        sector: float(score[sector])
-        for sector in ow_sorted
-        if float(score.get(sector, 0)) > 0
-    }
-    if (
-        "Technology" not in positive_scores
-        and score.get("Technology", 0) > -1.0
-        and market_quality_context.get("leadership_state") in ["BROAD", "MODERATE"]
-        and market_quality_context.get("participation_signal") in ["PARTIAL", "CONFIRMED"]
-    ):
-        positive_scores["Technology"] = 0.3
+    if weighted["rescue"][0]:
         print(
             "[DEBUG][TECH_RESCUE]",
             score.get("Technology", 0),
             market_quality_context.get("leadership_state"),
             market_quality_context.get("participation_signal"),
-
         )
 
-
-    # -------------------------
-    # 2) Classification adjustment
-    # -------------------------
-    adjusted_scores = {}
-
-    for sector, raw_score in positive_scores.items():
-        classification = sector_classification.get(sector, "ALIGNED")
-        div_flag = divergence_flags.get(sector, "ALIGNED")
-
-        multiplier = 1.0
-
-        if classification == "HIGH_CONVICTION_ALIGNED":
-            multiplier *= 1.15
-        elif classification == "FLOW_WEAK":
-            if policy.get("flow_weak_penalty", False):
-                multiplier *= 0.60
-            else:
-                multiplier *= 1.00
-        elif classification == "THEORY_TRAP":
-            multiplier *= 0.40
-        elif classification == "POSITIVE_DIVERGENCE":
-            multiplier *= 1.10
-        elif classification == "AVOID":
-            multiplier *= 0.0
-
-        if div_flag == "NEGATIVE_DIVERGENCE":
-            multiplier *= 0.60
-        elif div_flag == "POSITIVE_DIVERGENCE":
-            multiplier *= 1.15
-
-        adjusted = raw_score * multiplier
-
-        if adjusted > 0:
-            adjusted_scores[sector] = adjusted
-
-    total_score_sum = sum(adjusted_scores.values())
-    weights = {}
+    adjusted_scores = {
+        SECTORS[j]: float(weighted["adjusted"][0, j])
+        for j in weighted["order"][0]
+        if weighted["adjusted"][0, j] > 0
+    }
 
     # -------------------------
     # Early Exit
     # -------------------------
-    if total_score_sum <= 0:
+    if not weighted["active"][0]:
         return {
             "weights": {},
             "cash_weight": round(100.0 - total_exposure, 1),
             "total_score_sum": 0,
             "adjusted_scores": adjusted_scores,
-            "cap_applied": cap_applied,
+            "cap_applied": [],
             "macro_profile": macro_profile,
         }
 
-    # -------------------------
-    # 3) Base exposure
-    # -------------------------
-    if deleveraging_required and prev_exposure is not None:
-        base_exposure = float(prev_exposure)
-    else:
-        base_exposure = float(total_exposure)
-
-    # -------------------------
-    # 4) Initial weights
-    # -------------------------
-    for sector, adj_score in adjusted_scores.items():
-        weights[sector] = (adj_score / total_score_sum) * base_exposure
-
-    # -------------------------
-    # 5) Deleveraging
-    # -------------------------
-    if deleveraging_required and prev_exposure is not None:
-        reduction_needed = max(0.0, float(prev_exposure) - float(total_exposure))
-
-        priority_rows = rank_deleveraging_priority(
-            score=score,
-            weights=weights,
-            divergence_flags=divergence_flags,
-            momentum_scores=momentum_scores,
-            sector_classification=sector_classification,
-        )
-
-        MAX_CUT_RATIO = 0.5
-
-        for row in priority_rows:
-            if reduction_needed <= 0:
-                break
-
-            sector = row["sector"]
-            current_weight = weights.get(sector, 0.0)
-
-            if current_weight <= 0:
-                continue
-
-            max_cut = current_weight * MAX_CUT_RATIO
-            cut_amount = min(max_cut, reduction_needed)
-
-            weights[sector] = current_weight - cut_amount
-            reduction_needed -= cut_amount
-
-    # -------------------------
-    # 6) Regime Caps
-    # -------------------------
-    regime_caps = {
-        "SOFT_RISK_OFF_DISINFLATION": {
-            "Technology": 28.0,
-            "Health Care": 18.0,
-            "Consumer Staples": 15.0,
-            "Consumer Discretionary": 10.0,
-            "Industrials": 10.0,
-        },
-        "SOFT_RISK_ON_DISINFLATION": {
-            "Technology": 32.0,
-            "Consumer Discretionary": 16.0,
-            "Health Care": 16.0,
-            "Industrials": 14.0,
-        },
-        "DISINFLATION_RISK_ON": {
-            "Technology": 35.0,
-            "Consumer Discretionary": 20.0,
-            "Communication Services": 18.0,
-            "Industrials": 15.0,
-        },
-        "EARLY_RISK_ON": {
-            "Technology": 30.0,
-            "Industrials": 18.0,
-            "Consumer Discretionary": 16.0,
-            "Financials": 14.0,
-        },
-        "REFLATION_RISK_ON": {
-            "Industrials": 24.0,
-            "Financials": 22.0,
-            "Energy": 20.0,
-            "Materials": 18.0,
-        },
-        "STAGFLATION_STRESS": {
-            "Energy": 24.0,
-            "Materials": 18.0,
-            "Consumer Staples": 18.0,
-            "Health Care": 16.0,
-            "Technology": 12.0,
-        },
-        "DOLLAR_LIQUIDITY_STRESS": {
-            "Consumer Staples": 20.0,
-            "Health Care": 18.0,
-            "Utilities": 16.0,
-            "Technology": 12.0,
-            "Financials": 8.0,
-            "Real Estate": 6.0,
-        },
-        "GROWTH_SCARE": {
-            "Health Care": 22.0,
-            "Consumer Staples": 20.0,
-            "Utilities": 18.0,
-            "Technology": 14.0,
-            "Industrials": 8.0,
-            "Consumer Discretionary": 8.0,
-        },
-        "EVENT_TRANSITION": {
-            "Health Care": 18.0,
-            "Consumer Staples": 18.0,
-            "Technology": 18.0,
-            "Industrials": 10.0,
-            "Consumer Discretionary": 10.0,
-        },
-    }
-
-    caps = regime_caps.get(macro_profile, {})
-
-
-    # 6.1) Leadership Breadth Cap Relaxation
-    leadership_state = market_quality_context.get("leadership_state", "NARROW")
-    participation_signal = market_quality_context.get("participation_signal", "WEAK")
+    weights = ordered_weights(weighted, 0)
+    cap_applied = cap_records(weighted, 0, macro_profile)
 
-    if (
-        macro_profile == "GROWTH_SCARE"
-        and leadership_state == "BROAD"
-        and participation_signal in ["PARTIAL", "CONFIRMED"]
-    ):
-        caps = dict(caps)
-        caps["Technology"] = max(caps.get("Technology", 14.0), 18.0)
-        caps["Industrials"] = max(caps.get("Industrials", 8.0), 12.0)
-        caps["Consumer Discretionary"] = max(caps.get("Consumer Discretionary", 8.0), 12.0)
-
-    for sector, cap in caps.items():
-        if sector in weights and weights[sector] > cap:
-            original_weight = weights[sector]
-            weights[sector] = cap
-
-            cap_applied.append(
-                {
-                    "sector": sector,
-                    "original": round(original_weight, 1),
-                    "cap": round(cap, 1),
-                    "reduced_by": round(original_weight - cap, 1),
-                }
-            )
-    # -------------------------
-    # -------------------------
-    # 6.5) Participation Quality Caps
-    # -------------------------
-    for sector in list(weights.keys()):
-        sector_style = sector_style_map.get(sector, "CORE")
-
-        participation_cap = None
-
-        if sector_style == "HIGH_BETA":
-            participation_cap = policy.get("high_beta_cap", 1.0) * 100.0
-        elif sector_style == "CYCLICAL":
-            participation_cap = policy.get("cyclical_cap", 1.0) * 100.0
-        elif sector_style == "SMALL_CAP":
-            participation_cap = policy.get("small_cap_cap", 1.0) * 100.0
-
-        if participation_cap is not None and weights[sector] > participation_cap:
-            original_weight = weights[sector]
-            weights[sector] = participation_cap
-
-            cap_applied.append(
-                {
-                    "sector": sector,
-                    "original": round(original_weight, 1),
-                    "cap": round(participation_cap, 1),
-                    "reduced_by": round(original_weight - participation_cap, 1),
-                    "reason": f"PARTICIPATION_CAP_{participation_mode}",
-                }
-            ) 
-    # -------------------------
-    # 6.6) Residual Reallocation Policy
-    # -------------------------
-    current_sum = sum(weights.values())
-    residual_budget = max(0.0, float(total_exposure) - current_sum)
-
-    can_redistribute = (
-        residual_budget > 0
-        and not cash_return_required
-        and market_quality_context.get("leadership_state") == "BROAD"
-        and market_quality_context.get("participation_signal") == "CONFIRMED"
-        and market_quality_context.get("vol_structure") == "NORMAL"
-        and market_quality_context.get("positioning_state") not in ["STRESSED", "SQUEEZE_RISK"]
-    )
-
-    if can_redistribute:
-        eligible_sectors = []
-
-        for sector in adjusted_scores.keys():
-            if sector not in weights:
-                continue
-
-            sector_style = sector_style_map.get(sector, "CORE")
-            classification = sector_classification.get(sector, "ALIGNED")
-            div_flag = divergence_flags.get(sector, "ALIGNED")
-
-            if classification in ["THEORY_TRAP", "AVOID"]:
-                continue
-
-            if div_flag == "NEGATIVE_DIVERGENCE":
-                continue
-
-            if (
-                sector_style == "CYCLICAL"
-                and not policy.get("allow_cyclical_expansion", False)
-            ):
-                continue
-
-            already_capped = any(
-                c.get("sector") == sector
-                for c in cap_applied
-            )
-
-            if already_capped:
-                continue
-
-            eligible_sectors.append(sector)
-
-        eligible_score_sum = sum(
-            adjusted_scores.get(sector, 0.0)
-            for sector in eligible_sectors
-        )
-
-        if eligible_score_sum > 0:
-            for sector in eligible_sectors:
-                add_weight = (
-                    adjusted_scores.get(sector, 0.0)
-                    / eligible_score_sum
-                    * residual_budget
-                )
-                weights[sector] = weights.get(sector, 0.0) + add_weight
-
-            residual_reallocation_action = "REALLOCATED_TO_ELIGIBLE_SECTORS"
-
-            print(
-                "[DEBUG][18_RESIDUAL_REALLOCATED]",
-                round(residual_budget, 1),
-                eligible_sectors,
-            )
-        else:
-            residual_reallocation_action = "REALLOCATION_SKIPPED_NO_ELIGIBLE_SECTOR"
-
-            print(
-                "[DEBUG][18_RESIDUAL_REALLOCATION_SKIPPED]",
-                round(residual_budget, 1),
-                "NO_ELIGIBLE_SECTOR",
-            )
-
-    else:
-        residual_reallocation_action = (
-            "RETURN_TO_CASH"
-            if cash_return_required
-            else "REALLOCATION_CONDITIONS_NOT_MET"
-        )
-
-        print(
-            "[DEBUG][18_RESIDUAL_REALLOCATION_BLOCKED]",
-            round(residual_budget, 1),
-            residual_reallocation_action,
-        )        
-
-    # -------------------------
-    # 7) Exposure compression
-    # -------------------------
-    current_sum = sum(weights.values())
-
-    if current_sum > total_exposure and current_sum > 0:
-        scale = total_exposure / current_sum
-
-        for sector in list(weights.keys()):
-            weights[sector] *= scale
-
-    # -------------------------
-    # 8) Rounding + Residual Cash Return
-    # -------------------------
-    for sector in list(weights.keys()):
-        weights[sector] = round(weights[sector], 1)
-
-    allocated_equity = round(sum(weights.values()), 1)
-
-    residual_cash_return = round(
-        max(0.0, float(total_exposure) - allocated_equity),
-        1
-    )
-
-    if cash_return_required:
-        residual_cash_action = "RETURN_TO_CASH"
-    elif residual_reallocation_action == "REALLOCATED_TO_ELIGIBLE_SECTORS":
-        residual_cash_action = "REALLOCATED"
-    else:
-        residual_cash_action = "UNALLOCATED_RESIDUAL_CASH"
-
-    cash_weight = round(100.0 - allocated_equity, 1)
+    allocated_equity = float(weighted["allocated_equity"][0])
+    residual_cash_return = float(weighted["residual_cash_return"][0])
+    residual_cash_action = weighted["residual_cash_action"][0]
+    residual_reallocation_action = weighted["residual_reallocation_action"][0]
+    cash_weight = float(weighted["cash_weight"][0])
 
+    print("[DEBUG][18_RESIDUAL_REALLOCATION]", residual_reallocation_action)
     print("[DEBUG][18_ALLOCATED_EQUITY]", allocated_equity)
     print("[DEBUG][18_RESIDUAL_CASH_RETURN]", residual_cash_return)
     print("[DEBUG][18_RESIDUAL_CASH_ACTION]", residual_cash_action)
@@ -5807,7 +5475,7 @@ def build_tactical_allocation(
         "allocated_equity": allocated_equity,
         "residual_cash_return": residual_cash_return,
         "residual_cash_action": residual_cash_action,
-        "total_score_sum": round(total_score_sum, 2),
+        "total_score_sum": float(weighted["total_score_sum"][0]),
         "adjusted_scores": adjusted_scores,
         "cap_applied": cap_applied,
         "macro_profile": macro_profile,
@@ -5816,7 +5484,7 @@ def build_tactical_allocation(
         "participation_mode": participation_mode,
         "residual_reallocation_action": residual_reallocation_action,
     }
-    
+
 def apply_rebalance_threshold(
     weights: Dict[str, float],
     prev_sector_weights: Dict[str, float],
@@ -5827,41 +5495,23 @@ def apply_rebalance_threshold(
     Rebalancing Threshold Engine
     - 변화폭이 작으면 기존 비중 유지
     - 큰 변화만 실제 리밸런싱
+    (rebalance_threshold_kernel 1 row)
     """
 
-    adjusted_weights = {}
-    rebalance_actions = {}
-
-    for sector, target_w in weights.items():
-        prev_w = prev_sector_weights.get(sector)
-
-        if prev_w is None:
-            adjusted_weights[sector] = target_w
-            rebalance_actions[sector] = "NEW"
-            continue
-
-        diff = target_w - prev_w
-        abs_diff = abs(diff)
-
-        if abs_diff < hold_threshold:
-            adjusted_weights[sector] = prev_w
-            rebalance_actions[sector] = "HOLD"
+    sectors = list(weights.keys())
+    prev = [prev_sector_weights.get(sector) for sector in sectors]
 
-        elif abs_diff < rebalance_threshold:
-            adjusted_weights[sector] = target_w
-            rebalance_actions[sector] = "SMALL ADJUST"
-
-        else:
-            adjusted_weights[sector] = target_w
-            rebalance_actions[sector] = "REBALANCE"
+    adjusted, actions = rebalance_threshold_kernel(
+        np.array([weights[sector] for sector in sectors], dtype="float64"),
+        np.array([np.nan if p is None else p for p in prev], dtype="float64"),
+        hold_threshold=hold_threshold,
+        rebalance_threshold=rebalance_threshold,
+    )
 
-    adjusted_weights = {
-        sector: round(weight, 1)
-        for sector, weight in adjusted_weights.items()
-    }
+    adjusted_weights = {sector: float(w) for sector, w in zip(sectors, adjusted)}
+    rebalance_actions = {sector: str(a) for sector, a in zip(sectors, actions)}
 
     return adjusted_weights, rebalance_actions
-    
 
 def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
     """
@@ -5903,84 +5553,8 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
             val = state.get(key.lower())
         return str(val if val is not None else default).upper()
 
-    def infer_macro_regime_profile(
-        phase: str,
-        us10y_pct: float,
-        dxy_pct: float,
-        wti_pct: float,
-        vix: float,
-        credit_calm: Any,
-        liq_easy: bool,
-        liq_tight: bool,
-        flow_score: int,
-        drift_label: str,
-    ) -> str:
-        """
-        Macro Regime Profile Inference Layer
-        - 기존 FINAL_STATE phase를 덮어쓰지 않음
-        - Sector Allocation Engine의 PHASE 점수 보조용
-        """
-
-        phase_normalized = (
-            str(phase)
-            .upper()
-            .replace("–", "-")
-            .replace("—", "-")
-            .replace("−", "-")
-        )
-
-        # 1) Dollar liquidity stress는 phase보다 우선
-        if dxy_pct > 0 and liq_tight and credit_calm is False:
-            return "DOLLAR_LIQUIDITY_STRESS"
-
-        # 2) Stagflation / inflation shock
-        if us10y_pct > 0 and wti_pct > 0 and dxy_pct > 0 and vix >= 18:
-            return "STAGFLATION_STRESS"
-
-        # 3) Growth scare
-        if us10y_pct < 0 and wti_pct < 0 and vix >= 18:
-            return "GROWTH_SCARE"
-
-        # 4) Soft risk-off disinflation
-        if "RISK-OFF" in phase_normalized and credit_calm is True and vix < 20:
-            return "SOFT_RISK_OFF_DISINFLATION"
-
-        # 5) Disinflation risk-on
-        if "RISK-ON" in phase_normalized and dxy_pct <= 0 and vix < 24:
-            return "DISINFLATION_RISK_ON"
-
-        # 5.5) Soft risk-on disinflation
-        if (
-            "RISK-ON" in phase_normalized
-            and us10y_pct <= 0
-            and wti_pct <= 0
-            and vix < 20
-            and liq_easy
-            and credit_calm is True
-        ):
-            return "SOFT_RISK_ON_DISINFLATION"
-
-        # 6) Early risk-on
-        if "RISK-ON" in phase_normalized and flow_score >= 4 and vix < 24:
-            return "EARLY_RISK_ON"
-
-        # 7) Reflation risk-on
-        if "RISK-ON" in phase_normalized and us10y_pct > 0 and wti_pct > 0:
-            return "REFLATION_RISK_ON"
-
-        # 8) Event transition
-        if "EVENT-WATCHING" in phase_normalized or "WAITING" in phase_normalized:
-            return "EVENT_TRANSITION"
-
-        if "RISK-ON" in phase_normalized:
-            return "EARLY_RISK_ON"
-
-        if "RISK-OFF" in phase_normalized:
-            return "SOFT_RISK_OFF_DISINFLATION"
-
-        return "BALANCED"
     # -------------------------
-    # 1) 핵심 변수
+    # 1) 핵심 변수 (report context)
     # -------------------------
     t10y2y_raw = fetch_val("T10Y2Y", None)
     t10y2y_missing = t10y2y_raw is None
@@ -5994,10 +5568,6 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
     dxy_pct = float(dxy_data.get("pct_change", 0) or 0)
     wti_pct = float(wti_data.get("pct_change", 0) or 0)
 
-
-
-    
-
     phase = fetch_state_str("phase", "N/A")
     liq_dir = fetch_state_str("liquidity_dir", "N/A")
     liq_lvl = fetch_state_str("liquidity_level_bucket", "N/A")
@@ -6027,458 +5597,7 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
     vix_score, vix_label, vix_detail = dynamic_vix_threshold(market_data)
 
     # -------------------------
-    # 2) Curve 구간 세분화
-    # -------------------------
-    if t10y2y_missing:
-        curve_segment = "N/A"
-    elif t10y2y < 0:
-        curve_segment = "INVERTED"
-    elif t10y2y < 0.25:
-        curve_segment = "FLAT / FRAGILE"
-    elif t10y2y < 0.75:
-        curve_segment = "MODERATE STEEP"
-    else:
-        curve_segment = "STEEP / REFLATION"
-
-    # -------------------------
-    # 3) 우선순위
-    # -------------------------
-    PRIORITY = {
-        "VOL": 7,
-        "LIQ": 6,
-        "CURVE": 5,
-        "CREDIT": 4,
-        "PHASE": 3,
-        "FLOW": 2,   # 🔥 새로 추가
-        "MOM": 1,
-    }
-
-    sectors = [
-        "Technology",
-        "Financials",
-        "Energy",
-        "Industrials",
-        "Materials",
-        "Consumer Discretionary",
-        "Consumer Staples",
-        "Health Care",
-        "Utilities",
-        "Real Estate",
-        "Communication Services",
-    ]
-
-    score = {s: 0 for s in sectors}
-    drivers = {s: [] for s in sectors}
-
-    def add_score(sector: str, pts: float, why: str, bucket: str):
-        if sector not in score:
-            return
-        score[sector] += pts
-        drivers[sector].append({
-            "pts": pts,
-            "why": why,
-            "bucket": bucket,
-            "priority": PRIORITY[bucket],
-        })
-
-    # -------------------------
-    # A) VOLATILITY
-    # -------------------------
-    if vix_score >= 3:
-        add_score("Utilities", 4, f"{vix_label} → 최우선 피난처 ({vix_detail})", "VOL")
-        add_score("Consumer Staples", 3, f"{vix_label} → 경기 비탄력적 섹터 선호 ({vix_detail})", "VOL")
-        add_score("Health Care", 2, f"{vix_label} → 방어/현금흐름 선호 ({vix_detail})", "VOL")
-        add_score("Technology", -4, f"{vix_label} → 고베타/멀티플 압박 ({vix_detail})", "VOL")
-        add_score("Consumer Discretionary", -2, f"{vix_label} → 경기민감 소비 부담 ({vix_detail})", "VOL")
-    elif vix_score == 2:
-        add_score("Utilities", 3, f"{vix_label} → 방어주 우위 ({vix_detail})", "VOL")
-        add_score("Consumer Staples", 2, f"{vix_label} → 필수소비 선호 ({vix_detail})", "VOL")
-        add_score("Technology", -3, f"{vix_label} → 위험자산 회피 ({vix_detail})", "VOL")
-    elif vix_score == -2:
-        add_score("Technology", 2, f"{vix_label} → 성장주 베팅 유효 ({vix_detail})", "VOL")
-        add_score("Consumer Discretionary", 1, f"{vix_label} → 경기민감 소비 회복 ({vix_detail})", "VOL")
-        add_score("Utilities", -1, f"{vix_label} → 방어주 상대매력 둔화 ({vix_detail})", "VOL")
-
-   
-    # -------------------------
-    # B) LIQUIDITY
-    # -------------------------
-    liq_tight = (liq_dir == "DOWN") or (liq_lvl == "LOW")
-    liq_easy = (liq_dir == "UP") and (liq_lvl in ("MID", "HIGH"))
-
-    # 🔧 v3.4: Liquidity는 중요하지만 단독으로 섹터를 지배하지 않도록 완화
-    if liq_tight:
-        add_score("Consumer Staples", 2, "유동성 긴축 → 방어적 필수소비 선호", "LIQ")
-        add_score("Health Care", 2, "유동성 긴축 → 안정적 현금흐름 선호", "LIQ")
-        add_score("Utilities", 1, "유동성 긴축 → 방어주 버퍼", "LIQ")
-        add_score("Technology", -2, "유동성 긴축 → 고밸류에이션 부담", "LIQ")
-        add_score("Real Estate", -1.5, "유동성 긴축 → 조달비용 상승 부담", "LIQ")
-        add_score("Consumer Discretionary", -1, "유동성 긴축 → 경기민감 소비 부담", "LIQ")
-
-    elif liq_easy:
-        add_score("Technology", 2, "유동성 완화 → 성장주/베타 우호", "LIQ")
-        add_score("Industrials", 1.5, "유동성 완화 → 경기민감 회복", "LIQ")
-        add_score("Consumer Discretionary", 1.5, "유동성 완화 → 소비 민감주 우호", "LIQ")
-        add_score("Financials", 1, "유동성 완화 → 위험선호 회복", "LIQ")
-        add_score("Utilities", -1, "유동성 완화 → 방어주 상대매력 저하", "LIQ")
-
-
-    # -------------------------
-    # C) CURVE
-    # -------------------------
-    if not t10y2y_missing:
-        if curve_segment == "INVERTED":
-            add_score("Financials", -3, f"수익률 곡선 역전({t10y2y:.2f}) → 은행 수익성 악화", "CURVE")
-            add_score("Utilities", 2, "역전 커브 → 침체 방어주 선호", "CURVE")
-            add_score("Consumer Staples", 1, "역전 커브 → 경기 방어 필요", "CURVE")
-
-        elif curve_segment == "FLAT / FRAGILE":
-            add_score("Health Care", 1, f"플랫 커브({t10y2y:.2f}) → 방어/퀄리티 선호", "CURVE")
-            add_score("Consumer Staples", 1, f"플랫 커브({t10y2y:.2f}) → 경기 민감도 낮은 섹터 선호", "CURVE")
-
-        elif curve_segment == "MODERATE STEEP":
-            add_score("Financials", 2, f"완만한 스티프닝({t10y2y:.2f}) → 예대마진 개선", "CURVE")
-            add_score("Industrials", 1, f"완만한 스티프닝({t10y2y:.2f}) → 성장 기대 반영", "CURVE")
-
-        elif curve_segment == "STEEP / REFLATION":
-            add_score("Financials", 3, f"가파른 스티프닝({t10y2y:.2f}) → 금융주 우호", "CURVE")
-            add_score("Energy", 1, f"가파른 스티프닝({t10y2y:.2f}) → 리플레이션 민감 섹터", "CURVE")
-            add_score("Materials", 1, f"가파른 스티프닝({t10y2y:.2f}) → 경기재개/실물 민감", "CURVE")
-    else:
-        print("[WARN][18_CURVE_MISSING] T10Y2Y missing → CURVE scores skipped")
-
-    # -------------------------
-    # D) CREDIT
-    # -------------------------
-    if credit_calm is False:
-        add_score("Financials", -2, "크레딧 리스크 감지 → 금융주 변동성 확대", "CREDIT")
-        add_score("Real Estate", -3, "크레딧 리스크 감지 → 부동산 금융 위축", "CREDIT")
-        add_score("Consumer Staples", 1, "크레딧 리스크 감지 → 방어주 선호", "CREDIT")
-        add_score("Health Care", 1, "크레딧 리스크 감지 → 퀄리티 선호", "CREDIT")
-    # -------------------------
-    # -------------------------
-    # E) PHASE + Macro Regime Profile
-    # -------------------------
-    macro_profile = infer_macro_regime_profile(
-        phase=phase,
-        us10y_pct=us10y_pct,
-        dxy_pct=dxy_pct,
-        wti_pct=wti_pct,
-        vix=vix,
-        credit_calm=credit_calm,
-        liq_easy=liq_easy,
-        liq_tight=liq_tight,
-        flow_score=flow_score,
-        drift_label=drift_label,
-    )
-
-    if macro_profile == "DOLLAR_LIQUIDITY_STRESS":
-        add_score("Consumer Staples", 1.5, "Dollar Liquidity Stress → 달러 강세/유동성 압박에서 방어주 선호", "PHASE")
-        add_score("Health Care", 1.0, "Dollar Liquidity Stress → 퀄리티/현금흐름 선호", "PHASE")
-        add_score("Utilities", 0.5, "Dollar Liquidity Stress → 방어적 버퍼", "PHASE")
-        add_score("Technology", -1.0, "Dollar Liquidity Stress → 고밸류 성장주 부담", "PHASE")
-        add_score("Financials", -1.0, "Dollar Liquidity Stress → 크레딧/달러 조달 부담", "PHASE")
-        add_score("Real Estate", -1.0, "Dollar Liquidity Stress → 조달비용 부담", "PHASE")
-
-    elif macro_profile == "STAGFLATION_STRESS":
-        add_score("Energy", 1.5, "Stagflation Stress → 유가/인플레 압력 수혜", "PHASE")
-        add_score("Materials", 0.5, "Stagflation Stress → 원자재 민감 섹터 일부 우호", "PHASE")
-        add_score("Utilities", -1.0, "Stagflation Stress → 금리 상승에 취약", "PHASE")
-        add_score("Real Estate", -1.0, "Stagflation Stress → 조달비용 부담", "PHASE")
-        add_score("Technology", -1.0, "Stagflation Stress → 장기금리 상승 부담", "PHASE")
-        add_score("Consumer Discretionary", -0.5, "Stagflation Stress → 소비 여력 압박", "PHASE")
-
-    elif macro_profile == "GROWTH_SCARE":
-        add_score("Consumer Staples", 1.5, "Growth Scare → 경기방어 필수소비 선호", "PHASE")
-        add_score("Health Care", 1.5, "Growth Scare → 퀄리티/방어 선호", "PHASE")
-        add_score("Utilities", 0.5, "Growth Scare → 금리 하락 시 방어주 일부 우호", "PHASE")
-        add_score("Industrials", -0.5, "Growth Scare → 경기민감 부담", "PHASE")
-        add_score("Consumer Discretionary", -0.5, "Growth Scare → 소비민감 부담", "PHASE")
-        add_score("Financials", -0.5, "Growth Scare → 성장 둔화 시 금융 베타 부담", "PHASE")
-
-    elif macro_profile == "SOFT_RISK_OFF_DISINFLATION":
-        add_score("Health Care", 1.2, "Soft Risk-Off Disinflation → 금리 안정/퀄리티 방어 우위", "PHASE")
-        add_score("Consumer Staples", 0.8, "Soft Risk-Off Disinflation → 필수소비 방어 보완", "PHASE")
-        add_score("Technology", 0.5, "Soft Risk-Off Disinflation → 금리 안정으로 리더 섹터 일부 유지", "PHASE")
-        add_score("Consumer Discretionary", -0.5, "Soft Risk-Off Disinflation → 소비 베타는 일부 제한", "PHASE")
-        add_score("Industrials", -0.5, "Soft Risk-Off Disinflation → 경기민감 과열 억제", "PHASE")
-
-    elif macro_profile == "SOFT_RISK_ON_DISINFLATION":
-        add_score("Technology", 1.0, "Soft Risk-On Disinflation → 금리 안정으로 성장주 일부 우호", "PHASE")
-        add_score("Health Care", 0.5, "Soft Risk-On Disinflation → 퀄리티 보완", "PHASE")
-        add_score("Consumer Discretionary", 0.5, "Soft Risk-On Disinflation → 낮은 변동성에서 소비 베타 일부 회복", "PHASE")
-        add_score("Utilities", -0.5, "Soft Risk-On Disinflation → 방어주 상대매력 일부 둔화", "PHASE")
-
-    elif macro_profile == "DISINFLATION_RISK_ON":
-        add_score("Technology", 1.5, "Disinflation Risk-On → 성장주/장기 듀레이션 우호", "PHASE")
-        add_score("Consumer Discretionary", 1.0, "Disinflation Risk-On → 소비 베타 우호", "PHASE")
-        add_score("Communication Services", 0.5, "Disinflation Risk-On → 플랫폼/성장 섹터 우호", "PHASE")
-        add_score("Utilities", -0.5, "Disinflation Risk-On → 방어주 상대매력 둔화", "PHASE")
-
-    elif macro_profile == "EARLY_RISK_ON":
-        add_score("Technology", 1.0, "Early Risk-On → 초기 리더 섹터 선호", "PHASE")
-        add_score("Industrials", 1.0, "Early Risk-On → 경기민감 회복 관찰", "PHASE")
-        add_score("Consumer Discretionary", 0.5, "Early Risk-On → 소비 베타 일부 회복", "PHASE")
-        add_score("Consumer Staples", -0.5, "Early Risk-On → 방어주 상대매력 둔화", "PHASE")
-
-    elif macro_profile == "REFLATION_RISK_ON":
-        add_score("Industrials", 1.5, "Reflation Risk-On → 경기민감 우호", "PHASE")
-        add_score("Financials", 1.0, "Reflation Risk-On → 커브/성장 기대 우호", "PHASE")
-        add_score("Energy", 1.0, "Reflation Risk-On → 에너지/실물자산 우호", "PHASE")
-        add_score("Materials", 0.5, "Reflation Risk-On → 원자재/산업재 우호", "PHASE")
-
-    elif macro_profile == "EVENT_TRANSITION":
-        add_score("Health Care", 1.0, f"{phase} → 관망 구간 방어/퀄리티 선호", "PHASE")
-        add_score("Consumer Staples", 1.0, f"{phase} → 관망 구간 필수소비 선호", "PHASE")
-        add_score("Technology", -0.5, f"{phase} → 이벤트 전 성장주 베타 일부 제한", "PHASE")
-        add_score("Industrials", -0.5, f"{phase} → 이벤트 전 경기민감 베팅 제한", "PHASE")
-
-    else:
-        add_score("Health Care", 0.5, "Balanced Macro Profile → 퀄리티 보완", "PHASE")
-        add_score("Consumer Staples", 0.5, "Balanced Macro Profile → 방어 보완", "PHASE")
-
-    # Store inferred macro profile for downstream layers
-    market_data["MACRO_REGIME_PROFILE"] = macro_profile
-    # -------------------------
-    # F) REAL-TIME MOMENTUM (Relative Strength)
-    # -------------------------
-    ticker_map = {
-        "Technology": "XLK",
-        "Financials": "XLF",
-        "Energy": "XLE",
-        "Industrials": "XLI",
-        "Materials": "XLB",
-        "Consumer Discretionary": "XLY",
-        "Consumer Staples": "XLP",
-        "Health Care": "XLV",
-        "Utilities": "XLU",
-        "Real Estate": "XLRE",
-        "Communication Services": "XLC"
-    }
-
-    momentum_data = market_data.get("MOMENTUM_SCORES", {})
-
-    for sector_name, ticker in ticker_map.items():
-        m_score = momentum_data.get(ticker, 0)
-        if m_score > 0:
-            add_score(sector_name, m_score, "Relative Strength 강세 (vs SPY) → 자금 유입 확인", "MOM")
-        elif m_score < 0:
-            add_score(sector_name, m_score, "Relative Strength 약세 (vs SPY) → 소외 섹터", "MOM")
-
-    # -------------------------
-    # G) 🔥 FLOW / GAMMA / DRIFT OVERLAY (ADD ONLY)
-    # -------------------------
-    flow_overlay_notes: List[str] = []
-
-    flow_active = flow_score >= 4
-    gamma_transition = "TRANSITION" in gamma_state
-    gamma_positive = "POSITIVE" in gamma_state
-
-    # 1) 디스인플레이션 + 리스크온 초기
-    if flow_active and drift_label == "DISINFLATION_RISK_ON":
-        add_score("Technology", 1.5, "Flow Overlay → DISINFLATION_RISK_ON 수혜", "FLOW")
-        add_score("Consumer Discretionary", 1.0, "Flow Overlay → 소비/성장 베타 우호", "FLOW")
-        add_score("Communication Services", 0.5, "Flow Overlay → 성장/플랫폼 수혜", "FLOW")
-        flow_overlay_notes.append("DISINFLATION_RISK_ON → XLK/XLY/XLC 가점")
-
-    # 2) 오일 쇼크 / 원자재 압력
-    elif flow_active and drift_label == "OIL_SHOCK":
-        add_score("Energy", 1.5, "Flow Overlay → OIL_SHOCK 수혜", "FLOW")
-        add_score("Materials", 1.0, "Flow Overlay → 원자재/실물 우호", "FLOW")
-        add_score("Consumer Discretionary", -1.0, "Flow Overlay → 유가 쇼크 시 소비 부담", "FLOW")
-        flow_overlay_notes.append("OIL_SHOCK → XLE/XLB 가점, XLY 감점")
-
-    # 3) 중립이지만 초기 흐름이 형성되는 경우
-    elif flow_active and drift_label == "NEUTRAL":
-        add_score("Technology", 0.5, "Flow Overlay → 초기 흐름에서 성장주 선행 반응", "FLOW")
-        add_score("Industrials", 0.5, "Flow Overlay → 경기민감 확인용 가점", "FLOW")
-        flow_overlay_notes.append("NEUTRAL + FLOW ACTIVE → XLK/XLI 소폭 가점")
-
-    # 4) Gamma 상태에 따른 집중도
-    if flow_active and gamma_positive:
-        add_score("Technology", 1.0, "Gamma Overlay → POSITIVE, 추세 지속 우호", "FLOW")
-        add_score("Industrials", 0.5, "Gamma Overlay → 경기민감 추세 확인", "FLOW")
-        flow_overlay_notes.append("Gamma POSITIVE → 리더 섹터 가점")
-    elif flow_active and gamma_transition:
-        add_score("Technology", 0.5, "Gamma Overlay → TRANSITION, 초기 리더 형성", "FLOW")
-        flow_overlay_notes.append("Gamma TRANSITION → 초기 리더 소폭 가점")
-
-
-    # -------------------------
-    # H) Theory vs Flow Divergence Adjustment
-    # -------------------------
-        # -------------------------
-    # H) Layer 2~5. Theory / Flow / Divergence / Final Score (v4.2)
-    # -------------------------
-    divergence_flags = {}
-    sector_classification = {}
-    theoretical_score = {}
-    flow_score_by_sector = {}
-    sector_divergence = {}
-    final_score = {}
-
-    THEORY_BUCKETS = {"VOL", "LIQ", "CURVE", "CREDIT", "PHASE"}
-    FLOW_BUCKETS = {"FLOW", "MOM"}
-
-    # -------------------------
-    # H-1) First Pass: Theory / Flow / Divergence 계산
-    # -------------------------
-    for s in sectors:
-        theo = 0.0
-
-        for d in drivers[s]:
-            bucket = d.get("bucket")
-            pts = float(d.get("pts", 0) or 0)
-
-            if bucket in THEORY_BUCKETS:
-                theo += pts
-
-        theoretical_score[s] = round(theo, 2)
-
-        momentum_component = 0.0
-        flow_component = 0.0
-        relative_component = 0.0
-        price_trend_component = 0.0
-
-        for d in drivers[s]:
-            bucket = d.get("bucket")
-            pts = float(d.get("pts", 0) or 0)
-
-            if bucket == "MOM":
-                momentum_component += pts
-                relative_component += pts
-            elif bucket == "FLOW":
-                flow_component += pts
-
-        price_trend_component = momentum_component
-
-        market_flow_score = (
-            (0.35 * momentum_component) +
-            (0.30 * flow_component) +
-            (0.20 * relative_component) +
-            (0.15 * price_trend_component)
-        )
-
-        flow_score_by_sector[s] = round(market_flow_score, 2)
-        sector_divergence[s] = round(market_flow_score - theo, 2)
-
-    # -------------------------
-    # H-2) Regime Controller
-    # -------------------------
-    div_values = list(sector_divergence.values())
-
-    if div_values:
-        avg_divergence = round(sum(div_values) / len(div_values), 2)
-        variance = sum((x - avg_divergence) ** 2 for x in div_values) / len(div_values)
-        divergence_dispersion = round(variance ** 0.5, 2)
-    else:
-        avg_divergence = 0.0
-        divergence_dispersion = 0.0
-
-    if divergence_dispersion > 1.5:
-        regime_controller = "DISLOCATION"
-    elif avg_divergence > 1.0:
-        regime_controller = "FLOW_MARKET"
-    elif avg_divergence < -1.0:
-        regime_controller = "THEORY_MARKET"
-    else:
-        regime_controller = "BALANCED"
-
-    # -------------------------
-    # H-3) Second Pass: Regime-aware Classification / Final Score
-    # -------------------------
-    for s in sectors:
-        theo = theoretical_score.get(s, 0.0)
-        flow = flow_score_by_sector.get(s, 0.0)
-
-        if regime_controller == "FLOW_MARKET":
-            aligned_theo_w = 0.45
-            aligned_flow_w = 0.55
-            trap_penalty_mult = 0.8
-
-        elif regime_controller == "THEORY_MARKET":
-            aligned_theo_w = 0.75
-            aligned_flow_w = 0.25
-            trap_penalty_mult = 1.2
-
-        elif regime_controller == "DISLOCATION":
-            aligned_theo_w = 0.50
-            aligned_flow_w = 0.50
-            trap_penalty_mult = 1.35
-
-        else:
-            aligned_theo_w = 0.65
-            aligned_flow_w = 0.35
-            trap_penalty_mult = 1.0
-
-        classification = "ALIGNED"
-        div_flag = "ALIGNED"
-
-        if theo >= 2.0 and flow >= 1.0:
-            classification = "HIGH_CONVICTION_ALIGNED"
-            div_flag = "ALIGNED"
-            final = (aligned_theo_w * theo) + (aligned_flow_w * flow) + 0.3
-
-        elif theo >= 2.0 and -0.5 <= flow < 1.0:
-            classification = "FLOW_WEAK"
-            div_flag = "NEGATIVE_DIVERGENCE"
-            final = ((aligned_theo_w + 0.10) * theo) + ((aligned_flow_w - 0.10) * flow) - 0.3
-
-        elif theo >= 1.0 and flow < -0.5:
-            classification = "THEORY_TRAP"
-            div_flag = "NEGATIVE_DIVERGENCE"
-            final = (aligned_theo_w * theo) + (aligned_flow_w * flow) - (1.8 * trap_penalty_mult)
-
-        elif theo < 1.0 and flow >= 1.5:
-            classification = "POSITIVE_DIVERGENCE"
-            div_flag = "POSITIVE_DIVERGENCE"
-            final = ((aligned_theo_w - 0.20) * theo) + ((aligned_flow_w + 0.20) * flow) + 0.4
-
-        elif -0.5 <= theo < 1.0 and 0.5 <= flow < 1.5:
-            classification = "TACTICAL_MOMENTUM_ONLY"
-            div_flag = "POSITIVE_DIVERGENCE"
-            final = ((aligned_theo_w - 0.10) * theo) + ((aligned_flow_w + 0.10) * flow)
-
-        elif theo < 0 and flow < 0:
-            classification = "AVOID"
-            div_flag = "ALIGNED"
-            final = (0.50 * theo) + (0.50 * flow) - (0.3 * trap_penalty_mult)
-
-        elif theo == 0 and flow == 0:
-            classification = "NEUTRAL"
-            div_flag = "ALIGNED"
-            final = 0.0
-
-        else:
-            classification = "ALIGNED"
-            div_flag = "ALIGNED"
-            final = (aligned_theo_w * theo) + (aligned_flow_w * flow)
-
-        if regime_controller == "DISLOCATION":
-            final *= 0.90
-
-        if classification == "THEORY_TRAP" and final > -0.3:
-            final = -0.3
-
-        sector_classification[s] = classification
-        divergence_flags[s] = div_flag
-        final_score[s] = round(final, 2)
-
-    score = final_score
-
-    market_data["SECTOR_THEORETICAL_SCORE"] = theoretical_score
-    market_data["SECTOR_FLOW_SCORE"] = flow_score_by_sector
-    market_data["SECTOR_DIVERGENCE"] = sector_divergence
-    market_data["SECTOR_CLASSIFICATION"] = sector_classification
-    market_data["SECTOR_DIVERGENCE_FLAGS"] = divergence_flags
-    market_data["SECTOR_FINAL_SCORE"] = final_score
-
-    market_data["REGIME_CONTROLLER"] = regime_controller
-    market_data["AVG_DIVERGENCE"] = avg_divergence
-    market_data["DIVERGENCE_DISPERSION"] = divergence_dispersion
-
-
-    # H-4) Correlation Break Integration
+    # 2) Correlation Break (score kernel input)
     # -------------------------
     corr_state = correlation_break_state(market_data)
     sector_corr_state = sector_correlation_break_state(market_data)
@@ -6497,96 +5616,70 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
         + sector_corr_state.get("reasons", [])
     )
 
-    if is_corr_break:
-        for s in final_score:
-            final_score[s] = round(final_score[s] * 0.90, 2)
-
-        if breakdown_type == "MACRO_TIGHTENING_TECH_RALLY":
-            if "Technology" in final_score:
-                final_score["Technology"] = round(final_score["Technology"] + 0.5, 2)
-            if "Communication Services" in final_score:
-                final_score["Communication Services"] = round(final_score["Communication Services"] + 0.3, 2)
+    # -------------------------
+    # 3) Score kernel (오늘 input 1 row, history와 같은 kernel)
+    #    VOL > LIQ > CURVE > CREDIT > PHASE(macro profile) > FLOW > MOM
+    #    -> Theory / Flow / Divergence -> Regime Controller
+    #    -> Correlation Break -> Conflict Resolver (Financials cap)
+    # -------------------------
+    allocation_inputs = allocation_inputs_from_market_data(
+        market_data,
+        vix_score=vix_score,
+        corr_break=is_corr_break,
+        corr_break_type=breakdown_type,
+    )
+    scored = sector_score_kernel(pd.DataFrame([allocation_inputs]))
 
-            for s in ["Financials", "Industrials", "Consumer Discretionary", "Real Estate"]:
-                if s in final_score:
-                    final_score[s] = round(final_score[s] - 0.5, 2)
+    sectors = list(SECTORS)
+    ticker_map = dict(SECTOR_ETF)
 
-        elif breakdown_type == "XLF_BETRAYAL":
-            if "Financials" in final_score:
-                final_score["Financials"] = round(final_score["Financials"] - 0.8, 2)
+    curve_segment = scored["curve_segment"][0]
+    if t10y2y_missing:
+        print("[WARN][18_CURVE_MISSING] T10Y2Y missing → CURVE scores skipped")
 
-        elif breakdown_type == "ENERGY_BETRAYAL":
-            if "Energy" in final_score:
-                final_score["Energy"] = round(final_score["Energy"] - 0.8, 2)
-            if "Materials" in final_score:
-                final_score["Materials"] = round(final_score["Materials"] - 0.3, 2)
+    liq_tight = bool(scored["liq_tight"][0])
+    liq_easy = bool(scored["liq_easy"][0])
 
-        elif breakdown_type == "GROWTH_FAILED_ON_RATE_RELIEF":
-            if "Technology" in final_score:
-                final_score["Technology"] = round(final_score["Technology"] - 0.5, 2)
-            if "Communication Services" in final_score:
-                final_score["Communication Services"] = round(final_score["Communication Services"] - 0.3, 2)
+    macro_profile = scored["macro_profile"][0]
+    # Store inferred macro profile for downstream layers
+    market_data["MACRO_REGIME_PROFILE"] = macro_profile
 
-            for s in ["Consumer Staples", "Health Care", "Utilities"]:
-                if s in final_score:
-                    final_score[s] = round(final_score[s] + 0.3, 2)
+    flow_overlay_notes = sector_flow_notes(scored, 0)
+
+    drivers = sector_score_drivers(
+        scored,
+        0,
+        {
+            "vix_label": vix_label,
+            "vix_detail": vix_detail,
+            "t10y2y": t10y2y,
+            "phase": phase,
+            "momentum": market_data.get("MOMENTUM_SCORES", {}) or {},
+        },
+    )
 
-        elif breakdown_type == "FINANCIALS_WEAK_ON_RATE_RELIEF":
-            if "Financials" in final_score:
-                final_score["Financials"] = round(final_score["Financials"] - 0.5, 2)
+    theoretical_score = row_dict(scored["theory"], 0)
+    flow_score_by_sector = row_dict(scored["flow"], 0)
+    sector_divergence = row_dict(scored["divergence"], 0)
+    sector_classification = row_dict(scored["classification"], 0)
+    divergence_flags = row_dict(scored["div_flags"], 0)
 
-        elif breakdown_type == "FINANCIALS_RESILIENCE_UNDER_VOL":
-            if "Financials" in final_score:
-                final_score["Financials"] = round(final_score["Financials"] + 0.3, 2)
+    regime_controller = scored["regime_controller"][0]
+    avg_divergence = float(scored["avg_divergence"][0])
+    divergence_dispersion = float(scored["dispersion"][0])
 
-            for s in ["Technology", "Consumer Discretionary"]:
-                if s in final_score:
-                    final_score[s] = round(final_score[s] - 0.3, 2)
+    score = scores_from_kernel(scored, 0)
 
-        else:
-            for s in ["Real Estate", "Consumer Discretionary", "Financials"]:
-                if s in final_score:
-                    final_score[s] = round(final_score[s] - 0.2, 2)
+    market_data["SECTOR_THEORETICAL_SCORE"] = theoretical_score
+    market_data["SECTOR_FLOW_SCORE"] = flow_score_by_sector
+    market_data["SECTOR_DIVERGENCE"] = sector_divergence
+    market_data["SECTOR_CLASSIFICATION"] = sector_classification
+    market_data["SECTOR_DIVERGENCE_FLAGS"] = divergence_flags
+    market_data["SECTOR_FINAL_SCORE"] = score
 
-    score = final_score
-    market_data["SECTOR_FINAL_SCORE"] = final_score
-    
-   
-    # -------------------------
-    # I) Conflict Resolver
-    # -------------------------
-    if vix >= 28 and liq_tight:
-        if score["Technology"] > 0:
-            score["Technology"] = 0
-            drivers["Technology"].append({
-                "pts": 0,
-                "why": "Conflict Resolver → VIX 고점 + 유동성 긴축으로 성장주 긍정점수 제거",
-                "bucket": "VOL",
-                "priority": PRIORITY["VOL"],
-            })
-
-        if score["Real Estate"] > -1:
-            add_score("Real Estate", -1, "Conflict Resolver → VIX 고점 + 유동성 긴축으로 RE 추가 감점", "VOL")
-
-    if score["Financials"] > 0 and vix >= 30 and liq_tight:
-        original = score["Financials"]
-        score["Financials"] = min(score["Financials"], 1)
-        if score["Financials"] != original:
-            drivers["Financials"].append({
-                "pts": score["Financials"] - original,
-                "why": "Financials Cap → VIX 고점 + 유동성 긴축으로 금융주 상단 제한",
-                "bucket": "VOL",
-                "priority": PRIORITY["VOL"],
-            })
-
-    if score["Financials"] > 0 and (credit_calm is False):
-        add_score("Financials", -1, "Conflict Resolver → 커브 우호보다 크레딧 리스크 우선", "CREDIT")
-
-    if ("EVENT-WATCHING" in phase or "WAITING" in phase):
-        if score["Industrials"] > 0:
-            add_score("Industrials", -1, "Conflict Resolver → 이벤트 관망으로 경기민감 가점 일부 축소", "PHASE")
-        if score["Energy"] > 0:
-            add_score("Energy", -1, "Conflict Resolver → 이벤트 관망으로 리플레이션 베팅 일부 축소", "PHASE")
+    market_data["REGIME_CONTROLLER"] = regime_controller
+    market_data["AVG_DIVERGENCE"] = avg_divergence
+    market_data["DIVERGENCE_DISPERSION"] = divergence_dispersion
 
     # -------------------------
     # 5) Score 기반 정렬
@@ -6932,37 +6025,12 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
     # ========================================================
 
     FILTER18_RANK_PERSISTENCE_ENABLED = True
-    FILTER18_RANK_CONFIRM_DAYS = 3
 
     raw_target_weights = dict(weights)
 
     # Research rank contract:
     # positive sector score, descending by score then sector name.
-    _rank_rows = []
-
-    for _sector, _score in score.items():
-        try:
-            _score_float = float(_score)
-        except (TypeError, ValueError):
-            continue
-
-        if _score_float > 0:
-            _rank_rows.append(
-                (_sector, _score_float)
-            )
-
-    _rank_rows.sort(
-        key=lambda item: (
-            -item[1],
-            item[0],
-        )
-    )
-
-    raw_rank = "|".join(
-        sector
-        for sector, _
-        in _rank_rows
-    )
+    raw_rank = raw_sector_rank(score)
 
     rank_state_next = None
     rank_action = "DISABLED"
@@ -6970,6 +6038,13 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
     pending_rank = ""
     pending_count = 0
 
+    today_rank_date = (
+        pd.Timestamp.now(
+            tz="Asia/Seoul"
+        )
+        .strftime("%Y-%m-%d")
+    )
+
     if FILTER18_RANK_PERSISTENCE_ENABLED:
 
         try:
@@ -6985,224 +6060,23 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
         except Exception:
             rank_state = {}
 
-        accepted_rank = str(
-            rank_state.get(
-                "accepted_rank",
-                "",
-            )
-            or ""
+        # deleveraging은 항상 즉시 채택 (SAFETY OVERRIDE),
+        # 그 외 rank 변경은 3일 확인 전까지 마지막 채택 비중 유지
+        rank_step = rank_persistence_step(
+            rank_state,
+            raw_rank=raw_rank,
+            raw_target_weights=raw_target_weights,
+            deleveraging_required=deleveraging_required,
+            today=today_rank_date,
         )
 
-        accepted_target_weights = (
-            rank_state.get(
-                "accepted_target_weights",
-                {},
-            )
-            or {}
-        )
-
-        if not isinstance(
-            accepted_target_weights,
-            dict,
-        ):
-            accepted_target_weights = {}
-
-        pending_rank = str(
-            rank_state.get(
-                "pending_rank",
-                "",
-            )
-            or ""
-        )
-
-        try:
-            pending_count = int(
-                rank_state.get(
-                    "pending_count",
-                    0,
-                )
-                or 0
-            )
-        except Exception:
-            pending_count = 0
-
-        last_processed_date = str(
-            rank_state.get(
-                "last_processed_date",
-                "",
-            )
-            or ""
-        )
-
-        today_rank_date = (
-            pd.Timestamp.now(
-                tz="Asia/Seoul"
-            )
-            .strftime("%Y-%m-%d")
-        )
-
-        # ----------------------------------------------------
-        # SAFETY OVERRIDE
-        # ----------------------------------------------------
-
-        # Research contract:
-        # first-ever state is reported as INITIAL_ACCEPT even
-        # when deleveraging is active. Execution safety remains
-        # unchanged: raw defensive target is accepted immediately
-        # and rebalance threshold is still bypassed downstream.
-        rank_state_was_uninitialized = not accepted_rank
-
-        if deleveraging_required:
-
-            accepted_rank = raw_rank
-            accepted_target_weights = dict(
-                raw_target_weights
-            )
-
-            pending_rank = ""
-            pending_count = 0
-
-            weights = dict(
-                raw_target_weights
-            )
-
-            rank_action = (
-                "INITIAL_ACCEPT"
-                if rank_state_was_uninitialized
-                else "FORCED_DELEVERAGE_ACCEPT"
-            )
-
-        # ----------------------------------------------------
-        # First initialization
-        # ----------------------------------------------------
-
-        elif not accepted_rank:
-
-            accepted_rank = raw_rank
-            accepted_target_weights = dict(
-                raw_target_weights
-            )
-
-            pending_rank = ""
-            pending_count = 0
-
-            weights = dict(
-                raw_target_weights
-            )
-
-            rank_action = "INITIAL_ACCEPT"
-
-        # ----------------------------------------------------
-        # Same accepted rank
-        #
-        # Rank is unchanged, so today's target weights are
-        # allowed to refresh normally.
-        # ----------------------------------------------------
-
-        elif raw_rank == accepted_rank:
-
-            accepted_target_weights = dict(
-                raw_target_weights
-            )
-
-            pending_rank = ""
-            pending_count = 0
-
-            weights = dict(
-                raw_target_weights
-            )
-
-            rank_action = (
-                "ACCEPTED_RANK_UPDATE"
-            )
-
-        # ----------------------------------------------------
-        # Rank changed
-        # ----------------------------------------------------
-
-        else:
-
-            # Same-day rerun must NOT increment confirmation.
-            same_day_rerun = (
-                last_processed_date
-                == today_rank_date
-            )
-
-            if not same_day_rerun:
-
-                if pending_rank == raw_rank:
-                    pending_count += 1
-
-                else:
-                    pending_rank = raw_rank
-                    pending_count = 1
-
-            if (
-                pending_rank == raw_rank
-                and pending_count
-                >= FILTER18_RANK_CONFIRM_DAYS
-            ):
-
-                accepted_rank = raw_rank
-                accepted_target_weights = dict(
-                    raw_target_weights
-                )
-
-                pending_rank = ""
-                pending_count = 0
-
-                weights = dict(
-                    raw_target_weights
-                )
-
-                rank_action = (
-                    "RANK_CONFIRMED"
-                )
-
-            else:
-
-                # Until confirmation, preserve the last
-                # accepted target portfolio.
-                weights = {
-                    str(sector): float(weight)
-                    for sector, weight
-                    in accepted_target_weights.items()
-                }
-
-                rank_action = (
-                    "RANK_CHANGE_SUPPRESSED"
-                )
-
-        cash_weight = round(
-            100.0
-            - sum(weights.values()),
-            1,
-        )
-
-        rank_state_next = {
-            "accepted_rank":
-                accepted_rank,
-
-            "accepted_target_weights":
-                dict(
-                    accepted_target_weights
-                ),
-
-            "pending_rank":
-                pending_rank,
-
-            "pending_count":
-                pending_count,
-
-            "last_processed_date":
-                today_rank_date,
-
-            "last_output_target_weights":
-                dict(weights),
-
-            "last_action":
-                rank_action,
-        }
+        weights = rank_step["weights"]
+        cash_weight = rank_step["cash_weight"]
+        rank_action = rank_step["action"]
+        accepted_rank = rank_step["accepted_rank"]
+        pending_rank = rank_step["pending_rank"]
+        pending_count = rank_step["pending_count"]
+        rank_state_next = rank_step["state_next"]
 
     # --------------------------------------------------------
     # Filter18 audit lineage
@@ -7439,168 +6313,15 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
     except Exception:
         _execution_ceiling = 0.0
 
-    _execution_weights = {}
-
-    for _sector, _weight in (weights or {}).items():
-        try:
-            _w = float(_weight)
-        except Exception:
-            _w = 0.0
-
-        # Negative sector weights are not valid in this
-        # long-only execution contract.
-        _execution_weights[_sector] = max(
-            0.0,
-            _w,
-        )
-
-    _execution_sum = sum(
-        _execution_weights.values()
-    )
-
-    # --------------------------------------------------
-    # 1. Hard exposure ceiling
-    #
-    # If Rank Persistence restored stale absolute weights above
-    # today's allowed exposure, preserve relative composition
-    # but proportionally compress total equity exposure.
-    # --------------------------------------------------
-
-    if (
-        _execution_sum > _execution_ceiling
-        and _execution_sum > 0
-    ):
-        _execution_scale = (
-            _execution_ceiling
-            / _execution_sum
-        )
-
-        _execution_weights = {
-            _sector: (
-                _weight
-                * _execution_scale
-            )
-            for _sector, _weight
-            in _execution_weights.items()
-        }
-
-    # --------------------------------------------------
-    # 2. Execution rounding
-    #
-    # Production ETF weights operate at 0.1% precision.
-    # Round first, then reconcile once more because independent
-    # sector rounding can re-create a small ceiling breach.
-    # --------------------------------------------------
-
-    _execution_weights = {
-        _sector: round(
-            max(0.0, float(_weight)),
-            1,
-        )
-        for _sector, _weight
-        in _execution_weights.items()
-    }
-
-    _rounded_sum = sum(
-        _execution_weights.values()
-    )
-
-    # --------------------------------------------------
-    # 3. Post-rounding reconciliation
-    #
-    # Do NOT rescale everything repeatedly for a 0.1% residual.
-    # Remove only the residual amount from the largest position.
-    #
-    # This preserves:
-    # - sector ranking
-    # - Rank3D composition
-    # - turnover intent
-    # while enforcing the capital ceiling.
-    # --------------------------------------------------
-
-    _rounding_excess = (
-        _rounded_sum
-        - _execution_ceiling
-    )
-
-    if (
-        _rounding_excess > 1e-9
-        and _execution_weights
-    ):
-        _largest_sector = max(
-            _execution_weights,
-            key=_execution_weights.get,
-        )
-
-        _execution_weights[_largest_sector] = round(
-            max(
-                0.0,
-                _execution_weights[_largest_sector]
-                - _rounding_excess,
-            ),
-            1,
-        )
-
-    # --------------------------------------------------
+    # 1. Hard exposure ceiling (비율 유지 압축)
+    # 2. 0.1% execution rounding
+    # 3. Post-rounding residual은 최대 비중 섹터에서만 제거
     # 4. Defensive final invariant
-    #
-    # Floating-point / rounding protection.
-    # --------------------------------------------------
-
-    _final_execution_sum = sum(
-        _execution_weights.values()
+    weights = execution_ceiling_weights(
+        weights,
+        _execution_ceiling,
     )
 
-    if (
-        _final_execution_sum
-        > _execution_ceiling + 1e-9
-        and _final_execution_sum > 0
-    ):
-        _final_scale = (
-            _execution_ceiling
-            / _final_execution_sum
-        )
-
-        _execution_weights = {
-            _sector: round(
-                _weight * _final_scale,
-                1,
-            )
-            for _sector, _weight
-            in _execution_weights.items()
-        }
-
-        # A final independent round can theoretically leave
-        # another 0.1 residual. Remove it deterministically.
-        _final_execution_sum = sum(
-            _execution_weights.values()
-        )
-
-        _final_excess = (
-            _final_execution_sum
-            - _execution_ceiling
-        )
-
-        if (
-            _final_excess > 1e-9
-            and _execution_weights
-        ):
-            _largest_sector = max(
-                _execution_weights,
-                key=_execution_weights.get,
-            )
-
-            _execution_weights[_largest_sector] = round(
-                max(
-                    0.0,
-                    _execution_weights[_largest_sector]
-                    - _final_excess,
-                ),
-                1,
-            )
-
-    weights = _execution_weights
-
     # Reconcile execution-facing capital values with the
     # weights that will actually be sent to the ETF mapper.
     allocated_equity = round(
@@ -7688,6 +6409,19 @@ def sector_allocation_filter(market_data: Dict[str, Any]) -> str:
     except Exception as e:
         print(f"⚠️ Portfolio save failed: {e}")
 
+    # -------------------------
+    # Allocation input history (backtest: kernel 1회로 전체 기간 재계산)
+    # -------------------------
+    try:
+        data_dir = market_data.get("_DATA_DIR")
+        record_allocation_inputs(
+            today_rank_date,
+            allocation_inputs,
+            allocation_inputs_path(data_dir) if data_dir else None,
+        )
+    except Exception as e:
+        print(f"⚠️ Sector allocation inputs save failed: {e}")
+
     lines.append("")
     lines.append("### 🧬 19) Execution Layer (ETF Mapping)")
     lines.append("")
@@ -7943,6 +6677,13 @@ def apply_geo_overlay_to_final_state(market_data: Dict[str, Any]) -> Dict[str, A
 
 
 from scripts.monitor_sew import load_previous_flow_state, classify_flow_transition 
+from scripts.flow_engine import (
+    flow_day_row,
+    flow_features_from_market_data,
+    flow_reasons,
+    flow_score_kernel,
+    transition_info_from_row,
+)
 
 def institutional_flow_engine_filter(market_data: Dict[str, Any]) -> str:
     """
@@ -7972,213 +6713,58 @@ def institutional_flow_engine_filter(market_data: Dict[str, Any]) -> str:
     except Exception:
         pos_z = 0.0
 
-    drift_data = market_data.get("DRIFT_DATA", {}) or {}
-
-    def g(asset: str, key: str):
+    gex = market_data.get("GEX", {}) or {}
+    gex_regime = str(gex.get("regime", "UNKNOWN") or "UNKNOWN").upper()
+    flip_distance = gex.get("flip_distance_pct")
+
+    # 점수 규칙은 scripts/flow_engine.flow_score_kernel 하나로 (history 계산과 동일)
+    # 1) Drift core / 2) Label quality / 3) Short-horizon pre-move cluster
+    # 4) Gamma context (GEX 우선) / 5) SEW relationship / 6) Positioning penalty
+    # 6.5) Validation Layer (최대 +2) / 7) Flow state
+    features = flow_features_from_market_data(market_data)
+    scored_frame = flow_score_kernel(pd.DataFrame([features]))
+    scored = scored_frame.iloc[0]
+
+    flow_score = int(scored["FLOW_SCORE"])
+    flow_state = str(scored["FLOW_STATE"])
+    confidence = str(scored["FLOW_CONFIDENCE"])
+    interpretation = str(scored["FLOW_INTERPRETATION"])
+    action_bias = str(scored["FLOW_ACTION_BIAS"])
+    validation_score = int(scored["VALIDATION_SCORE"])
+    validation_boost = int(scored["VALIDATION_BOOST"])
+    reasons = flow_reasons(scored, drift_label)
+
+    # transition: flow history(전일 row) 기준, history 없으면 flow_state.json snapshot
+    as_of_date = market_data.get("DATA_AS_OF_DATE")
+    transition_info = None
+    if as_of_date:
         try:
-            return drift_data.get(asset, {}).get(key)
-        except Exception:
-            return None
-
-    # -----------------------------
-    # 기존 short-horizon inputs
-    # -----------------------------
-    spy_15m = g("SPY", "ret_15m")
-    spy_30m = g("SPY", "ret_30m")
-    wti_15m = g("WTI", "ret_15m")
-    wti_30m = g("WTI", "ret_30m")
-    gold_15m = g("GOLD", "ret_15m")
-    gold_30m = g("GOLD", "ret_30m")
-    dxy_15m = g("DXY", "ret_15m")
-    dxy_30m = g("DXY", "ret_30m")
-
-    flow_score = 0
-    reasons = []
-
-    # 1) Drift core
-    if drift_score >= 4:
-        flow_score += 3
-        reasons.append("Drift strong")
-    elif drift_score >= 3:
-        flow_score += 2
-        reasons.append("Drift building")
-    elif drift_score >= 2:
-        flow_score += 1
-        reasons.append("Drift early")
-
-    # 2) Label quality
-    if drift_label in ["DISINFLATION_RISK_ON", "SYSTEMIC_HEDGE", "TIGHTENING_PRESSURE", "OIL_SHOCK"]:
-        flow_score += 1
-        reasons.append(f"Clear flow label: {drift_label}")
-
-    # 3) Short-horizon pre-move cluster
-    short_hits = 0
-
-    if spy_15m is not None and spy_15m >= 0.25:
-        short_hits += 1
-    if spy_30m is not None and spy_30m >= 0.40:
-        short_hits += 1
-
-    if wti_15m is not None and abs(wti_15m) >= 0.60:
-        short_hits += 1
-    if wti_30m is not None and abs(wti_30m) >= 0.90:
-        short_hits += 1
-
-    if gold_15m is not None and abs(gold_15m) >= 0.30:
-        short_hits += 1
-    if gold_30m is not None and abs(gold_30m) >= 0.45:
-        short_hits += 1
-
-    if dxy_15m is not None and abs(dxy_15m) >= 0.10:
-        short_hits += 1
-    if dxy_30m is not None and abs(dxy_30m) >= 0.15:
-        short_hits += 1
-
-    if short_hits >= 3:
-        flow_score += 2
-        reasons.append("Short-horizon pre-move cluster")
-    elif short_hits >= 2:
-        flow_score += 1
-        reasons.append("Short-horizon pre-move")
-
-    # 4) Gamma context
-    if "TRANSITION" in gamma_state:
-        flow_score += 1
-        reasons.append("Gamma transition")
-    elif "NEGATIVE" in gamma_state:
-        flow_score += 1
-        reasons.append("Gamma acceleration regime")
-
-    # 5) SEW relationship
-    if sew_status == "STABLE":
-        flow_score += 1
-        reasons.append("No shock yet")
-    elif sew_status in ["WATCH", "ALERT"]:
-        flow_score -= 1
-        reasons.append("Shock already leaking into tape")
-
-    # 6) Positioning penalty
-    if pos_z >= 2.0:
-        flow_score -= 2
-        reasons.append("Positioning overheated")
-    elif pos_z >= 1.5:
-        flow_score -= 1
-        reasons.append("Positioning somewhat stretched")
-
-    # --------------------------------------------------
-    # 6.5) Validation Layer (NEW, minimal additive only)
-    # --------------------------------------------------
-    validation_score = 0
-
-    hyg_1d = g("HYG", "ret_1d")
-    lqd_1d = g("LQD", "ret_1d")
-    eem_1d = g("EEM", "ret_1d")
-    fxi_1d = g("FXI", "ret_1d")
-
-    xlk_1d = g("XLK", "ret_1d")
-    xli_1d = g("XLI", "ret_1d")
-    xlf_1d = g("XLF", "ret_1d")
-    xly_1d = g("XLY", "ret_1d")
-    xlp_1d = g("XLP", "ret_1d")
-    xlu_1d = g("XLU", "ret_1d")
-
-    # 6.5-1) Cross-asset risk participation
-    risk_participation_hits = 0
-
-    if hyg_1d is not None and hyg_1d > 0:
-        risk_participation_hits += 1
-    if eem_1d is not None and eem_1d > 0:
-        risk_participation_hits += 1
-    if fxi_1d is not None and fxi_1d > 0:
-        risk_participation_hits += 1
-
-    if risk_participation_hits >= 2:
-        validation_score += 1
-        reasons.append("Cross-asset risk participation")
-
-    # 6.5-2) Credit confirmation
-    if hyg_1d is not None and lqd_1d is not None and hyg_1d >= lqd_1d:
-        validation_score += 1
-        reasons.append("Credit confirms risk appetite")
-
-    # 6.5-3) Sector leadership breadth
-    leadership_hits = 0
-    for v in [xlk_1d, xli_1d, xlf_1d, xly_1d]:
-        if v is not None and v > 0:
-            leadership_hits += 1
-
-    if leadership_hits >= 2:
-        validation_score += 1
-        reasons.append("Leadership breadth expanding")
+            hist_row = flow_day_row(as_of_date, features, scored=scored_frame)
+            if hist_row.get("PREV_FLOW_STATE") != "N/A":
+                transition_info = transition_info_from_row(hist_row)
+        except Exception as e:
+            print(f"[WARN] flow history transition 실패 → flow_state.json 사용: {e}")
 
-    # 6.5-4) Cyclical vs defensive check
-    defensive_weak = 0
-    for v in [xlp_1d, xlu_1d]:
-        if v is not None and v <= 0:
-            defensive_weak += 1
+    if transition_info is None:
+        prev_flow = load_previous_flow_state()
 
-    cyclical_strong = 0
-    for v in [xli_1d, xly_1d, xlk_1d]:
-        if v is not None and v > 0:
-            cyclical_strong += 1
-
-    if cyclical_strong >= 2 and defensive_weak >= 1:
-        validation_score += 1
-        reasons.append("Cyclical leadership over defensives")
+        prev_flow_state = str(prev_flow.get("flow_state", "N/A") or "N/A")
+        try:
+            prev_flow_score = int(float(prev_flow.get("flow_score", 0) or 0))
+        except Exception:
+            prev_flow_score = 0
 
-    # Validation score는 최대 +2까지만 반영 (과적합 방지)
-    validation_boost = min(validation_score, 2)
-    flow_score += validation_boost
+        prev_persistence_days = int(prev_flow.get("persistence_days", 0) or 0)
 
-        
-        # 7) Flow state
-    if flow_score >= 7:
-        flow_state = "🔥 BUILDING HARD"
-        confidence = "HIGH"
-        interpretation = "뉴스 전 방향성 자금 축적 가능성 높음"
-        action_bias = "EARLY PREP"
-    
-    elif flow_score >= 5:
-        flow_state = "⚡ BUILDING"
-        confidence = "MEDIUM-HIGH"
-        interpretation = "기관성 흐름 형성 가능성"
-        action_bias = "WATCHLIST"
-    
-    elif flow_score >= 3:
-        flow_state = "👀 EARLY TRACE"
-        confidence = "MEDIUM"
-        interpretation = "흔적은 있으나 확신은 이르다"
-        action_bias = "MONITOR"
-    
-    elif flow_score >= 1:
-        flow_state = "🌱 LIGHT TRACE"
-        confidence = "LOW-MEDIUM"
-        interpretation = "약한 초기 수급 흔적은 있으나 확정적 기관 흐름은 아님"
-        action_bias = "OBSERVE"
-    
-    else:
-        flow_state = "NO CLEAR FLOW"
-        confidence = "LOW"
-        interpretation = "기관성 축적 흔적 불충분"
-        action_bias = "IGNORE"
-    
-    prev_flow = load_previous_flow_state()
+        transition_info = classify_flow_transition(
+            prev_flow_state=prev_flow_state,
+            prev_flow_score=prev_flow_score,
+            current_flow_state=flow_state,
+            current_flow_score=flow_score,
+            prev_persistence_days=prev_persistence_days,
+        )
 
-    prev_flow_state = str(prev_flow.get("flow_state", "N/A") or "N/A")
-    try:
-        prev_flow_score = int(float(prev_flow.get("flow_score", 0) or 0))
-    except Exception:
-        prev_flow_score = 0
-    
-    prev_persistence_days = int(prev_flow.get("persistence_days", 0) or 0)
-    
-    transition_info = classify_flow_transition(
-        prev_flow_state=prev_flow_state,
-        prev_flow_score=prev_flow_score,
-        current_flow_state=flow_state,
-        current_flow_score=flow_score,
-        prev_persistence_days=prev_persistence_days,
-    )
+    prev_flow_score = transition_info.get("prev_flow_score", 0)
 
     market_data["INSTITUTIONAL_FLOW"] = {
         "score": flow_score,
@@ -8191,10 +6777,12 @@ def institutional_flow_engine_filter(market_data: Dict[str, Any]) -> str:
         "combo_signal": combo_signal,
         "gamma_state": gamma_state,
         "gamma_combo": gamma_combo,
+        "gamma_source": "GEX" if gex_regime in ["SHORT_GAMMA", "LONG_GAMMA"] else "PSEUDO",
         "sew_status": sew_status,
         "sew_event_type": sew_event_type,
         "validation_score": validation_score,
         "validation_boost": validation_boost,
+        "features": features,
     }
 
     print("[FLOW ENGINE FINAL]", market_data["INSTITUTIONAL_FLOW"])
@@ -8216,6 +6804,8 @@ def institutional_flow_engine_filter(market_data: Dict[str, Any]) -> str:
     lines.append("")
     lines.append(f"- **Drift:** {drift_state} / {drift_label} / {combo_signal}")
     lines.append(f"- **Gamma:** {gamma_state} / {gamma_combo}")
+    if gex_regime in ["SHORT_GAMMA", "LONG_GAMMA"]:
+        lines.append(f"- **Dealer GEX:** {gex_regime} / flip distance {flip_distance}%")
     lines.append(f"- **SEW:** {sew_status} / {sew_event_type}")
     lines.append(f"- **Positioning (POS_Z):** {pos_z}")
     lines.append(f"- **Validation Score:** {validation_score} (boost applied: +{validation_boost})")
@@ -1,6 +1,8 @@
 from typing import Dict, Optional
 import pandas as pd
 
+from scripts.market_backend import get_market_backend
+
 
 TREASURY_NOMINAL_URL = (
     "https://home.treasury.gov/resource-center/data-chart-center/interest-rates/"
@@ -15,7 +17,7 @@ TREASURY_REAL_URL = (
 
 def _latest_table_value(url: str, column: str) -> Optional[float]:
     try:
-        tables = pd.read_html(url)
+        tables = get_market_backend().read_html(url)
         if not tables:
             return None
 
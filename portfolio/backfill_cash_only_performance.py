@@ -1,7 +1,8 @@
 ## 포트폴리오 비어있느날짜있을경우 사용하는 파일 
 import os
 import pandas as pd
-import yfinance as yf
+
+from scripts.market_backend import get_market_backend
 
 PERF_PATH = "data/paper_portfolio_performance.csv"
 TARGET_DATES = ["2026-05-08", "2026-05-09"]
@@ -17,7 +18,7 @@ def fetch_spy_return_for_date(target_date: str) -> float:
     start = (target - pd.Timedelta(days=7)).strftime("%Y-%m-%d")
     end = (target + pd.Timedelta(days=2)).strftime("%Y-%m-%d")
 
-    df = yf.download(
+    df = get_market_backend().download(
         "SPY",
         start=start,
         end=end,
@@ -1,8 +1,12 @@
 import os
+from pathlib import Path
 from typing import Dict, Tuple, Optional
 
 import pandas as pd
-import yfinance as yf
+
+from scripts.log_store import upsert_log_rows
+from scripts.market_backend import get_market_backend
+from scripts.price_panel import panel_return_pct
 
 
 PORTFOLIO_LOG_PATH = "data/paper_portfolio_log.csv"
@@ -30,7 +34,7 @@ def get_latest_completed_market_date(ticker: str = "SPY") -> Optional[str]:
     이 날짜가 performance에 기록될 date가 된다.
     """
     try:
-        df = yf.download(
+        df = get_market_backend().download(
             ticker,
             period="14d",
             interval="1d",
@@ -132,11 +136,16 @@ def fetch_return_for_date(ticker: str, target_date: str) -> float:
     if target.weekday() >= 5:
         return 0.0
 
+    # 공용 price panel에 target / 직전 close가 있으면 download 생략
+    cached = panel_return_pct(ticker, target, data_dir=Path("data"))
+    if cached is not None:
+        return cached
+
     start = (target - pd.Timedelta(days=15)).strftime("%Y-%m-%d")
     end = (target + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
 
     try:
-        df = yf.download(
+        df = get_market_backend().download(
             ticker,
             start=start,
             end=end,
@@ -289,31 +298,10 @@ def save_performance_row(
     for ticker, contrib in result["weighted_contribs"].items():
         row[f"contrib_{ticker}"] = round(contrib, 4)
 
-    new_df = pd.DataFrame([row])
-
-    if os.path.exists(output_path):
-        try:
-            old_df = pd.read_csv(output_path)
-        except Exception:
-            old_df = pd.DataFrame()
-
-        if not old_df.empty and "date" in old_df.columns:
-            old_df["date"] = old_df["date"].astype(str)
-            old_df = old_df[old_df["date"] != portfolio_date].copy()
-
-        out_df = pd.concat([old_df, new_df], ignore_index=True)
-    else:
-        out_df = new_df
-
-    if "date" in out_df.columns:
-        out_df["date"] = pd.to_datetime(out_df["date"], errors="coerce")
-        out_df = out_df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-        out_df["date"] = out_df["date"].dt.strftime("%Y-%m-%d")
-
-    os.makedirs("data", exist_ok=True)
-    out_df.to_csv(output_path, index=False)
+    # 같은 날짜 overwrite (append segment + date index)
+    mode = upsert_log_rows(output_path, pd.DataFrame([row]))
 
-    print(f"✅ Performance saved/updated for action date: {portfolio_date}")
+    print(f"✅ Performance saved/updated for action date: {portfolio_date} ({mode})")
     print(f"✅ File path: {output_path}")
 
 
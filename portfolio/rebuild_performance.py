@@ -1,8 +1,11 @@
 import os
+from pathlib import Path
 from typing import Dict, Optional
 
 import pandas as pd
-import yfinance as yf
+
+from scripts.market_backend import get_market_backend
+from scripts.price_panel import panel_return_pct
 
 
 PORTFOLIO_LOG_PATH = "data/paper_portfolio_log.csv"
@@ -18,7 +21,7 @@ def is_weekend(date_str: str) -> bool:
 
 def get_latest_completed_market_date(ticker: str = "SPY") -> Optional[str]:
     try:
-        df = yf.download(
+        df = get_market_backend().download(
             ticker,
             period="14d",
             interval="1d",
@@ -51,11 +54,16 @@ def fetch_return_for_date(ticker: str, target_date: str) -> float:
     if target.weekday() >= 5:
         return 0.0
 
+    # 공용 price panel에 target / 직전 close가 있으면 download 생략
+    cached = panel_return_pct(ticker, target, data_dir=Path("data"))
+    if cached is not None:
+        return cached
+
     start = (target - pd.Timedelta(days=15)).strftime("%Y-%m-%d")
     end = (target + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
 
     try:
-        df = yf.download(
+        df = get_market_backend().download(
             ticker,
             start=start,
             end=end,
@@ -3,50 +3,119 @@ import os
 from datetime import datetime
 from typing import Any, Dict
 
+import numpy as np
 import pandas as pd
 
+from scripts.log_store import upsert_log_rows
 
-def apply_slippage_to_trades(
-    trade_df: pd.DataFrame,
-    market_data: dict,
-) -> pd.DataFrame:
+
+# ============================================================
+# Trade Cost Model (slippage + fee / tax)
+# ============================================================
+
+# 단위: % (trade_weight 대비). 밴드는 위에서부터 첫 매칭 1개만 가산.
+TRADE_COST_TABLE: Dict[str, Any] = {
+    "base_slippage": 0.1,
+    # 🔥 VIX 기반 (시장 발작): VIX > level
+    "vix_bands": [(30, 0.4), (25, 0.3), (20, 0.1)],
+    # 🔥 유동성 낮은 ETF
+    "liquidity_tiers": {"NORMAL": 0.0, "LOW": 0.2},
+    "etf_liquidity": {"XLU": "LOW", "XLRE": "LOW"},
+    # 🔥 거래 규모: |trade_weight| > level
+    "size_bands": [(5, 0.2)],
+    "base_fee": 0.05,       # 기본 수수료
+    "sell_tax": 0.1,        # 매도 세금
+}
+
+DEFAULT_VIX = 20.0
+
+
+def _band_add(values: np.ndarray, bands, default: float = 0.0) -> np.ndarray:
+    if not bands:
+        return np.full(values.shape, default)
+    return np.select(
+        [values > level for level, _ in bands],
+        [add for _, add in bands],
+        default=default,
+    )
+
+
+def trade_cost_columns(
+    etf,
+    trade_weight,
+    action=None,
+    vix=DEFAULT_VIX,
+    table: Dict[str, Any] = TRADE_COST_TABLE,
+) -> Dict[str, np.ndarray]:
     """
-    Trade Log에 슬리피지 반영
+    trade block 전체를 컬럼 연산으로 비용 계산.
+    vix: scalar 또는 row별 배열 (다년 시뮬레이션 trade log)
+    action이 없으면 trade_weight 부호로 SELL 판정.
     """
-    vix_node = market_data.get("VIX", 20)
+    etf = np.asarray(etf, dtype=object)
+    trade_weight = np.asarray(trade_weight, dtype="float64")
+    vix = np.broadcast_to(np.asarray(vix, dtype="float64"), trade_weight.shape)
 
-    if isinstance(vix_node, dict):
-        vix = float(vix_node.get("today", 20) or 20)
+    if action is None:
+        sell = trade_weight < 0
     else:
-        vix = float(vix_node or 20)
+        sell = np.asarray(action, dtype=object) == "SELL"
+
+    tiers = table.get("liquidity_tiers", {})
+    liquidity = table.get("etf_liquidity", {})
+    liq_add = (
+        pd.Series(etf.ravel(), dtype=object)
+        .map(liquidity).fillna("NORMAL")
+        .map(tiers).fillna(0.0)
+        .to_numpy(dtype="float64")
+        .reshape(trade_weight.shape)
+    )
+
+    slip = (
+        float(table["base_slippage"])
+        + _band_add(vix, table.get("vix_bands"))
+        + liq_add
+        + _band_add(np.abs(trade_weight), table.get("size_bands"))
+    )
+    slip = np.round(slip, 2)
 
-    def calc_slippage(row):
-        slip = 0.1  # base 0.1%
+    fee = np.round(float(table["base_fee"]) + np.where(sell, float(table["sell_tax"]), 0.0), 2)
+    total = np.round(slip + fee, 2)
+    impact = np.round(np.abs(trade_weight) * total / 100, 4)
 
-        # 🔥 VIX 기반 (시장 발작)
-        if vix > 30:
-            slip += 0.4
-        elif vix > 25:
-            slip += 0.3
-        elif vix > 20:
-            slip += 0.1
+    return {
+        "slippage_pct": slip,
+        "transaction_cost_pct": fee,
+        "total_cost_pct": total,
+        "trade_cost_impact_pct": impact,
+    }
 
-        # 🔥 유동성 낮은 ETF
-        low_liq = ["XLU", "XLRE"]
-        if row["etf"] in low_liq:
-            slip += 0.2
 
-        # 🔥 거래 규모
-        if abs(row["trade_weight"]) > 5:
-            slip += 0.2
+def _market_vix(market_data: dict) -> float:
+    vix_node = market_data.get("VIX", DEFAULT_VIX)
+
+    if isinstance(vix_node, dict):
+        return float(vix_node.get("today", DEFAULT_VIX) or DEFAULT_VIX)
+    return float(vix_node or DEFAULT_VIX)
 
-        return round(slip, 2)
 
+def apply_slippage_to_trades(
+    trade_df: pd.DataFrame,
+    market_data: dict,
+) -> pd.DataFrame:
+    """
+    Trade Log에 슬리피지 반영
+    """
     if trade_df.empty:
         trade_df["slippage_pct"] = []
         return trade_df
 
-    trade_df["slippage_pct"] = trade_df.apply(calc_slippage, axis=1)
+    costs = trade_cost_columns(
+        trade_df["etf"].to_numpy(),
+        trade_df["trade_weight"].to_numpy(),
+        vix=_market_vix(market_data),
+    )
+    trade_df["slippage_pct"] = costs["slippage_pct"]
 
     return trade_df
 
@@ -55,20 +124,16 @@ def apply_transaction_cost(trade_df: pd.DataFrame) -> pd.DataFrame:
     """
     거래 수수료 + 세금 반영
     """
-
-    def calc_cost(row):
-        cost = 0.05  # 기본 0.05%
-
-        if row["action"] == "SELL":
-            cost += 0.1  # 매도 세금
-
-        return round(cost, 2)
-
     if trade_df.empty:
         trade_df["transaction_cost_pct"] = []
         return trade_df
 
-    trade_df["transaction_cost_pct"] = trade_df.apply(calc_cost, axis=1)
+    costs = trade_cost_columns(
+        trade_df["etf"].to_numpy(),
+        trade_df["trade_weight"].to_numpy(),
+        action=trade_df["action"].to_numpy(),
+    )
+    trade_df["transaction_cost_pct"] = costs["transaction_cost_pct"]
 
     return trade_df
 
@@ -132,20 +197,18 @@ def save_trade_log(
     # 오늘 거래 로그 생성
     df_today = pd.DataFrame(rows)
 
-    # 비용 계산 적용
-    df_today = apply_slippage_to_trades(df_today, market_data)
-    df_today = apply_transaction_cost(df_today)
+    # 비용 계산 적용 (slippage / fee·tax / total / impact: 공용 cost model 1회)
+    costs = trade_cost_columns(
+        df_today["etf"].to_numpy(),
+        df_today["trade_weight"].to_numpy(),
+        action=df_today["action"].to_numpy(),
+        vix=_market_vix(market_data),
+    )
+    for col, values in costs.items():
+        df_today[col] = values
 
     print("🔥 DEBUG COLUMNS:", df_today.columns)
 
-    df_today["total_cost_pct"] = (
-        df_today["slippage_pct"] + df_today["transaction_cost_pct"]
-    ).round(2)
-
-    df_today["trade_cost_impact_pct"] = (
-        df_today["trade_weight"].abs() * df_today["total_cost_pct"] / 100
-    ).round(4)
-
     # 🔥 총 거래 비용 계산
     total_cost_impact = df_today["trade_cost_impact_pct"].sum().round(4)
 
@@ -158,26 +221,10 @@ def save_trade_log(
     else:
         print("✅ EXECUTE TRADE: 비용 감수 가능")
 
-    # 기존 파일 있으면 오늘 row 제거 후 병합
-    if os.path.exists(filepath):
-        try:
-            old_df = pd.read_csv(filepath)
-
-            if not old_df.empty and "date" in old_df.columns:
-                old_df["date"] = old_df["date"].astype(str)
-                old_df = old_df[old_df["date"] != today].copy()
-
-            df = pd.concat([old_df, df_today], ignore_index=True)
+    # 같은 날짜 row는 교체 (append segment + date index)
+    mode = upsert_log_rows(filepath, df_today)
 
-        except Exception:
-            df = df_today
-    else:
-        df = df_today
-
-    os.makedirs("data", exist_ok=True)
-    df.to_csv(filepath, index=False)
-
-    print(f"✅ Trade log saved/updated: {today}")
+    print(f"✅ Trade log saved/updated: {today} ({mode})")
     print(f"✅ File path: {filepath}")
 
 
@@ -549,6 +596,14 @@ def clear_filter18_rank_state(
         os.remove(filepath)
 
 
+def _paper_portfolio_column_order(columns: list) -> list:
+    fixed_cols = ["date"]
+    tail_cols = ["CASH", "total_exposure"]
+
+    dynamic_cols = sorted(c for c in columns if c not in fixed_cols + tail_cols)
+    return fixed_cols + dynamic_cols + tail_cols
+
+
 def save_paper_portfolio(
     weights: Dict[str, float],
     cash_weight: float,
@@ -577,21 +632,7 @@ def save_paper_portfolio(
     if exposure <= 0 and cash_weight <= 0:
         cash_weight = 100.0
 
-    # 1) 기존 파일 로드
-    if os.path.exists(filepath):
-        try:
-            df = pd.read_csv(filepath)
-        except Exception:
-            df = pd.DataFrame()
-    else:
-        df = pd.DataFrame()
-
-    # 2) 같은 날짜 기존 row 제거
-    if not df.empty and "date" in df.columns:
-        df["date"] = df["date"].astype(str)
-        df = df[df["date"] != today].copy()
-
-    # 3) 새 row 생성
+    # 1) 새 row 생성
     new_row = {"date": today}
 
     for ticker, weight in weights.items():
@@ -613,30 +654,15 @@ def save_paper_portfolio(
         new_row["CASH"] = 100.0
         new_row["total_exposure"] = 0.0
 
-    # 4) append
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-
-    # 5) 컬럼 정리
-    fixed_cols = ["date"]
-    tail_cols = ["CASH", "total_exposure"]
-
-    dynamic_cols = [c for c in df.columns if c not in fixed_cols + tail_cols]
-    dynamic_cols = sorted(dynamic_cols)
-
-    ordered_cols = fixed_cols + dynamic_cols + tail_cols
-    df = df.reindex(columns=ordered_cols)
-
-    # 6) 날짜 정렬
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
-
-    # 7) 저장
-    os.makedirs("data", exist_ok=True)
-    df.to_csv(filepath, index=False)
+    # 2) 같은 날짜 overwrite (append segment + date index)
+    #    새 ticker 컬럼이 생기면 compaction에서 컬럼 순서 재정리
+    mode = upsert_log_rows(
+        filepath,
+        pd.DataFrame([new_row]),
+        column_order=_paper_portfolio_column_order,
+    )
 
-    print(f"✅ Portfolio saved/updated: {today}")
+    print(f"✅ Portfolio saved/updated: {today} ({mode})")
     print(f"✅ File path: {filepath}")
 
 
@@ -0,0 +1,414 @@
+import argparse
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from portfolio.save_portfolio import TRADE_COST_TABLE, trade_cost_columns
+from scripts.backtest_store import save_run
+from scripts.price_panel import DATA_DIR, get_price_panel
+from scripts.sector_allocation_engine import (
+    HOLD_THRESHOLD,
+    SECTOR_ETF,
+    compute_allocation_history,
+    load_allocation_inputs,
+)
+
+# =========================================================
+# Event-driven ETF Portfolio Simulator
+# ---------------------------------------------------------
+# 입력:
+#   history : compute_allocation_history 결과 (date, EXPOSURE, VIX,
+#             ALLOCATED_EQUITY, WEIGHT_<etf>, CASH)
+#   prices  : date x ETF close panel (공용 price panel, bar archive 1d 포함)
+#
+# 시점 규칙 (live paper portfolio와 동일):
+#   date=d allocation row는 d-1 close에 체결 → d close까지 보유 (r_d 반영)
+#   시장 거래일 d에는 date <= d 인 가장 최근 allocation row 적용
+#
+# 하루 흐름 (array state, DataFrame append 없음):
+#   1) 새 allocation row → 현재 보유 비중 대비 trade 생성
+#      drift=True : 보유 비중은 가격에 따라 drift
+#                   목표 불변 + drift < drift_band 인 ETF는 거래 생략
+#                   (단, 유지 시 Filter 15 exposure 초과면 전체 목표 비중 복원)
+#      drift=False: paper log 방식 (전일 목표 비중 대비 trade, 매일 목표 비중 복원)
+#   2) slippage / transaction cost (save_portfolio cost table) → NAV 차감
+#   3) 실행 계약 점검: Filter 15 exposure ≥ Filter 18 allocated ≥ ETF exposure
+#   4) r_d 로 보유분 drift, NAV 갱신 (현금 수익률 0)
+# =========================================================
+
+PORTFOLIO_ETFS = list(SECTOR_ETF.values())
+SIM_OUTPUT_DIR = "data/backtest/simulation"
+
+INITIAL_NAV = 100.0
+TRADING_DAYS = 252
+CONTRACT_TOLERANCE = 0.1   # 1자리 반올림 오차 허용
+
+TRADE_COLUMNS = [
+    "date", "etf", "prev_weight", "target_weight", "trade_weight", "action",
+    "slippage_pct", "transaction_cost_pct", "total_cost_pct", "trade_cost_impact_pct",
+]
+VIOLATION_COLUMNS = ["date", "check", "lhs", "rhs", "detail"]
+
+
+# -------------------------
+# Price panel
+# -------------------------
+def load_price_panel(
+    tickers: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    data_dir=DATA_DIR,
+) -> pd.DataFrame:
+    """공용 price panel(bar archive 1d + ETF CSV) close → date x ticker panel. 없는 ticker는 NaN 컬럼."""
+    tickers = tickers or PORTFOLIO_ETFS
+    panel = get_price_panel(data_dir)
+
+    for ticker in tickers:
+        if ticker not in panel:
+            print(f"⚠️ No price history for {ticker}")
+
+    # 요청 ticker 중 하나라도 가격이 있는 날짜만 (다른 ticker만 거래된 날짜 제외)
+    return panel.frame(tickers, start=start, end=end).dropna(how="all").rename_axis(None)
+
+
+def daily_returns(prices: pd.DataFrame) -> np.ndarray:
+    """close 대비 1D 수익률 (%). 전일/당일 close가 없으면 0 (live fetch_return_for_date와 동일)."""
+    px = prices.to_numpy(dtype="float64")
+    out = np.zeros(px.shape, dtype="float64")
+    if len(px) > 1:
+        prev, cur = px[:-1], px[1:]
+        ok = np.isfinite(prev) & np.isfinite(cur) & (prev != 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[1:] = np.where(ok, (cur - prev) / prev * 100.0, 0.0)
+    return out
+
+
+# -------------------------
+# Simulator
+# -------------------------
+def _history_arrays(history: pd.DataFrame, etfs: List[str]) -> Dict[str, np.ndarray]:
+    hist = history.copy()
+    hist["date"] = pd.to_datetime(hist["date"], errors="coerce").dt.normalize()
+    hist = hist.dropna(subset=["date"]).sort_values("date", kind="mergesort")
+    hist = hist.drop_duplicates("date", keep="last").reset_index(drop=True)
+
+    def col(name: str, default: float) -> np.ndarray:
+        if name not in hist.columns:
+            return np.full(len(hist), default, dtype="float64")
+        return pd.to_numeric(hist[name], errors="coerce").fillna(default).to_numpy(dtype="float64")
+
+    weight_cols = [f"WEIGHT_{etf}" for etf in etfs]
+    target = hist.reindex(columns=weight_cols).apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype="float64")
+    cash = col("CASH", np.nan)
+    cash = np.where(np.isnan(cash), 100.0 - target.sum(axis=1), cash)
+
+    return {
+        "date": hist["date"].to_numpy(dtype="datetime64[ns]"),
+        "target": target,
+        "cash": cash,
+        "exposure": col("EXPOSURE", 100.0),
+        "allocated": col("ALLOCATED_EQUITY", np.nan),
+        "vix": col("VIX", 20.0),
+    }
+
+
+def simulate_portfolio(
+    history: pd.DataFrame,
+    prices: pd.DataFrame,
+    initial_nav: float = INITIAL_NAV,
+    drift: bool = True,
+    drift_band: float = HOLD_THRESHOLD,
+    tolerance: float = CONTRACT_TOLERANCE,
+    cost_table: Dict[str, Any] = TRADE_COST_TABLE,
+) -> Dict[str, Any]:
+    """
+    history(allocation) + prices(close panel) → daily NAV / trades / 실행 계약 위반.
+    Return: {"daily": DataFrame, "trades": DataFrame, "violations": DataFrame, "summary": dict}
+    """
+    etfs = PORTFOLIO_ETFS
+    k = len(etfs)
+    alloc = _history_arrays(history, etfs)
+
+    prices = prices.copy()
+    prices.index = pd.to_datetime(prices.index).normalize()
+    prices = prices[~prices.index.duplicated(keep="last")].sort_index().reindex(columns=etfs)
+
+    if len(alloc["date"]) == 0 or prices.empty:
+        return {
+            "daily": pd.DataFrame(),
+            "trades": pd.DataFrame(columns=TRADE_COLUMNS),
+            "violations": pd.DataFrame(columns=VIOLATION_COLUMNS),
+            "summary": {},
+        }
+
+    rets_all = daily_returns(prices)
+    in_range = prices.index >= pd.Timestamp(alloc["date"][0])
+    cal = prices.index[in_range]
+    rets = rets_all[in_range]
+    priced = np.isfinite(prices.to_numpy(dtype="float64")[in_range])
+    row_of = np.searchsorted(alloc["date"], cal.to_numpy(dtype="datetime64[ns]"), side="right") - 1
+
+    etf_names = np.array(etfs, dtype=object)
+
+    n = len(cal)
+    nav_out = np.zeros(n)
+    gross_out = np.zeros(n)
+    cost_out = np.zeros(n)
+    turnover_out = np.zeros(n)
+    cash_out = np.zeros(n)
+    weights_out = np.zeros((n, k))
+    event_out = np.zeros(n, dtype=bool)
+
+    trade_parts: List[Dict[str, np.ndarray]] = []
+    violations: List[Dict[str, Any]] = []
+
+    hold = np.zeros(k)             # ETF 보유 가치 (NAV 단위)
+    cash_v = float(initial_nav)
+    prev_target = np.zeros(k)      # 직전 목표 비중 (%)
+    exec_w = np.zeros(k)           # 직전 실행 비중 (%)
+    last_row = -1
+
+    for j in range(n):
+        date_str = cal[j].strftime("%Y-%m-%d")
+        row = int(row_of[j])
+        nav = cash_v + hold.sum()
+
+        if row != last_row:
+            event_out[j] = True
+            target = alloc["target"][row]
+
+            if drift:
+                cur_w = hold / nav * 100.0 if nav > 0 else np.zeros(k)
+                keep = (target == prev_target) & (np.abs(cur_w - target) < drift_band)
+                exec_w = np.where(keep, cur_w, target)
+                # drift 유지분이 Filter 15 exposure를 넘기면 전부 목표 비중으로 복원
+                if exec_w.sum() > alloc["exposure"][row] + tolerance:
+                    exec_w = target.copy()
+            else:
+                cur_w = prev_target
+                exec_w = target.copy()
+
+            diff = np.round(exec_w - cur_w, 2)
+            logged = (cur_w > 0) | (target > 0)
+            costs = trade_cost_columns(etf_names, diff, vix=alloc["vix"][row], table=cost_table)
+            cost_pct = float(costs["trade_cost_impact_pct"][logged].sum())
+
+            if logged.any():
+                trade_parts.append(
+                    {
+                        "date": np.full(int(logged.sum()), date_str, dtype=object),
+                        "etf": etf_names[logged],
+                        "prev_weight": np.round(cur_w[logged], 2),
+                        "target_weight": np.round(exec_w[logged], 2),
+                        "trade_weight": diff[logged],
+                        "action": np.where(diff[logged] > 0, "BUY", np.where(diff[logged] < 0, "SELL", "HOLD")).astype(object),
+                        **{key: val[logged] for key, val in costs.items()},
+                    }
+                )
+
+            post_nav = nav * (1.0 - cost_pct / 100.0)
+            hold = exec_w / 100.0 * post_nav
+            cash_v = post_nav - hold.sum()
+
+            cost_out[j] = cost_pct
+            turnover_out[j] = float(np.abs(diff).sum())
+
+            violations.extend(
+                contract_violations(
+                    date_str,
+                    exposure=float(alloc["exposure"][row]),
+                    allocated=float(alloc["allocated"][row]),
+                    target=target,
+                    executed=exec_w,
+                    cash=float(alloc["cash"][row]),
+                    priced=priced[j],
+                    etfs=etfs,
+                    tolerance=tolerance,
+                )
+            )
+
+            prev_target = target
+            last_row = row
+
+        elif not drift:
+            hold = exec_w / 100.0 * nav
+            cash_v = nav - hold.sum()
+
+        pre_nav = cash_v + hold.sum()
+        weights_out[j] = hold / pre_nav * 100.0 if pre_nav > 0 else 0.0
+        pnl = hold * rets[j] / 100.0
+        gross_out[j] = pnl.sum() / pre_nav * 100.0 if pre_nav > 0 else 0.0
+        hold = hold + pnl
+        nav_out[j] = cash_v + hold.sum()
+        cash_out[j] = cash_v / nav_out[j] * 100.0 if nav_out[j] > 0 else 0.0
+
+    prev_nav = np.concatenate([[float(initial_nav)], nav_out[:-1]])
+    daily = pd.DataFrame(
+        {
+            "date": cal.strftime("%Y-%m-%d"),
+            "allocation_date": pd.DatetimeIndex(alloc["date"][row_of]).strftime("%Y-%m-%d"),
+            "rebalance": event_out,
+            "nav": nav_out,
+            "gross_return_pct": gross_out,
+            "cost_pct": cost_out,
+            "net_return_pct": (nav_out / prev_nav - 1.0) * 100.0,
+            "turnover_pct": turnover_out,
+            "equity_weight": weights_out.sum(axis=1),
+            "cash_weight": 100.0 - weights_out.sum(axis=1),
+            "end_cash_weight": cash_out,
+            "exposure_target": alloc["exposure"][row_of],
+        }
+    )
+    for i, etf in enumerate(etfs):
+        daily[f"w_{etf}"] = weights_out[:, i]
+
+    if trade_parts:
+        trades = pd.DataFrame({c: np.concatenate([p[c] for p in trade_parts]) for c in TRADE_COLUMNS})
+    else:
+        trades = pd.DataFrame(columns=TRADE_COLUMNS)
+
+    violations_df = pd.DataFrame(violations, columns=VIOLATION_COLUMNS)
+
+    return {
+        "daily": daily,
+        "trades": trades,
+        "violations": violations_df,
+        "summary": summarize_simulation(daily, violations_df, initial_nav),
+    }
+
+
+def contract_violations(
+    date: str,
+    exposure: float,
+    allocated: float,
+    target: np.ndarray,
+    executed: np.ndarray,
+    cash: float,
+    priced: np.ndarray,
+    etfs: List[str],
+    tolerance: float = CONTRACT_TOLERANCE,
+) -> List[Dict[str, Any]]:
+    """실행 계약: Filter 15 exposure ≥ Filter 18 allocated ≥ ETF exposure (+ 비중 합/가격 존재)."""
+    out: List[Dict[str, Any]] = []
+    etf_total = float(target.sum())
+    executed_total = float(executed.sum())
+
+    def add(check: str, lhs: float, rhs: float, detail: str = "") -> None:
+        out.append({"date": date, "check": check, "lhs": round(lhs, 4), "rhs": round(rhs, 4), "detail": detail})
+
+    if not np.isnan(allocated):
+        if allocated > exposure + tolerance:
+            add("F18_ABOVE_F15", allocated, exposure)
+        if etf_total > allocated + tolerance:
+            add("ETF_ABOVE_F18", etf_total, allocated)
+    if executed_total > exposure + tolerance:
+        add("EXECUTED_ABOVE_F15", executed_total, exposure)
+    if abs(etf_total + cash - 100.0) > tolerance:
+        add("WEIGHT_SUM", etf_total + cash, 100.0)
+    if (target < 0).any() or cash < -tolerance:
+        add("NEGATIVE_WEIGHT", float(target.min()), cash)
+
+    unpriced = (executed > 0) & ~priced
+    if unpriced.any():
+        names = [etf for etf, flag in zip(etfs, unpriced) if flag]
+        add("UNPRICED_TARGET", float(executed[unpriced].sum()), 0.0, ",".join(names))
+
+    return out
+
+
+def summarize_simulation(daily: pd.DataFrame, violations: pd.DataFrame, initial_nav: float = INITIAL_NAV) -> Dict[str, Any]:
+    if daily.empty:
+        return {}
+
+    nav = daily["nav"].to_numpy(dtype="float64")
+    final = float(nav[-1])
+    net = daily["net_return_pct"].to_numpy() / 100.0
+    years = max(len(daily) / TRADING_DAYS, 1e-9)
+    peak = np.maximum.accumulate(np.concatenate([[initial_nav], nav]))[1:]
+
+    gross_curve = np.prod(1.0 + daily["gross_return_pct"].to_numpy() / 100.0)
+
+    return {
+        "start": daily["date"].iloc[0],
+        "end": daily["date"].iloc[-1],
+        "days": int(len(daily)),
+        "years": round(years, 2),
+        "rebalances": int(daily["rebalance"].sum()),
+        "final_nav": round(final, 4),
+        "total_return_pct": round((final / initial_nav - 1.0) * 100.0, 4),
+        "gross_return_pct": round((float(gross_curve) - 1.0) * 100.0, 4),
+        "cagr_pct": round(((final / initial_nav) ** (1.0 / years) - 1.0) * 100.0, 4),
+        "vol_pct": round(float(np.std(net, ddof=1) * np.sqrt(TRADING_DAYS) * 100.0) if len(net) > 1 else 0.0, 4),
+        "max_drawdown_pct": round(float((nav / peak - 1.0).min() * 100.0), 4),
+        "cost_drag_pct": round(float(daily["cost_pct"].sum()), 4),
+        "cost_drag_annual_pct": round(float(daily["cost_pct"].sum()) / years, 4),
+        "turnover_annual_pct": round(float(daily["turnover_pct"].sum()) / years, 2),
+        "avg_equity_weight": round(float(daily["equity_weight"].mean()), 2),
+        "violations": {str(k): int(v) for k, v in violations["check"].value_counts().items()} if not violations.empty else {},
+    }
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Filter 18 → ETF execution portfolio simulator")
+    parser.add_argument("--history", default=None, help="allocation history CSV (없으면 sector_allocation_inputs로 재계산)")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--paper", action="store_true", help="drift 없이 paper log 방식으로 시뮬레이션")
+    parser.add_argument("--out-dir", default=None, help=f"daily/trades/violations CSV 저장 (예: {SIM_OUTPUT_DIR})")
+    parser.add_argument("--no-store", action="store_true", help="backtest run store(data/backtest/runs)에 기록하지 않음")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+
+    if args.history:
+        history = pd.read_csv(args.history)
+    else:
+        history = compute_allocation_history(load_allocation_inputs())
+
+    if args.start:
+        history = history[history["date"] >= str(pd.Timestamp(args.start).date())]
+    if args.end:
+        history = history[history["date"] <= str(pd.Timestamp(args.end).date())]
+
+    prices = load_price_panel(PORTFOLIO_ETFS, end=args.end)
+    result = simulate_portfolio(history, prices, drift=not args.paper)
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        for name in ["daily", "trades", "violations"]:
+            path = os.path.join(args.out_dir, f"{name}.csv")
+            result[name].to_csv(path, index=False)
+            print(f"✅ {name}: {len(result[name])} rows -> {path}")
+
+    if not args.no_store and not result["daily"].empty:
+        try:
+            save_run(
+                result["daily"],
+                kind="portfolio_simulation",
+                params={
+                    "history": args.history or "sector_allocation_inputs",
+                    "start": args.start,
+                    "end": args.end,
+                    "drift": not args.paper,
+                    "drift_band": HOLD_THRESHOLD,
+                },
+                summary=result["summary"],
+            )
+        except Exception as e:
+            print(f"⚠️ backtest run store 저장 실패: {e}")
+
+    print("")
+    print("=== Portfolio Simulation Summary ===")
+    for key, val in result["summary"].items():
+        print(f"{key}: {val}")
+    print(f"elapsed: {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+# scripts/alert_dispatcher.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# =========================================================
+# Alert Dispatcher (persistent queue + background sender)
+# ---------------------------------------------------------
+# 탐지 경로(SEW monitor / regime change)는 enqueue_alert()로 spool 파일 1개만
+# 쓰고 바로 반환 -> 메일 API 지연/장애와 무관하게 탐지 cycle은 일정 시간.
+#
+# spool: insights/alert_queue/<EVENT_TYPE>__<first_ts>.json (alert 1건 = 파일 1개)
+#   status: pending -> sending -> sent
+#                              -> pending (retry, backoff) -> failed (MAX_ATTEMPTS)
+#
+# coalescing / dedupe (event_type 별 window, 첫 trigger 기준):
+#   - window 안 pending alert 존재 -> 최신 subject/body로 교체, count += 1 (1통으로 합침)
+#   - window 안 이미 발송(sending/sent) -> suppressed += 1 (재발송 안 함)
+#   - window 밖 또는 직전 alert가 failed -> 새 alert (failed는 suppress 근거가 아님)
+#
+# transport (ALERT_TRANSPORT 환경변수):
+#   resend (기본) : Resend HTTP API (RESEND_API_KEY / RESEND_FROM / RESEND_TO)
+#   file          : ALERT_OUTBOX_FILE에 append (테스트 / 로컬)
+#   smtp          : ALERT_SMTP_HOST:ALERT_SMTP_PORT (로컬 debug SMTP 서버 등)
+#
+# 발송:
+#   - start_sender() : daemon thread가 queue drain (enqueue 시 즉시 깨움)
+#   - flush_alerts() : 프로세스 종료 전 남은 alert 발송 대기 (timeout 한도)
+#   - CLI            : python scripts/alert_dispatcher.py --drain
+# 미발송 alert는 파일로 남아 다음 실행에서 다시 시도.
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+QUEUE_DIR = BASE_DIR / "insights" / "alert_queue"
+OUTBOX_FILE = BASE_DIR / "insights" / "alert_outbox.log"
+
+DEFAULT_WINDOW_SEC = 3600
+ALERT_WINDOWS: Dict[str, int] = {
+    "REGIME_CHANGE": 24 * 3600,   # 하루 1통
+    "SEW_HARD": 30 * 60,          # 10분 cron 3회분
+}
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SEC = 30          # 30s, 60s, 120s, 240s ...
+SENDING_TIMEOUT_SEC = 300      # sending 상태로 멈춘 alert(프로세스 중단) 재시도
+RETENTION_SEC = 2 * 24 * 3600  # window 종료 후 sent/failed 파일 보관 기간
+POLL_SEC = 5.0
+HTTP_TIMEOUT_SEC = 20
+
+Transport = Callable[[str, str], Tuple[bool, str]]
+
+_lock = threading.RLock()
+_wake = threading.Event()
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+
+# -------------------------
+# Transports
+# -------------------------
+def send_resend(subject: str, body: str) -> Tuple[bool, str]:
+    """
+    Requires:
+      - RESEND_API_KEY (GitHub Secret)
+      - RESEND_FROM (e.g. "alerts@yourdomain.com")  *Resend에서 발신 도메인 인증 필요할 수 있음*
+      - RESEND_TO   (e.g. "seyeon8143@gmail.com")
+    """
+    api_key = os.getenv("RESEND_API_KEY")
+    from_email = os.getenv("RESEND_FROM")
+    to_email = os.getenv("RESEND_TO")
+
+    if not api_key or not from_email or not to_email:
+        return False, "RESEND env missing (RESEND_API_KEY/RESEND_FROM/RESEND_TO)"
+
+    try:
+        import requests  # needs 'requests' in dependencies
+        r = requests.post(
+            "https://api.resend.com/emails",
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            json={"from": from_email, "to": [to_email], "subject": subject, "text": body},
+            timeout=HTTP_TIMEOUT_SEC,
+        )
+        if 200 <= r.status_code < 300:
+            return True, "sent"
+        return False, f"resend http {r.status_code}: {r.text}"
+    except Exception as e:
+        return False, f"exception: {e}"
+
+
+def send_file(subject: str, body: str) -> Tuple[bool, str]:
+    """메일 대신 outbox 파일에 append (테스트 / 로컬 확인용)."""
+    path = Path(os.getenv("ALERT_OUTBOX_FILE") or OUTBOX_FILE)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"===== {stamp} =====\nSubject: {subject}\n\n{body}\n\n")
+        return True, f"written to {path}"
+    except Exception as e:
+        return False, f"exception: {e}"
+
+
+def send_smtp(subject: str, body: str) -> Tuple[bool, str]:
+    """ALERT_SMTP_HOST / ALERT_SMTP_PORT (기본 localhost:1025) 로 평문 발송."""
+    import smtplib
+    from email.message import EmailMessage
+
+    host = os.getenv("ALERT_SMTP_HOST", "localhost")
+    port = int(os.getenv("ALERT_SMTP_PORT", "1025"))
+
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = os.getenv("RESEND_FROM") or "alerts@localhost"
+    msg["To"] = os.getenv("RESEND_TO") or "alerts@localhost"
+    msg.set_content(body)
+
+    try:
+        with smtplib.SMTP(host, port, timeout=HTTP_TIMEOUT_SEC) as s:
+            s.send_message(msg)
+        return True, f"smtp {host}:{port}"
+    except Exception as e:
+        return False, f"exception: {e}"
+
+
+TRANSPORTS: Dict[str, Transport] = {
+    "resend": send_resend,
+    "file": send_file,
+    "smtp": send_smtp,
+}
+
+
+def get_transport(name: Optional[str] = None) -> Transport:
+    name = (name or os.getenv("ALERT_TRANSPORT") or "resend").strip().lower()
+    if name not in TRANSPORTS:
+        raise ValueError(f"unknown ALERT_TRANSPORT: {name} (choices: {sorted(TRANSPORTS)})")
+    return TRANSPORTS[name]
+
+
+# -------------------------
+# Spool I/O
+# -------------------------
+def _queue_dir(queue_dir: Optional[Path] = None) -> Path:
+    return Path(queue_dir or os.getenv("ALERT_QUEUE_DIR") or QUEUE_DIR)
+
+
+def _safe_name(event_type: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", event_type)
+
+
+def _read_record(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def _write_record(path: Path, rec: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(rec, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _latest_record(qdir: Path, event_type: str) -> Tuple[Optional[Path], Optional[Dict[str, Any]]]:
+    # 파일명 = <event_type>__<first_ts> 이므로 이름 정렬 = 시간 정렬
+    paths = sorted(qdir.glob(f"{_safe_name(event_type)}__*.json"))
+    for path in reversed(paths):
+        rec = _read_record(path)
+        if rec is not None:
+            return path, rec
+    return None, None
+
+
+def load_queue(queue_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    qdir = _queue_dir(queue_dir)
+    if not qdir.exists():
+        return []
+    out = []
+    for path in sorted(qdir.glob("*.json")):
+        rec = _read_record(path)
+        if rec is not None:
+            out.append(rec)
+    return out
+
+
+# -------------------------
+# Enqueue (탐지 경로: 파일 I/O만, 네트워크 없음)
+# -------------------------
+def enqueue_alert(
+    event_type: str,
+    subject: str,
+    body: str,
+    window_sec: Optional[int] = None,
+    now: Optional[float] = None,
+    queue_dir: Optional[Path] = None,
+    wake: bool = True,
+) -> Dict[str, Any]:
+    """
+    alert를 spool에 기록 (coalesce / dedupe 포함).
+    Return: {"id", "action": "queued" | "coalesced" | "suppressed", "count"}
+    """
+    qdir = _queue_dir(queue_dir)
+    now = time.time() if now is None else float(now)
+    window = int(window_sec if window_sec is not None else ALERT_WINDOWS.get(event_type, DEFAULT_WINDOW_SEC))
+
+    with _lock:
+        path, rec = _latest_record(qdir, event_type)
+
+        # failed(MAX_ATTEMPTS 소진) alert는 window를 잡고 있지 않음 -> 새 alert로 다시 시도
+        in_window = (
+            rec is not None
+            and rec.get("status") != "failed"
+            and now < float(rec.get("window_end", 0))
+        )
+
+        if in_window:
+            if rec.get("status") == "pending":
+                rec["subject"] = subject
+                rec["body"] = body
+                rec["count"] = int(rec.get("count", 1)) + 1
+                rec["last_ts"] = now
+                action = "coalesced"
+            else:
+                rec["suppressed"] = int(rec.get("suppressed", 0)) + 1
+                rec["last_ts"] = now
+                action = "suppressed"
+            _write_record(path, rec)
+        else:
+            stamp = datetime.fromtimestamp(now, timezone.utc).strftime("%Y%m%dT%H%M%S")
+            rec = {
+                "id": f"{_safe_name(event_type)}__{stamp}",
+                "event_type": event_type,
+                "subject": subject,
+                "body": body,
+                "status": "pending",
+                "count": 1,
+                "suppressed": 0,
+                "first_ts": now,
+                "last_ts": now,
+                "window_end": now + window,
+                "attempts": 0,
+                "next_attempt_ts": now,
+                "last_error": None,
+                "sent_ts": None,
+            }
+            path = qdir / f"{rec['id']}.json"
+            _write_record(path, rec)
+            action = "queued"
+
+    if wake:
+        _wake.set()
+
+    return {"id": rec["id"], "action": action, "count": int(rec.get("count", 1))}
+
+
+# -------------------------
+# Drain (background sender / CLI)
+# -------------------------
+def _render(rec: Dict[str, Any]) -> Tuple[str, str]:
+    subject = rec["subject"]
+    body = rec["body"]
+    count = int(rec.get("count", 1))
+    if count > 1:
+        first = datetime.fromtimestamp(float(rec["first_ts"]), timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        subject = f"{subject} (x{count})"
+        body = f"{body}\n\n※ {first} 이후 같은 유형 alert {count}건을 1통으로 합쳤습니다 (최신 내용 기준)."
+    return subject, body
+
+
+def _claim_due(qdir: Path, now: float) -> List[Path]:
+    """due 상태 alert를 sending으로 표시 후 반환 (같은 alert 중복 발송 방지)."""
+    claimed = []
+    with _lock:
+        for path in sorted(qdir.glob("*.json")):
+            rec = _read_record(path)
+            if rec is None:
+                continue
+
+            status = rec.get("status")
+            stuck = status == "sending" and now - float(rec.get("claimed_ts", 0)) > SENDING_TIMEOUT_SEC
+            due = status == "pending" and float(rec.get("next_attempt_ts", 0)) <= now
+
+            if due or stuck:
+                rec["status"] = "sending"
+                rec["claimed_ts"] = now
+                _write_record(path, rec)
+                claimed.append(path)
+    return claimed
+
+
+def _prune(qdir: Path, now: float) -> int:
+    removed = 0
+    with _lock:
+        for path in qdir.glob("*.json"):
+            rec = _read_record(path)
+            if rec is None or rec.get("status") not in ("sent", "failed"):
+                continue
+            if now - float(rec.get("window_end", 0)) > RETENTION_SEC:
+                path.unlink(missing_ok=True)
+                removed += 1
+    return removed
+
+
+def drain_queue(
+    transport: Optional[Transport] = None,
+    queue_dir: Optional[Path] = None,
+    now: Optional[float] = None,
+) -> Dict[str, int]:
+    """due alert 발송. 실패는 지수 backoff 후 재시도, MAX_ATTEMPTS 초과 시 failed."""
+    qdir = _queue_dir(queue_dir)
+    stats = {"sent": 0, "retry": 0, "failed": 0, "pruned": 0}
+    if not qdir.exists():
+        return stats
+
+    transport = transport or get_transport()
+    now = time.time() if now is None else float(now)
+
+    for path in _claim_due(qdir, now):
+        rec = _read_record(path)
+        if rec is None:
+            continue
+
+        subject, body = _render(rec)
+        try:
+            ok, note = transport(subject, body)
+        except Exception as e:
+            ok, note = False, f"exception: {e}"
+
+        with _lock:
+            # 발송 중 suppressed 카운트가 바뀌었을 수 있으므로 다시 읽고 갱신
+            rec = _read_record(path) or rec
+            rec["attempts"] = int(rec.get("attempts", 0)) + 1
+
+            if ok:
+                rec["status"] = "sent"
+                rec["sent_ts"] = time.time()
+                rec["last_error"] = None
+                stats["sent"] += 1
+                print(f"📧 alert sent: {rec['id']} ({note})")
+            elif rec["attempts"] >= MAX_ATTEMPTS:
+                rec["status"] = "failed"
+                rec["last_error"] = note
+                stats["failed"] += 1
+                print(f"❌ alert failed after {rec['attempts']} attempts: {rec['id']} | {note}")
+            else:
+                rec["status"] = "pending"
+                rec["last_error"] = note
+                rec["next_attempt_ts"] = now + BACKOFF_BASE_SEC * (2 ** (rec["attempts"] - 1))
+                stats["retry"] += 1
+                print(f"⚠️ alert retry {rec['attempts']}/{MAX_ATTEMPTS}: {rec['id']} | {note}")
+
+            _write_record(path, rec)
+
+    stats["pruned"] = _prune(qdir, now)
+    return stats
+
+
+def pending_count(queue_dir: Optional[Path] = None, due_only: bool = False) -> int:
+    now = time.time()
+    n = 0
+    for rec in load_queue(queue_dir):
+        if rec.get("status") in ("pending", "sending"):
+            if due_only and float(rec.get("next_attempt_ts", 0)) > now:
+                continue
+            n += 1
+    return n
+
+
+# -------------------------
+# Background sender
+# -------------------------
+def _worker_loop(transport: Optional[Transport], queue_dir: Optional[Path]) -> None:
+    while True:
+        _wake.wait(POLL_SEC)
+        _wake.clear()
+        try:
+            drain_queue(transport, queue_dir)
+        except Exception as e:
+            print(f"[WARN] alert sender loop error: {type(e).__name__}: {e}")
+        # 종료 요청 시: drain 도중 새로 들어온 due alert까지 보낸 뒤 종료
+        if _stop.is_set() and pending_count(queue_dir, due_only=True) == 0:
+            break
+
+
+def start_sender(transport: Optional[Transport] = None, queue_dir: Optional[Path] = None) -> None:
+    """daemon sender thread 시작 (이미 실행 중이면 no-op). 이전 실행의 미발송 alert도 처리."""
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _stop.clear()
+        _worker = threading.Thread(
+            target=_worker_loop,
+            args=(transport, queue_dir),
+            name="alert-sender",
+            daemon=True,
+        )
+        _worker.start()
+    _wake.set()
+
+
+def flush_alerts(timeout: float = 30.0) -> int:
+    """
+    sender thread에 마지막 drain을 요청하고 최대 timeout초 대기.
+    Return: 아직 남은 pending/sending alert 수 (다음 실행 / --drain 에서 재시도)
+    """
+    global _worker
+    worker = _worker
+    if worker is not None:
+        _stop.set()
+        _wake.set()
+        worker.join(timeout)
+        if not worker.is_alive():
+            _worker = None
+
+    left = pending_count()
+    if left:
+        print(f"⚠️ alert queue: {left}건 미발송 (다음 실행에서 재시도)")
+    return left
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Alert queue dispatcher")
+    parser.add_argument("--drain", action="store_true", help="due alert 발송")
+    parser.add_argument("--status", action="store_true", help="queue 상태 출력")
+    parser.add_argument("--transport", default=None, help="resend | file | smtp (기본: ALERT_TRANSPORT)")
+    args = parser.parse_args()
+
+    if args.drain:
+        stats = drain_queue(get_transport(args.transport))
+        print(f"[DEBUG] alert drain: {stats}")
+
+    if args.status or not args.drain:
+        for rec in load_queue():
+            print(
+                f"{rec['id']:<45} {rec.get('status'):<8} count={rec.get('count')} "
+                f"suppressed={rec.get('suppressed')} attempts={rec.get('attempts')} "
+                f"err={rec.get('last_error')}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+# scripts/anomaly_detectors.py
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.bar_archive import BAR_DTYPE, BARS_DIR, archive_frame, bar_path, load_bars
+from scripts.data_processing import country_etf_list
+from scripts.fetch_macro_data import INDICATORS
+from scripts.market_backend import get_market_backend
+from scripts.sector_allocation_engine import SECTOR_ETF
+
+# =========================================================
+# Streaming Anomaly Detector Bank (SEW wide universe)
+# ---------------------------------------------------------
+# universe : SEW core proxy 5 + macro INDICATORS 32 + sector ETF + country ETF (ticker 중복 제거)
+# 입력     : bar archive 5m (data/bars/5m/<ticker>.bin), 완성된 bar만 사용
+#
+# detector (ticker x horizon 배열 state, horizon = 5m / 15m / 60m = 1 / 3 / 12 bar 수익률):
+#   EWMA-z : z = (r - mu) / sigma  (mu / var는 r 반영 전 값 = 예측 오차 기준)
+#            mu, var 는 halflife HALFLIFE_BARS 의 EWMA로 갱신, MIN_OBS 관측 전 z = 0
+#   CUSUM  : S+ = max(0, S+ + z - k), S- = max(0, S- - z - k), S > h 이면 alarm 후 0으로 reset
+#
+# cycle마다 새 bar 행렬 (new bars x tickers, NaN pad)을 시간축으로만 loop, ticker 축은 vector 연산.
+# state는 insights/sew_detector_state.npz (없거나 universe가 바뀌면 archive replay로 bootstrap)
+# repo에 커밋하지 않음: sew-monitor.yml이 actions/cache로 cron 실행 간 유지
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STATE_PATH = BASE_DIR / "insights" / "sew_detector_state.npz"
+
+INTERVAL = "5m"
+BAR_NS = 5 * 60 * 1_000_000_000
+DOWNLOAD_PERIOD = "5d"
+
+HORIZONS: Dict[str, int] = {"5m": 1, "15m": 3, "60m": 12}
+HORIZON_NAMES = list(HORIZONS)
+LAGS = np.array(list(HORIZONS.values()), dtype=np.int64)
+RING = int(LAGS.max())
+
+HALFLIFE_BARS = 78          # 5m bar 기준 1 session
+MIN_OBS = 20                # 기존 20-bar z-score와 같은 warm-up
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+
+# classify_spike_state 와 같은 경계
+ALERT_Z = 2.5
+EXTREME_Z = 3.5
+WIDE_HORIZON = "15m"        # group breadth 판단용 horizon
+
+# 기존 check_market_anomaly 5개 proxy (name → ticker)
+CORE_PROXIES: Dict[str, str] = {
+    "SPY": "SPY",
+    "QQQ": "QQQ",
+    "VIX": "^VIX",
+    "DXY": "UUP",
+    "WTI": "USO",
+}
+
+
+def build_universe() -> Dict[str, List[str]]:
+    """ticker → 소속 group 목록 (core / macro / sector / country)."""
+    universe: Dict[str, List[str]] = {}
+    groups = [
+        ("core", CORE_PROXIES.values()),
+        ("macro", INDICATORS.values()),
+        ("sector", SECTOR_ETF.values()),
+        ("country", country_etf_list),
+    ]
+    for group, tickers in groups:
+        for ticker in tickers:
+            universe.setdefault(ticker, [])
+            if group not in universe[ticker]:
+                universe[ticker].append(group)
+    return universe
+
+
+SEW_UNIVERSE = build_universe()
+
+
+# -------------------------
+# Detector bank (array state)
+# -------------------------
+class DetectorBank:
+    """
+    ticker x horizon detector state.
+    update(ts, closes)는 (n_new, n_tickers) 행렬을 받아 시간축으로만 loop.
+    """
+
+    __slots__ = (
+        "tickers", "index", "last_ts", "ring", "seen",
+        "mu", "var", "n_obs", "cusum_pos", "cusum_neg",
+        "z", "alarm", "alarm_ts", "updated_ts",
+    )
+
+    STATE_FIELDS = (
+        "last_ts", "ring", "seen", "mu", "var", "n_obs",
+        "cusum_pos", "cusum_neg", "z", "alarm", "alarm_ts", "updated_ts",
+    )
+
+    def __init__(self, tickers: Sequence[str]):
+        n, k = len(tickers), len(LAGS)
+        self.tickers = list(tickers)
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+        self.last_ts = np.full(n, np.iinfo("int64").min, dtype=np.int64)
+        self.ring = np.full((n, RING), np.nan)          # 최근 close (마지막 열 = 가장 최근)
+        self.seen = np.zeros(n, dtype=np.int64)
+        self.mu = np.zeros((n, k))
+        self.var = np.zeros((n, k))
+        self.n_obs = np.zeros((n, k), dtype=np.int64)
+        self.cusum_pos = np.zeros((n, k))
+        self.cusum_neg = np.zeros((n, k))
+        self.z = np.zeros((n, k))                        # 마지막 EWMA-z
+        self.alarm = np.zeros((n, k), dtype=np.int8)     # 마지막 CUSUM alarm 방향 (+1 / -1 / 0)
+        self.alarm_ts = np.zeros((n, k), dtype=np.int64)
+        self.updated_ts = np.zeros(n, dtype=np.int64)
+
+    # ---- persistence ----
+    def save(self, path: Path = STATE_PATH) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, tickers=np.array(self.tickers), **{f: getattr(self, f) for f in self.STATE_FIELDS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, tickers: Sequence[str], path: Path = STATE_PATH) -> "DetectorBank":
+        """저장된 state에서 tickers 순서로 복원. 새 ticker는 초기 state (archive replay 대상)."""
+        bank = cls(tickers)
+        path = Path(path)
+        if not path.exists():
+            return bank
+        try:
+            with np.load(path) as saved:
+                old_index = {str(t): i for i, t in enumerate(saved["tickers"])}
+                rows = [(i, old_index[t]) for i, t in enumerate(bank.tickers) if t in old_index]
+                if rows:
+                    new_rows, old_rows = map(np.array, zip(*rows))
+                    for f in cls.STATE_FIELDS:
+                        getattr(bank, f)[new_rows] = saved[f][old_rows]
+        except Exception as e:
+            print(f"[WARN][SEW DETECTOR] state load 실패 → 초기화: {e}")
+            return cls(tickers)
+        return bank
+
+    # ---- streaming update ----
+    def update(self, ts: np.ndarray, closes: np.ndarray) -> None:
+        """
+        ts, closes: (n_new, n_tickers). 열 j의 유효 bar는 위에서부터 시간순, 나머지 NaN pad.
+        """
+        alpha = 1.0 - 0.5 ** (1.0 / HALFLIFE_BARS)
+        cols = RING - LAGS                               # horizon별 비교 close 위치
+
+        for t in range(closes.shape[0]):
+            c = closes[t]
+            m = np.isfinite(c)
+            if not m.any():
+                continue
+
+            prev = self.ring[:, cols]                    # (n, k)
+            ok = m[:, None] & (self.seen[:, None] >= LAGS[None, :]) & (prev > 0)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = (c[:, None] / prev - 1.0) * 100.0
+                sd = np.sqrt(self.var)
+                z = np.where(ok & (self.n_obs >= MIN_OBS) & (sd > 0), (r - self.mu) / sd, 0.0)
+
+            warm = ok & (self.n_obs >= MIN_OBS)
+            self.z = np.where(ok, z, self.z)
+
+            # EWMA (r 반영)
+            diff = np.where(ok, r - self.mu, 0.0)
+            self.mu = self.mu + alpha * diff
+            self.var = np.where(ok, (1.0 - alpha) * (self.var + alpha * diff * diff), self.var)
+            self.n_obs = self.n_obs + ok
+
+            # CUSUM (표준화 z 기준)
+            sp = np.where(warm, np.maximum(0.0, self.cusum_pos + z - CUSUM_K), self.cusum_pos)
+            sn = np.where(warm, np.maximum(0.0, self.cusum_neg - z - CUSUM_K), self.cusum_neg)
+            up, down = sp > CUSUM_H, sn > CUSUM_H
+            fired = up | down
+            if fired.any():
+                self.alarm = np.where(fired, np.where(up, 1, -1), self.alarm).astype(np.int8)
+                self.alarm_ts = np.where(fired, ts[t][:, None], self.alarm_ts)
+                sp = np.where(fired, 0.0, sp)
+                sn = np.where(fired, 0.0, sn)
+            self.cusum_pos, self.cusum_neg = sp, sn
+
+            # close ring
+            self.ring[m, :-1] = self.ring[m, 1:]
+            self.ring[m, -1] = c[m]
+            self.seen += m
+            self.last_ts = np.where(m, ts[t], self.last_ts)
+            self.updated_ts = np.where(m, ts[t], self.updated_ts)
+
+    # ---- output ----
+    def scores(self) -> pd.DataFrame:
+        """ticker별 horizon z / CUSUM / 마지막 alarm."""
+        out = pd.DataFrame(self.z, index=self.tickers, columns=[f"z_{h}" for h in HORIZON_NAMES])
+        for k, h in enumerate(HORIZON_NAMES):
+            out[f"cusum_pos_{h}"] = self.cusum_pos[:, k]
+            out[f"cusum_neg_{h}"] = self.cusum_neg[:, k]
+            out[f"alarm_{h}"] = self.alarm[:, k]
+        out["max_abs_z"] = np.abs(self.z).max(axis=1)
+        out["warm"] = self.n_obs[:, 0] >= MIN_OBS
+        return out
+
+
+# -------------------------
+# Bars → update matrix
+# -------------------------
+TAIL_RECORDS = 64
+
+
+def _read_tail(ticker: str, last_ts: int, root: Path = BARS_DIR) -> np.ndarray:
+    """
+    steady-state cycle에서는 새 bar가 몇 개뿐 → 파일 끝 TAIL_RECORDS개만 읽음.
+    tail 첫 bar가 이미 last_ts 이후면 (bootstrap / 긴 공백) 전체 archive로 fallback.
+    """
+    path = bar_path(ticker, INTERVAL, root)
+    try:
+        n = path.stat().st_size // BAR_DTYPE.itemsize
+    except OSError:
+        return np.zeros(0, dtype=BAR_DTYPE)
+    if n == 0:
+        return np.zeros(0, dtype=BAR_DTYPE)
+
+    k = min(n, TAIL_RECORDS)
+    tail = np.fromfile(path, dtype=BAR_DTYPE, count=k, offset=(n - k) * BAR_DTYPE.itemsize)
+    if k < n and tail.size and tail["ts"][0] > last_ts:
+        return np.asarray(load_bars(ticker, INTERVAL, root=root))
+    return tail
+
+
+def collect_new_bars(
+    bank: DetectorBank,
+    as_of_ns: Optional[int] = None,
+    root: Path = BARS_DIR,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    archive에서 ticker별 last_ts 이후 완성 bar(ts + 5m <= as_of)만 모아 (n_new, n_tickers) 행렬로.
+    """
+    as_of_ns = time.time_ns() if as_of_ns is None else int(as_of_ns)
+    cutoff = as_of_ns - BAR_NS
+
+    chunks: List[Optional[np.ndarray]] = []
+    longest = 0
+    for j, ticker in enumerate(bank.tickers):
+        bars = _read_tail(ticker, bank.last_ts[j], root)
+        if len(bars) == 0:
+            chunks.append(None)
+            continue
+        bars = bars[: int(np.searchsorted(bars["ts"], cutoff, side="right"))]
+        start = int(np.searchsorted(bars["ts"], bank.last_ts[j], side="right"))
+        new = bars[start:]
+        chunks.append(new if len(new) else None)
+        longest = max(longest, len(new))
+
+    n = len(bank.tickers)
+    ts = np.zeros((longest, n), dtype=np.int64)
+    closes = np.full((longest, n), np.nan)
+    for j, new in enumerate(chunks):
+        if new is not None:
+            ts[: len(new), j] = new["ts"]
+            closes[: len(new), j] = new["close"]
+
+    return ts, closes
+
+
+def refresh_universe_bars(
+    tickers: Sequence[str],
+    period: str = DOWNLOAD_PERIOD,
+    root: Path = BARS_DIR,
+) -> Dict[str, bool]:
+    """universe 5m bar download → archive. 반환: ticker → 성공 여부."""
+    backend = get_market_backend()
+    ok: Dict[str, bool] = {}
+    for ticker in tickers:
+        try:
+            df = backend.download(
+                ticker,
+                period=period,
+                interval=INTERVAL,
+                progress=False,
+                auto_adjust=False,
+                threads=False,
+            )
+            ok[ticker] = archive_frame(ticker, INTERVAL, df, root).size > 0
+        except Exception as e:
+            print(f"[WARN][SEW DETECTOR] {ticker} download 실패: {e}")
+            ok[ticker] = False
+    return ok
+
+
+# -------------------------
+# Wide signal summary
+# -------------------------
+def wide_signal(
+    scores: pd.DataFrame,
+    universe: Dict[str, List[str]] = SEW_UNIVERSE,
+    alarm_since_ns: Optional[int] = None,
+    alarm_ts: Optional[np.ndarray] = None,
+    top_n: int = 5,
+) -> Dict[str, Any]:
+    """
+    detector 점수 → detect_event_signature 용 요약.
+      n_scored / n_alert / n_extreme : warm ticker 기준 (max |z| across horizons)
+      groups[g]                      : WIDE_HORIZON z 평균, ALERT_Z 이상 하락/상승 비율
+      cusum_alarms                   : 이번 cycle에 alarm 난 ticker:horizon
+    """
+    warm = scores[scores["warm"]]
+    zcol = f"z_{WIDE_HORIZON}"
+
+    groups: Dict[str, Dict[str, Any]] = {}
+    members: Dict[str, List[str]] = {}
+    for ticker, gs in universe.items():
+        for g in gs:
+            members.setdefault(g, []).append(ticker)
+
+    for g, tickers in members.items():
+        z = warm[zcol].reindex([t for t in tickers if t in warm.index])
+        n = int(len(z))
+        groups[g] = {
+            "n": n,
+            "mean_z": round(float(z.mean()), 3) if n else 0.0,
+            "down": round(float((z <= -ALERT_Z).mean()), 3) if n else 0.0,
+            "up": round(float((z >= ALERT_Z).mean()), 3) if n else 0.0,
+        }
+
+    alarms: List[str] = []
+    if alarm_since_ns is not None and alarm_ts is not None:
+        rows, cols = np.nonzero(alarm_ts > alarm_since_ns)
+        alarms = [f"{scores.index[i]}:{HORIZON_NAMES[k]}" for i, k in zip(rows, cols)]
+
+    top = warm["max_abs_z"].nlargest(top_n)
+    zs = warm[[f"z_{h}" for h in HORIZON_NAMES]]
+    return {
+        "n_scored": int(len(warm)),
+        "n_alert": int(((warm["max_abs_z"] >= ALERT_Z) & (warm["max_abs_z"] < EXTREME_Z)).sum()),
+        "n_extreme": int((warm["max_abs_z"] >= EXTREME_Z).sum()),
+        "groups": groups,
+        "cusum_alarms": alarms,
+        "top": [
+            {"ticker": t, "horizon": zs.loc[t].abs().idxmax()[2:], "z": round(float(zs.loc[t, zs.loc[t].abs().idxmax()]), 2)}
+            for t in top.index
+        ],
+    }
+
+
+# -------------------------
+# Cycle
+# -------------------------
+def run_detector_cycle(
+    universe: Dict[str, List[str]] = SEW_UNIVERSE,
+    refresh: bool = True,
+    as_of_ns: Optional[int] = None,
+    state_path: Path = STATE_PATH,
+    root: Path = BARS_DIR,
+) -> Dict[str, Any]:
+    """
+    (download →) archive 새 bar → detector 갱신 → state 저장.
+    반환: {"wide", "scores", "fresh"(ticker → download 성공), "n_new", "elapsed_ms"}
+    """
+    tickers = list(universe)
+    fresh = refresh_universe_bars(tickers, root=root) if refresh else {}
+
+    t0 = time.perf_counter()
+    bank = DetectorBank.load(tickers, state_path)
+    prev_updated = int(bank.updated_ts.max()) if len(tickers) else 0
+
+    ts, closes = collect_new_bars(bank, as_of_ns=as_of_ns, root=root)
+    bank.update(ts, closes)
+    scores = bank.scores()
+
+    try:
+        bank.save(state_path)
+    except Exception as e:
+        print(f"[WARN][SEW DETECTOR] state save 실패: {e}")
+
+    wide = wide_signal(scores, universe, alarm_since_ns=prev_updated, alarm_ts=bank.alarm_ts)
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(
+        f"[SEW DETECTOR] {wide['n_scored']}/{len(tickers)} scored | new bars={int(np.isfinite(closes).sum())} "
+        f"| alert={wide['n_alert']} extreme={wide['n_extreme']} | {elapsed:.1f} ms"
+    )
+    return {"wide": wide, "scores": scores, "fresh": fresh, "n_new": int(ts.shape[0]), "elapsed_ms": elapsed}
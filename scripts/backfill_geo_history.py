@@ -8,6 +8,8 @@ from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import yfinance as yf
 
+from scripts.macro_schema import write_macro_csv
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 CSV_PATH = DATA_DIR / "macro_data.csv"
@@ -170,7 +172,7 @@ def main():
         print()
 
     df = df.drop(columns=["date_key"])
-    df.to_csv(CSV_PATH, index=False)
+    write_macro_csv(df, CSV_PATH)
     print("[DONE] Backfill complete safely.")
 
 
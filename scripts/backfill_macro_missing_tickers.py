@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 import pandas as pd
 import yfinance as yf
 
+from scripts.macro_schema import write_macro_csv
+
 
 MACRO_PATH = "data/macro_data.csv"
 START_DATE = "2022-01-01"
@@ -122,7 +124,7 @@ def main() -> None:
     merged = merge_backfill(macro_df, backfill_df)
     output = restore_datetime_column(merged)
 
-    output.to_csv(MACRO_PATH, index=False)
+    write_macro_csv(output, MACRO_PATH)
 
     print("[OK] macro_data.csv backfill completed")
     print(f"- path: {MACRO_PATH}")
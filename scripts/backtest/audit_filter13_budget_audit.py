@@ -63,6 +63,8 @@ from filters.strategist_filters import (
     market_regime_filter,
 )
 
+from scripts.backtest_store import save_run
+
 
 OUTPUT_DIR = Path("data/backtest/results")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -970,8 +972,10 @@ def main():
                 market_data
             ) or market_data
 
+            # backtest: 당일 시점 archive bar만 사용 (미래 drift 유입 방지)
             market_data = attach_drift_data_layer(
-                market_data
+                market_data,
+                as_of=df.iloc[idx]["date"]
             ) or market_data
 
             market_data = attach_growth_sustainability_layer(
@@ -1102,6 +1106,26 @@ def main():
     print("[OK]", txt_path)
 
 
+    # run별 보관 (위 CSV는 매 실행 덮어씀)
+    try:
+
+        save_run(
+            result,
+            kind="filter13_budget_audit",
+            params={
+                "start_date": str(start_date.date()),
+                "end_date": str(end_date.date()),
+                "macro_source": "data/backtest/macro_data.csv",
+            },
+            summary={
+                "error_rows": int(result["error"].notna().sum()) if "error" in result else 0,
+            },
+        )
+
+    except Exception as e:
+        print("[WARN] backtest run store 저장 실패:", e)
+
+
 
 if __name__ == "__main__":
 
@@ -1,6 +1,8 @@
 from pathlib import Path
 import pandas as pd
 
+from scripts.price_panel import get_price_panel
+
 DATA = Path("data/backtest")
 RESULT = DATA / "results"
 
@@ -14,7 +16,6 @@ files = {
     "macro": DATA / "macro_data.csv",
     "positioning": DATA / "positioning_data.csv",
     "sentiment": DATA / "sentiment_proxy.csv",
-    "country_etf": DATA / "country_etf_data_combined.csv",
     "yield": DATA / "sovereign_yields.csv",
     "spread": DATA / "sovereign_spreads.csv",
 }
@@ -32,6 +33,11 @@ for name, path in files.items():
 
     loaded[name] = df
 
+# 국가 ETF close는 공용 price panel (data/backtest/price_panel) 사용
+panel = get_price_panel(DATA)
+loaded["country_etf"] = panel.frame().reset_index()
+print(f"{'country_etf':15s} : {len(panel.dates):6,d} rows ({len(panel.tickers)} tickers, price panel)")
+
 print()
 print("All datasets loaded successfully.")
 print()
@@ -0,0 +1,436 @@
+# scripts/backtest_store.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Run-keyed Backtest Results Store (columnar, memmap)
+# ---------------------------------------------------------
+# backtest / audit 실행 1회 = run 1개 (덮어쓰기 없음)
+#
+# 저장: data/backtest/runs/ (gitignore, BACKTEST_RUNS_DIR로 변경 가능)
+#   runs.json            : run index (run_id → kind / created_at / code / params / 기간 / 컬럼 / summary)
+#   <run_id>/dates.npy   : int64 epoch day, 오름차순 (날짜 중복 없음)
+#   <run_id>/<col>.npy   : 컬럼 1개 = 파일 1개
+#                          숫자/bool → float64 (NaN = 결측)
+#                          문자열(regime / action / reasons) → int32 code (-1 = 결측) + vocab.json
+#                          list/dict(reasons 등) → JSON 문자열로 바꿔 같은 방식
+#   <run_id>/vocab.json  : 문자열 컬럼별 code → 값
+#
+# 읽기: np.load(mmap_mode="r") → 필요한 컬럼 / 날짜 구간만 (CSV 전체 로드 없음)
+#   load_run(run, columns, start, end)   : date index DataFrame
+#   diff_runs(a, b, columns)             : 날짜 x 컬럼 차이 (long format)
+#   run_matrix(runs, column)             : 날짜 x run 행렬 (여러 run 한 컬럼 비교)
+#   aggregate_runs(runs, columns, stats) : run x (컬럼, 통계) + params → tuning 비교
+#
+# run_id: <kind>_<UTC YYYYmmddTHHMMSS>_<sha1(code + params)[:8]>
+# code  : git HEAD (없으면 GITHUB_SHA) + scripts/filters/portfolio 미커밋 변경 여부
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RUNS_DIR = BASE_DIR / "data" / "backtest" / "runs"
+RUNS_DIR_ENV = "BACKTEST_RUNS_DIR"
+STORE_VERSION = 1
+
+DATE_COL = "date"
+CODE_PATHS = ["scripts", "filters", "portfolio"]
+NUMERIC_STATS = ("mean", "min", "max", "last")
+
+
+# -------------------------
+# Code version / index
+# -------------------------
+def code_version(base_dir: Path = BASE_DIR) -> Dict[str, Any]:
+    def git(*args: str) -> Optional[subprocess.CompletedProcess]:
+        try:
+            return subprocess.run(["git", *args], cwd=base_dir, capture_output=True, text=True, timeout=10)
+        except Exception:
+            return None
+
+    head = git("rev-parse", "HEAD")
+    sha = head.stdout.strip() if head is not None and head.returncode == 0 else os.environ.get("GITHUB_SHA")
+    diff = git("diff", "--quiet", "HEAD", "--", *CODE_PATHS) if sha else None
+    return {"git": sha or "unknown", "dirty": bool(diff is not None and diff.returncode == 1)}
+
+
+def runs_root(root: Optional[Path] = None) -> Path:
+    """store 위치: 인자 > BACKTEST_RUNS_DIR 환경변수 > data/backtest/runs (호출 시점에 결정)."""
+    return Path(root or os.getenv(RUNS_DIR_ENV) or RUNS_DIR)
+
+
+def _index_path(root: Optional[Path]) -> Path:
+    return runs_root(root) / "runs.json"
+
+
+def load_index(root: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    path = _index_path(root)
+    if not path.exists():
+        return {}
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN] backtest run index 손상 → run 폴더에서 재구축: {e}")
+        return _rebuild_index(root)
+    return payload.get("runs", {})
+
+
+def _rebuild_index(root: Path) -> Dict[str, Dict[str, Any]]:
+    runs = {}
+    for meta_path in sorted(runs_root(root).glob("*/meta.json")):
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            runs[meta["run_id"]] = meta
+        except Exception:
+            continue
+    return runs
+
+
+def _write_json(path: Path, payload: Any) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _save_index(runs: Dict[str, Dict[str, Any]], root: Path) -> None:
+    _write_json(_index_path(root), {"version": STORE_VERSION, "runs": runs})
+
+
+# -------------------------
+# Write
+# -------------------------
+def _jsonable(x: Any) -> Any:
+    if isinstance(x, (list, tuple, dict)):
+        return json.dumps(x, ensure_ascii=False, sort_keys=True, default=str)
+    return x
+
+
+def _encode_column(values: pd.Series) -> Dict[str, Any]:
+    """컬럼 1개 → {"kind", "data"(ndarray), "vocab"(문자열 컬럼만)}."""
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return {"kind": "float", "data": pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64")}
+
+    as_num = pd.to_numeric(values, errors="coerce")
+    if as_num.notna().sum() == values.notna().sum():
+        return {"kind": "float", "data": as_num.to_numpy(dtype="float64")}
+
+    text = values.map(_jsonable).astype("string")
+    codes, uniques = pd.factorize(text, use_na_sentinel=True)
+    return {"kind": "category", "data": codes.astype("int32"), "vocab": [str(u) for u in uniques]}
+
+
+def _safe_name(col: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(col))
+
+
+def save_run(
+    frame: pd.DataFrame,
+    kind: str,
+    params: Optional[Mapping[str, Any]] = None,
+    summary: Optional[Mapping[str, Any]] = None,
+    run_id: Optional[str] = None,
+    date_col: str = DATE_COL,
+    root: Optional[Path] = None,
+) -> str:
+    """
+    per-date 결과 DataFrame(date 컬럼 필수) → run 1개로 저장.
+    날짜 중복이면 마지막 row, 날짜 파싱 실패 row(에러 row 등)는 제외.
+    Return: run_id
+    """
+    root = runs_root(root)
+    params = dict(params or {})
+    code = code_version()
+    created = datetime.now(timezone.utc)
+
+    if run_id is None:
+        digest = hashlib.sha1(json.dumps([code, params], sort_keys=True, default=str).encode("utf-8")).hexdigest()[:8]
+        run_id = f"{kind}_{created.strftime('%Y%m%dT%H%M%S')}_{digest}"
+
+    df = frame.copy()
+    df[date_col] = pd.to_datetime(df[date_col], errors="coerce").dt.normalize()
+    dropped = int(df[date_col].isna().sum())
+    df = df.dropna(subset=[date_col]).drop_duplicates(subset=[date_col], keep="last").sort_values(date_col)
+
+    # 같은 초 / 같은 params 반복 실행 → suffix로 구분
+    base_id, n = run_id, 1
+    while (root / run_id).exists():
+        n += 1
+        run_id = f"{base_id}-{n}"
+    run_dir = root / run_id
+    tmp_dir = root / f".{run_id}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    days = df[date_col].to_numpy(dtype="datetime64[D]").astype("int64")
+    np.save(tmp_dir / "dates.npy", days)
+
+    columns: Dict[str, Dict[str, str]] = {}
+    vocab: Dict[str, List[str]] = {}
+    used_files = {"dates"}
+    for col in df.columns:
+        if col == date_col:
+            continue
+        enc = _encode_column(df[col].reset_index(drop=True))
+        fname = _safe_name(col)
+        while fname in used_files:
+            fname += "_"
+        used_files.add(fname)
+        np.save(tmp_dir / f"{fname}.npy", enc["data"])
+        columns[str(col)] = {"kind": enc["kind"], "file": f"{fname}.npy"}
+        if enc["kind"] == "category":
+            vocab[str(col)] = enc["vocab"]
+
+    meta = {
+        "run_id": run_id,
+        "kind": kind,
+        "version": STORE_VERSION,
+        "created_at": created.isoformat(),
+        "code": code,
+        "params": params,
+        "start": str(df[date_col].iloc[0].date()) if len(df) else None,
+        "end": str(df[date_col].iloc[-1].date()) if len(df) else None,
+        "rows": int(len(df)),
+        "dropped_rows": dropped,
+        "columns": columns,
+        "summary": dict(summary or {}),
+    }
+    _write_json(tmp_dir / "vocab.json", vocab)
+    _write_json(tmp_dir / "meta.json", meta)
+    os.replace(tmp_dir, run_dir)
+
+    runs = load_index(root)
+    runs[run_id] = meta
+    _save_index(runs, root)
+    print(f"[OK] backtest run saved: {run_id} ({meta['rows']} rows, {len(columns)} columns)")
+    return run_id
+
+
+def delete_run(run_id: str, root: Optional[Path] = None) -> None:
+    runs = load_index(root)
+    runs.pop(run_id, None)
+    _save_index(runs, root)
+    shutil.rmtree(runs_root(root) / run_id, ignore_errors=True)
+
+
+# -------------------------
+# Read
+# -------------------------
+def _meta(run_id: str, root: Path) -> Dict[str, Any]:
+    # index 전체 대신 run 폴더 meta.json (run 수백 개 비교 시 index 반복 parse 방지)
+    path = runs_root(root) / run_id / "meta.json"
+    if not path.exists():
+        raise KeyError(f"unknown backtest run: {run_id}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def list_runs(kind: Optional[str] = None, root: Optional[Path] = None) -> pd.DataFrame:
+    """run index → run_id 1행 (params는 param.<key>, summary 숫자는 summary.<key> 컬럼)."""
+    rows = []
+    for run_id, meta in load_index(root).items():
+        if kind is not None and meta.get("kind") != kind:
+            continue
+        row = {
+            "run_id": run_id,
+            "kind": meta.get("kind"),
+            "created_at": meta.get("created_at"),
+            "git": (meta.get("code") or {}).get("git"),
+            "dirty": (meta.get("code") or {}).get("dirty"),
+            "start": meta.get("start"),
+            "end": meta.get("end"),
+            "rows": meta.get("rows"),
+        }
+        row.update({f"param.{k}": _jsonable(v) for k, v in (meta.get("params") or {}).items()})
+        row.update({
+            f"summary.{k}": v for k, v in (meta.get("summary") or {}).items()
+            if isinstance(v, (int, float, str, bool)) or v is None
+        })
+        rows.append(row)
+
+    if not rows:
+        return pd.DataFrame(columns=["run_id", "kind", "created_at", "git", "dirty", "start", "end", "rows"])
+    return pd.DataFrame(rows).sort_values("created_at").set_index("run_id")
+
+
+def _date_slice(days: np.ndarray, start: Optional[str], end: Optional[str]) -> slice:
+    lo = 0 if start is None else int(np.searchsorted(days, np.datetime64(pd.Timestamp(start).date(), "D").astype("int64"), "left"))
+    hi = len(days) if end is None else int(np.searchsorted(days, np.datetime64(pd.Timestamp(end).date(), "D").astype("int64"), "right"))
+    return slice(lo, hi)
+
+
+def load_run(
+    run_id: str,
+    columns: Optional[Sequence[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    root: Optional[Path] = None,
+) -> pd.DataFrame:
+    """run 1개 → date index DataFrame (요청 컬럼 / 날짜 구간만 memmap에서 읽음)."""
+    meta = _meta(run_id, root)
+    run_dir = runs_root(root) / run_id
+    days = np.load(run_dir / "dates.npy", mmap_mode="r")
+    sl = _date_slice(days, start, end)
+    index = pd.DatetimeIndex(np.asarray(days[sl]).astype("datetime64[D]"), name=DATE_COL)
+
+    wanted = list(meta["columns"]) if columns is None else [c for c in columns if c in meta["columns"]]
+    vocab = None
+    out: Dict[str, Any] = {}
+    for col in wanted:
+        info = meta["columns"][col]
+        data = np.asarray(np.load(run_dir / info["file"], mmap_mode="r")[sl])
+        if info["kind"] == "category":
+            if vocab is None:
+                vocab = json.loads((run_dir / "vocab.json").read_text(encoding="utf-8"))
+            out[col] = pd.Categorical.from_codes(data, categories=vocab[col]) if vocab[col] else pd.Categorical([None] * len(data))
+        else:
+            out[col] = data
+    return pd.DataFrame(out, index=index)
+
+
+def run_matrix(
+    run_ids: Iterable[str],
+    column: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    root: Optional[Path] = None,
+) -> pd.DataFrame:
+    """여러 run의 같은 컬럼 → 날짜(union) x run_id."""
+    series = {}
+    for run_id in run_ids:
+        frame = load_run(run_id, [column], start, end, root)
+        if column in frame:
+            series[run_id] = frame[column].astype(object) if isinstance(frame[column].dtype, pd.CategoricalDtype) else frame[column]
+    return pd.DataFrame(series)
+
+
+def diff_runs(
+    run_a: str,
+    run_b: str,
+    columns: Optional[Sequence[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    atol: float = 1e-9,
+    root: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    두 run을 날짜(union) x 공통 컬럼으로 비교 → 값이 다른 칸만 long format.
+    columns: date / column / a / b / delta(숫자 컬럼만)
+    한쪽에만 있는 날짜도 차이로 포함 (반대쪽 NaN).
+    """
+    meta_a, meta_b = _meta(run_a, root), _meta(run_b, root)
+    common = [c for c in meta_a["columns"] if c in meta_b["columns"]]
+    if columns is not None:
+        common = [c for c in common if c in columns]
+
+    a = load_run(run_a, common, start, end, root)
+    b = load_run(run_b, common, start, end, root)
+    dates = a.index.union(b.index)
+    a, b = a.reindex(dates), b.reindex(dates)
+
+    parts = []
+    for col in common:
+        numeric = meta_a["columns"][col]["kind"] == "float" and meta_b["columns"][col]["kind"] == "float"
+        if numeric:
+            va = a[col].to_numpy(dtype="float64")
+            vb = b[col].to_numpy(dtype="float64")
+            both_nan = np.isnan(va) & np.isnan(vb)
+            changed = ~both_nan & ~(np.abs(va - vb) <= atol)
+            delta = vb - va
+        else:
+            va = a[col].astype(object).to_numpy()
+            vb = b[col].astype(object).to_numpy()
+            na_a, na_b = pd.isna(va), pd.isna(vb)
+            changed = (na_a != na_b) | (~na_a & ~na_b & (va != vb))
+            delta = np.full(len(dates), np.nan)
+
+        idx = np.flatnonzero(changed)
+        if len(idx):
+            parts.append(pd.DataFrame({
+                "date": dates[idx],
+                "column": col,
+                "a": pd.Series(va[idx], dtype=object),
+                "b": pd.Series(vb[idx], dtype=object),
+                "delta": delta[idx],
+            }))
+
+    if not parts:
+        return pd.DataFrame(columns=["date", "column", "a", "b", "delta"])
+    return pd.concat(parts, ignore_index=True).sort_values(["date", "column"]).reset_index(drop=True)
+
+
+def aggregate_runs(
+    run_ids: Optional[Iterable[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    kind: Optional[str] = None,
+    stats: Sequence[str] = NUMERIC_STATS,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    root: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    run별 숫자 컬럼 통계 + params → run_id 1행 (tuning 결과 비교용).
+    문자열 컬럼은 <col>.mode / <col>.changes(값이 바뀐 날 수).
+    """
+    index = list_runs(kind, root)
+    run_ids = list(index.index) if run_ids is None else list(run_ids)
+
+    rows = []
+    for run_id in run_ids:
+        meta = _meta(run_id, root)
+        wanted = list(meta["columns"]) if columns is None else [c for c in columns if c in meta["columns"]]
+        frame = load_run(run_id, wanted, start, end, root)
+        row: Dict[str, Any] = {"run_id": run_id}
+        for col in wanted:
+            if meta["columns"][col]["kind"] == "float":
+                values = frame[col].dropna()
+                for stat in stats:
+                    if stat == "last":
+                        row[f"{col}.last"] = float(values.iloc[-1]) if len(values) else np.nan
+                    else:
+                        row[f"{col}.{stat}"] = float(getattr(values, stat)()) if len(values) else np.nan
+            else:
+                values = frame[col].astype(object).dropna()
+                row[f"{col}.mode"] = values.mode().iloc[0] if len(values) else None
+                row[f"{col}.changes"] = int((values != values.shift()).iloc[1:].sum()) if len(values) > 1 else 0
+        rows.append(row)
+
+    if not rows:
+        return pd.DataFrame()
+    out = pd.DataFrame(rows).set_index("run_id")
+    params = index.reindex(out.index).filter(like="param.")
+    return pd.concat([params, out], axis=1)
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run-keyed backtest results store")
+    parser.add_argument("--kind", default=None)
+    parser.add_argument("--diff", nargs=2, metavar=("RUN_A", "RUN_B"))
+    parser.add_argument("--columns", nargs="*", default=None)
+    parser.add_argument("--aggregate", action="store_true", help="run별 컬럼 통계 + params")
+    args = parser.parse_args()
+
+    with pd.option_context("display.width", 200, "display.max_columns", 30, "display.max_rows", 200):
+        if args.diff:
+            diff = diff_runs(args.diff[0], args.diff[1], args.columns)
+            print(f"{len(diff)} differing cells")
+            print(diff.to_string(index=False))
+        elif args.aggregate:
+            print(aggregate_runs(columns=args.columns, kind=args.kind).to_string())
+        else:
+            print(list_runs(args.kind).to_string())
+
+
+if __name__ == "__main__":
+    main()
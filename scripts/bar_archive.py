@@ -0,0 +1,300 @@
+# scripts/bar_archive.py
+from __future__ import annotations
+
+import argparse
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from scripts.market_backend import get_market_backend
+
+# =========================================================
+# Intraday / Daily Bar Archive (append-only, binary)
+# ---------------------------------------------------------
+# 파일: data/bars/<interval>/<ticker>.bin
+# 레이아웃: fixed-size record (BAR_DTYPE, 48 bytes), ts 오름차순
+#   ts     : int64 epoch ns
+#            - intraday(15m 등): bar 시작 시각 UTC
+#            - daily(1d)       : 거래일 00:00 (거래소 기준 날짜)
+#   open / high / low / close / volume : float64
+#
+# - ts 기준 정렬이 유지되므로 as-of 조회는 np.searchsorted 한 번
+# - 읽기는 np.memmap (파일 전체 로드 없음)
+# - 쓰기:
+#     새 bar(ts > 마지막 ts)      : 파일 끝 append
+#     마지막 bar 갱신(ts 동일)     : 마지막 record만 overwrite (진행 중 bar)
+#     과거 구간 backfill          : merge 후 atomic rewrite
+# - record 단위가 아닌 꼬리(torn write)는 읽을 때 무시, 다음 쓰기 때 잘라냄
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BARS_DIR = BASE_DIR / "data" / "bars"
+
+BAR_DTYPE = np.dtype(
+    [
+        ("ts", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+
+DAILY_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+_EMPTY = np.zeros(0, dtype=BAR_DTYPE)
+
+
+def bar_path(ticker: str, interval: str, root: Path = BARS_DIR) -> Path:
+    safe = re.sub(r"[^A-Za-z0-9]+", "_", ticker).strip("_") or "UNKNOWN"
+    return Path(root) / interval / f"{safe}.bin"
+
+
+# -------------------------
+# yfinance frame -> records
+# -------------------------
+def _column(df: pd.DataFrame, field: str) -> Optional[pd.Series]:
+    if isinstance(df.columns, pd.MultiIndex):
+        cols = [c for c in df.columns if str(c[0]).lower() == field.lower()]
+        if not cols:
+            return None
+        s = df[cols]
+    else:
+        if field not in df.columns:
+            return None
+        s = df[field]
+
+    if isinstance(s, pd.DataFrame):
+        s = s.iloc[:, 0]
+
+    return pd.to_numeric(s, errors="coerce")
+
+
+def _index_to_ns(index: pd.Index, interval: str) -> np.ndarray:
+    idx = pd.DatetimeIndex(pd.to_datetime(index, errors="coerce"))
+
+    if interval in DAILY_INTERVALS:
+        # 거래소 기준 날짜 유지
+        if idx.tz is not None:
+            idx = idx.tz_localize(None)
+        idx = idx.normalize()
+    else:
+        idx = idx.tz_convert("UTC").tz_localize(None) if idx.tz is not None else idx
+
+    # pandas 버전/입력에 따라 resolution(us/ns)이 달라 ns로 고정
+    return idx.as_unit("ns").asi8
+
+
+def frame_to_records(df: Optional[pd.DataFrame], interval: str) -> np.ndarray:
+    """
+    yfinance download 결과(single / MultiIndex 컬럼 모두)를 BAR_DTYPE 배열로 변환.
+    close가 없는 row는 제외, 같은 ts는 마지막 값 유지.
+    """
+    if df is None or df.empty:
+        return _EMPTY.copy()
+
+    close = _column(df, "Close")
+    if close is None:
+        return _EMPTY.copy()
+
+    out = np.zeros(len(df), dtype=BAR_DTYPE)
+    out["ts"] = _index_to_ns(df.index, interval)
+
+    for field in ("open", "high", "low", "close", "volume"):
+        s = _column(df, field.capitalize())
+        out[field] = s.to_numpy(dtype="float64", na_value=np.nan) if s is not None else np.nan
+
+    valid = ~np.isnan(out["close"]) & (out["ts"] != np.iinfo("int64").min)
+    out = out[valid]
+
+    if out.size == 0:
+        return out
+
+    # ts 정렬 + 중복 ts는 마지막 값
+    order = np.argsort(out["ts"], kind="stable")
+    out = out[order]
+    keep = np.r_[out["ts"][1:] != out["ts"][:-1], True]
+    return out[keep]
+
+
+# -------------------------
+# Read
+# -------------------------
+def load_bars(
+    ticker: str,
+    interval: str,
+    end_ts: Optional[int] = None,
+    root: Path = BARS_DIR,
+) -> np.ndarray:
+    """
+    archive bar 배열 (read-only memmap view).
+    end_ts(ns)가 있으면 ts <= end_ts 구간만 반환.
+    """
+    path = bar_path(ticker, interval, root)
+    if not path.exists():
+        return _EMPTY
+
+    n = path.stat().st_size // BAR_DTYPE.itemsize
+    if n == 0:
+        return _EMPTY
+
+    bars = np.memmap(path, dtype=BAR_DTYPE, mode="r", shape=(n,))
+
+    if end_ts is not None:
+        bars = bars[: int(np.searchsorted(bars["ts"], end_ts, side="right"))]
+
+    return bars
+
+
+# -------------------------
+# Write
+# -------------------------
+def _rewrite(path: Path, records: np.ndarray) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    # 같은 filesystem 안에서 atomic replace.
+    os.replace(tmp_path, path)
+
+
+def append_bars(
+    ticker: str,
+    interval: str,
+    records: np.ndarray,
+    root: Path = BARS_DIR,
+) -> int:
+    """
+    records(BAR_DTYPE, ts 정렬)를 archive에 반영. Return: 새로 추가된 bar 수.
+    """
+    if records is None or records.size == 0:
+        return 0
+
+    path = bar_path(ticker, interval, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if not path.exists():
+        _rewrite(path, records)
+        return int(records.size)
+
+    size = path.stat().st_size
+    n = size // BAR_DTYPE.itemsize
+    committed = n * BAR_DTYPE.itemsize
+
+    if n == 0:
+        _rewrite(path, records)
+        return int(records.size)
+
+    with open(path, "rb") as f:
+        f.seek(committed - BAR_DTYPE.itemsize)
+        last = np.frombuffer(f.read(BAR_DTYPE.itemsize), dtype=BAR_DTYPE)[0]
+    last_ts = int(last["ts"])
+
+    old = records[records["ts"] < last_ts]
+    if old.size:
+        existing = load_bars(ticker, interval, root=root)
+        pos = np.searchsorted(existing["ts"], old["ts"])
+        pos = np.minimum(pos, existing.size - 1)
+        missing = existing["ts"][pos] != old["ts"]
+
+        if not missing.any():
+            # 겹치는 구간은 이미 확정된 bar -> tail만 반영 (일상적인 download overlap)
+            records = records[records["ts"] >= last_ts]
+            if records.size == 0:
+                return 0
+
+    if int(records["ts"][0]) < last_ts:
+        # archive에 없는 과거 bar가 섞인 경우: 기존 + 신규 merge (신규 우선) 후 rewrite
+        existing = np.array(load_bars(ticker, interval, root=root))
+        merged = np.concatenate([existing, records])
+        order = np.argsort(merged["ts"], kind="stable")
+        merged = merged[order]
+        keep = np.r_[merged["ts"][1:] != merged["ts"][:-1], True]
+        merged = merged[keep]
+        _rewrite(path, merged)
+        return int(merged.size - existing.size)
+
+    start = committed
+    if int(records["ts"][0]) == last_ts:
+        # 진행 중이던 마지막 bar 갱신
+        start = committed - BAR_DTYPE.itemsize
+
+    with open(path, "r+b") as f:
+        f.truncate(start)
+        f.seek(start)
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    return int(records.size - (1 if start < committed else 0))
+
+
+def archive_frame(
+    ticker: str,
+    interval: str,
+    df: Optional[pd.DataFrame],
+    root: Path = BARS_DIR,
+) -> np.ndarray:
+    """download 결과를 archive에 반영하고 변환된 records를 반환."""
+    records = frame_to_records(df, interval)
+    try:
+        append_bars(ticker, interval, records, root)
+    except Exception as e:
+        print(f"[WARN][BAR ARCHIVE] {ticker} {interval} append failed: {e}")
+    return records
+
+
+def to_ns(as_of: Any) -> int:
+    ts = pd.Timestamp(as_of)
+    if ts.tz is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return int(ts.value)
+
+
+# -------------------------
+# Backfill CLI
+# -------------------------
+def backfill(tickers: Dict[str, str], interval: str, period: str, root: Path = BARS_DIR) -> Dict[str, int]:
+    added: Dict[str, int] = {}
+    backend = get_market_backend()
+
+    for name, ticker in tickers.items():
+        try:
+            df = backend.download(
+                ticker,
+                period=period,
+                interval=interval,
+                progress=False,
+                auto_adjust=False,
+                threads=False,
+            )
+            added[name] = append_bars(ticker, interval, frame_to_records(df, interval), root)
+        except Exception as e:
+            print(f"⚠️ backfill failed for {ticker} {interval}: {e}")
+            added[name] = 0
+
+    return added
+
+
+def main() -> None:
+    from scripts.drift_engine import DRIFT_TICKERS
+
+    parser = argparse.ArgumentParser(description="Backfill drift bar archive")
+    parser.add_argument("--interval", default="1d", help="1d (최대 수년) / 15m (yfinance 최근 60일)")
+    parser.add_argument("--period", default="5y")
+    args = parser.parse_args()
+
+    added = backfill(DRIFT_TICKERS, args.interval, args.period)
+    for name, n in added.items():
+        print(f"✅ {name}: +{n} bars ({args.interval})")
+
+
+if __name__ == "__main__":
+    main()
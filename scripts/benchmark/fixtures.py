@@ -0,0 +1,294 @@
+# scripts/benchmark/fixtures.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from scripts.macro_schema import DATE_FORMAT, MACRO_COLUMNS, VALUE_COLUMNS
+from scripts.market_backend import _fixture_key
+
+# =========================================================
+# Synthetic market fixtures (offline benchmark 전용)
+# ---------------------------------------------------------
+# - production data/*.csv 와 같은 파일명 / 컬럼 / 날짜 포맷
+# - seed 고정 -> 같은 (years, tickers, seed)면 항상 같은 파일
+# - 크기: years(1~30) x tickers(30~300)
+#   tickers가 macro 기본 컬럼 수보다 크면 SYN001.. 가격 컬럼을 추가
+# - option chain은 MARKET_BACKEND=record archive 형식(<key>.pkl)으로 기록
+#   -> ReplayMarketBackend로 gex_engine.fetch_option_chains 경로를 offline 재현
+# =========================================================
+
+FIXTURE_END_DATE = "2026-01-02"
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_SEED = 7
+
+# level 기반(금리/지수) 컬럼: random walk, 나머지는 가격(GBM)
+RATE_LIKE = {"US10Y", "VIX", "VIX3M", "VIX9D"}
+
+START_LEVELS: Dict[str, float] = {
+    "US10Y": 4.0, "DXY": 100.0, "WTI": 75.0, "VIX": 17.0, "USDKRW": 1350.0,
+    "HYG": 78.0, "LQD": 108.0, "XLK": 200.0, "XLF": 40.0, "XLE": 90.0,
+    "XLRE": 40.0, "QQQ": 420.0, "SPY": 500.0, "XLI": 120.0, "XLY": 180.0,
+    "RSP": 160.0, "QQQE": 85.0, "SMH": 220.0, "SOXX": 210.0, "IWM": 200.0,
+    "VIX3M": 19.0, "VIX9D": 16.0, "GOLD": 2000.0, "USDCNH": 7.2, "USDJPY": 150.0,
+    "USDMXN": 17.5, "SEA": 15.0, "BDRY": 10.0, "ITA": 120.0, "XAR": 130.0,
+    "EEM": 42.0, "EMB": 90.0,
+}
+
+COUNTRY_ETFS: List[str] = ["EIS", "SPY", "EEM", "EMB", "GLD", "VXX", "FXI", "EWJ", "BND"]
+
+SOVEREIGNS: List[str] = ["KR10Y", "JP10Y", "CN10Y", "DE10Y", "IL10Y", "TR10Y", "GB10Y", "MX10Y"]
+
+
+def _dates(years: int) -> pd.DatetimeIndex:
+    n = max(int(years * TRADING_DAYS_PER_YEAR), 30)
+    return pd.bdate_range(end=FIXTURE_END_DATE, periods=n)
+
+
+def _price_paths(rng: np.random.Generator, n: int, starts: np.ndarray, vol: float = 0.012) -> np.ndarray:
+    # 공통 factor + 개별 noise, vol regime 2단계 (stress 구간 포함)
+    regime = np.where(np.sin(np.arange(n) / 97.0) > 0.8, 2.5, 1.0)[:, None]
+    common = rng.normal(0.0002, vol, size=(n, 1))
+    idio = rng.normal(0.0, vol * 0.8, size=(n, len(starts)))
+    rets = (0.6 * common + idio) * regime
+    return starts[None, :] * np.exp(np.cumsum(rets, axis=0))
+
+
+def _level_paths(rng: np.random.Generator, n: int, starts: np.ndarray, step: float) -> np.ndarray:
+    walk = np.cumsum(rng.normal(0.0, step, size=(n, len(starts))), axis=0)
+    return np.maximum(starts[None, :] + walk, 0.05)
+
+
+def _with_gaps(rng: np.random.Generator, values: np.ndarray, frac: float = 0.01) -> np.ndarray:
+    # 실제 파일처럼 드문 결측 (첫/마지막 row는 유지)
+    out = values.copy()
+    mask = rng.random(out.shape) < frac
+    mask[0, :] = False
+    mask[-1, :] = False
+    out[mask] = np.nan
+    return out
+
+
+def make_macro_frame(years: int, tickers: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = _dates(years)
+    n = len(dates)
+
+    extra = [f"SYN{i:03d}" for i in range(1, max(0, tickers - len(VALUE_COLUMNS)) + 1)]
+    cols = VALUE_COLUMNS + extra
+
+    rate_cols = [c for c in cols if c in RATE_LIKE]
+    price_cols = [c for c in cols if c not in RATE_LIKE]
+
+    out = pd.DataFrame(index=range(n))
+    out["datetime"] = dates.strftime(DATE_FORMAT)
+    out["date"] = out["datetime"]
+
+    starts = np.array([START_LEVELS.get(c, 50.0 + 5.0 * (i % 20)) for i, c in enumerate(price_cols)])
+    prices = _with_gaps(rng, _price_paths(rng, n, starts))
+    out[price_cols] = np.round(prices, 4)
+
+    rate_starts = np.array([START_LEVELS[c] for c in rate_cols])
+    rates = _level_paths(rng, n, rate_starts, step=0.05)
+    out[rate_cols] = np.round(rates, 4)
+
+    return out[MACRO_COLUMNS + extra]
+
+
+def make_liquidity_frame(years: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    dates = _dates(years)
+    n = len(dates)
+
+    walcl = 7_000_000 + np.cumsum(rng.normal(0, 4_000, n))
+    tga = np.clip(700_000 + np.cumsum(rng.normal(0, 6_000, n)), 50_000, None)
+    rrp = np.clip(500_000 + np.cumsum(rng.normal(0, 8_000, n)), 0, None)
+
+    return pd.DataFrame({
+        "date": dates.strftime(DATE_FORMAT),
+        "TGA": np.round(tga, 1),
+        "RRP": np.round(rrp, 3),
+        "WALCL": np.round(walcl, 1),
+        "NET_LIQ": np.round(walcl - tga - rrp, 3),
+    })
+
+
+def make_credit_spread_frame(years: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 2)
+    dates = _dates(years)
+    hy = _level_paths(rng, len(dates), np.array([3.5]), step=0.03)[:, 0]
+    return pd.DataFrame({"date": dates.strftime(DATE_FORMAT), "HY_OAS": np.round(hy, 2)})
+
+
+def make_fred_extras_frame(years: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 3)
+    dates = _dates(years)
+    n = len(dates)
+
+    lv = _level_paths(rng, n, np.array([-0.4, 1.8, 0.3, 2.3, 17.0, 1.8, 4.2]), step=0.02)
+    return pd.DataFrame({
+        "date": dates.strftime(DATE_FORMAT),
+        "FCI": np.round(lv[:, 0] - 0.6, 4),
+        "REAL_RATE": np.round(lv[:, 1], 4),
+        "T10Y2Y": np.round(lv[:, 2] - 0.3, 4),
+        "T10YIE": np.round(lv[:, 3], 4),
+        "VIX": np.round(lv[:, 4], 2),
+        "DFII10": np.round(lv[:, 5], 4),
+        "DGS2": np.round(lv[:, 6], 4),
+    })
+
+
+def make_sovereign_frames(years: int, seed: int = DEFAULT_SEED) -> Dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(seed + 4)
+    dates = _dates(years)
+    n = len(dates)
+
+    starts = np.array([4.2, 3.1, 1.0, 2.0, 2.4, 4.3, 28.0, 4.3, 9.5])
+    y = _level_paths(rng, n, starts, step=0.02)
+    names = ["US10Y"] + SOVEREIGNS
+
+    yields = pd.DataFrame({"date": dates.strftime(DATE_FORMAT)})
+    for i, name in enumerate(names):
+        yields[name] = np.round(y[:, i], 4)
+
+    spreads = pd.DataFrame({"date": yields["date"]})
+    for name in names:
+        spreads[f"{name}_Y"] = yields[name]
+    for name in SOVEREIGNS:
+        spreads[f"{name}_SPREAD"] = np.round(yields[name] - yields["US10Y"], 4)
+
+    return {"sovereign_yields.csv": yields, "sovereign_spreads.csv": spreads}
+
+
+def make_sentiment_frame(years: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 5)
+    dates = _dates(years)
+    n = len(dates)
+
+    proxy = np.clip(50 + np.cumsum(rng.normal(0, 2.0, n)) * 0.3, 0, 100)
+    return pd.DataFrame({
+        "date": dates.strftime(DATE_FORMAT),
+        "sentiment_proxy": np.round(proxy, 2),
+        "used": "proxy",
+        "vix": np.round(_level_paths(rng, n, np.array([17.0]), 0.3)[:, 0], 2),
+        "hy_oas": np.round(_level_paths(rng, n, np.array([3.5]), 0.03)[:, 0], 2),
+        "hyg_lqd": np.round(0.72 + rng.normal(0, 0.005, n), 6),
+    })
+
+
+def make_positioning_frame(years: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 6)
+    dates = _dates(years)
+    n = len(dates)
+
+    z = np.clip(np.cumsum(rng.normal(0, 0.15, size=(n, 3)), axis=0) * 0.2, -3, 3)
+    return pd.DataFrame({
+        "date": dates.strftime(DATE_FORMAT),
+        "SP500_POS_Z": np.round(z[:, 0], 2),
+        "US10Y_POS_Z": np.round(z[:, 1], 2),
+        "DXY_POS_Z": np.round(z[:, 2], 2),
+        "DEALER_GAMMA_BIAS": np.round(np.abs(1 + rng.normal(0, 0.5, n)), 2),
+        "CTA_MOMENTUM_SCORE": rng.choice([-1.0, -0.5, 0.0, 0.5, 1.0], n),
+        "GAMMA_FETCH_OK": 1,
+        "CTA_FETCH_OK": 1,
+    })
+
+
+def make_country_etf_frame(years: int, tickers: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 7)
+    dates = _dates(years)
+
+    extra = [f"SYN{i:03d}" for i in range(1, max(0, tickers - len(VALUE_COLUMNS)) + 1)]
+    cols = COUNTRY_ETFS + extra
+    starts = np.array([50.0 + 10.0 * (i % 15) for i in range(len(cols))])
+
+    out = pd.DataFrame(np.round(_price_paths(rng, len(dates), starts), 4), columns=cols)
+    out.insert(0, "Date", dates.strftime(DATE_FORMAT))
+    return out
+
+
+def write_option_chain_archive(
+    fixture_dir: Path,
+    symbol: str = "SPY",
+    seed: int = DEFAULT_SEED,
+    n_expiries: int = 10,
+    n_strikes: int = 81,
+) -> Dict[str, int]:
+    """
+    fixture_dir에 option chain replay archive 기록 (backend clock / 만기 목록 / 만기별 chain / spot history).
+    as_of는 FIXTURE_END_DATE 장중 (만기 필터가 실행 날짜와 무관하게 재현되는지 확인용).
+    Return: {"expiries", "contracts"}
+    """
+    rng = np.random.default_rng(seed)
+    fixture_dir = Path(fixture_dir)
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+
+    def _store(method: str, target: str, params: Dict[str, object], value: object) -> None:
+        pd.to_pickle(value, fixture_dir / f"{_fixture_key(method, target, params)}.pkl")
+
+    as_of = pd.Timestamp(FIXTURE_END_DATE + " 15:00", tz="UTC")
+    spot = START_LEVELS.get(symbol, 500.0)
+
+    # 주간 만기 + 분기 만기 하나 (max_days 밖 → 필터에서 빠져야 함)
+    expiries = [(as_of + pd.Timedelta(days=7 * k)).strftime("%Y-%m-%d") for k in range(n_expiries)]
+    expiries.append((as_of + pd.Timedelta(days=120)).strftime("%Y-%m-%d"))
+
+    _store("now", f"{symbol} option chain", {}, as_of)
+    _store("option_expirations", symbol, {}, expiries)
+
+    strikes = np.round(spot * np.linspace(0.8, 1.2, n_strikes), 0)
+    moneyness = np.log(strikes / spot)
+    contracts = 0
+    for k, exp in enumerate(expiries):
+        smile = 0.16 + 0.6 * moneyness ** 2 - 0.08 * moneyness + 0.002 * k
+        oi_shape = np.exp(-(moneyness / 0.05) ** 2)
+        tables = []
+        for put_skew in (0.7, 1.3):
+            oi = np.round(rng.gamma(2.0, 2500.0, n_strikes) * oi_shape * put_skew)
+            tables.append(pd.DataFrame({
+                "strike": strikes,
+                "openInterest": oi,
+                "impliedVolatility": np.round(smile * rng.uniform(0.97, 1.03, n_strikes), 4),
+            }))
+        _store("option_chain", symbol, {"expiry": exp}, tables)
+        contracts += 2 * n_strikes
+
+    days = pd.bdate_range(end=as_of.normalize().tz_localize(None), periods=5)
+    hist = pd.DataFrame({"Close": np.round(spot * np.exp(np.cumsum(rng.normal(0, 0.01, len(days)))), 2)}, index=days)
+    _store("history", symbol, {"period": "5d"}, hist)
+
+    return {"expiries": len(expiries), "contracts": contracts}
+
+
+def build_fixture_tree(
+    root: Path,
+    years: int,
+    tickers: int,
+    seed: int = DEFAULT_SEED,
+) -> Dict[str, int]:
+    """
+    root/data/*.csv 를 production 파일명으로 생성.
+    Return: {파일명: row 수}
+    """
+    data_dir = Path(root) / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    (Path(root) / "insights").mkdir(parents=True, exist_ok=True)
+
+    frames: Dict[str, pd.DataFrame] = {
+        "macro_data.csv": make_macro_frame(years, tickers, seed),
+        "liquidity_data.csv": make_liquidity_frame(years, seed),
+        "credit_spread_data.csv": make_credit_spread_frame(years, seed),
+        "fred_macro_sctorallo.csv": make_fred_extras_frame(years, seed),
+        "sentiment_proxy.csv": make_sentiment_frame(years, seed),
+        "positioning_data.csv": make_positioning_frame(years, seed),
+        "country_etf_data_combined.csv": make_country_etf_frame(years, tickers, seed),
+    }
+    frames.update(make_sovereign_frames(years, seed))
+
+    for name, frame in frames.items():
+        frame.to_csv(data_dir / name, index=False)
+
+    return {name: len(frame) for name, frame in frames.items()}
@@ -0,0 +1,498 @@
+# scripts/benchmark/run_benchmark.py
+"""
+Offline Pipeline Benchmark
+
+목적:
+synthetic fixture(1y~30y, 30~300 tickers) 위에서
+build_market_data / 각 attach_*_layer / build_strategist_commentary / full replay
+실행 시간을 측정하고, baseline 대비 regression을 표시한다.
+
+원칙:
+- yfinance / FRED / Treasury 접속 없음
+  (network layer는 SKIP, --replay fixture archive가 있으면 replay backend로 측정)
+- production 코드 수정 없이 재사용
+- fixture와 replay 부산물(trade_log 등)은 임시 폴더 안에서만 생성
+  (repo data/insights/reports를 가리키는 module-level 경로 / 함수 기본 인자 모두 임시 폴더로 교체,
+   실행 후 git status에 새 변경이 생기면 실패 처리)
+
+사용:
+    PYTHONPATH=. python scripts/benchmark/run_benchmark.py
+    PYTHONPATH=. python scripts/benchmark/run_benchmark.py --years 1 10 30 --tickers 30 300
+    PYTHONPATH=. python scripts/benchmark/run_benchmark.py --update-baseline
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import inspect
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+import pandas as pd
+
+import scripts.generate_report as gr
+from scripts.benchmark.fixtures import DEFAULT_SEED, build_fixture_tree, write_option_chain_archive
+from scripts.gex_engine import compute_gex, fetch_option_chains
+from scripts.market_backend import ReplayMarketBackend, get_market_backend, set_market_backend
+from filters.strategist_filters import (
+    apply_geo_overlay_to_final_state,
+    attach_country_risk_layer,
+    attach_drift_data_layer,
+    attach_geo_similarity_layer,
+    attach_geopolitical_ew_layer,
+    build_strategist_commentary,
+)
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# fixture workspace 안에서 임시 폴더로 바꿀 repo 경로 / 대상 package
+SANDBOX_DIRS = ("data", "insights", "reports")
+REPO_PACKAGES = ("scripts", "filters", "portfolio")
+
+DEFAULT_TOLERANCE = 0.25      # median이 baseline 대비 25% 넘게 느려지면 regression
+MIN_REGRESSION_MS = 5.0       # 너무 짧은 case의 noise 방지 (절대 차이 하한)
+
+# 외부 접속이 필요한 layer (--replay fixture archive가 있을 때만 측정)
+NETWORK_LAYERS = {
+    "attach_fred_extras_layer": "Treasury fallback (read_html)",
+    "attach_expectation_layer": "fetch_expectation_data (signal cache)",
+    "attach_cnn_fear_greed_layer": "CNN scrape (signal cache)",
+    "attach_drift_data_layer": "yfinance intraday/daily download",
+}
+
+LayerFn = Callable[[Dict[str, Any], pd.DataFrame, int], Dict[str, Any]]
+
+# production(generate_daily_report) 순서 그대로
+PIPELINE_LAYERS: List[Tuple[str, LayerFn]] = [
+    ("attach_liquidity_layer", lambda md, df, i: gr.attach_liquidity_layer(md)),
+    ("attach_credit_spread_layer", lambda md, df, i: gr.attach_credit_spread_layer(md)),
+    ("attach_fred_extras_layer", lambda md, df, i: gr.attach_fred_extras_layer(md)),
+    ("attach_sovereign_spread_layer", lambda md, df, i: gr.attach_sovereign_spread_layer(md)),
+    ("attach_expectation_layer", lambda md, df, i: gr.attach_expectation_layer(md)),
+    ("attach_geopolitical_ew_layer", attach_geopolitical_ew_layer),
+    ("attach_country_risk_layer", attach_country_risk_layer),
+    ("attach_sector_momentum_layer", gr.attach_sector_momentum_layer),
+    ("attach_geo_similarity_layer", lambda md, df, i: attach_geo_similarity_layer(md)),
+    ("attach_sentiment_proxy_layer", lambda md, df, i: gr.attach_sentiment_proxy_layer(md)),
+    ("attach_cnn_fear_greed_layer", lambda md, df, i: gr.attach_cnn_fear_greed_layer(md)),
+    ("attach_drift_data_layer", lambda md, df, i: attach_drift_data_layer(md)),
+    ("attach_growth_sustainability_layer", gr.attach_growth_sustainability_layer),
+    ("attach_breadth_layer", gr.attach_breadth_layer),
+    ("attach_leadership_layer", gr.attach_leadership_layer),
+    ("attach_volatility_structure_layer", gr.attach_volatility_structure_layer),
+    ("attach_positioning_layer", lambda md, df, i: gr.attach_positioning_layer(md)),
+]
+
+
+def active_layers(include_network: bool) -> List[Tuple[str, LayerFn]]:
+    return [
+        (name, fn) for name, fn in PIPELINE_LAYERS
+        if include_network or name not in NETWORK_LAYERS
+    ]
+
+
+# -------------------------
+# Fixture workspace
+# -------------------------
+def _sandbox_path(value: Any, root: Path) -> Optional[Path]:
+    """repo data/insights/reports 아래 절대 경로면 임시 폴더 쪽 경로, 아니면 None."""
+    if not isinstance(value, Path) or not value.is_absolute():
+        return None
+    for name in SANDBOX_DIRS:
+        top = ROOT / name
+        if value == top or top in value.parents:
+            return root / value.relative_to(ROOT)
+    return None
+
+
+def _redirect_repo_paths(root: Path) -> List[Tuple[Any, str, Any]]:
+    """
+    이미 import된 repo module의
+    - module-level Path (DATA_DIR / RUNS_DIR / ALLOCATION_INPUTS 등)
+    - 함수 기본 인자에 박힌 Path (data_dir: Path = DATA_DIR 등)
+    를 임시 폴더로 교체. Return: 복구용 (대상, 속성, 원래 값)
+    """
+    undo: List[Tuple[Any, str, Any]] = []
+
+    def _swap(target: Any, attr: str, new: Any) -> None:
+        undo.append((target, attr, getattr(target, attr)))
+        setattr(target, attr, new)
+
+    for mod_name, mod in list(sys.modules.items()):
+        if mod is None or mod_name.split(".")[0] not in REPO_PACKAGES:
+            continue
+        for attr, value in list(vars(mod).items()):
+            new = _sandbox_path(value, root)
+            if new is not None:
+                _swap(mod, attr, new)
+                continue
+            if not inspect.isfunction(value) or value.__module__ != mod_name:
+                continue
+            if value.__defaults__:
+                defaults = tuple(_sandbox_path(d, root) or d for d in value.__defaults__)
+                if defaults != value.__defaults__:
+                    _swap(value, "__defaults__", defaults)
+            if value.__kwdefaults__:
+                kwdefaults = {k: _sandbox_path(d, root) or d for k, d in value.__kwdefaults__.items()}
+                if kwdefaults != value.__kwdefaults__:
+                    _swap(value, "__kwdefaults__", kwdefaults)
+
+    return undo
+
+
+@contextlib.contextmanager
+def fixture_workspace(years: int, tickers: int, seed: int) -> Iterator[Path]:
+    """
+    임시 폴더에 fixture 생성 후
+    - cwd를 임시 폴더로 이동 ("data/..." 상대경로 사용 코드용)
+    - repo data/insights/reports를 가리키는 module-level 경로 / 함수 기본 인자를 임시 폴더로 교체
+      (generate_report.DATA_DIR, backtest_store.RUNS_DIR, sector_allocation_engine.DATA_DIR 등)
+    - BACKTEST_RUNS_DIR도 임시 폴더로
+    종료 시 원래대로 복구.
+    """
+    prev_cwd = os.getcwd()
+    prev_env = os.environ.get("BACKTEST_RUNS_DIR")
+
+    with tempfile.TemporaryDirectory(prefix="gcfm_bench_") as tmp:
+        root = Path(tmp)
+        build_fixture_tree(root, years, tickers, seed)
+        undo: List[Tuple[Any, str, Any]] = []
+
+        try:
+            os.chdir(root)
+            undo = _redirect_repo_paths(root)
+            os.environ["BACKTEST_RUNS_DIR"] = str(root / "data" / "backtest" / "runs")
+            yield root
+        finally:
+            for target, attr, value in reversed(undo):
+                setattr(target, attr, value)
+            if prev_env is None:
+                os.environ.pop("BACKTEST_RUNS_DIR", None)
+            else:
+                os.environ["BACKTEST_RUNS_DIR"] = prev_env
+            os.chdir(prev_cwd)
+
+
+def repo_status() -> Optional[set]:
+    """git status --porcelain 줄 집합 (git 없으면 None → 검사 생략)."""
+    try:
+        out = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=all"],
+            cwd=ROOT, capture_output=True, text=True, timeout=60,
+        )
+    except Exception:
+        return None
+    return set(out.stdout.splitlines()) if out.returncode == 0 else None
+
+
+@contextlib.contextmanager
+def _quiet(enabled: bool) -> Iterator[None]:
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _load_frame() -> pd.DataFrame:
+    df = gr.load_macro_df()
+    return gr.merge_sovereign_spreads_into_macro_df(df)
+
+
+def _run_layers(
+    market_data: Dict[str, Any],
+    df: pd.DataFrame,
+    idx: int,
+    layers: List[Tuple[str, LayerFn]],
+) -> Dict[str, Any]:
+    market_data["_STALE"] = False
+    for _, fn in layers:
+        market_data = fn(market_data, df, idx) or market_data
+    return apply_geo_overlay_to_final_state(market_data) or market_data
+
+
+# -------------------------
+# Timing
+# -------------------------
+def _time_case(
+    fn: Callable[[], Any],
+    setup: Optional[Callable[[], Any]],
+    repeat: int,
+    quiet: bool,
+) -> Dict[str, float]:
+    samples: List[float] = []
+
+    for _ in range(repeat):
+        try:
+            with _quiet(quiet):
+                arg = setup() if setup is not None else None
+                t0 = time.perf_counter()
+                fn(arg) if setup is not None else fn()
+                samples.append((time.perf_counter() - t0) * 1000.0)
+        except Exception as e:
+            # 측정 대상 crash는 숫자 대신 에러로 기록 (나머지 case는 계속 측정)
+            return {"error": f"{type(e).__name__}: {e}", "repeat": repeat}
+
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "repeat": repeat,
+    }
+
+
+def _time_gex_replay(root: Path, seed: int, repeat: int, quiet: bool) -> Dict[str, float]:
+    fixture_dir = root / "fixtures" / "market"
+    write_option_chain_archive(fixture_dir, seed=seed)
+    prev = get_market_backend()
+    set_market_backend(ReplayMarketBackend(fixture_dir))
+    try:
+        # 첫 호출은 pickle load 등 cold cost → 1회 warm-up 후 측정
+        # replay에서 thread pool은 지연만 흔들어서 workers=1로 고정 (같은 fetch / gamma 경로)
+        _time_case(lambda: compute_gex(fetch_option_chains("SPY", workers=1)), None, 1, quiet)
+        return _time_case(lambda: compute_gex(fetch_option_chains("SPY", workers=1)), None, repeat, quiet)
+    finally:
+        set_market_backend(prev)
+
+
+def run_size(
+    years: int,
+    tickers: int,
+    repeat: int,
+    replay_days: int,
+    seed: int = DEFAULT_SEED,
+    quiet: bool = True,
+    include_network: bool = False,
+) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    layers = active_layers(include_network)
+
+    with fixture_workspace(years, tickers, seed):
+        with _quiet(quiet):
+            df = _load_frame()
+        idx = len(df) - 1
+
+        results["load_macro_df"] = _time_case(_load_frame, None, repeat, quiet)
+        results["build_market_data"] = _time_case(
+            lambda: gr.build_market_data(df, idx), None, repeat, quiet
+        )
+
+        for name, layer in layers:
+            results[name] = _time_case(
+                lambda md, layer=layer: layer(md, df, idx),
+                lambda: gr.build_market_data(df, idx),
+                repeat,
+                quiet,
+            )
+
+        results["build_strategist_commentary"] = _time_case(
+            build_strategist_commentary,
+            lambda: _run_layers(gr.build_market_data(df, idx), df, idx, layers),
+            repeat,
+            quiet,
+        )
+
+        start = max(1, len(df) - replay_days)
+
+        def _replay() -> None:
+            for i in range(start, len(df)):
+                md = _run_layers(gr.build_market_data(df, i), df, i, layers)
+                build_strategist_commentary(md)
+
+        results["full_replay"] = _time_case(_replay, None, max(1, repeat // 2), quiet)
+        results["full_replay"]["days"] = len(df) - start
+
+        # option chain (gex_engine) 경로는 recorded-format archive replay로 항상 측정
+        results["gex_option_chain"] = _time_gex_replay(Path(os.getcwd()), seed, repeat, quiet)
+
+    return results
+
+
+# -------------------------
+# Baseline / Regression
+# -------------------------
+def _size_key(years: int, tickers: int) -> str:
+    return f"{years}y_{tickers}t"
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN][BENCH] baseline load failed: {e}")
+        return {}
+
+
+def save_baseline(results: Dict[str, Any], path: Path = BASELINE_PATH) -> None:
+    payload = {
+        "created_at": pd.Timestamp.now(tz="Asia/Seoul").strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+        },
+        "sizes": results,
+    }
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _comparable_ms(stat: Dict[str, Any]) -> float:
+    """full_replay 처럼 days가 있는 case는 하루당 ms로 비교 (--replay-days가 달라도 비교 가능)."""
+    days = stat.get("days")
+    return stat["median_ms"] / days if days else stat["median_ms"]
+
+
+def find_regressions(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    regressions: List[str] = []
+    base_sizes = (baseline or {}).get("sizes", {})
+
+    for size_key, cases in results.items():
+        base_cases = base_sizes.get(size_key, {})
+        for case, stat in cases.items():
+            base = base_cases.get(case)
+            if "error" in stat:
+                regressions.append(f"{size_key} {case}: ERROR {stat['error']}")
+                continue
+            if not base or "median_ms" not in base:
+                continue
+
+            now_ms = _comparable_ms(stat)
+            base_ms = _comparable_ms(base)
+            unit = "ms/day" if stat.get("days") else "ms"
+            if now_ms > base_ms * (1.0 + tolerance) and now_ms - base_ms > MIN_REGRESSION_MS:
+                regressions.append(
+                    f"{size_key} {case}: {base_ms:.1f}{unit} -> {now_ms:.1f}{unit} "
+                    f"(+{(now_ms / base_ms - 1.0) * 100:.0f}%)"
+                )
+
+    return regressions
+
+
+def print_table(results: Dict[str, Any], baseline: Dict[str, Any], include_network: bool = False) -> None:
+    base_sizes = (baseline or {}).get("sizes", {})
+
+    for size_key, cases in results.items():
+        print("")
+        print(f"=== {size_key} ===")
+        print(f"{'case':<38}{'median_ms':>12}{'min_ms':>12}{'baseline':>12}{'ratio':>8}")
+        for case, stat in cases.items():
+            if "error" in stat:
+                print(f"{case:<38}{'ERROR':>12}  {stat['error']}")
+                continue
+            base = base_sizes.get(size_key, {}).get(case)
+            base_ms = base.get("median_ms") if base else None
+            ratio = f"{_comparable_ms(stat) / _comparable_ms(base):.2f}" if base_ms else "-"
+            base_txt = f"{base_ms:.1f}" if base_ms else "-"
+            print(f"{case:<38}{stat['median_ms']:>12.1f}{stat['min_ms']:>12.1f}{base_txt:>12}{ratio:>8}")
+
+    if include_network:
+        return
+
+    print("")
+    for name, reason in NETWORK_LAYERS.items():
+        print(f"[SKIP] {name}: network ({reason}) -> --replay <fixture dir>로 측정 가능")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark (synthetic fixtures)")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--tickers", type=int, nargs="+", default=[30])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--replay-days", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="pipeline DEBUG 출력 유지")
+    parser.add_argument(
+        "--replay",
+        type=Path,
+        default=None,
+        help="MARKET_BACKEND=record로 만든 fixture archive. 지정 시 network layer도 replay로 측정",
+    )
+    args = parser.parse_args()
+
+    include_network = args.replay is not None
+    if include_network:
+        set_market_backend(ReplayMarketBackend(args.replay))
+    elif get_market_backend().mode != "replay":
+        print("[WARN][BENCH] network layers skipped (no --replay archive)")
+
+    status_before = repo_status()
+
+    results: Dict[str, Any] = {}
+    for years in args.years:
+        for tickers in args.tickers:
+            key = _size_key(years, tickers) + ("_replay" if include_network else "")
+            print(f"[BENCH] running {key} (repeat={args.repeat}, replay_days={args.replay_days})")
+            results[key] = run_size(
+                years,
+                tickers,
+                repeat=args.repeat,
+                replay_days=args.replay_days,
+                seed=args.seed,
+                quiet=not args.verbose,
+                include_network=include_network,
+            )
+
+    baseline = load_baseline(args.baseline)
+    print_table(results, baseline, include_network)
+
+    # sandbox 검사: fixture run이 repo working tree를 건드리면 실패
+    status_after = repo_status()
+    if status_before is not None and status_after is not None:
+        leaked = sorted(status_after - status_before)
+        if leaked:
+            print("")
+            print("❌ BENCHMARK SANDBOX LEAK (repo working tree changed)")
+            for line in leaked:
+                print(f"- {line}")
+            return 1
+
+    if args.update_baseline:
+        merged = dict(baseline.get("sizes", {}))
+        merged.update(results)
+        save_baseline(merged, args.baseline)
+        print(f"✅ baseline updated: {args.baseline}")
+        return 0
+
+    missing = [key for key in results if key not in baseline.get("sizes", {})]
+    for key in missing:
+        print(f"[WARN][BENCH] {key}: baseline 없음 → regression 비교 안 함 (--update-baseline)")
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print("")
+        print("❌ PERFORMANCE REGRESSION")
+        for line in regressions:
+            print(f"- {line}")
+        return 1
+
+    print("✅ no regression vs baseline" if baseline else "[INFO] no baseline yet (use --update-baseline)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
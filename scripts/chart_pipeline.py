@@ -0,0 +1,408 @@
+# scripts/chart_pipeline.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+from scripts.macro_schema import read_macro_csv  # noqa: E402
+
+# =========================================================
+# Report Chart Pipeline (Agg, cached, downsampled, parallel)
+# ---------------------------------------------------------
+# - pyplot global state 없이 Figure + FigureCanvasAgg 로 직접 렌더
+# - chart별 입력 slice(날짜 + 값) sha1 == 지난 렌더 hash 이고 PNG가 있으면 skip
+#   (hash는 insights/chart_cache.json, CHART_VERSION 올리면 전체 재렌더)
+# - 긴 series는 min/max bucket downsample (bucket마다 first/last/min/max 유지)
+#   → spike / drawdown 모양은 그대로, 점 개수는 history 길이와 무관하게 상한
+# - 다시 그려야 할 chart가 2개 이상이면 worker process에서 병렬 렌더
+#   (forkserver: report 프로세스의 alert dispatcher thread 등을 fork로 복제하지 않음)
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+INSIGHTS_DIR = BASE_DIR / "insights"
+CACHE_NAME = "chart_cache.json"
+
+CHART_VERSION = 1
+MAX_BUCKETS = 600   # 컬럼당 bucket 수 (bucket당 최대 4점)
+DPI = 150
+
+
+# -------------------------
+# Downsampling
+# -------------------------
+def minmax_downsample_indices(values: np.ndarray, n_buckets: int = MAX_BUCKETS) -> np.ndarray:
+    """
+    (n,) 또는 (n, k) 값 → 유지할 row index (오름차순).
+    bucket마다 첫/끝 row + 컬럼별 min/max row를 남긴다 (NaN은 무시).
+    """
+    values = np.asarray(values, dtype="float64")
+    if values.ndim == 1:
+        values = values[:, None]
+
+    n = len(values)
+    if n <= n_buckets * 4:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    padded = np.full((n_buckets * size, values.shape[1]), np.nan)
+    padded[:n] = values
+    blocks = padded.reshape(n_buckets, size, values.shape[1])
+
+    starts = np.arange(n_buckets) * size
+    keep = [starts, np.minimum(starts + size - 1, n - 1)]
+
+    valid = np.isfinite(blocks)
+    for arr, fill in ((np.where(valid, blocks, np.inf), np.argmin), (np.where(valid, blocks, -np.inf), np.argmax)):
+        pos = fill(arr, axis=1)                                  # (n_buckets, k)
+        has = valid.any(axis=1)
+        keep.append((starts[:, None] + pos)[has])
+
+    idx = np.unique(np.concatenate([np.ravel(k) for k in keep]))
+    return idx[idx < n]
+
+
+def downsample_frame(df: pd.DataFrame, n_buckets: int = MAX_BUCKETS) -> pd.DataFrame:
+    if df.empty:
+        return df
+    return df.iloc[minmax_downsample_indices(df.to_numpy(dtype="float64"), n_buckets)]
+
+
+def frame_hash(name: str, df: pd.DataFrame) -> str:
+    h = hashlib.sha1(f"{CHART_VERSION}|{name}|{','.join(map(str, df.columns))}".encode())
+    h.update(np.ascontiguousarray(df.index.to_numpy(dtype="datetime64[ns]")).view("i8").tobytes())
+    h.update(np.ascontiguousarray(df.to_numpy(dtype="float64")).tobytes())
+    return h.hexdigest()
+
+
+# -------------------------
+# Loaders (data_dir → date index frame)
+# -------------------------
+MACRO_PANELS = [
+    # column, title, ylabel, risk levels
+    ("US10Y", "US 10Y Yield", "%", [4.5, 5.0]),
+    ("DXY", "DXY (Dollar Index)", "", [102, 105]),
+    ("WTI", "WTI Crude Oil", "$", [90]),
+    ("VIX", "VIX (Volatility Index)", "", [20, 25]),
+    ("USDKRW", "USD/KRW", "KRW", [1350, 1400]),
+]
+
+
+def _numeric(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    out = df[[c for c in cols if c in df.columns]].apply(pd.to_numeric, errors="coerce")
+    return out[~out.index.duplicated(keep="last")].sort_index()
+
+
+def load_macro_frame(data_dir: Path) -> pd.DataFrame:
+    path = Path(data_dir) / "macro_data.csv"
+    if not path.exists():
+        return pd.DataFrame()
+    df = read_macro_csv(path).set_index("date")
+    return _numeric(df, [c for c, *_ in MACRO_PANELS]).dropna(how="all")
+
+
+def load_liquidity_frame(data_dir: Path) -> pd.DataFrame:
+    path = Path(data_dir) / "liquidity_data.csv"
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame()
+    df = pd.read_csv(path)
+    if "date" not in df.columns:
+        return pd.DataFrame()
+    df.index = pd.to_datetime(df.pop("date"), errors="coerce")
+    df = df[df.index.notna()]
+    # WALCL은 주간, TGA/RRP는 일간 → 직전 값 유지 후 모두 있는 날짜만
+    return _numeric(df, ["WALCL", "TGA", "RRP"]).ffill().dropna()
+
+
+def load_net_liq_frame(data_dir: Path) -> pd.DataFrame:
+    liq_path = Path(data_dir) / "liquidity_data.csv"
+    macro_path = Path(data_dir) / "macro_data.csv"
+    if not liq_path.exists() or not macro_path.exists() or liq_path.stat().st_size == 0:
+        return pd.DataFrame()
+
+    liq = pd.read_csv(liq_path)
+    if "date" not in liq.columns or "NET_LIQ" not in liq.columns:
+        return pd.DataFrame()
+    liq.index = pd.to_datetime(liq.pop("date"), errors="coerce")
+    macro = read_macro_csv(macro_path).set_index("date")
+
+    net_liq = _numeric(liq[liq.index.notna()], ["NET_LIQ"])
+    spy = _numeric(macro, ["SPY"])
+    if net_liq.empty or spy.empty:
+        return pd.DataFrame()
+
+    # SPY 거래일 기준, NET_LIQ는 as-of (직전 관측치)
+    out = spy.join(net_liq.reindex(spy.index.union(net_liq.index)).ffill().reindex(spy.index))
+    return out.dropna()
+
+
+# -------------------------
+# Renderers (Figure, frame) → None
+# -------------------------
+def _date_axis(ax) -> None:
+    ax.grid(True, linestyle="--", alpha=0.3)
+    for label in ax.get_xticklabels():
+        label.set_rotation(30)
+        label.set_horizontalalignment("right")
+
+
+def render_macro_timeseries(fig: Figure, df: pd.DataFrame) -> None:
+    axes = fig.subplots(3, 2).ravel()
+    for ax, (col, title, ylabel, levels) in zip(axes, MACRO_PANELS):
+        ax.set_title(title)
+        if col not in df.columns:
+            ax.text(0.5, 0.5, "no data", ha="center", va="center", transform=ax.transAxes)
+            continue
+        s = df[col].dropna()
+        ax.plot(s.index, s.to_numpy(), linewidth=1.2, label=col)
+        for level in levels:
+            ax.axhline(level, linestyle="--", linewidth=1.0, color="#d62728", alpha=0.6, label=f"{level:g}")
+        ax.set_ylabel(ylabel)
+        ax.legend(loc="best", fontsize=8)
+        _date_axis(ax)
+
+    axes[-1].axis("off")
+    axes[-1].text(
+        0.0, 0.5,
+        "Risk Levels\n"
+        "- US10Y >= 4.5% / 5.0%\n"
+        "- DXY >= 102 / 105\n"
+        "- WTI >= 90$\n"
+        "- VIX >= 20 / 25\n"
+        "- USDKRW >= 1350 / 1400",
+        va="center", fontsize=10,
+    )
+    fig.suptitle("Global Macro Signals with Risk Levels", fontsize=16)
+
+
+def render_liquidity_plumbing(fig: Figure, df: pd.DataFrame) -> None:
+    ax = fig.subplots()
+    ax.plot(df.index, df["WALCL"].to_numpy(), color="#333333", linewidth=2, label="WALCL (Fed Total Assets)")
+    ax.stackplot(
+        df.index, df["TGA"].to_numpy(), df["RRP"].to_numpy(),
+        labels=["TGA (Gov Account)", "RRP (Reverse Repo)"],
+        colors=["#ff9999", "#cccccc"], alpha=0.7,
+    )
+    ax.set_title("Fed Plumbing: WALCL vs TGA & RRP Stacked Chart", fontsize=12, fontweight="bold")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("USD Value")
+    ax.legend(loc="upper left")
+    _date_axis(ax)
+
+
+def render_net_liq_vs_spy(fig: Figure, df: pd.DataFrame, index_col: str = "SPY") -> None:
+    ax1 = fig.subplots()
+    ax1.set_xlabel("Date")
+    ax1.set_ylabel("NET_LIQ", color="#2ca02c", fontweight="bold")
+    ax1.plot(df.index, df["NET_LIQ"].to_numpy(), color="#2ca02c", linewidth=2.5, label="NET_LIQ")
+    ax1.tick_params(axis="y", labelcolor="#2ca02c")
+    _date_axis(ax1)
+
+    ax2 = ax1.twinx()
+    ax2.set_ylabel(f"{index_col} Index", color="#1f77b4", fontweight="bold")
+    ax2.plot(df.index, df[index_col].to_numpy(), color="#1f77b4", linewidth=2, label=index_col)
+    ax2.tick_params(axis="y", labelcolor="#1f77b4")
+    ax1.set_title("Market Liquidity (NET_LIQ) vs Stock Index", fontsize=12, fontweight="bold")
+
+
+RENDERERS: Dict[str, Callable[[Figure, pd.DataFrame], None]] = {
+    "macro_timeseries": render_macro_timeseries,
+    "liquidity_plumbing": render_liquidity_plumbing,
+    "net_liq_vs_spy": render_net_liq_vs_spy,
+}
+
+# report chart: name → (loader, renderer, figsize, 필수 컬럼)
+CHART_SPECS: Dict[str, Dict[str, Any]] = {
+    "macro_timeseries": {
+        "loader": load_macro_frame, "renderer": "macro_timeseries",
+        "figsize": (14, 10), "required": [],
+    },
+    "liquidity_plumbing": {
+        "loader": load_liquidity_frame, "renderer": "liquidity_plumbing",
+        "figsize": (10, 5), "required": ["WALCL", "TGA", "RRP"],
+    },
+    "net_liq_vs_spy": {
+        "loader": load_net_liq_frame, "renderer": "net_liq_vs_spy",
+        "figsize": (10, 5), "required": ["NET_LIQ", "SPY"],
+    },
+}
+
+
+# -------------------------
+# Render jobs
+# -------------------------
+def _render_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """worker: 1 chart → PNG (tmp 후 atomic replace)."""
+    t0 = time.perf_counter()
+    fig = Figure(figsize=job["figsize"])
+    FigureCanvasAgg(fig)
+    RENDERERS[job["renderer"]](fig, job["frame"], **job.get("kwargs", {}))
+    fig.tight_layout()
+
+    output = Path(job["output"])
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(output.stem + ".tmp.png")
+    fig.savefig(tmp_path, dpi=job.get("dpi", DPI))
+    os.replace(tmp_path, output)
+
+    return {"name": job["name"], "output": str(output), "ms": (time.perf_counter() - t0) * 1000}
+
+
+def _worker_context():
+    """
+    forkserver(+ 이 module preload): worker는 import 끝난 server에서 fork → 시작 비용 작음.
+    report 프로세스 자체(alert dispatcher thread 등)는 fork하지 않는다.
+    """
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return mp.get_context("spawn")
+
+
+def _load_cache(path: Path) -> Dict[str, str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_cache(path: Path, cache: Dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def render_charts(
+    jobs: List[Dict[str, Any]],
+    cache_path: Optional[Path] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, str]:
+    """
+    jobs: [{"name", "renderer", "frame", "output", "figsize", (kwargs, dpi)}]
+    frame hash가 cache와 같고 output이 있으면 skip.
+    반환: name → "rendered" / "cached" / "failed: ..."
+    """
+    cache_path = Path(cache_path) if cache_path else None
+    cache = _load_cache(cache_path) if cache_path else {}
+    status: Dict[str, str] = {}
+    dirty: List[Dict[str, Any]] = []
+
+    for job in jobs:
+        key = frame_hash(job["name"], job["frame"])
+        job["key"] = key
+        if not force and cache.get(job["name"]) == key and Path(job["output"]).exists():
+            status[job["name"]] = "cached"
+            continue
+        job["frame"] = downsample_frame(job["frame"])
+        dirty.append(job)
+
+    results: List[Any] = []
+    n = min(len(dirty), workers or os.cpu_count() or 1)
+    if n > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=n, mp_context=_worker_context()) as pool:
+                futures = [pool.submit(_render_job, job) for job in dirty]
+                results = [f.exception() or f.result() for f in futures]
+        except Exception as e:
+            print(f"⚠️ chart worker pool failed ({e}) → 순차 렌더")
+            results = []
+
+    if len(results) != len(dirty):
+        results = []
+        for job in dirty:
+            try:
+                results.append(_render_job(job))
+            except Exception as e:
+                results.append(e)
+
+    for job, res in zip(dirty, results):
+        if isinstance(res, BaseException):
+            status[job["name"]] = f"failed: {res}"
+            print(f"⚠️ chart {job['name']} 렌더 실패: {res}")
+            continue
+        cache[job["name"]] = job["key"]
+        status[job["name"]] = "rendered"
+        print(f"✅ chart {job['name']} → {res['output']} ({len(job['frame'])} pts, {res['ms']:.0f} ms)")
+
+    if cache_path and dirty:
+        _save_cache(cache_path, cache)
+
+    return status
+
+
+def update_report_charts(
+    data_dir: Path = DATA_DIR,
+    out_dir: Path = INSIGHTS_DIR,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, Dict[str, str]]:
+    """CHART_SPECS 전체 → out_dir/<name>.png. 반환: name → {"status", "path"}."""
+    out_dir = Path(out_dir)
+    jobs: List[Dict[str, Any]] = []
+    skipped: Dict[str, Dict[str, str]] = {}
+
+    for name, spec in CHART_SPECS.items():
+        try:
+            frame = spec["loader"](data_dir)
+        except Exception as e:
+            skipped[name] = {"status": f"failed: {e}", "path": ""}
+            continue
+
+        missing = [c for c in spec["required"] if c not in frame.columns]
+        if frame.empty or missing:
+            skipped[name] = {"status": f"skipped: no data {missing}", "path": ""}
+            continue
+
+        jobs.append({
+            "name": name,
+            "renderer": spec["renderer"],
+            "frame": frame,
+            "output": str(out_dir / f"{name}.png"),
+            "figsize": spec["figsize"],
+        })
+
+    status = render_charts(jobs, cache_path=out_dir / CACHE_NAME, workers=workers, force=force)
+    out = {job["name"]: {"status": status[job["name"]], "path": job["output"]} for job in jobs}
+    out.update(skipped)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render report charts (cached)")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--out-dir", default=str(INSIGHTS_DIR))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    result = update_report_charts(Path(args.data_dir), Path(args.out_dir), workers=args.workers, force=args.force)
+    for name, info in result.items():
+        print(f"{name:20s} {info['status']:10s} {info['path']}")
+    print(f"elapsed: {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+# scripts/correlation_engine.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.fetch_macro_data import INDICATORS
+from scripts.macro_schema import DATE_COL, MACRO_CSV_PATH, read_macro_csv
+
+# =========================================================
+# Rolling Cross-Asset Correlation Engine (incremental)
+# ---------------------------------------------------------
+# 입력 : data/macro_data.csv (INDICATORS 컬럼), 일간 수익률
+#        - 가격류 : log return
+#        - 금리류 (RATE_COLUMNS) : 1차 차분
+#        - 전일/당일 중 하나라도 NaN이면 그 날 해당 자산 수익률 NaN (pairwise-complete)
+#
+# estimator (자산 N개, 각자 pair 단위 moment 4종 (N x N)):
+#   w   = Σ m_i m_j          (pair 관측 수, ewm은 가중치 합)
+#   sx  = Σ x_i m_j          (sx.T = Σ x_j m_i)
+#   sxx = Σ x_i² m_j
+#   sxy = Σ x_i x_j
+#   corr = (w·sxy - sx·sxᵀ) / sqrt((w·sxx - sx²)(w·sxxᵀ - sxᵀ²))
+#
+#   20d / 60d / 120d : 새 날 더하고 window 밖으로 나간 날 빼기 (ring buffer 120일)
+#                      RESYNC_DAYS마다 ring에서 다시 합산 (덧셈/뺄셈 누적 오차 제거)
+#   ewm              : moment *= λ 후 새 날 더하기
+#   full             : expanding (long-run 기준)
+#   → 하루 update = outer product 몇 개 = O(N²), 전체 재계산 없음
+#
+# deviation (pair별 통계적 이탈):
+#   Fisher z : (atanh r_20d - atanh r_full) / sqrt(1/(n_20d-3) + 1/(n_full-3))
+#   |z| >= DEV_Z 이고 |r_20d - r_full| >= DEV_MIN_DELTA 이면 flag
+#   (20d는 full의 부분집합이라 실제 분산은 더 작음 → 보수적인 검정)
+#
+# 저장: data/correlation/
+#   registry.json : columns / 날짜 수 / 마지막 날짜 / source fingerprint
+#   dates.bin     : int64 epoch day, append-only
+#   corr_<est>.bin: int16 (corr x CORR_SCALE) upper triangle (k=1), 하루 1 row, append-only
+#   state.npz     : moment + ring (다음 날 증분 update용)
+#   source(이미 반영된 구간)가 바뀌거나 column set이 바뀌면 전체 replay
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+STORE_DIRNAME = "correlation"
+ENGINE_VERSION = 1
+
+RATE_COLUMNS = {"US10Y"}
+
+ESTIMATORS: Dict[str, Dict[str, Any]] = {
+    "20d": {"kind": "window", "window": 20, "min_obs": 15},
+    "60d": {"kind": "window", "window": 60, "min_obs": 40},
+    "120d": {"kind": "window", "window": 120, "min_obs": 80},
+    "ewm": {"kind": "ewm", "lam": 0.97, "min_obs": 20},       # min_obs는 pair 누적 관측 수 기준
+    "full": {"kind": "expanding", "min_obs": 60},
+}
+EST_NAMES = list(ESTIMATORS)
+RING = max(spec.get("window", 0) for spec in ESTIMATORS.values())
+RESYNC_DAYS = 250
+
+SHORT_EST = "20d"
+BASE_EST = "full"
+DEV_Z = 2.58
+DEV_MIN_DELTA = 0.30
+
+CORR_SCALE = 10000          # int16 저장 (해상도 1e-4)
+
+
+def store_dir(data_dir: Path = DATA_DIR) -> Path:
+    return Path(data_dir) / STORE_DIRNAME
+
+
+def pair_key(a: str, b: str) -> str:
+    return f"{a}|{b}"
+
+
+# -------------------------
+# Returns
+# -------------------------
+def macro_returns(df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """macro level frame → 일간 수익률 (date index)."""
+    columns = [c for c in (columns or INDICATORS) if c in df.columns]
+    levels = df.set_index(DATE_COL)[columns].apply(pd.to_numeric, errors="coerce")
+    levels = levels[~levels.index.duplicated(keep="last")].sort_index()
+
+    out = pd.DataFrame(index=levels.index)
+    for col in columns:
+        s = levels[col]
+        if col in RATE_COLUMNS:
+            out[col] = s.diff()
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[col] = np.log(s.where(s > 0)).diff()
+    return out.iloc[1:]
+
+
+# -------------------------
+# Moment state
+# -------------------------
+def _outer_moments(x: np.ndarray) -> np.ndarray:
+    """return 1일 (N,) → (4, N, N) moment 증분."""
+    m = np.isfinite(x).astype(float)
+    x0 = np.where(m > 0, x, 0.0)
+    return np.stack([np.outer(m, m), np.outer(x0, m), np.outer(x0 * x0, m), np.outer(x0, x0)])
+
+
+def _block_moments(rows: np.ndarray) -> np.ndarray:
+    """(k, N) return block → (4, N, N) moment 합 (resync / 검증용)."""
+    m = np.isfinite(rows).astype(float)
+    x0 = np.where(m > 0, rows, 0.0)
+    return np.stack([m.T @ m, x0.T @ m, (x0 * x0).T @ m, x0.T @ x0])
+
+
+def corr_from_moments(moments: np.ndarray, min_obs: float = 0.0, counts: Optional[np.ndarray] = None) -> np.ndarray:
+    w, sx, sxx, sxy = moments
+    cov = w * sxy - sx * sx.T
+    vx = w * sxx - sx * sx
+    vy = vx.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = cov / np.sqrt(vx * vy)
+    n = w if counts is None else counts
+    r = np.where((vx > 0) & (vy > 0) & (n >= min_obs), np.clip(r, -1.0, 1.0), np.nan)
+    np.fill_diagonal(r, 1.0)
+    return r
+
+
+class CorrelationState:
+    """estimator별 pair moment + 최근 RING일 return (증분 update용)."""
+
+    __slots__ = ("columns", "moments", "ring", "n_days")
+
+    def __init__(self, columns: Sequence[str]):
+        n = len(columns)
+        self.columns = list(columns)
+        self.moments = np.zeros((len(EST_NAMES), 4, n, n))
+        self.ring = np.full((RING, n), np.nan)
+        self.n_days = 0
+
+    def update(self, x: np.ndarray) -> None:
+        x = np.asarray(x, dtype=float)
+        add = _outer_moments(x)
+        pos = self.n_days % RING
+
+        for e, name in enumerate(EST_NAMES):
+            spec = ESTIMATORS[name]
+            if spec["kind"] == "window":
+                w = spec["window"]
+                self.moments[e] += add
+                if self.n_days >= w:
+                    self.moments[e] -= _outer_moments(self.ring[(pos - w) % RING])
+            elif spec["kind"] == "ewm":
+                self.moments[e] = spec["lam"] * self.moments[e] + add
+            else:
+                self.moments[e] += add
+
+        self.ring[pos] = x
+        self.n_days += 1
+
+        if self.n_days % RESYNC_DAYS == 0:
+            self.resync()
+
+    def recent(self, k: int) -> np.ndarray:
+        """최근 k일 return (오래된 것 → 최근 순)."""
+        k = min(k, self.n_days, RING)
+        idx = (self.n_days - k + np.arange(k)) % RING
+        return self.ring[idx]
+
+    def resync(self) -> None:
+        for e, name in enumerate(EST_NAMES):
+            spec = ESTIMATORS[name]
+            if spec["kind"] == "window":
+                self.moments[e] = _block_moments(self.recent(spec["window"]))
+
+    def corr(self, name: str) -> np.ndarray:
+        spec = ESTIMATORS[name]
+        e = EST_NAMES.index(name)
+        counts = self.moments[EST_NAMES.index(BASE_EST), 0] if spec["kind"] == "ewm" else None
+        return corr_from_moments(self.moments[e], spec["min_obs"], counts)
+
+    def count(self, name: str) -> np.ndarray:
+        return self.moments[EST_NAMES.index(name), 0]
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, columns=np.array(self.columns), moments=self.moments, ring=self.ring, n_days=self.n_days)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["CorrelationState"]:
+        if not path.exists():
+            return None
+        with np.load(path) as saved:
+            state = cls([str(c) for c in saved["columns"]])
+            if saved["moments"].shape != state.moments.shape:
+                return None
+            state.moments = saved["moments"]
+            state.ring = saved["ring"]
+            state.n_days = int(saved["n_days"])
+        return state
+
+
+# -------------------------
+# Deviations
+# -------------------------
+def _fisher_z(rs: np.ndarray, rb: np.ndarray, ns: np.ndarray, nb: np.ndarray) -> np.ndarray:
+    """short vs long-run correlation 차이의 Fisher z."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fz = np.arctanh(np.clip(rs, -0.9999, 0.9999)) - np.arctanh(np.clip(rb, -0.9999, 0.9999))
+        return fz / np.sqrt(1.0 / (ns - 3.0) + 1.0 / (nb - 3.0))
+
+
+def _is_break(z: Any, delta: Any) -> Any:
+    return (np.abs(z) >= DEV_Z) & (np.abs(delta) >= DEV_MIN_DELTA)
+
+
+def pair_deviations(state: CorrelationState, short: str = SHORT_EST, base: str = BASE_EST) -> pd.DataFrame:
+    """pair별 short vs long-run Fisher z (upper triangle, |z| 내림차순)."""
+    r_s, r_b = state.corr(short), state.corr(base)
+    n_s, n_b = state.count(short), state.count(base)
+
+    iu = np.triu_indices(len(state.columns), k=1)
+    rs, rb, ns, nb = r_s[iu], r_b[iu], n_s[iu], n_b[iu]
+    z = _fisher_z(rs, rb, ns, nb)
+
+    cols = np.array(state.columns)
+    out = pd.DataFrame({
+        "a": cols[iu[0]],
+        "b": cols[iu[1]],
+        f"r_{short}": rs,
+        f"r_{base}": rb,
+        "delta": rs - rb,
+        "z": z,
+    })
+    out = out.dropna(subset=["z"])
+    out["flag"] = _is_break(out["z"], out["delta"])
+    return out.reindex(out["z"].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+
+# -------------------------
+# Store
+# -------------------------
+def _fingerprint(returns: pd.DataFrame) -> str:
+    values = np.ascontiguousarray(returns.to_numpy(dtype=float))
+    return hashlib.sha1(values.tobytes() + "|".join(returns.columns).encode()).hexdigest()
+
+
+def _load_registry(data_dir: Path) -> Optional[Dict[str, Any]]:
+    path = store_dir(data_dir) / "registry.json"
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN][CORR ENGINE] registry read failed → rebuild: {e}")
+        return None
+
+
+def _append(path: Path, arr: np.ndarray) -> None:
+    with open(path, "ab") as f:
+        f.write(np.ascontiguousarray(arr).tobytes())
+
+
+def _quantize(r: np.ndarray) -> np.ndarray:
+    q = np.round(np.nan_to_num(r, nan=0.0) * CORR_SCALE)
+    return np.where(np.isfinite(r), q, np.iinfo(np.int16).min).astype("<i2")
+
+
+def update_correlation_store(
+    data_dir: Path = DATA_DIR,
+    macro_path: Optional[Path] = None,
+    force: bool = False,
+) -> CorrelationState:
+    """
+    macro_data.csv의 새 날짜만 state에 반영하고 history에 append.
+    이미 반영된 구간이 바뀌었거나 column set이 다르면 전체 replay.
+    """
+    out_dir = store_dir(data_dir)
+    macro_path = Path(macro_path) if macro_path else Path(data_dir) / MACRO_CSV_PATH.name
+    returns = macro_returns(read_macro_csv(macro_path))
+    columns = list(returns.columns)
+    iu = np.triu_indices(len(columns), k=1)
+
+    registry = None if force else _load_registry(data_dir)
+    state = None
+    start = 0
+    if registry and registry.get("version") == ENGINE_VERSION and registry.get("columns") == columns:
+        n_done = int(registry.get("n_days", 0))
+        if n_done <= len(returns) and registry.get("fingerprint") == _fingerprint(returns.iloc[:n_done]):
+            try:
+                state = CorrelationState.load(out_dir / "state.npz")
+            except Exception as e:
+                print(f"[WARN][CORR ENGINE] state load failed → rebuild: {e}")
+            if state is not None and state.n_days == n_done and state.columns == columns:
+                start = n_done
+            else:
+                state = None
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if state is None:
+        state = CorrelationState(columns)
+        for f in out_dir.glob("*.bin"):
+            f.unlink()
+
+    new = returns.iloc[start:]
+    if new.empty:
+        return state
+
+    values = new.to_numpy(dtype=float)
+    days = (new.index.values.astype("datetime64[D]").astype(np.int64)).astype("<i8")
+    rows: Dict[str, List[np.ndarray]] = {name: [] for name in EST_NAMES}
+    for x in values:
+        state.update(x)
+        for name in EST_NAMES:
+            rows[name].append(_quantize(state.corr(name)[iu]))
+
+    for name in EST_NAMES:
+        _append(out_dir / f"corr_{name}.bin", np.vstack(rows[name]))
+    _append(out_dir / "dates.bin", days)
+
+    state.save(out_dir / "state.npz")
+    registry = {
+        "version": ENGINE_VERSION,
+        "columns": columns,
+        "estimators": ESTIMATORS,
+        "scale": CORR_SCALE,
+        "n_days": int(state.n_days),
+        "last_date": str(new.index[-1].date()),
+        "fingerprint": _fingerprint(returns),
+    }
+    tmp_path = out_dir / "registry.json.tmp"
+    tmp_path.write_text(json.dumps(registry, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, out_dir / "registry.json")
+
+    print(f"[CORR ENGINE] +{len(new)} day(s) → {state.n_days} days x {len(columns)} assets ({'append' if start else 'rebuild'})")
+    return state
+
+
+def load_correlation_history(name: str, data_dir: Path = DATA_DIR) -> Optional[pd.DataFrame]:
+    """
+    backtest용: 날짜 x pair("A|B") correlation (float).
+    파일은 memmap으로 읽음 → 필요한 날짜만 잘라 쓰면 됨.
+    """
+    registry = _load_registry(data_dir)
+    path = store_dir(data_dir) / f"corr_{name}.bin"
+    if registry is None or not path.exists():
+        return None
+
+    columns = registry["columns"]
+    iu = np.triu_indices(len(columns), k=1)
+    k = len(iu[0])
+    n = int(registry["n_days"])
+
+    dates = np.memmap(store_dir(data_dir) / "dates.bin", dtype="<i8", mode="r", shape=(n,))
+    raw = np.memmap(path, dtype="<i2", mode="r", shape=(n, k))
+    values = np.where(raw == np.iinfo(np.int16).min, np.nan, raw / float(registry["scale"]))
+
+    pairs = [pair_key(columns[i], columns[j]) for i, j in zip(*iu)]
+    index = pd.DatetimeIndex(np.asarray(dates).astype("datetime64[D]"), name="date")
+    return pd.DataFrame(values, index=index, columns=pairs)
+
+
+def correlation_as_of(as_of: Any, name: str = SHORT_EST, data_dir: Path = DATA_DIR) -> Optional[pd.DataFrame]:
+    """as_of 시점 (그 날 포함 가장 최근) correlation matrix."""
+    hist = load_correlation_history(name, data_dir)
+    if hist is None:
+        return None
+    pos = int(hist.index.searchsorted(pd.Timestamp(as_of), side="right")) - 1
+    if pos < 0:
+        return None
+
+    columns = _load_registry(data_dir)["columns"]
+    mat = pd.DataFrame(np.eye(len(columns)), index=columns, columns=columns)
+    for key, r in hist.iloc[pos].items():
+        a, b = key.split("|")
+        mat.loc[a, b] = mat.loc[b, a] = r
+    return mat
+
+
+# -------------------------
+# Report snapshot
+# -------------------------
+def correlation_snapshot(
+    state: CorrelationState,
+    watch: Sequence[Tuple[str, str]] = (),
+    top_n: int = 10,
+) -> Dict[str, Any]:
+    """
+    6.5 / 6.6 monitor용 요약 (market_data["CORR_ENGINE"]).
+    breaks: 전체 pair 중 |z| 상위 top_n (표시용)
+    levels: watch pair별 estimator 값 + z / flag (top_n 절단과 무관하게 직접 계산)
+    """
+    dev = pair_deviations(state)
+    flagged = dev[dev["flag"]].head(top_n)
+
+    mats = {name: state.corr(name) for name in EST_NAMES}
+    r_s, r_b = mats[SHORT_EST], mats[BASE_EST]
+    n_s, n_b = state.count(SHORT_EST), state.count(BASE_EST)
+    index = {c: i for i, c in enumerate(state.columns)}
+
+    levels: Dict[str, Dict[str, Any]] = {}
+    for a, b in watch:
+        if a not in index or b not in index:
+            continue
+        i, j = index[a], index[b]
+        level: Dict[str, Any] = {
+            name: (None if np.isnan(mats[name][i, j]) else round(float(mats[name][i, j]), 3))
+            for name in EST_NAMES
+        }
+        z = float(_fisher_z(r_s[i, j], r_b[i, j], n_s[i, j], n_b[i, j]))
+        level["z"] = None if np.isnan(z) else round(z, 2)
+        level["flag"] = bool(not np.isnan(z) and _is_break(z, r_s[i, j] - r_b[i, j]))
+        levels[pair_key(a, b)] = level
+
+    return {
+        "n_days": int(state.n_days),
+        "n_assets": len(state.columns),
+        "short": SHORT_EST,
+        "base": BASE_EST,
+        "breaks": [
+            {
+                "pair": pair_key(row.a, row.b),
+                "r_short": round(float(getattr(row, f"r_{SHORT_EST}")), 3),
+                "r_base": round(float(getattr(row, f"r_{BASE_EST}")), 3),
+                "z": round(float(row.z), 2),
+            }
+            for row in flagged.itertuples(index=False)
+        ],
+        "levels": levels,
+    }
+
+
+def engine_pair_breaks(market_data: Dict[str, Any], pairs: Sequence[Tuple[str, str]]) -> List[str]:
+    """market_data["CORR_ENGINE"] levels(watch pair)에서 flag된 pair만 문장으로."""
+    snap = market_data.get("CORR_ENGINE") or {}
+    levels = snap.get("levels", {})
+    short, base = snap.get("short", SHORT_EST), snap.get("base", BASE_EST)
+
+    out = []
+    for a, b in pairs:
+        hit = levels.get(pair_key(a, b)) or levels.get(pair_key(b, a))
+        if hit and hit.get("flag"):
+            out.append(
+                f"Corr({a}, {b}) {short} {hit[short]:+.2f} "
+                f"vs long-run {hit[base]:+.2f} (z={hit['z']:+.1f})"
+            )
+    return out
+
+
+def update_correlation_engine(
+    data_dir: Path = DATA_DIR,
+    watch: Sequence[Tuple[str, str]] = (),
+) -> Dict[str, Any]:
+    """store 증분 update → snapshot."""
+    return correlation_snapshot(update_correlation_store(data_dir), watch)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rolling cross-asset correlation engine")
+    parser.add_argument("command", choices=["build", "show"], nargs="?", default="build")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    state = update_correlation_store(data_dir, force=args.force)
+    if args.command == "show":
+        dev = pair_deviations(state)
+        print(dev.head(20).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
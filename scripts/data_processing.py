@@ -1,8 +1,9 @@
 import os
-import yfinance as yf
 import pandas as pd
 from datetime import datetime
 
+from scripts.market_backend import get_market_backend
+
 # 국가별 ETF 목록 정의 (전체 ETF 리스트)
 country_etf_list = [
     "EIS",    # Israel ETF
@@ -34,9 +35,7 @@ def get_etf_data(etf_symbol: str, start_date: str, end_date: str) -> pd.DataFram
     """
     ETF 데이터를 Yahoo Finance에서 받아오는 함수
     """
-    ticker = yf.Ticker(etf_symbol)
-    df = ticker.history(start=start_date, end=end_date)
-    return df
+    return get_market_backend().history(etf_symbol, start=start_date, end=end_date)
 
 def download_all_etfs_and_save():
     """
@@ -54,8 +53,7 @@ def download_all_etfs_and_save():
 
     for symbol in country_etf_list:
         try:
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(start=start_date, end=end_date)
+            df = get_market_backend().history(symbol, start=start_date, end=end_date)
 
             if not df.empty:
                 # 'Close' 가격만 추출하고 타임존 제거
@@ -0,0 +1,309 @@
+# scripts/derived_series.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from scripts.log_store import count_log_keys, read_log_tail, replace_log_tail
+
+# =========================================================
+# Derived Series Engine (incremental)
+# ---------------------------------------------------------
+# 대상: sovereign_spreads (*10Y_SPREAD) / liquidity (NET_LIQ) / sentiment_proxy
+#
+# 각 derived 컬럼은 spec(dict)으로 선언:
+#   {
+#     "outputs": ["KR10Y_SPREAD"],            # 생성 컬럼
+#     "inputs":  ["KR10Y_Y", "US10Y_Y"],      # 필요한 컬럼 (source 또는 앞선 spec output)
+#     "window":  0,                           # rolling lookback row 수 (0 = pointwise)
+#     "ffill":   True,                        # inputs를 forward-fill 후 계산
+#     "func":    lambda f: f["KR10Y_Y"] - f["US10Y_Y"],   # Series 또는 DataFrame
+#   }
+#
+# update_derived_csv 흐름:
+# 1) source와 저장 파일의 input 컬럼을 한 번에 비교해 처음 달라진 날짜(dirty_from) 탐색
+#    - <csv>.fp.json (직전 기록 시 source 행 수 + 마지막 TAIL_CHECK_ROWS 이전 구간 digest)이
+#      현재 source 앞부분과 일치하면 저장 파일은 꼬리 TAIL_CHECK_ROWS row만 읽어 비교
+#    - fingerprint가 없거나 컬럼 / 행 수 / digest가 다르면 저장 파일 전체 비교 (기존 방식)
+# 2) dirty_from 이전 context = max(window) row + ffill carry (저장 파일 꼬리에서)
+# 3) context + 신규 row에 spec 순서대로 계산 -> dirty_from 이후 row만 기록
+#    (log_store.replace_log_tail: 해당 offset에서 truncate 후 append)
+#
+# -> 일일 계산/쓰기 비용은 history 길이가 아니라 새로 바뀐 row 수에 비례
+# =========================================================
+
+DerivedSpec = Dict[str, Any]
+
+INITIAL_TAIL = 64
+TAIL_CHECK_ROWS = 64     # fingerprint 일치 시 저장 파일에서 다시 비교하는 꼬리 row 수
+FINGERPRINT_SUFFIX = ".fp.json"
+MAX_CARRY_ROWS = 512     # ffill carry 탐색 한도 (그 이상 결측이면 carry 없음)
+FLOAT_ATOL = 1e-12
+
+
+# -------------------------
+# Spec helpers
+# -------------------------
+def spec_outputs(specs: List[DerivedSpec]) -> List[str]:
+    out: List[str] = []
+    for spec in specs:
+        out.extend(spec["outputs"])
+    return out
+
+
+def _context_rows(specs: List[DerivedSpec]) -> int:
+    return max([int(spec.get("window", 0) or 0) for spec in specs] + [0])
+
+
+def _ffill_inputs(specs: List[DerivedSpec], source_cols: List[str]) -> List[str]:
+    cols: List[str] = []
+    for spec in specs:
+        if spec.get("ffill"):
+            cols.extend(c for c in spec["inputs"] if c in source_cols and c not in cols)
+    return cols
+
+
+def apply_specs(frame: pd.DataFrame, specs: List[DerivedSpec]) -> pd.DataFrame:
+    """frame(key + inputs)에 spec 순서대로 derived 컬럼 추가 (in-place 아님)."""
+    frame = frame.copy()
+
+    for spec in specs:
+        missing = [c for c in spec["inputs"] if c not in frame.columns]
+        if missing:
+            for col in spec["outputs"]:
+                frame[col] = np.nan
+            continue
+
+        view = frame
+        if spec.get("ffill"):
+            view = frame.copy()
+            view[spec["inputs"]] = view[spec["inputs"]].ffill()
+
+        result = spec["func"](view)
+        if isinstance(result, pd.DataFrame):
+            for col in spec["outputs"]:
+                frame[col] = result[col]
+        else:
+            frame[spec["outputs"][0]] = result
+
+    return frame
+
+
+# -------------------------
+# Source fingerprint (<csv>.fp.json)
+# -------------------------
+def _fingerprint_path(path: Path) -> Path:
+    return path.with_name(path.name + FINGERPRINT_SUFFIX)
+
+
+def _frame_digest(frame: pd.DataFrame) -> str:
+    hashed = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+
+def _load_fingerprint(path: Path) -> Optional[Dict[str, Any]]:
+    fp_path = _fingerprint_path(path)
+    if not fp_path.exists():
+        return None
+    try:
+        return json.loads(fp_path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN] derived fingerprint read failed ({fp_path.name}): {e}")
+        return None
+
+
+def _save_fingerprint(path: Path, source: pd.DataFrame, input_cols: List[str], key_col: str) -> None:
+    """기록 직후 저장 파일의 input 컬럼 == source 이므로 source 기준으로 fingerprint 저장."""
+    n_head = max(0, len(source) - TAIL_CHECK_ROWS)
+    fp = {
+        "columns": [key_col] + input_cols,
+        "rows": int(len(source)),
+        "head_rows": int(n_head),
+        "head_digest": _frame_digest(source.iloc[:n_head][[key_col] + input_cols]),
+    }
+    fp_path = _fingerprint_path(path)
+    tmp_path = fp_path.with_suffix(fp_path.suffix + ".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(fp, f)
+        os.replace(tmp_path, fp_path)
+    except Exception as e:
+        print(f"[WARN] derived fingerprint write failed ({fp_path.name}): {e}")
+
+
+def _tail_window(
+    path: Path,
+    source: pd.DataFrame,
+    input_cols: List[str],
+    key_col: str,
+    total: int,
+) -> Optional[int]:
+    """fingerprint가 현재 source / 저장 파일과 맞으면 비교 시작 row(head_rows), 아니면 None."""
+    fp = _load_fingerprint(path)
+    if not fp or fp.get("columns") != [key_col] + input_cols:
+        return None
+    if int(fp.get("rows", -1)) != total:
+        return None
+
+    n_head = int(fp.get("head_rows", 0))
+    if len(source) < n_head:
+        return None
+    if _frame_digest(source.iloc[:n_head][[key_col] + input_cols]) != fp.get("head_digest"):
+        return None
+    return n_head
+
+
+# -------------------------
+# Dirty range detection
+# -------------------------
+def _same(a: pd.Series, b: pd.Series) -> np.ndarray:
+    x = pd.to_numeric(a, errors="coerce").to_numpy(dtype="float64")
+    y = pd.to_numeric(b, errors="coerce").to_numpy(dtype="float64")
+    both_nan = np.isnan(x) & np.isnan(y)
+    with np.errstate(invalid="ignore"):
+        close = np.abs(x - y) <= FLOAT_ATOL
+    return both_nan | close
+
+
+def find_dirty_from(
+    path: Path,
+    source: pd.DataFrame,
+    input_cols: List[str],
+    key_col: str = "date",
+) -> Optional[str]:
+    """
+    source와 저장 파일(input 컬럼만)이 처음 달라지는 날짜. 같으면 None.
+    저장 파일이 없거나 input 컬럼이 없으면 source 첫 날짜.
+    비교는 vectorized 한 번 (derived 계산/쓰기는 이 날짜 이후만).
+    fingerprint가 맞으면 저장 파일은 꼬리 TAIL_CHECK_ROWS row만 읽는다.
+    """
+    if source.empty:
+        return None
+
+    first_key = str(source[key_col].iloc[0])
+    total = count_log_keys(path, key_col)
+    if total == 0:
+        return first_key
+
+    header = pd.read_csv(path, nrows=0).columns
+    if any(c not in header for c in input_cols):
+        return first_key
+
+    n_head = _tail_window(path, source, input_cols, key_col, total)
+    if n_head is not None:
+        stored = read_log_tail(path, total - n_head, key_col)[[key_col] + input_cols]
+        source = source.iloc[n_head:]
+        if source.empty and stored.empty:
+            return None
+        first_key = str(source[key_col].iloc[0]) if len(source) else str(stored[key_col].iloc[0])
+    else:
+        stored = pd.read_csv(path, usecols=[key_col] + input_cols)
+
+    stored[key_col] = pd.to_datetime(stored[key_col], errors="coerce").dt.strftime("%Y-%m-%d")
+    stored = stored.dropna(subset=[key_col]).drop_duplicates(key_col, keep="last").set_index(key_col)
+
+    window = source.set_index(key_col)
+    in_stored = window.index.isin(stored.index)
+    diff = ~in_stored
+
+    common = window.index[in_stored]
+    changed = np.zeros(len(common), dtype=bool)
+    for col in input_cols:
+        changed |= ~_same(window.loc[common, col], stored.loc[common, col])
+    diff[in_stored] = changed
+
+    # 저장 파일에만 있는 날짜(source에서 빠진 날짜)도 그 이후부터 다시 기록
+    removed = stored.index[~stored.index.isin(window.index)]
+    candidates = list(window.index[diff]) + [k for k in removed if k >= first_key]
+
+    return str(min(candidates)) if candidates else None
+
+
+# -------------------------
+# Incremental update
+# -------------------------
+def update_derived_csv(
+    path: Path,
+    source: pd.DataFrame,
+    specs: List[DerivedSpec],
+    key_col: str = "date",
+    columns: Optional[List[str]] = None,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """
+    source(key + input 컬럼, 날짜 정렬)를 저장 파일에 반영하고 derived 컬럼을 증분 계산.
+    columns: 파일 컬럼 순서 (기본: key + source 컬럼 + spec outputs)
+    full: True면 source 첫 날짜부터 전체 재계산
+    Return: {"dirty_from", "rows", "mode"}
+    """
+    path = Path(path)
+    source = source.copy()
+    source[key_col] = pd.to_datetime(source[key_col], errors="coerce").dt.strftime("%Y-%m-%d")
+    source = (
+        source.dropna(subset=[key_col])
+        .sort_values(key_col, kind="mergesort")
+        .drop_duplicates(key_col, keep="last")
+        .reset_index(drop=True)
+    )
+
+    input_cols = [c for c in source.columns if c != key_col]
+    outputs = spec_outputs(specs)
+    columns = columns or ([key_col] + input_cols + outputs)
+
+    if full and not source.empty:
+        dirty_from = str(source[key_col].iloc[0])
+    else:
+        dirty_from = find_dirty_from(path, source, input_cols, key_col)
+
+    if dirty_from is None:
+        _save_fingerprint(path, source, input_cols, key_col)
+        return {"dirty_from": None, "rows": 0, "mode": "noop"}
+
+    fresh = source[source[key_col] >= dirty_from]
+
+    # context: dirty_from 이전 window row + ffill carry
+    total = count_log_keys(path, key_col)
+    context = pd.DataFrame(columns=[key_col] + input_cols)
+    if total > 0:
+        need = _context_rows(specs)
+        ffill_cols = _ffill_inputs(specs, input_cols)
+        base = len(fresh) + need
+        n = base + INITIAL_TAIL
+
+        while True:
+            tail = read_log_tail(path, min(n, total), key_col)
+            tail[key_col] = pd.to_datetime(tail[key_col], errors="coerce").dt.strftime("%Y-%m-%d")
+            before = tail[tail[key_col] < dirty_from]
+
+            carry_ok = all(
+                c in before.columns and before[c].notna().any() for c in ffill_cols
+            )
+            if (len(before) >= need and carry_ok) or n >= total or n >= base + MAX_CARRY_ROWS:
+                break
+            n *= 2
+
+        keep = [c for c in [key_col] + input_cols if c in before.columns]
+        context = before[keep]
+        if not ffill_cols:
+            context = context.tail(need) if need > 0 else context.iloc[0:0]
+
+    frame = pd.concat([context, fresh], ignore_index=True) if len(context) else fresh.reset_index(drop=True)
+    derived = apply_specs(frame, specs)
+    rows = derived[derived[key_col] >= dirty_from].reindex(columns=columns)
+
+    mode = replace_log_tail(path, rows, key_col, column_order=lambda _cols: columns, from_key=dirty_from)
+    _save_fingerprint(path, source, input_cols, key_col)
+
+    return {"dirty_from": dirty_from, "rows": int(len(rows)), "mode": mode}
+
+
+def rebuild_derived(source: pd.DataFrame, specs: List[DerivedSpec], key_col: str = "date") -> pd.DataFrame:
+    """전체 재계산 (검증 / 초기 생성용)."""
+    source = source.sort_values(key_col, kind="mergesort").reset_index(drop=True)
+    return apply_specs(source, specs)
@@ -0,0 +1,220 @@
+# scripts/drift_engine.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.bar_archive import BARS_DIR, load_bars, to_ns
+
+# =========================================================
+# Drift Engine (point-in-time, vectorized across tickers)
+# ---------------------------------------------------------
+# attach_drift_data_layer의 ret_15m ~ ret_5d / ATR(14) / norm_* 계산을
+# ticker 축으로 한 번에 수행.
+#
+# 입력 window 두 종류:
+# - live_window   : 방금 download한 bar 그대로 (기존 live 동작과 동일)
+# - pit_window    : bar archive에서 as_of 시점까지만 잘라서 구성 (backtest replay)
+#     intraday : ts < as_of (strict: bar ts는 시작 시각 → as_of에 시작하는 bar는 미완료,
+#                날짜만 준 경우 D+1 00:00 UTC bar가 D에 섞이지 않음)
+#     daily    : 거래일 + 1일 <= as_of 인 bar만 완료 bar로 사용
+#                as_of 당일은 intraday bar(<= as_of)로 partial daily bar 구성
+#     as_of가 날짜만(00:00)이면 그 날 장 마감 이후로 간주 (당일 daily bar 포함)
+# =========================================================
+
+DRIFT_TICKERS: Dict[str, str] = {
+    "SPY": "SPY",
+    "WTI": "CL=F",
+    "DXY": "DX-Y.NYB",
+    "GOLD": "GC=F",
+
+    # Credit / Risk participation
+    "HYG": "HYG",
+    "LQD": "LQD",
+
+    # EM / China
+    "EEM": "EEM",
+    "FXI": "FXI",
+
+    # Sector leadership
+    "XLK": "XLK",
+    "XLI": "XLI",
+    "XLF": "XLF",
+    "XLY": "XLY",
+
+    # Defensive comparison
+    "XLP": "XLP",
+    "XLU": "XLU",
+}
+
+INTRADAY_INTERVAL = "15m"
+DAILY_INTERVAL = "1d"
+
+INTRADAY_DEPTH = 17      # curr + 15m / 30m / 1h / 4h(16 bars 전)
+DAILY_DEPTH = 20         # ATR(14) + prev close 여유
+ATR_PERIOD = 14
+
+DAY_NS = 24 * 60 * 60 * 10**9
+
+# window = (curr, intraday closes, daily high, daily low, daily close)
+DriftWindow = Tuple[float, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+# -------------------------
+# Windows
+# -------------------------
+def resolve_as_of(as_of: Any) -> int:
+    ts = pd.Timestamp(as_of)
+    ns = to_ns(ts)
+    if ts == ts.normalize():
+        # 날짜만 주어진 경우: 그 날 장 마감 이후 시점
+        ns += DAY_NS
+    return ns
+
+
+def live_window(intraday: np.ndarray, daily: np.ndarray) -> Optional[DriftWindow]:
+    """download 결과 그대로 (daily 마지막 bar = 오늘 진행 중 bar)."""
+    if intraday.size == 0 or daily.size == 0:
+        return None
+
+    closes = np.asarray(intraday["close"][-INTRADAY_DEPTH:], dtype="float64")
+    d = daily[-DAILY_DEPTH:]
+    return (
+        float(closes[-1]),
+        closes,
+        np.asarray(d["high"], dtype="float64"),
+        np.asarray(d["low"], dtype="float64"),
+        np.asarray(d["close"], dtype="float64"),
+    )
+
+
+def pit_window(ticker: str, as_of_ns: int, root: Path = BARS_DIR) -> Optional[DriftWindow]:
+    """archive 기준 as_of 시점 window (미래 bar 사용 없음)."""
+    # load_bars end_ts는 inclusive → strict < as_of
+    intraday = load_bars(ticker, INTRADAY_INTERVAL, end_ts=as_of_ns - 1, root=root)
+    daily = load_bars(ticker, DAILY_INTERVAL, end_ts=as_of_ns - DAY_NS, root=root)
+
+    day_start = (as_of_ns // DAY_NS) * DAY_NS
+    partial = intraday[intraday["ts"] >= day_start] if intraday.size else intraday
+
+    high = np.asarray(daily["high"][-DAILY_DEPTH:], dtype="float64")
+    low = np.asarray(daily["low"][-DAILY_DEPTH:], dtype="float64")
+    close = np.asarray(daily["close"][-DAILY_DEPTH:], dtype="float64")
+
+    if partial.size:
+        high = np.r_[high, np.nanmax(partial["high"])][-DAILY_DEPTH:]
+        low = np.r_[low, np.nanmin(partial["low"])][-DAILY_DEPTH:]
+        close = np.r_[close, partial["close"][-1]][-DAILY_DEPTH:]
+
+    # intraday가 마지막 daily bar보다 오래됐으면 intraday 수익률은 계산하지 않음
+    last_daily_ts = int(daily["ts"][-1]) if daily.size else None
+    if intraday.size and (last_daily_ts is None or int(intraday["ts"][-1]) >= last_daily_ts):
+        closes = np.asarray(intraday["close"][-INTRADAY_DEPTH:], dtype="float64")
+    else:
+        closes = np.zeros(0, dtype="float64")
+
+    if closes.size:
+        curr = float(closes[-1])
+    elif close.size:
+        curr = float(close[-1])
+    else:
+        return None
+
+    return curr, closes, high, low, close
+
+
+# -------------------------
+# Vectorized kernel
+# -------------------------
+def _right_align(rows: List[np.ndarray], width: int) -> np.ndarray:
+    out = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        row = row[-width:]
+        if row.size:
+            out[i, width - row.size:] = row
+    return out
+
+
+def _ret(curr: np.ndarray, past: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (curr / past - 1.0) * 100.0
+    out[~np.isfinite(past) | (past == 0)] = np.nan
+    return out
+
+
+def drift_kernel(
+    curr: np.ndarray,
+    intraday_close: np.ndarray,
+    daily_high: np.ndarray,
+    daily_low: np.ndarray,
+    daily_close: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """
+    모든 입력은 ticker 축(N) 기준, window는 오른쪽 정렬 + NaN padding.
+    intraday_close: N x INTRADAY_DEPTH, daily_*: N x DAILY_DEPTH
+    """
+    prev_close = np.c_[np.full(len(curr), np.nan), daily_close[:, :-1]]
+
+    tr = np.fmax(
+        np.fmax(daily_high - daily_low, np.abs(daily_high - prev_close)),
+        np.abs(daily_low - prev_close),
+    )
+    last_tr = tr[:, -ATR_PERIOD:]
+    atr = np.where(np.isnan(last_tr).any(axis=1), np.nan, last_tr.mean(axis=1))
+
+    out = {
+        "ret_15m": _ret(curr, intraday_close[:, -2]),
+        "ret_30m": _ret(curr, intraday_close[:, -3]),
+        "ret_1h": _ret(curr, intraday_close[:, -5]),
+        "ret_4h": _ret(curr, intraday_close[:, -17]),
+        "ret_1d": _ret(curr, daily_close[:, -2]),
+        "ret_5d": _ret(curr, daily_close[:, -6]),
+        "atr": atr,
+    }
+
+    safe_atr = np.where(atr == 0, np.nan, atr)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["norm_1d"] = out["ret_1d"] / safe_atr
+        out["norm_5d"] = out["ret_5d"] / safe_atr
+
+    return out
+
+
+def compute_drift(windows: Dict[str, Optional[DriftWindow]]) -> Dict[str, Dict[str, Any]]:
+    """window dict -> DRIFT_DATA 형식 (window 없는 ticker는 {})."""
+    names = [name for name, w in windows.items() if w is not None]
+    drift: Dict[str, Dict[str, Any]] = {name: {} for name in windows}
+
+    if not names:
+        return drift
+
+    ws = [windows[name] for name in names]
+    res = drift_kernel(
+        np.array([w[0] for w in ws], dtype="float64"),
+        _right_align([w[1] for w in ws], INTRADAY_DEPTH),
+        _right_align([w[2] for w in ws], DAILY_DEPTH),
+        _right_align([w[3] for w in ws], DAILY_DEPTH),
+        _right_align([w[4] for w in ws], DAILY_DEPTH),
+    )
+
+    for i, name in enumerate(names):
+        drift[name] = {
+            key: (float(values[i]) if np.isfinite(values[i]) else None)
+            for key, values in res.items()
+        }
+
+    return drift
+
+
+def drift_as_of(
+    as_of: Any,
+    tickers: Optional[Dict[str, str]] = None,
+    root: Path = BARS_DIR,
+) -> Dict[str, Dict[str, Any]]:
+    """archive만 사용한 point-in-time DRIFT_DATA (network 없음)."""
+    tickers = tickers or DRIFT_TICKERS
+    as_of_ns = resolve_as_of(as_of)
+    return compute_drift({name: pit_window(t, as_of_ns, root) for name, t in tickers.items()})
@@ -1,8 +1,10 @@
-import os
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
 
 from filters.executive_layer import execution_layer_filter
+from scripts.price_panel import SOURCE_PRECEDENCE, get_price_panel
 
 # =========================
 # 1) 원래 포트폴리오
@@ -181,43 +183,32 @@ def build_regime_portfolio(market_data):
 
 def calculate_returns(weights_dict):
     """
-    각 ETF 개별 파일을 읽어 일일 수익률 계산
+    공용 price panel(data/price_panel)에서 ETF별 일일 수익률 계산
+    - source는 <SYM>_data.csv 원본 close (SOURCE_PRECEDENCE["etf_returns"], splice 없음)
+    - 각 ETF는 자기 거래일 close로 pct_change (ETF별 기간 그대로, 공통 시작일로 자르지 않음)
     """
     all_returns = []
-    data_directory = "data/"
     symbols = list(weights_dict.keys())
+    panel = get_price_panel(Path("data"))
 
     for symbol in symbols:
-        file_path = os.path.join(data_directory, f"{symbol}_data.csv")
-
-        if os.path.exists(file_path):
-            try:
-                df = pd.read_csv(file_path, skiprows=3, header=None)
-                df = df.iloc[:, [0, 1]]
-                df.columns = ["Date", "Price"]
-
-                df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-                df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-                df = df.dropna().set_index("Date").sort_index()
+        prices = panel.series(symbol, precedence=SOURCE_PRECEDENCE["etf_returns"])
 
-                returns = df["Price"].pct_change()
-                returns.name = symbol
-                all_returns.append(returns)
+        if prices.empty:
+            print(f"⚠️ 가격 없음: {symbol}")
+            continue
 
-                print(f"✅ {symbol}: 계산 성공")
+        returns = prices.pct_change()
+        returns.name = symbol
+        all_returns.append(returns)
 
-            except Exception as e:
-                print(f"❌ {symbol} 처리 중 에러: {e}")
-        else:
-            print(f"⚠️ 파일 없음: {file_path}")
+        print(f"✅ {symbol}: 계산 성공")
 
     if all_returns:
         combined = pd.concat(all_returns, axis=1)
         return combined
 
     return None
-    
-
 
 
 def build_portfolio_returns(combined_df, weights_dict, portfolio_name="Portfolio"):
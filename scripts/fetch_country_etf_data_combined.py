@@ -1,6 +1,9 @@
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
+from pathlib import Path
+
+from scripts.freshness_index import record_frame
+from scripts.market_backend import get_market_backend
 
 START_DATE = "2022-01-01"
 END_DATE = (datetime.utcnow() + timedelta(days=1)).strftime("%Y-%m-%d")
@@ -19,7 +22,7 @@ TICKERS = [
 
 print("Downloading ETF data...")
 
-data = yf.download(
+data = get_market_backend().download(
     TICKERS,
     start=START_DATE,
     end=END_DATE,
@@ -85,6 +88,7 @@ if df.empty:
     raise SystemExit(0)
 
 df.to_csv("data/country_etf_data_combined.csv", index=False)
+record_frame(Path("data/country_etf_data_combined.csv"), df, date_col="Date")
 
 print("Saved: data/country_etf_data_combined.csv")
 print("Columns:", list(df.columns))
@@ -6,6 +6,9 @@ from datetime import datetime, timezone, timedelta
 
 import pandas as pd
 
+from scripts.freshness_index import record_frame
+from scripts.market_backend import get_market_backend
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 OUT_CSV = DATA_DIR / "credit_spread_data.csv"
@@ -22,7 +25,7 @@ def fetch_fred(series_id: str, retries: int = 3, delay: int = 5) -> pd.DataFrame
 
     for attempt in range(retries):
         try:
-            df = pd.read_csv(url)
+            df = get_market_backend().read_csv_url(url)
             df.columns = ["date", series_id]
             df["date"] = pd.to_datetime(df["date"], errors="coerce")
             df[series_id] = pd.to_numeric(df[series_id], errors="coerce")
@@ -109,6 +112,7 @@ def main() -> None:
     combined["date"] = combined["date"].dt.strftime("%Y-%m-%d")
 
     combined.to_csv(OUT_CSV, index=False)
+    record_frame(OUT_CSV, combined, source_as_of={"HY_OAS": hy["date"].max().date()} if not hy.empty else None)
 
     print(f"[DEBUG] HY_OAS last fetched date: {hy['date'].max() if not hy.empty else 'EMPTY'}")
     print(f"[DEBUG] CSV last date after update: {combined['date'].iloc[-1] if not combined.empty else 'EMPTY'}")
@@ -1,8 +1,9 @@
 # 기존 코드 예시
-import yfinance as yf
 import pandas as pd
 import os
 
+from scripts.market_backend import get_market_backend
+
 # etf_symbols 딕셔너리 추가
 etf_symbols = {
     "BND": "Vanguard Total Bond Market ETF",
@@ -18,6 +19,9 @@ etf_symbols = {
     "XLV": "Health Care Select Sector SPDR",
     "XLP": "Consumer Staples Select Sector SPDR",
     "XLF": "Financials Select Sector SPDR",
+    "XLB": "Materials Select Sector SPDR",
+    "XLU": "Utilities Select Sector SPDR",
+    "XLC": "Communication Services Select Sector SPDR",
     "QUAL": "iShares MSCI USA Quality Factor ETF",
     "COWZ": "Pacer US Cash Cows 100 ETF",
     "MTUM": "iShares MSCI USA Momentum Factor ETF"
@@ -29,7 +33,7 @@ def fetch_etf_data():
     
     for ticker, name in etf_symbols.items():
         print(f"Downloading data for {name} ({ticker})...")
-        data = yf.download(ticker, period="1y", progress=False)
+        data = get_market_backend().download(ticker, period="1y", progress=False)
         data['Ticker'] = ticker  # 티커 정보 추가
         etf_data[ticker] = data
 
@@ -5,7 +5,8 @@ import time
 from typing import Dict, Any, Optional, Tuple
 
 import pandas as pd
-import requests
+
+from scripts.market_backend import FixtureMissingError, get_market_backend
 
 
 # Keyless FRED CSV endpoint
@@ -46,11 +47,10 @@ def _fetch_fred_series_df(series_id: str, timeout: int = 20) -> pd.DataFrame:
     last_err = None
     for i in range(3):
         try:
-            r = requests.get(url, headers=headers, timeout=timeout)
-            r.raise_for_status()
+            text = get_market_backend().get_text(url, headers=headers, timeout=timeout)
             # fredgraph.csv is tiny; parse via pandas from string
             from io import StringIO
-            df = pd.read_csv(StringIO(r.text))
+            df = pd.read_csv(StringIO(text))
             # Expected columns: DATE, <SERIES_ID>
             if df.empty or "DATE" not in df.columns:
                 raise ValueError(f"Unexpected CSV format for {series_id}")
@@ -64,6 +64,9 @@ def _fetch_fred_series_df(series_id: str, timeout: int = 20) -> pd.DataFrame:
             out["value"] = pd.to_numeric(out["value"], errors="coerce")
             out = out.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
             return out
+        except FixtureMissingError:
+            # replay에는 재시도할 네트워크가 없음
+            raise
         except Exception as e:
             last_err = e
             # backoff
@@ -10,6 +10,8 @@ import urllib.error
 
 import pandas as pd
 
+from scripts.freshness_index import record_frame
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 OUT_CSV = DATA_DIR / "fred_macro_extras.csv"
@@ -157,6 +159,10 @@ def main() -> None:
     merged["date"] = merged["date"].dt.strftime("%Y-%m-%d")
 
     merged.to_csv(OUT_CSV, index=False)
+    record_frame(OUT_CSV, merged, source_as_of={
+        col: src["date"].max().date() for col, src in [("FCI", fci_df), ("REAL_RATE", real_df)]
+        if src is not None and not src.empty
+    })
 
     got_fci = "YES" if fci_df is not None and not fci_df.empty else "NO"
     got_real = "YES" if real_df is not None and not real_df.empty else "NO"
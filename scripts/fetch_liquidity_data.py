@@ -6,6 +6,10 @@ from datetime import datetime, timezone, timedelta
 
 import pandas as pd
 
+from scripts.derived_series import update_derived_csv
+from scripts.market_backend import get_market_backend
+from scripts.freshness_index import record_source_as_of
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 OUT_CSV = DATA_DIR / "liquidity_data.csv"
@@ -20,6 +24,17 @@ SERIES = {
 
 KST = timezone(timedelta(hours=9))
 
+# NET_LIQ 재계산: 세 값이 모두 있을 때만 계산 (NaN 전파)
+LIQUIDITY_SPECS = [
+    {
+        "outputs": ["NET_LIQ"],
+        "inputs": ["WALCL", "TGA", "RRP"],
+        "window": 0,
+        "ffill": False,
+        "func": lambda f: f["WALCL"] - f["TGA"] - f["RRP"],
+    },
+]
+
 
 def fetch_fred(series_id: str, retries: int = 3, delay: int = 5) -> pd.DataFrame:
     """Fetch a FRED series with retries. On failure, return empty DataFrame."""
@@ -28,7 +43,7 @@ def fetch_fred(series_id: str, retries: int = 3, delay: int = 5) -> pd.DataFrame
     last_err = None
     for attempt in range(retries):
         try:
-            df = pd.read_csv(url)
+            df = get_market_backend().read_csv_url(url)
             df.columns = ["date", series_id]
             df["date"] = pd.to_datetime(df["date"], errors="coerce")
             df[series_id] = pd.to_numeric(df[series_id], errors="coerce")
@@ -129,23 +144,26 @@ def main() -> None:
         combined[col] = combined[f"{col}__new"].combine_first(combined[col])
         combined = combined.drop(columns=[f"{col}__new"])
 
-    # NET_LIQ 재계산: 세 값이 모두 있을 때만 계산
-    combined["NET_LIQ"] = pd.NA
-    mask = combined["TGA"].notna() & combined["RRP"].notna() & combined["WALCL"].notna()
-    combined.loc[mask, "NET_LIQ"] = (
-        combined.loc[mask, "WALCL"]
-        - combined.loc[mask, "TGA"]
-        - combined.loc[mask, "RRP"]
-    )
-
     # 타입 정리
-    for col in ["TGA", "RRP", "WALCL", "NET_LIQ"]:
+    for col in ["TGA", "RRP", "WALCL"]:
         combined[col] = pd.to_numeric(combined[col], errors="coerce")
 
     combined = combined.sort_values("date").drop_duplicates(subset=["date"], keep="last")
     combined["date"] = combined["date"].dt.strftime("%Y-%m-%d")
 
-    combined.to_csv(OUT_CSV, index=False)
+    # NET_LIQ: 값이 바뀐 날짜 이후만 재계산 + 파일 꼬리 교체
+    info = update_derived_csv(
+        OUT_CSV,
+        combined[["date", "TGA", "RRP", "WALCL"]],
+        LIQUIDITY_SPECS,
+        columns=["date", "TGA", "RRP", "WALCL", "NET_LIQ"],
+    )
+    print(f"[DEBUG] NET_LIQ derived: dirty_from={info['dirty_from']} rows_written={info['rows']} mode={info['mode']}")
+
+    record_source_as_of(OUT_CSV, {
+        col: fred["date"].max().date() for col, fred in [("TGA", tga_df), ("RRP", rrp_df), ("WALCL", walcl_df)]
+        if not fred.empty
+    })
 
     print(f"[DEBUG] TGA last fetched date: {tga_df['date'].max() if not tga_df.empty else 'EMPTY'}")
     print(f"[DEBUG] RRP last fetched date: {rrp_df['date'].max() if not rrp_df.empty else 'EMPTY'}")
@@ -4,9 +4,12 @@ from pathlib import Path
 from typing import Dict, Optional, List, Tuple
 
 import pandas as pd
-import yfinance as yf
 from zoneinfo import ZoneInfo
 
+from scripts.freshness_index import record_source_as_of
+from scripts.macro_schema import upsert_macro_row
+from scripts.market_backend import get_market_backend
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 CSV_PATH = DATA_DIR / "macro_data.csv"
@@ -150,12 +153,13 @@ def _safe_last_close_and_date(
 def fetch_macro_data() -> Tuple[Dict[str, float], Optional[str]]:
     results: Dict[str, float] = {}
     market_date_candidates: List[str] = []
+    source_as_of: Dict[str, Optional[str]] = {}
 
     expected_market_date = _expected_market_date_kst()
 
     def _fetch(ticker: str):
         try:
-            df = yf.download(
+            df = get_market_backend().download(
                 ticker,
                 period="30d",
                 interval="1d",
@@ -180,7 +184,7 @@ def fetch_macro_data() -> Tuple[Dict[str, float], Optional[str]]:
                 # ✅ US10Y Yahoo 실패/지연 시 FRED(DGS10) fallback
         if name == "US10Y" and (value is None or asof_date != expected_market_date):
             try:
-                fred = pd.read_csv(
+                fred = get_market_backend().read_csv_url(
                     "https://fred.stlouisfed.org/graph/fredgraph.csv?id=DGS10"
                 )
                 fred.columns = ["date", "DGS10"]
@@ -205,7 +209,7 @@ def fetch_macro_data() -> Tuple[Dict[str, float], Optional[str]]:
                     f"https://cdn.cboe.com/api/global/us_indices/daily_prices/{name}_History.csv"
                 )
 
-                cboe = pd.read_csv(cboe_url)
+                cboe = get_market_backend().read_csv_url(cboe_url)
 
                 cboe["date"] = pd.to_datetime(
                     cboe["DATE"],
@@ -241,6 +245,8 @@ def fetch_macro_data() -> Tuple[Dict[str, float], Optional[str]]:
                     f"{name} error={e}"
                 )
 
+        source_as_of[name] = asof_date
+
         if value is None:
             results[name] = float("nan")
             continue
@@ -252,6 +258,9 @@ def fetch_macro_data() -> Tuple[Dict[str, float], Optional[str]]:
 
     print(f"[DEBUG] market_date_candidates={market_date_candidates}")
 
+    # 저장 여부와 무관하게 upstream as-of 기록 (not ready 원인 추적용)
+    record_source_as_of(CSV_PATH, source_as_of)
+
     ready_count = sum(1 for d in market_date_candidates if d == expected_market_date)
 
     if ready_count < 4:
@@ -272,57 +281,15 @@ def append_to_csv(values: Dict[str, float], market_date: Optional[str]) -> None:
         print("❌ append_to_csv skipped: market_date is None")
         return
 
-    row_date = market_date
-
     # ✅ Daily EOD file: datetime도 기준일로 고정
-    row = {"datetime": row_date, "date": row_date}
-    row.update(values)
-
-    df_row = pd.DataFrame([row])
-
-    if not CSV_PATH.exists():
-        df_row["date"] = pd.to_datetime(df_row["date"], errors="coerce")
-        df_row = df_row.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-        df_row["date"] = df_row["date"].dt.strftime("%Y-%m-%d")
-        df_row["datetime"] = df_row["date"]
-        df_row.to_csv(CSV_PATH, index=False)
-        print(f"✅ Saved row for {row_date} (new file)")
-        return
-
-    df_existing = pd.read_csv(CSV_PATH)
-
-    if "date" not in df_existing.columns:
-        df_row.to_csv(CSV_PATH, index=False)
-        print(f"✅ Saved row for {row_date} (date column rebuilt)")
-        return
-
-    df_existing["date"] = pd.to_datetime(df_existing["date"], errors="coerce")
-    df_row["date"] = pd.to_datetime(df_row["date"], errors="coerce")
-
-    df_existing = df_existing.dropna(subset=["date"]).copy()
-    df_row = df_row.dropna(subset=["date"]).copy()
-
-    if df_row.empty:
-        print("❌ New macro row has invalid date. Skip save.")
+    # 같은 date는 overwrite only / 스키마 보정 + atomic write는 macro_schema에서 처리
+    try:
+        upsert_macro_row(values, market_date, CSV_PATH)
+    except ValueError as e:
+        print(f"❌ New macro row has invalid date. Skip save. ({e})")
         return
 
-    row_date_dt = df_row["date"].iloc[0]
-    row_date_str = row_date_dt.strftime("%Y-%m-%d")
-
-    # 같은 date는 overwrite only
-    df_existing = df_existing[df_existing["date"] != row_date_dt].copy()
-
-    df_updated = pd.concat([df_existing, df_row], ignore_index=True)
-
-    df_updated["date"] = pd.to_datetime(df_updated["date"], errors="coerce")
-    df_updated = df_updated.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-
-    df_updated["date"] = df_updated["date"].dt.strftime("%Y-%m-%d")
-    df_updated["datetime"] = pd.to_datetime(df_updated["date"], errors="coerce").dt.strftime("%Y-%m-%d")
-
-    df_updated.to_csv(CSV_PATH, index=False)
-
-    print(f"✅ Saved row for {row_date_str} (overwrite-safe, sorted)")
+    print(f"✅ Saved row for {market_date} (overwrite-safe, sorted)")
 
 
 if __name__ == "__main__":
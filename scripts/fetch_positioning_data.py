@@ -1,9 +1,13 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import os
 from datetime import datetime
 
+from scripts.log_store import upsert_log_rows
+from scripts.market_backend import get_market_backend
+from scripts.positioning_features import POSITIONING_TICKERS, latest_positioning_features, update_price_panel
+from scripts.gex_engine import compute_gex, get_option_chains, gex_positioning_fields, summarize_gex
+
 
 def save_trade_log(
     prev_weights: dict,
@@ -41,23 +45,14 @@ def save_trade_log(
         })
 
     new_df = pd.DataFrame(rows)
+    if new_df.empty:
+        print(f"[INFO] Trade log skipped (no ETF): {today}")
+        return
 
-    if os.path.exists(filepath):
-        try:
-            old_df = pd.read_csv(filepath)
-            if not old_df.empty and "date" in old_df.columns:
-                old_df["date"] = old_df["date"].astype(str)
-                old_df = old_df[old_df["date"] != today].copy()
-            df = pd.concat([old_df, new_df], ignore_index=True)
-        except Exception:
-            df = new_df
-    else:
-        df = new_df
-
-    os.makedirs("data", exist_ok=True)
-    df.to_csv(filepath, index=False)
+    # 같은 날짜 row는 교체 (append segment + date index)
+    mode = upsert_log_rows(filepath, new_df)
 
-    print(f"✅ Trade log saved/updated: {today}")
+    print(f"✅ Trade log saved/updated: {today} ({mode})")
     print(f"✅ File path: {filepath}")
 
 
@@ -85,29 +80,6 @@ def get_recent_pos_slope(csv_path="data/positioning_data.csv", column_name="SP50
         return 0.0
 
 
-def get_reliable_z_score(ticker_list, period="1y"):
-    """
-    FALLBACK 로직: 리스트 내 티커들을 순차적으로 시도하여
-    유효한 데이터가 나오면 Z-Score를 계산합니다.
-    """
-    for ticker in ticker_list:
-        try:
-            hist = yf.Ticker(ticker).history(period=period)
-            if not hist.empty and len(hist) > 20:
-                close = hist["Close"].dropna()
-                z_score = (close.iloc[-1] - close.mean()) / close.std()
-                print(f"   ✅ 데이터 수집 성공: {ticker}")
-                return round(z_score, 2)
-            else:
-                print(f"   ⚠️ {ticker}: 데이터 부족 또는 empty")
-        except Exception as e:
-            print(f"   ⚠️ {ticker} 시도 실패: {e}")
-            continue
-
-    print("   ❌ 모든 fallback ticker 실패 → 0.0 반환")
-    return 0.0
-
-
 def _load_last_positioning_row(output_path: str):
     """
     기존 CSV에서 마지막 정상 행을 읽어옵니다.
@@ -151,6 +123,14 @@ def _save_positioning_snapshot(results: dict, output_path: str):
         "CTA_MOMENTUM_SCORE",
         "GAMMA_FETCH_OK",
         "CTA_FETCH_OK",
+        "GAMMA_SOURCE",
+        "GEX_TOTAL_BN",
+        "GEX_ZERO_GAMMA",
+        "GEX_SPOT",
+        "GEX_CALL_WALL",
+        "GEX_PUT_WALL",
+        "POSITIONING_AS_OF",
+        "POSITIONING_STALE",
     ]
 
     for col in ordered_cols:
@@ -159,40 +139,14 @@ def _save_positioning_snapshot(results: dict, output_path: str):
 
     new_df = new_df[ordered_cols]
 
-    if not os.path.exists(output_path):
-        new_df.to_csv(output_path, index=False)
-        print(f"✅ 새 positioning_data.csv 생성 완료 ({output_path})")
-        return
-
     try:
-        existing = pd.read_csv(output_path)
-
-        # 컬럼 불일치 보정
-        for col in ordered_cols:
-            if col not in existing.columns:
-                existing[col] = np.nan
-
-        existing = existing[ordered_cols]
-
-        # date 정리
-        existing["date"] = pd.to_datetime(existing["date"], errors="coerce").dt.strftime("%Y-%m-%d")
-        new_df["date"] = pd.to_datetime(new_df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
-
-        target_date = new_df.iloc[0]["date"]
-
-        # 같은 날짜 기존 행 제거
-        existing = existing[existing["date"] != target_date]
-
-        # 새 데이터 추가
-        updated = pd.concat([existing, new_df], ignore_index=True)
-
-        # 날짜 정렬
-        updated["date"] = pd.to_datetime(updated["date"], errors="coerce")
-        updated = updated.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-        updated["date"] = updated["date"].dt.strftime("%Y-%m-%d")
-
-        updated.to_csv(output_path, index=False)
-        print(f"✅ 날짜 기준 overwrite 저장 완료 ({output_path})")
+        # 같은 날짜 overwrite (append segment + date index)
+        mode = upsert_log_rows(
+            output_path,
+            new_df,
+            column_order=lambda _cols: ordered_cols,
+        )
+        print(f"✅ 날짜 기준 overwrite 저장 완료 ({output_path}, {mode})")
 
     except Exception as e:
         print(f"❌ CSV 저장 실패: {e}")
@@ -214,151 +168,157 @@ def fetch_positioning_center():
         "CTA_FETCH_OK": 0,
     }
 
-    # --- [1] CFTC/선물 포지션 Proxy (Fallback 시스템 적용) ---
-    tickers_priority = {
-        "SP500_POS": ["ES=F", "SPY", "VOO"],
-        "US10Y_POS": ["ZN=F", "^TNX", "TLT"],
-        "DXY_POS": ["DX-Y.NYB", "DX=F", "UUP"],
-    }
-
-    for name, t_list in tickers_priority.items():
-        print(f"\n🔎 {name} 분석 중...")
-        results[f"{name}_Z"] = get_reliable_z_score(t_list)
+    # --- [1] CFTC/선물 포지션 Proxy (가격 panel 기반, backtest와 같은 feature engine) ---
+    print("\n🔎 positioning price panel update 중...")
+    features = {}
+    try:
+        panel = update_price_panel()
+        features = latest_positioning_features(panel, as_of=results["date"])
+        print(f"   panel rows = {len(panel)}, as_of = {features.get('as_of')}")
+    except Exception as e:
+        print(f"   ❌ positioning feature 계산 실패: {e}")
+
+    # download 실패 시 panel 기존 값이 그대로 이어짐 → 오늘 row에 stale 표시
+    feature_days = [features.get(f"{col}_AS_OF") for col in POSITIONING_TICKERS]
+    results["POSITIONING_AS_OF"] = min((d for d in feature_days if d), default=None)
+    stale = features.get("STALE", list(POSITIONING_TICKERS)) if features else list(POSITIONING_TICKERS)
+    results["POSITIONING_STALE"] = int(bool(stale))
+    if stale:
+        print(f"   ⚠️ stale positioning feature: {', '.join(stale)} (as_of={results['POSITIONING_AS_OF']})")
+
+    for col in POSITIONING_TICKERS:
+        z = features.get(col)
+        if z is None:
+            print(f"   ⚠️ {col}: 유효 데이터 없음 → 0.0")
+            z = 0.0
+        results[col] = z
+        print(f"   {col} = {results[col]}")
 
     # --- [2] Dealer Gamma Exposure ---
     print("\n🔎 DEALER_GAMMA_BIAS 분석 중...")
+
+    # [2-1] strike-level GEX (실제 option chain 기반)
+    gex = None
     try:
-        spy = yf.Ticker("SPY")
+        gex = compute_gex(get_option_chains("SPY"))
+        print("\n".join(summarize_gex(gex)))
 
-        vix_hist = yf.Ticker("^VIX").history(period="5d")
-        vix_current = vix_hist["Close"].iloc[-1] if not vix_hist.empty else 20.0
-        print(f"   vix_current = {vix_current}")
+        if gex["contracts"] == 0:
+            raise ValueError("no valid contracts (OI / IV)")
 
-        expirations = spy.options[:2]
-        print(f"   expirations = {expirations}")
+        results.update(gex_positioning_fields(gex))
+        results["GAMMA_FETCH_OK"] = 1
+        print(f"   gamma_bias(GEX) = {results['DEALER_GAMMA_BIAS']} ({results['DEALER_GAMMA_LABEL']})")
 
-        if len(expirations) == 0:
-            raise ValueError("SPY option expirations is empty")
+    except Exception as e:
+        gex = None
+        print(f"   ⚠️ GEX 계산 실패 → PCR proxy fallback: {e}")
+
+    # [2-2] PCR/VIX proxy (GEX 실패 시에만)
+    if gex is None:
+        results["GAMMA_SOURCE"] = "PCR_PROXY"
+        try:
+            backend = get_market_backend()
 
-        total_call_oi = 0
-        total_put_oi = 0
+            vix_hist = backend.history("^VIX", period="5d")
+            vix_current = vix_hist["Close"].iloc[-1] if not vix_hist.empty else 20.0
+            print(f"   vix_current = {vix_current}")
 
-        for date in expirations:
-            print(f"   📅 option chain fetch: {date}")
-            opt = spy.option_chain(date)
+            expirations = backend.option_expirations("SPY")[:2]
+            print(f"   expirations = {expirations}")
 
-            if "openInterest" not in opt.calls.columns or "openInterest" not in opt.puts.columns:
-                raise ValueError(f"openInterest column missing for expiration {date}")
+            if len(expirations) == 0:
+                raise ValueError("SPY option expirations is empty")
 
-            call_oi = opt.calls["openInterest"].fillna(0).sum()
-            put_oi = opt.puts["openInterest"].fillna(0).sum()
+            total_call_oi = 0
+            total_put_oi = 0
 
-            print(f"      call_oi={call_oi}, put_oi={put_oi}")
+            for date in expirations:
+                print(f"   📅 option chain fetch: {date}")
+                calls, puts = backend.option_chain("SPY", date)
 
-            total_call_oi += call_oi
-            total_put_oi += put_oi
+                if "openInterest" not in calls.columns or "openInterest" not in puts.columns:
+                    raise ValueError(f"openInterest column missing for expiration {date}")
 
-        print(f"   total_call_oi = {total_call_oi}")
-        print(f"   total_put_oi = {total_put_oi}")
+                call_oi = calls["openInterest"].fillna(0).sum()
+                put_oi = puts["openInterest"].fillna(0).sum()
 
-        if total_call_oi == 0:
-            raise ValueError("total_call_oi is 0, cannot compute PCR")
+                print(f"      call_oi={call_oi}, put_oi={put_oi}")
 
-        pcr = total_put_oi / total_call_oi
+                total_call_oi += call_oi
+                total_put_oi += put_oi
 
-        print(f"   pcr = {pcr:.6f}")
+            print(f"   total_call_oi = {total_call_oi}")
+            print(f"   total_put_oi = {total_put_oi}")
+
+            if total_call_oi == 0:
+                raise ValueError("total_call_oi is 0, cannot compute PCR")
+
+            pcr = total_put_oi / total_call_oi
+
+            print(f"   pcr = {pcr:.6f}")
         
-        # -------------------------------------------------------------------------
-        # [ARCHITECT NOTE: Proxy Boundary Defense]
-        # True dealer gamma requires strike-level gamma aggregation.
-        # This engine uses free-data PCR/VIX proxy only.
-        #
-        # High PCR usually implies downside hedge demand / possible short-gamma stress,
-        # NOT supportive positive gamma.
-        #
-        # Therefore:
-        # - Use inverse PCR to avoid interpreting put-hedge spikes
-        #   as stabilizing gamma support.
-        # - This remains a positioning proxy, not real dealer GEX.
-        # -------------------------------------------------------------------------
+            # -------------------------------------------------------------------------
+            # [ARCHITECT NOTE: Proxy Boundary Defense]
+            # True dealer gamma requires strike-level gamma aggregation.
+            # This engine uses free-data PCR/VIX proxy only.
+            #
+            # High PCR usually implies downside hedge demand / possible short-gamma stress,
+            # NOT supportive positive gamma.
+            #
+            # Therefore:
+            # - Use inverse PCR to avoid interpreting put-hedge spikes
+            #   as stabilizing gamma support.
+            # - This remains a positioning proxy, not real dealer GEX.
+            # -------------------------------------------------------------------------
         
-        if pcr <= 0:
-            raise ValueError("Invalid PCR value")
+            if pcr <= 0:
+                raise ValueError("Invalid PCR value")
         
-        gamma_proxy = round((1 / pcr) * (20 / vix_current), 2)
+            gamma_proxy = round((1 / pcr) * (20 / vix_current), 2)
         
-        # Optional interpretation label
-        if pcr >= 1.5:
-            gamma_label = "PUT_HEDGE_STRESS"
-        elif gamma_proxy >= 1.2:
-            gamma_label = "SQUEEZE_SUPPORTIVE_PROXY"
-        else:
-            gamma_label = "NEUTRAL_OPTION_POSITIONING"
+            # Optional interpretation label
+            if pcr >= 1.5:
+                gamma_label = "PUT_HEDGE_STRESS"
+            elif gamma_proxy >= 1.2:
+                gamma_label = "SQUEEZE_SUPPORTIVE_PROXY"
+            else:
+                gamma_label = "NEUTRAL_OPTION_POSITIONING"
         
-        print(f"   gamma_proxy = {gamma_proxy}")
-        print(f"   gamma_label = {gamma_label}")
+            print(f"   gamma_proxy = {gamma_proxy}")
+            print(f"   gamma_label = {gamma_label}")
         
-        results["DEALER_GAMMA_BIAS"] = gamma_proxy
-        results["DEALER_GAMMA_LABEL"] = gamma_label
-        results["GAMMA_FETCH_OK"] = 1
+            results["DEALER_GAMMA_BIAS"] = gamma_proxy
+            results["DEALER_GAMMA_LABEL"] = gamma_label
+            results["GAMMA_FETCH_OK"] = 1
 
 
-    except Exception as e:
-        print(f"   ❌ Dealer Gamma 분석 실패: {e}")
-
-        prev_gamma = None
-        if last_row is not None:
-            try:
-                prev_gamma = float(last_row.get("DEALER_GAMMA_BIAS"))
-            except Exception:
-                prev_gamma = None
-
-        if prev_gamma is not None:
-            print(f"   ⚠️ 이전 gamma 값 유지: {prev_gamma}")
-            results["DEALER_GAMMA_BIAS"] = prev_gamma
-        else:
-            print("   ⚠️ 이전 gamma 값 없음 → 중립값 1.0 사용")
-            results["DEALER_GAMMA_BIAS"] = 1.0
+        except Exception as e:
+            print(f"   ❌ Dealer Gamma 분석 실패: {e}")
+
+            prev_gamma = None
+            if last_row is not None:
+                try:
+                    prev_gamma = float(last_row.get("DEALER_GAMMA_BIAS"))
+                except Exception:
+                    prev_gamma = None
+
+            if prev_gamma is not None:
+                print(f"   ⚠️ 이전 gamma 값 유지: {prev_gamma}")
+                results["DEALER_GAMMA_BIAS"] = prev_gamma
+            else:
+                print("   ⚠️ 이전 gamma 값 없음 → 중립값 1.0 사용")
+                results["DEALER_GAMMA_BIAS"] = 1.0
 
     # --- [3] CTA Momentum (Trend Following) ---
     print("\n🔎 CTA_MOMENTUM_SCORE 분석 중...")
-    try:
-        spy_hist = yf.Ticker("SPY").history(period="1y")
-        print(f"   SPY rows: {len(spy_hist)}")
-
-        if spy_hist.empty:
-            raise ValueError("SPY history empty")
-
-        close = spy_hist["Close"].dropna()
-        current = close.iloc[-1]
-        ma50 = close.rolling(50).mean().iloc[-1]
-        ma200 = close.rolling(200).mean().iloc[-1]
-
-        print(f"   current = {current:.4f}")
-        print(f"   ma50    = {ma50:.4f}")
-        print(f"   ma200   = {ma200:.4f}")
-
-        cta_score = 0.0
-        if current > ma50:
-            cta_score += 0.5
-            print("   +0.5 : current > ma50")
-        if current > ma200:
-            cta_score += 0.5
-            print("   +0.5 : current > ma200")
-        if current < ma50:
-            cta_score -= 0.5
-            print("   -0.5 : current < ma50")
-        if current < ma200:
-            cta_score -= 0.5
-            print("   -0.5 : current < ma200")
-
-        print(f"   cta_score = {cta_score}")
-
-        results["CTA_MOMENTUM_SCORE"] = cta_score
+    if features.get("CTA_FETCH_OK"):
+        results["CTA_MOMENTUM_SCORE"] = features["CTA_MOMENTUM_SCORE"]
         results["CTA_FETCH_OK"] = 1
+        print(f"   cta_score = {results['CTA_MOMENTUM_SCORE']}")
 
-    except Exception as e:
-        print(f"   ❌ CTA 분석 실패: {e}")
+    else:
+        print("   ❌ CTA 분석 실패: MA200 계산에 필요한 SPY panel 부족")
 
         prev_cta = None
         if last_row is not None:
@@ -1,14 +1,15 @@
-import requests
 import re
 from typing import Optional
 
+from scripts.market_backend import get_market_backend
+
 
 CNN_URL = "https://edition.cnn.com/markets/fear-and-greed"
 
 
 def fetch_cnn_fear_greed() -> Optional[float]:
     """
-    CNN Fear & Greed Index 크롤링
+    CNN Fear & Greed Index 크롤링 (market backend 경유 → record/replay 지원)
     실패 시 None 반환
     """
 
@@ -17,8 +18,7 @@ def fetch_cnn_fear_greed() -> Optional[float]:
     }
 
     try:
-        response = requests.get(CNN_URL, headers=headers, timeout=10)
-        html = response.text
+        html = get_market_backend().get_text(CNN_URL, headers=headers, timeout=10)
 
         match = re.search(r'"fear_and_greed":{"score":(\d+)', html)
 
@@ -3,6 +3,10 @@ from __future__ import annotations
 from pathlib import Path
 import pandas as pd
 
+from scripts.derived_series import update_derived_csv
+from scripts.log_store import read_log_tail
+from scripts.macro_schema import DATE_COL, read_macro_csv
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 
@@ -11,16 +15,6 @@ CREDIT_CSV = DATA_DIR / "credit_spread_data.csv" # date,HY_OAS
 OUT_CSV = DATA_DIR / "sentiment_proxy.csv"
 
 
-EXPECTED_MACRO_COLS = ["datetime", "US10Y", "DXY", "WTI", "VIX", "USDKRW", "HYG", "LQD"]
-
-
-def _to_float(x):
-    try:
-        return float(x)
-    except Exception:
-        return None
-
-
 def _zscore(series: pd.Series, window: int = 120, min_periods: int = 20) -> pd.Series:
     s = pd.to_numeric(series, errors="coerce")
     mu = s.rolling(window=window, min_periods=min_periods).mean()
@@ -29,74 +23,68 @@ def _zscore(series: pd.Series, window: int = 120, min_periods: int = 20) -> pd.S
     return z
 
 
-def _load_macro_df() -> pd.DataFrame:
-    """
-    Robust loader:
-    - Accepts 'date' or 'datetime'
-    - If header missing or corrupted, tries reading with fixed column names
-    """
-    if not MACRO_CSV.exists():
-        raise FileNotFoundError(f"missing {MACRO_CSV}")
+def _combine(frame: pd.DataFrame) -> pd.DataFrame:
+    """VIX / HY_OAS / HYG-LQD z-score 가중 평균 -> 0~100 (사용 가능한 component만 재가중)."""
+    components = [
+        ("VIX_z", -0.45, "VIX"),
+        ("HY_OAS_z", -0.35, "HY_OAS"),
+        ("HYG_LQD_z", 0.20, "HYG/LQD"),
+    ]
 
-    # 1) normal read
-    df = pd.read_csv(MACRO_CSV)
+    score = pd.Series(0.0, index=frame.index)
+    w_sum = pd.Series(0.0, index=frame.index)
+    used = pd.Series("", index=frame.index)
 
-    # If header is broken (single column) try fallback
-    if df.shape[1] == 1 and df.columns.tolist() == [EXPECTED_MACRO_COLS[0]]:
-        # rare case: file already has correct header but parsing odd; keep as-is
-        pass
+    for col, weight, label in components:
+        z = pd.to_numeric(frame[col], errors="coerce")
+        ok = z.notna()
+        score = score + (weight * z).where(ok, 0.0)
+        w_sum = w_sum + abs(weight) * ok
+        used = used.where(~ok, used.where(used == "", used + "+") + label)
 
-    # If no 'date'/'datetime', try forcing names (headerless append scenario)
-    if ("date" not in df.columns) and ("datetime" not in df.columns):
-        df2 = pd.read_csv(MACRO_CSV, header=None, names=EXPECTED_MACRO_COLS)
-        # sanity: must at least have datetime + VIX
-        if "datetime" in df2.columns and "VIX" in df2.columns:
-            df = df2
+    proxy = (50 + 15 * (score / w_sum.where(w_sum > 0))).clip(0.0, 100.0)
 
-    # Now decide time column
-    time_col = "date" if "date" in df.columns else ("datetime" if "datetime" in df.columns else None)
-    if time_col is None:
-        raise RuntimeError("macro_data.csv missing 'date'/'datetime' column")
+    return pd.DataFrame({
+        "sentiment_proxy": proxy.where(w_sum > 0, 50.0).astype(float),
+        "used": used.where(w_sum > 0, "fallback"),
+    })
 
-    df[time_col] = pd.to_datetime(df[time_col], errors="coerce")
-    df = df.dropna(subset=[time_col]).sort_values(time_col)
 
-    # Normalize column name to 'datetime' internally
-    if time_col != "datetime":
-        df = df.rename(columns={time_col: "datetime"})
+OUT_COLS = ["date", "sentiment_proxy", "used", "vix", "hy_oas", "hyg_lqd"]
 
-    # numeric conversion
-    for c in ["VIX", "HYG", "LQD"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
+SENTIMENT_SPECS = [
+    {"outputs": ["VIX_z"], "inputs": ["vix"], "window": 120, "func": lambda f: _zscore(f["vix"], window=120)},
+    {"outputs": ["HY_OAS_z"], "inputs": ["hy_oas"], "window": 60, "func": lambda f: _zscore(f["hy_oas"], window=60)},
+    {"outputs": ["HYG_LQD_z"], "inputs": ["hyg_lqd"], "window": 120, "func": lambda f: _zscore(f["hyg_lqd"], window=120)},
+    {
+        "outputs": ["sentiment_proxy", "used"],
+        "inputs": ["VIX_z", "HY_OAS_z", "HYG_LQD_z"],
+        "window": 0,
+        "func": _combine,
+    },
+]
 
-    return df
 
+def _load_macro_df() -> pd.DataFrame:
+    """
+    macro_data.csv 읽기는 macro_schema.read_macro_csv로 통일
+    (header 누락 / 컬럼 drift 보정은 macro_schema 담당, 여기서는 repair 안 함)
+    """
+    if not MACRO_CSV.exists():
+        raise FileNotFoundError(f"missing {MACRO_CSV}")
+
+    return read_macro_csv(MACRO_CSV)
 
 
 def main() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+    # read_macro_csv가 date(datetime64) 파싱 / 중복 날짜 제거 / 정렬까지 보장 → 여기서 재정규화 안 함
     macro = _load_macro_df()
-    # ✅ FIX: handle duplicated datetime/date columns safely
-    macro = macro.loc[:, ~macro.columns.duplicated()].copy()
-
-    dt_col = "date" if "date" in macro.columns else ("datetime" if "datetime" in macro.columns else None)
-    if dt_col is None:
-        raise RuntimeError("macro_data.csv must contain a 'date' column (or 'datetime').")
-
-    macro[dt_col] = pd.to_datetime(macro[dt_col], errors="coerce")
-    macro = macro.dropna(subset=[dt_col]).copy()
-
-    macro["d"] = macro[dt_col].dt.strftime("%Y-%m-%d")
     if macro.empty:
         raise RuntimeError("macro_data.csv is empty after parsing")
 
-    # daily key: last print of each day
- 
-    daily = macro.groupby("d").tail(1).copy()
-    daily["d"] = pd.to_datetime(daily["d"], errors="coerce")
-    daily = daily.dropna(subset=["d"]).sort_values("d")
+    daily = macro.assign(d=macro[DATE_COL])
 
     # HY OAS (last available, as-of merge)
     if CREDIT_CSV.exists():
@@ -117,56 +105,28 @@ def main() -> None:
     else:
         daily["HY_OAS"] = pd.NA
 
-    # --- components ---
-    daily["VIX_z"] = _zscore(daily["VIX"], window=120) if "VIX" in daily.columns else pd.NA
-    daily["HY_OAS_z"] = _zscore(daily["HY_OAS"], window=60)
-    daily["HYG_LQD"] = (daily["HYG"] / daily["LQD"]) if ("HYG" in daily.columns and "LQD" in daily.columns) else pd.NA
-    daily["HYG_LQD_z"] = _zscore(daily["HYG_LQD"], window=120)
-    # --- combine into 0~100 ---
-    def _combine(row):
-        score = 0.0
-        w_sum = 0.0
-        used = []
-
-        if pd.notna(row.get("VIX_z")):
-            score += 0.45 * (-row["VIX_z"])
-            w_sum += 0.45
-            used.append("VIX")
-        if pd.notna(row.get("HY_OAS_z")):
-            score += 0.35 * (-row["HY_OAS_z"])
-            w_sum += 0.35
-            used.append("HY_OAS")
-        if pd.notna(row.get("HYG_LQD_z")):
-            score += 0.20 * (row["HYG_LQD_z"])
-            w_sum += 0.20
-            used.append("HYG/LQD")
-
-        if w_sum == 0:
-            return 50.0, "fallback"
-
-        score = score / w_sum
-        proxy = 50 + 15 * score
-        proxy = max(0.0, min(100.0, proxy))
-        return float(proxy), "+".join(used)
-
-    out_rows = []
-    for _, r in daily.iterrows():
-        proxy, used = _combine(r)
-        out_rows.append(
-            {
-                "date": r["d"].strftime("%Y-%m-%d"),
-                "sentiment_proxy": proxy,
-                "used": used,
-                "vix": _to_float(r.get("VIX")),
-                "hy_oas": _to_float(r.get("HY_OAS")),
-                "hyg_lqd": _to_float(r.get("HYG_LQD")),
-            }
-        )
-
-    out = pd.DataFrame(out_rows)
-    out.to_csv(OUT_CSV, index=False)
-    print(f"[OK] sentiment_proxy updated: {OUT_CSV} (rows={len(out)})")
-    print("[DEBUG] last:", out.tail(1).to_dict(orient="records")[0])
+    # --- source (저장 컬럼) -> derived (z-score / proxy)는 바뀐 날짜 이후만 계산 ---
+    source = pd.DataFrame({
+        "date": daily["d"].dt.strftime("%Y-%m-%d"),
+        "vix": pd.to_numeric(daily["VIX"], errors="coerce") if "VIX" in daily.columns else pd.NA,
+        "hy_oas": pd.to_numeric(daily["HY_OAS"], errors="coerce"),
+        "hyg_lqd": (
+            pd.to_numeric(daily["HYG"], errors="coerce") / pd.to_numeric(daily["LQD"], errors="coerce")
+            if ("HYG" in daily.columns and "LQD" in daily.columns) else pd.NA
+        ),
+    })
+    for c in ["vix", "hy_oas", "hyg_lqd"]:
+        source[c] = pd.to_numeric(source[c], errors="coerce")
+
+    info = update_derived_csv(OUT_CSV, source, SENTIMENT_SPECS, columns=OUT_COLS)
+    print(
+        f"[OK] sentiment_proxy updated: {OUT_CSV} "
+        f"(dirty_from={info['dirty_from']}, rows_written={info['rows']}, mode={info['mode']})"
+    )
+
+    last = read_log_tail(OUT_CSV, 1)
+    if not last.empty:
+        print("[DEBUG] last:", last.tail(1).to_dict(orient="records")[0])
 
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@ from datetime import datetime, timezone, timedelta
 import pandas as pd
 import os
 
+from scripts.derived_series import update_derived_csv
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 YIELD_SOURCE = DATA_DIR / "sovereign_yields.csv" # 👈 원본 데이터 소스 추가
@@ -14,6 +16,22 @@ KST = timezone(timedelta(hours=9))
 
 YIELD_COLS = ["US10Y_Y", "KR10Y_Y", "JP10Y_Y", "CN10Y_Y", "DE10Y_Y", "IL10Y_Y", "TR10Y_Y", "GB10Y_Y", "MX10Y_Y"]
 SPREAD_COLS = ["KR10Y_SPREAD", "JP10Y_SPREAD", "CN10Y_SPREAD", "DE10Y_SPREAD", "IL10Y_SPREAD", "TR10Y_SPREAD", "GB10Y_SPREAD", "MX10Y_SPREAD"]
+COUNTRIES = ["KR", "JP", "CN", "DE", "IL", "TR", "GB", "MX"]
+
+
+def _spread_spec(cc: str) -> dict:
+    # 각국 10Y - US10Y (둘 다 직전 값 forward-fill 후 계산)
+    y_col = f"{cc}10Y_Y"
+    return {
+        "outputs": [f"{cc}10Y_SPREAD"],
+        "inputs": [y_col, "US10Y_Y"],
+        "window": 0,
+        "ffill": True,
+        "func": lambda f: pd.to_numeric(f[y_col], errors="coerce") - pd.to_numeric(f["US10Y_Y"], errors="coerce"),
+    }
+
+
+SPREAD_SPECS = [_spread_spec(cc) for cc in COUNTRIES]
 
 def main() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -28,21 +46,13 @@ def main() -> None:
     yields_raw = pd.read_csv(YIELD_SOURCE)
     yields_raw['date'] = pd.to_datetime(yields_raw['date'])
     
-    # 2. 기존 스프레드 파일 로드 (있다면)
-    if OUT_CSV.exists():
-        existing_spreads = pd.read_csv(OUT_CSV)
-        existing_spreads['date'] = pd.to_datetime(existing_spreads['date'])
-    else:
-        existing_spreads = pd.DataFrame(columns=['date'])
-
-    # 3. 날짜 범위 설정 (원본 데이터의 전체 기간 유지)
+    # 2. 날짜 범위 설정 (원본 데이터의 전체 기간 유지)
     start_date = yields_raw['date'].min()
     today_ts = pd.Timestamp(datetime.now(KST).date())
     full_dates = pd.date_range(start=start_date, end=today_ts, freq="D")
     base = pd.DataFrame({"date": full_dates})
 
-    # 4. 데이터 병합 및 계산
-    # 원본 금리 데이터를 base에 합침
+    # 3. 원본 금리 데이터를 base에 합침
     updated = base.merge(yields_raw, on="date", how="left")
     
     # 컬럼명 보정 (예: US10Y -> US10Y_Y)
@@ -50,26 +60,23 @@ def main() -> None:
     rename_dict = {col.replace('_Y', ''): col for col in YIELD_COLS}
     updated = updated.rename(columns=rename_dict)
 
+    yield_cols = [c for c in YIELD_COLS if c in updated.columns]
+    source = updated[["date"] + yield_cols].sort_values("date").drop_duplicates("date", keep="last")
+
+    # 4. 변경된 날짜 이후만 스프레드 계산 + 파일 꼬리 교체
     # US10Y_Y가 있어야 스프레드 계산 가능
-    if "US10Y_Y" in updated.columns:
-        us_yield = pd.to_numeric(updated["US10Y_Y"], errors="coerce").ffill()
-        
-        for cc in ["KR", "JP", "CN", "DE", "IL", "TR", "GB", "MX"]:
-            y_col = f"{cc}10Y_Y"
-            s_col = f"{cc}10Y_SPREAD"
-            if y_col in updated.columns:
-                target_yield = pd.to_numeric(updated[y_col], errors="coerce").ffill()
-                updated[s_col] = target_yield - us_yield
-
-    # 5. 저장 전 정리
-    updated = updated.sort_values("date").drop_duplicates("date", keep="last")
-    updated["date"] = updated["date"].dt.strftime("%Y-%m-%d")
-
-    # 필요한 컬럼만 추출 (date + YIELD + SPREAD)
-    final_cols = ["date"] + [c for c in YIELD_COLS if c in updated.columns] + [c for c in SPREAD_COLS if c in updated.columns]
-    updated[final_cols].to_csv(OUT_CSV, index=False)
-
-    print(f"[OK] sovereign_spreads sync complete: {OUT_CSV} (rows={len(updated)})")
+    spread_cols = []
+    if "US10Y_Y" in yield_cols:
+        spread_cols = [f"{cc}10Y_SPREAD" for cc in COUNTRIES if f"{cc}10Y_Y" in yield_cols]
+    specs = [spec for spec in SPREAD_SPECS if spec["outputs"][0] in spread_cols]
+
+    final_cols = ["date"] + yield_cols + spread_cols
+    info = update_derived_csv(OUT_CSV, source, specs, columns=final_cols)
+
+    print(
+        f"[OK] sovereign_spreads sync complete: {OUT_CSV} "
+        f"(dirty_from={info['dirty_from']}, rows_written={info['rows']}, mode={info['mode']})"
+    )
 
 if __name__ == "__main__":
     main()
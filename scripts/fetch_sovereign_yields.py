@@ -5,6 +5,9 @@ from datetime import datetime, timezone, timedelta
 import time
 import pandas as pd
 
+from scripts.freshness_index import record_frame
+from scripts.market_backend import get_market_backend
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 OUT_CSV = DATA_DIR / "sovereign_yields.csv"
@@ -29,7 +32,7 @@ def fetch_fred_csv(series_id: str, max_retries: int = 3) -> pd.DataFrame:
 
     for attempt in range(1, max_retries + 1):
         try:
-            df = pd.read_csv(url)
+            df = get_market_backend().read_csv_url(url)
 
             if df is None or df.empty:
                 return pd.DataFrame()
@@ -119,6 +122,7 @@ def main(days: int = 365) -> None:
 
     merged["date"] = merged["date"].dt.strftime("%Y-%m-%d")
     merged.to_csv(OUT_CSV, index=False)
+    record_frame(OUT_CSV, merged, source_as_of={col: df["date"].max().date() for col, df in fetched.items()})
 
     print(f"✅ 업데이트 완료: {OUT_CSV} ({len(merged)} rows)")
 
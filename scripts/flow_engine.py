@@ -0,0 +1,530 @@
+# scripts/flow_engine.py
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from scripts.log_store import count_log_keys, read_log_tail, replace_log_tail, upsert_log_rows
+
+# =========================================================
+# Institutional Flow Engine (vectorized, history 공용)
+# ---------------------------------------------------------
+# institutional_flow_engine_filter의 점수 규칙을 date x feature panel 위에서 한 번에 계산.
+#   live   : filter가 오늘 market_data에서 feature 1 row를 뽑아 같은 kernel 호출
+#   history: data/flow_history.csv 전체 (또는 임의 panel)를 한 번에 계산
+#
+# transition (monitor_sew.classify_flow_transition 규칙):
+#   - FLOW_BREAK / FLOW_FADE / EARLY_TRACE / ... 판정은 전일 score와 vectorized 비교
+#   - persistence_days는 전일 값에 의존하므로 정수 배열 1회 선형 scan
+#
+# 저장: data/flow_history.csv (date 1 row, log_store index -> 오늘 row만 append/replace)
+#   FEATURE_SOURCE = LIVE         : feature 전체 보유 -> rebuild 시 kernel로 재계산
+#                    STORED_SCORE : market_data_history의 FLOW_SCORE/STATE로 backfill
+#                                   (과거 feature 미보관 구간, score 그대로 사용)
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+FLOW_HISTORY_PATH = DATA_DIR / "flow_history.csv"
+MARKET_HISTORY_PATH = DATA_DIR / "market_data_history.csv"
+
+SHORT_HORIZON_RULES = [
+    # (feature, threshold, abs 사용)
+    ("SPY_RET_15M", 0.25, False),
+    ("SPY_RET_30M", 0.40, False),
+    ("WTI_RET_15M", 0.60, True),
+    ("WTI_RET_30M", 0.90, True),
+    ("GOLD_RET_15M", 0.30, True),
+    ("GOLD_RET_30M", 0.45, True),
+    ("DXY_RET_15M", 0.10, True),
+    ("DXY_RET_30M", 0.15, True),
+]
+
+VALIDATION_ASSETS = ["HYG", "LQD", "EEM", "FXI", "XLK", "XLI", "XLF", "XLY", "XLP", "XLU"]
+
+CLEAR_FLOW_LABELS = ["DISINFLATION_RISK_ON", "SYSTEMIC_HEDGE", "TIGHTENING_PRESSURE", "OIL_SHOCK"]
+
+FEATURE_COLUMNS = (
+    ["DRIFT_SCORE", "DRIFT_LABEL", "GAMMA_STATE", "GEX_REGIME", "GEX_FLIP_DISTANCE_PCT", "SEW_STATUS", "SP500_POS_Z"]
+    + [col for col, _, _ in SHORT_HORIZON_RULES]
+    + [f"{asset}_RET_1D" for asset in VALIDATION_ASSETS]
+)
+
+# (min score, state, confidence, interpretation, action_bias) - 위에서부터 첫 매칭
+FLOW_STATE_TABLE = [
+    (7, "🔥 BUILDING HARD", "HIGH", "뉴스 전 방향성 자금 축적 가능성 높음", "EARLY PREP"),
+    (5, "⚡ BUILDING", "MEDIUM-HIGH", "기관성 흐름 형성 가능성", "WATCHLIST"),
+    (3, "👀 EARLY TRACE", "MEDIUM", "흔적은 있으나 확신은 이르다", "MONITOR"),
+    (1, "🌱 LIGHT TRACE", "LOW-MEDIUM", "약한 초기 수급 흔적은 있으나 확정적 기관 흐름은 아님", "OBSERVE"),
+]
+NO_FLOW_ROW = ("NO CLEAR FLOW", "LOW", "기관성 축적 흔적 불충분", "IGNORE")
+
+TRANSITION_NOTES = {
+    "FLOW_BREAK": "전일 형성되던 기관성 흐름이 유지되지 못하고 소멸",
+    "FLOW_FADE": "기관성 흐름은 남아 있으나 강도 약화",
+    "EARLY_TRACE": "기관성 흐름 초기 흔적 발생",
+    "TRACE_BUILDING": "기관성 흐름이 전일 대비 강화",
+    "CONFIRMED_FLOW": "기관성 흐름이 높은 강도로 확인",
+    "NO_FLOW_BASE": "기관성 흐름 부재 상태 지속",
+}
+HOLD_NOTE = "기관성 흐름 상태 유지"
+
+SCORE_COLUMNS = [
+    "FLOW_SCORE", "FLOW_STATE", "FLOW_CONFIDENCE", "FLOW_INTERPRETATION", "FLOW_ACTION_BIAS",
+    "VALIDATION_SCORE", "VALIDATION_BOOST", "GAMMA_SOURCE",
+]
+TRANSITION_COLUMNS = [
+    "TRANSITION_STATE", "PREV_FLOW_STATE", "PREV_FLOW_SCORE", "FLOW_DELTA",
+    "PERSISTENCE_DAYS", "TRANSITION", "TRANSITION_NOTE",
+]
+HISTORY_COLUMNS = ["date", "FEATURE_SOURCE"] + FEATURE_COLUMNS + SCORE_COLUMNS + TRANSITION_COLUMNS
+
+
+# -------------------------
+# Feature extraction (live)
+# -------------------------
+def flow_features_from_market_data(market_data: Dict[str, Any]) -> Dict[str, Any]:
+    """institutional_flow_engine_filter가 읽는 입력을 feature row 하나로 정리."""
+    drift = market_data.get("DRIFT", {}) or {}
+    gex = market_data.get("GEX", {}) or {}
+    drift_data = market_data.get("DRIFT_DATA", {}) or {}
+
+    def g(asset: str, key: str):
+        try:
+            return drift_data.get(asset, {}).get(key)
+        except Exception:
+            return None
+
+    pos_z = market_data.get("SP500_POS_Z", 0.0)
+    try:
+        pos_z = float(pos_z)
+    except Exception:
+        pos_z = 0.0
+
+    row = {
+        "DRIFT_SCORE": drift.get("score", 0),
+        "DRIFT_LABEL": str(drift.get("label", "N/A") or "N/A"),
+        "GAMMA_STATE": str(market_data.get("GAMMA_STATE", "UNKNOWN") or "UNKNOWN"),
+        "GEX_REGIME": str(gex.get("regime", "UNKNOWN") or "UNKNOWN").upper(),
+        "GEX_FLIP_DISTANCE_PCT": gex.get("flip_distance_pct"),
+        "SEW_STATUS": str(market_data.get("SEW_STATUS", "N/A") or "N/A").upper(),
+        "SP500_POS_Z": pos_z,
+    }
+    for col, _, _ in SHORT_HORIZON_RULES:
+        asset, _, horizon = col.split("_")
+        row[col] = g(asset, f"ret_{horizon.lower()}")
+    for asset in VALIDATION_ASSETS:
+        row[f"{asset}_RET_1D"] = g(asset, "ret_1d")
+
+    return row
+
+
+# -------------------------
+# Score kernel
+# -------------------------
+def _num(panel: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in panel.columns:
+        return np.full(len(panel), np.nan, dtype="float64")
+    return pd.to_numeric(panel[col], errors="coerce").to_numpy(dtype="float64")
+
+
+def _text(panel: pd.DataFrame, col: str, default: str, upper: bool = False) -> np.ndarray:
+    if col not in panel.columns:
+        values = [default] * len(panel)
+    else:
+        values = [default if pd.isna(v) else str(v) for v in panel[col].tolist()]
+    return np.array([v.upper() for v in values] if upper else values, dtype=object)
+
+
+def flow_score_kernel(panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    panel: row = 날짜, 컬럼 = FEATURE_COLUMNS (없는 컬럼 / NaN은 filter의 None과 동일 취급)
+    Return: 같은 index x [PTS_* 구성 점수, V_* validation flag, SCORE_COLUMNS]
+    (컬럼별 numpy 배열 연산 → live 1 row 호출도 pandas op overhead 없이 계산)
+    """
+    out: Dict[str, Any] = {}
+
+    drift_score = np.nan_to_num(_num(panel, "DRIFT_SCORE"), nan=0.0)
+    out["PTS_DRIFT"] = np.select([drift_score >= 4, drift_score >= 3, drift_score >= 2], [3, 2, 1], 0)
+
+    drift_label = _text(panel, "DRIFT_LABEL", "N/A")
+    out["PTS_LABEL"] = np.isin(drift_label, CLEAR_FLOW_LABELS).astype(int)
+
+    short_hits = np.zeros(len(panel), dtype=int)
+    for col, thr, use_abs in SHORT_HORIZON_RULES:
+        v = _num(panel, col)
+        short_hits += ((np.abs(v) if use_abs else v) >= thr).astype(int)
+    out["SHORT_HITS"] = short_hits
+    out["PTS_SHORT"] = np.select([short_hits >= 3, short_hits >= 2], [2, 1], 0)
+
+    # gamma: GEX regime 우선, 없으면 pseudo gamma state
+    gex_regime = _text(panel, "GEX_REGIME", "UNKNOWN", upper=True)
+    flip = _num(panel, "GEX_FLIP_DISTANCE_PCT")
+    gamma_state = _text(panel, "GAMMA_STATE", "UNKNOWN")
+    has_gex = np.isin(gex_regime, ["SHORT_GAMMA", "LONG_GAMMA"])
+    gamma_transition = np.array(["TRANSITION" in v for v in gamma_state], dtype=bool)
+    gamma_negative = np.array(["NEGATIVE" in v for v in gamma_state], dtype=bool)
+    out["GAMMA_REASON"] = np.select(
+        [
+            gex_regime == "SHORT_GAMMA",
+            (gex_regime == "LONG_GAMMA") & (np.abs(flip) <= 1.0),
+            ~has_gex & gamma_transition,
+            ~has_gex & gamma_negative,
+        ],
+        ["GEX_SHORT", "GEX_FLIP", "TRANSITION", "NEGATIVE"],
+        "",
+    )
+    out["PTS_GAMMA"] = (out["GAMMA_REASON"] != "").astype(int)
+    out["GAMMA_SOURCE"] = np.where(has_gex, "GEX", "PSEUDO")
+
+    sew = _text(panel, "SEW_STATUS", "N/A", upper=True)
+    out["PTS_SEW"] = np.select([sew == "STABLE", np.isin(sew, ["WATCH", "ALERT"])], [1, -1], 0)
+
+    pos_z = _num(panel, "SP500_POS_Z")
+    out["PTS_POS"] = np.select([pos_z >= 2.0, pos_z >= 1.5], [-2, -1], 0)
+
+    # validation layer
+    r = {asset: _num(panel, f"{asset}_RET_1D") for asset in VALIDATION_ASSETS}
+
+    participation = sum((r[a] > 0).astype(int) for a in ["HYG", "EEM", "FXI"])
+    leadership = sum((r[a] > 0).astype(int) for a in ["XLK", "XLI", "XLF", "XLY"])
+    defensive_weak = sum((r[a] <= 0).astype(int) for a in ["XLP", "XLU"])
+    cyclical_strong = sum((r[a] > 0).astype(int) for a in ["XLI", "XLY", "XLK"])
+
+    out["V_PARTICIPATION"] = (participation >= 2).astype(int)
+    out["V_CREDIT"] = (r["HYG"] >= r["LQD"]).astype(int)
+    out["V_LEADERSHIP"] = (leadership >= 2).astype(int)
+    out["V_CYCLICAL"] = ((cyclical_strong >= 2) & (defensive_weak >= 1)).astype(int)
+
+    out["VALIDATION_SCORE"] = out["V_PARTICIPATION"] + out["V_CREDIT"] + out["V_LEADERSHIP"] + out["V_CYCLICAL"]
+    out["VALIDATION_BOOST"] = np.minimum(out["VALIDATION_SCORE"], 2)
+
+    score = (
+        out["PTS_DRIFT"] + out["PTS_LABEL"] + out["PTS_SHORT"] + out["PTS_GAMMA"]
+        + out["PTS_SEW"] + out["PTS_POS"] + out["VALIDATION_BOOST"]
+    )
+    out["FLOW_SCORE"] = score.astype(int)
+
+    conds = [score >= row[0] for row in FLOW_STATE_TABLE]
+    for i, col in enumerate(["FLOW_STATE", "FLOW_CONFIDENCE", "FLOW_INTERPRETATION", "FLOW_ACTION_BIAS"]):
+        out[col] = np.select(conds, [row[i + 1] for row in FLOW_STATE_TABLE], NO_FLOW_ROW[i])
+
+    return pd.DataFrame(out, index=panel.index)
+
+
+def flow_reasons(row: Mapping[str, Any], drift_label: str) -> List[str]:
+    """kernel 구성 점수 -> filter 출력용 driver 문구 (기존 순서 유지)."""
+    reasons: List[str] = []
+
+    reasons += {3: ["Drift strong"], 2: ["Drift building"], 1: ["Drift early"]}.get(int(row["PTS_DRIFT"]), [])
+    if int(row["PTS_LABEL"]):
+        reasons.append(f"Clear flow label: {drift_label}")
+    reasons += {2: ["Short-horizon pre-move cluster"], 1: ["Short-horizon pre-move"]}.get(int(row["PTS_SHORT"]), [])
+    reasons += {
+        "GEX_SHORT": ["Dealer short gamma (GEX) amplifies flow"],
+        "GEX_FLIP": ["Near zero-gamma flip (GEX)"],
+        "TRANSITION": ["Gamma transition"],
+        "NEGATIVE": ["Gamma acceleration regime"],
+    }.get(str(row["GAMMA_REASON"]), [])
+    reasons += {1: ["No shock yet"], -1: ["Shock already leaking into tape"]}.get(int(row["PTS_SEW"]), [])
+    reasons += {-2: ["Positioning overheated"], -1: ["Positioning somewhat stretched"]}.get(int(row["PTS_POS"]), [])
+
+    if int(row["V_PARTICIPATION"]):
+        reasons.append("Cross-asset risk participation")
+    if int(row["V_CREDIT"]):
+        reasons.append("Credit confirms risk appetite")
+    if int(row["V_LEADERSHIP"]):
+        reasons.append("Leadership breadth expanding")
+    if int(row["V_CYCLICAL"]):
+        reasons.append("Cyclical leadership over defensives")
+
+    return reasons
+
+
+# -------------------------
+# Transition / persistence
+# -------------------------
+def flow_transition_series(
+    scores: pd.Series,
+    states: pd.Series,
+    seed: Optional[Mapping[str, Any]] = None,
+) -> pd.DataFrame:
+    """
+    날짜순 (score, raw state) 시계열 -> classify_flow_transition을 매일 적용한 결과.
+    seed: 첫 row 이전 상태 {"flow_state", "flow_score", "persistence_days"} (없으면 N/A / 0 / 0)
+    """
+    seed = seed or {}
+    s = pd.to_numeric(scores, errors="coerce").fillna(0).astype(int).to_numpy()
+    raw = states.astype(str).to_numpy()
+    n = len(s)
+
+    prev = np.empty(n, dtype=int)
+    if n:
+        prev[0] = int(seed.get("flow_score", 0) or 0)
+        prev[1:] = s[:-1]
+
+    codes = np.select(
+        [
+            (prev >= 2) & (s == 0),
+            (prev >= 3) & (s > 0) & (s < prev),
+            (prev < 2) & (s >= 2),
+            (s > prev) & (s >= 3),
+            s >= 5,
+            (s < 2) & (prev < 2),
+        ],
+        [1, 2, 3, 4, 5, 6],
+        0,
+    )
+    names = np.array(["", "FLOW_BREAK", "FLOW_FADE", "EARLY_TRACE", "TRACE_BUILDING", "CONFIRMED_FLOW", "NO_FLOW_BASE"], dtype=object)
+    state = np.where(codes == 0, raw, names[codes])
+
+    # persistence: 전일 값 의존 -> 선형 scan
+    persistence = np.zeros(n, dtype=int)
+    p = int(seed.get("persistence_days", 0) or 0)
+    for i in range(n):
+        c = codes[i]
+        if c == 1 or c == 6:
+            p = 0
+        elif c == 2:
+            p = max(0, p - 1)
+        elif c == 3:
+            p = 1
+        elif c == 4 or c == 5:
+            p = p + 1
+        else:
+            p = p if s[i] >= 2 else 0
+        persistence[i] = p
+
+    prev_state = np.empty(n, dtype=object)
+    if n:
+        prev_state[0] = str(seed.get("flow_state", "N/A") or "N/A")
+        prev_state[1:] = state[:-1]
+
+    note = np.where(codes == 0, HOLD_NOTE, pd.Series(names[codes]).map(TRANSITION_NOTES).to_numpy())
+
+    return pd.DataFrame(
+        {
+            "TRANSITION_STATE": state,
+            "PREV_FLOW_STATE": prev_state,
+            "PREV_FLOW_SCORE": prev,
+            "FLOW_DELTA": s - prev,
+            "PERSISTENCE_DAYS": persistence,
+            "TRANSITION": [f"{a} -> {b}" for a, b in zip(prev_state, state)],
+            "TRANSITION_NOTE": note,
+        },
+        index=scores.index,
+    )
+
+
+def transition_info_from_row(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """history row -> classify_flow_transition 반환 형식."""
+    return {
+        "flow_state": row["TRANSITION_STATE"],
+        "flow_score": int(row["FLOW_SCORE"]),
+        "prev_flow_state": row["PREV_FLOW_STATE"],
+        "prev_flow_score": int(row["PREV_FLOW_SCORE"]),
+        "flow_delta": int(row["FLOW_DELTA"]),
+        "persistence_days": int(row["PERSISTENCE_DAYS"]),
+        "transition": row["TRANSITION"],
+        "transition_note": row["TRANSITION_NOTE"],
+    }
+
+
+# -------------------------
+# History table
+# -------------------------
+def compute_flow_history(
+    panel: pd.DataFrame,
+    seed: Optional[Mapping[str, Any]] = None,
+    scored: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    panel: date + FEATURE_SOURCE + FEATURE_COLUMNS (+ STORED_SCORE row는 FLOW_SCORE/FLOW_STATE)
+    LIVE row는 kernel로 재계산, STORED_SCORE row는 저장된 score/state 사용.
+    scored: 이미 계산한 flow_score_kernel 결과 (panel과 같은 날짜 순서, live filter 재사용용)
+    """
+    panel = panel.sort_values("date", kind="mergesort").reset_index(drop=True).copy()
+    source = _text(panel, "FEATURE_SOURCE", "LIVE")
+    live = source == "LIVE"
+
+    scored = flow_score_kernel(panel) if scored is None else scored.reset_index(drop=True)
+    for col in SCORE_COLUMNS:
+        if col in panel.columns:
+            panel[col] = panel[col].where(~live, scored[col])
+        else:
+            panel[col] = scored[col].where(live, np.nan)
+
+    panel["FEATURE_SOURCE"] = source
+    panel["FLOW_SCORE"] = pd.to_numeric(panel["FLOW_SCORE"], errors="coerce").fillna(0).astype(int)
+    panel["FLOW_STATE"] = panel["FLOW_STATE"].fillna("NO CLEAR FLOW")
+
+    trans = flow_transition_series(panel["FLOW_SCORE"], panel["FLOW_STATE"], seed)
+    panel[TRANSITION_COLUMNS] = trans[TRANSITION_COLUMNS]
+
+    return panel.reindex(columns=HISTORY_COLUMNS)
+
+
+def load_flow_history(path: Path = FLOW_HISTORY_PATH) -> pd.DataFrame:
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    df = pd.read_csv(path)
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    return df.dropna(subset=["date"]).drop_duplicates("date", keep="last").sort_values("date").reset_index(drop=True)
+
+
+def query_flow_history(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    states: Optional[List[str]] = None,
+    min_persistence: Optional[int] = None,
+    path: Path = FLOW_HISTORY_PATH,
+) -> pd.DataFrame:
+    """날짜 구간 / transition state / 최소 persistence 조건으로 history 조회."""
+    df = load_flow_history(path)
+    mask = pd.Series(True, index=df.index)
+    if start:
+        mask &= df["date"] >= str(pd.Timestamp(start).date())
+    if end:
+        mask &= df["date"] <= str(pd.Timestamp(end).date())
+    if states:
+        mask &= df["TRANSITION_STATE"].isin(states)
+    if min_persistence is not None:
+        mask &= pd.to_numeric(df["PERSISTENCE_DAYS"], errors="coerce") >= min_persistence
+    return df[mask].reset_index(drop=True)
+
+
+def latest_flow_row(path: Path = FLOW_HISTORY_PATH, as_of: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """마지막 history row (as_of가 있으면 그 날짜 row만). index tail read."""
+    tail = read_log_tail(Path(path), 1)
+    if tail.empty:
+        return None
+    row = tail.iloc[-1].to_dict()
+    if as_of is not None and str(row.get("date")) != str(pd.Timestamp(as_of).date()):
+        return None
+    return row
+
+
+def _prev_row(path: Path, date: str) -> Optional[Dict[str, Any]]:
+    total = count_log_keys(path)
+    if total == 0:
+        return None
+    tail = read_log_tail(path, min(2, total))
+    before = tail[tail["date"].astype(str) < date]
+    if before.empty and total > 2:
+        hist = load_flow_history(path)
+        before = hist[hist["date"] < date]
+    return before.iloc[-1].to_dict() if not before.empty else None
+
+
+def flow_day_row(
+    date: str,
+    features: Dict[str, Any],
+    path: Path = FLOW_HISTORY_PATH,
+    scored: Optional[pd.DataFrame] = None,
+) -> Dict[str, Any]:
+    """
+    오늘 feature row 점수화 + 저장된 전일 row 기준 transition (저장 없음).
+    scored: features 1 row의 flow_score_kernel 결과 (있으면 다시 계산하지 않음)
+    """
+    path = Path(path)
+    date = str(pd.Timestamp(date).date())
+
+    prev = _prev_row(path, date)
+    seed = None
+    if prev is not None:
+        seed = {
+            "flow_state": prev.get("TRANSITION_STATE"),
+            "flow_score": prev.get("FLOW_SCORE"),
+            "persistence_days": prev.get("PERSISTENCE_DAYS"),
+        }
+
+    panel = pd.DataFrame([{"date": date, "FEATURE_SOURCE": "LIVE", **features}])
+    return compute_flow_history(panel, seed, scored).iloc[0].to_dict()
+
+
+def record_flow_day(
+    date: str,
+    features: Dict[str, Any],
+    path: Path = FLOW_HISTORY_PATH,
+) -> Dict[str, Any]:
+    """
+    flow_day_row 결과를 history에 upsert.
+    (같은 날짜 재실행은 교체, 그 이후 날짜 row는 제거 - war room history와 동일)
+    Return: 저장된 row dict
+    """
+    row = flow_day_row(date, features, path)
+    upsert_log_rows(
+        Path(path),
+        pd.DataFrame([row]),
+        drop_after=True,
+        column_order=lambda _cols: HISTORY_COLUMNS,
+    )
+    return row
+
+
+def backfill_from_market_history(
+    market_history_path: Path = MARKET_HISTORY_PATH,
+    path: Path = FLOW_HISTORY_PATH,
+) -> pd.DataFrame:
+    """
+    market_data_history의 FLOW_SCORE / FLOW_STATE로 과거 구간 history 생성
+    (이미 LIVE feature가 있는 날짜는 그 row 유지) 후 전체 transition 재계산.
+    """
+    stored = pd.read_csv(market_history_path, usecols=lambda c: c in ["date", "FLOW_SCORE", "FLOW_STATE", "SP500_POS_Z"])
+    stored["date"] = pd.to_datetime(stored["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    stored = stored.dropna(subset=["date", "FLOW_SCORE"]).drop_duplicates("date", keep="last")
+    stored["FEATURE_SOURCE"] = "STORED_SCORE"
+
+    existing = load_flow_history(path)
+    live = existing[existing["FEATURE_SOURCE"].astype(str).eq("LIVE")]
+    stored = stored[~stored["date"].isin(live["date"])]
+
+    panel = pd.concat([stored, live], ignore_index=True)
+    return rebuild_flow_history(panel, path)
+
+
+def rebuild_flow_history(panel: Optional[pd.DataFrame] = None, path: Path = FLOW_HISTORY_PATH) -> pd.DataFrame:
+    """전체 재계산 후 atomic rewrite (panel 없으면 저장된 history를 다시 계산)."""
+    path = Path(path)
+    panel = load_flow_history(path) if panel is None else panel
+    hist = compute_flow_history(panel)
+    if hist.empty:
+        return hist
+
+    # 첫 날짜 이후 전체 교체 (index도 같이 갱신)
+    replace_log_tail(path, hist, column_order=lambda _cols: HISTORY_COLUMNS)
+    return hist
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Institutional flow history")
+    parser.add_argument("--backfill", action="store_true", help="market_data_history FLOW_SCORE로 과거 구간 생성")
+    parser.add_argument("--rebuild", action="store_true", help="저장된 history 전체 재계산")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--state", action="append", default=None, help="TRANSITION_STATE 필터 (반복 가능)")
+    parser.add_argument("--min-persistence", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.backfill:
+        hist = backfill_from_market_history()
+        print(f"✅ flow history backfilled: {len(hist)} rows -> {FLOW_HISTORY_PATH}")
+    elif args.rebuild:
+        hist = rebuild_flow_history()
+        print(f"✅ flow history rebuilt: {len(hist)} rows -> {FLOW_HISTORY_PATH}")
+
+    df = query_flow_history(args.start, args.end, args.state, args.min_persistence)
+    cols = ["date", "FEATURE_SOURCE", "FLOW_SCORE", "FLOW_STATE", "TRANSITION_STATE", "FLOW_DELTA", "PERSISTENCE_DAYS"]
+    print(df[cols].to_string(index=False) if not df.empty else "(no rows)")
+
+
+if __name__ == "__main__":
+    main()
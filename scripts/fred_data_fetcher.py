@@ -1,6 +1,8 @@
 import pandas as pd
 from datetime import datetime
 
+from scripts.market_backend import get_market_backend
+
 # 날짜 범위 설정
 START_DATE = "2022-01-01"
 END_DATE = datetime.today().strftime("%Y-%m-%d")
@@ -22,7 +24,7 @@ FRED_SERIES = {
 
 def download_fred_csv_series(series_code: str) -> pd.DataFrame:
     url = FRED_CSV + series_code
-    df = pd.read_csv(url)
+    df = get_market_backend().read_csv_url(url)
 
     df.columns = ["date", series_code]
     df["date"] = pd.to_datetime(df["date"], errors="coerce")
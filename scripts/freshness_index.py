@@ -0,0 +1,430 @@
+# scripts/freshness_index.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Data Freshness Index (dataset별 마지막 유효 날짜)
+# ---------------------------------------------------------
+# readiness / stale 판단 때마다 전체 frame을 copy → to_numeric → 마지막 유효 row scan
+# 하지 않도록, writer가 저장 시점에 작은 index를 같이 갱신한다.
+#
+# 저장: <dataset 폴더>/freshness_index.json  (data/ → data/freshness_index.json)
+#   files.<파일명>:
+#     date_col / dates(서로 다른 날짜 수) / first_date / last_date
+#     columns       : 컬럼 → 마지막 유효(non-null) 날짜
+#     source_as_of  : fetch 시점 upstream as-of (fetch_* 가 기록, rescan해도 유지)
+#     fingerprint   : size / mtime_ns / sha1 (기록 직후 파일 기준)
+#     writer        : frame(전체 frame) / tail(log_store 증분) / scan(lazy rescan)
+#
+# 갱신 경로:
+#   record_frame(path, df)            : 전체 frame을 쓴 writer (write_macro_csv / compact_log / to_csv)
+#   record_tail(path, rows, first..)  : log_store append / tail replace → 새 row만 보고 O(rows x cols)
+#   dataset_freshness(path)           : fingerprint 불일치(index 없는 writer / 외부 편집)면 1회 rescan
+#     (size 같고 mtime만 다르면 sha1 비교 → CI checkout은 rescan 없음)
+#
+# 조회: last_valid_dates / market_calendar_as_of → O(columns)
+# CLI : python scripts/freshness_index.py [--datasets ...] [--columns]  (workflow debug step)
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+INDEX_NAME = "freshness_index.json"
+INDEX_VERSION = 1
+
+# freshness report 기본 대상 (data/ 기준 파일명, 날짜 컬럼, report에 항상 보여줄 컬럼)
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "macro_data": {"file": "macro_data.csv", "date_col": "date", "core": ["US10Y", "DXY", "WTI", "VIX", "USDKRW", "SPY", "HYG"]},
+    "liquidity": {"file": "liquidity_data.csv", "date_col": "date", "core": ["TGA", "RRP", "WALCL", "NET_LIQ"]},
+    "credit_spread": {"file": "credit_spread_data.csv", "date_col": "date", "core": ["HY_OAS"]},
+    "fred_extras": {"file": "fred_macro_extras.csv", "date_col": "date", "core": ["FCI", "REAL_RATE"]},
+    "sovereign_yields": {"file": "sovereign_yields.csv", "date_col": "date", "core": ["US10Y", "KR10Y", "JP10Y", "DE10Y"]},
+    "sovereign_spreads": {"file": "sovereign_spreads.csv", "date_col": "date", "core": ["KR10Y_SPREAD", "JP10Y_SPREAD"]},
+    "sentiment_proxy": {"file": "sentiment_proxy.csv", "date_col": "date", "core": ["sentiment_proxy"]},
+    "positioning": {"file": "positioning_data.csv", "date_col": "date", "core": ["SP500_POS_Z", "DEALER_GAMMA_BIAS"]},
+    "country_etf": {"file": "country_etf_data_combined.csv", "date_col": "Date", "core": ["SPY", "EEM"]},
+    "paper_portfolio_log": {"file": "paper_portfolio_log.csv", "date_col": "date", "core": ["total_exposure", "CASH"]},
+    "trade_log": {"file": "trade_log.csv", "date_col": "date", "core": []},
+    "paper_portfolio_performance": {"file": "paper_portfolio_performance.csv", "date_col": "date", "core": ["portfolio_return_pct"]},
+    "market_data_history": {"file": "market_data_history.csv", "date_col": "date", "core": ["FLOW_STATE"]},
+}
+
+# 주말 / 휴일 감안: 마지막 날짜가 이보다 오래되면 report에서 STALE 표시
+STALE_AFTER_DAYS = 4
+
+Reader = Callable[[Path], pd.DataFrame]
+
+
+# -------------------------
+# Index file
+# -------------------------
+def _index_path(path: Path) -> Path:
+    return Path(path).parent / INDEX_NAME
+
+
+def _load(index_path: Path) -> Dict[str, Any]:
+    if not index_path.exists():
+        return {"version": INDEX_VERSION, "files": {}}
+    try:
+        payload = json.loads(index_path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN] freshness index 손상 → 재구축: {e}")
+        return {"version": INDEX_VERSION, "files": {}}
+    if payload.get("version") != INDEX_VERSION:
+        return {"version": INDEX_VERSION, "files": {}}
+    return payload
+
+
+def _save(index_path: Path, payload: Dict[str, Any]) -> None:
+    tmp_path = index_path.with_name(index_path.name + f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, index_path)
+
+
+def _update_entry(path: Path, fn: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    index_path = _index_path(path)
+    payload = _load(index_path)
+    entry = fn(payload["files"].get(path.name))
+    if entry is None:
+        payload["files"].pop(path.name, None)
+    else:
+        payload["files"][path.name] = entry
+    _save(index_path, payload)
+    return entry
+
+
+def _sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fingerprint(path: Path, with_sha1: bool = True) -> Dict[str, Any]:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": _sha1(path) if with_sha1 else None}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# -------------------------
+# Compute
+# -------------------------
+def _to_naive_dates(s: pd.Series) -> pd.Series:
+    # country ETF 등 tz 포함 날짜 문자열 → 날짜만 (tz 제거)
+    dates = pd.to_datetime(s, errors="coerce")
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(s, errors="coerce", utc=True)
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates
+
+
+def frame_freshness(df: pd.DataFrame, date_col: str = "date") -> Dict[str, Any]:
+    """frame 1개 → dates / first / last / 컬럼별 마지막 유효 날짜 (한 번의 vectorized pass)."""
+    if df is None or df.empty or date_col not in df.columns:
+        return {"date_col": date_col, "dates": 0, "first_date": None, "last_date": None, "columns": {}}
+
+    dates = _to_naive_dates(df[date_col])
+    ok = dates.notna().to_numpy()
+    days = dates.to_numpy(dtype="datetime64[D]")[ok].astype("int64")
+    if len(days) == 0:
+        return {"date_col": date_col, "dates": 0, "first_date": None, "last_date": None, "columns": {}}
+
+    cols = [c for c in df.columns if c != date_col]
+    valid = df.loc[ok, cols].notna().to_numpy()
+    # 빈 문자열은 CSV에서 NaN으로 읽히므로 notna만으로 충분
+    last = np.where(valid, days[:, None], np.iinfo(np.int64).min).max(axis=0) if cols else np.array([], dtype="int64")
+
+    def day_str(d: int) -> str:
+        return str(np.datetime64(int(d), "D"))
+
+    return {
+        "date_col": date_col,
+        "dates": int(len(np.unique(days))),
+        "first_date": day_str(days.min()),
+        "last_date": day_str(days.max()),
+        "columns": {
+            str(c): (day_str(d) if d != np.iinfo(np.int64).min else None)
+            for c, d in zip(cols, last.tolist())
+        },
+    }
+
+
+def _read_csv(path: Path) -> pd.DataFrame:
+    return pd.read_csv(path, low_memory=False)
+
+
+# -------------------------
+# Writers
+# -------------------------
+def record_frame(
+    path: Path,
+    df: pd.DataFrame,
+    date_col: str = "date",
+    source_as_of: Optional[Dict[str, Any]] = None,
+    writer: str = "frame",
+) -> Optional[Dict[str, Any]]:
+    """writer가 path에 df 전체를 쓴 직후 호출. (실패해도 writer는 계속 → fail-safe)"""
+    path = Path(path)
+    if df is not None and not df.empty and date_col not in df.columns:
+        # 날짜 컬럼 불일치 (예: Date vs date) → 빈 entry로 기존 entry를 덮어쓰지 않음
+        print(f"[WARN] freshness index skip ({path.name}): date column '{date_col}' 없음")
+        return None
+    try:
+        stats = frame_freshness(df, date_col)
+        fingerprint = _fingerprint(path)
+
+        def apply(prev: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            entry = dict(stats)
+            entry["source_as_of"] = dict((prev or {}).get("source_as_of") or {})
+            entry["source_as_of"].update({k: str(v) for k, v in (source_as_of or {}).items() if v is not None})
+            entry.update({"fingerprint": fingerprint, "writer": writer, "updated_at": _now()})
+            return entry
+
+        return _update_entry(path, apply)
+    except Exception as e:
+        print(f"[WARN] freshness index 갱신 실패 ({path.name}): {e}")
+        return None
+
+
+def record_tail(
+    path: Path,
+    rows: pd.DataFrame,
+    first_key: str,
+    n_dates: int,
+    prev_size: int,
+    date_col: str = "date",
+) -> Optional[Dict[str, Any]]:
+    """
+    log_store 증분 write 직후 호출: first_key 이후 row가 rows로 교체(또는 append)됨.
+      - index가 write 직전 파일(prev_size)과 맞지 않으면 entry 삭제 → 다음 조회 때 rescan
+      - 교체 구간에만 유효값이 있던 컬럼이 rows에서 비면 알 수 없음 → entry 삭제
+    """
+    path = Path(path)
+    try:
+        new = frame_freshness(rows, date_col)
+
+        def apply(prev: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if prev is None or (prev.get("fingerprint") or {}).get("size") != prev_size or prev.get("date_col") != date_col:
+                return None
+
+            columns = dict(prev.get("columns") or {})
+            for col, last in new["columns"].items():
+                if last is not None:
+                    columns[col] = last
+                elif columns.get(col) is not None and columns[col] >= first_key:
+                    return None
+                else:
+                    columns.setdefault(col, None)
+            for col, last in list(columns.items()):
+                if col not in new["columns"] and last is not None and last >= first_key:
+                    return None
+
+            entry = dict(prev)
+            entry.update({
+                "dates": int(n_dates),
+                "first_date": prev.get("first_date") or new["first_date"],
+                "last_date": new["last_date"],
+                "columns": columns,
+                "fingerprint": _fingerprint(path),
+                "writer": "tail",
+                "updated_at": _now(),
+            })
+            return entry
+
+        return _update_entry(path, apply)
+    except Exception as e:
+        print(f"[WARN] freshness index 갱신 실패 ({path.name}): {e}")
+        return None
+
+
+def record_source_as_of(path: Path, source_as_of: Dict[str, Any]) -> None:
+    """fetch 시점 upstream as-of 기록 (파일 저장 여부와 무관, rescan에도 유지)."""
+    path = Path(path)
+    try:
+        def apply(prev: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            entry = dict(prev or {"fingerprint": None})
+            merged = dict(entry.get("source_as_of") or {})
+            merged.update({k: str(v) for k, v in source_as_of.items() if v is not None})
+            merged["_fetched_at"] = _now()
+            entry["source_as_of"] = merged
+            return entry
+
+        _update_entry(path, apply)
+    except Exception as e:
+        print(f"[WARN] freshness source as-of 기록 실패 ({path.name}): {e}")
+
+
+# -------------------------
+# Readers
+# -------------------------
+def _in_sync(entry: Optional[Dict[str, Any]], path: Path) -> bool:
+    fp = (entry or {}).get("fingerprint")
+    if not fp or "columns" not in entry:
+        return False
+    st = path.stat()
+    if st.st_size != fp.get("size"):
+        return False
+    if st.st_mtime_ns == fp.get("mtime_ns"):
+        return True
+    # CI checkout: 내용은 같고 mtime만 바뀜
+    return fp.get("sha1") is not None and _sha1(path) == fp["sha1"]
+
+
+def dataset_freshness(
+    path: Path,
+    date_col: str = "date",
+    reader: Optional[Reader] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    파일 1개의 freshness entry. index가 파일과 맞으면 그대로 (O(columns)),
+    아니면 1회 rescan 후 index 갱신. 파일 없으면 None.
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+
+    payload = _load(_index_path(path))
+    entry = payload["files"].get(path.name)
+    if _in_sync(entry, path) and entry.get("date_col") == date_col:
+        if entry["fingerprint"].get("mtime_ns") != path.stat().st_mtime_ns:
+            entry["fingerprint"]["mtime_ns"] = path.stat().st_mtime_ns
+            _update_entry(path, lambda _prev: entry)
+        return entry
+
+    try:
+        df = (reader or _read_csv)(path)
+    except Exception as e:
+        print(f"[WARN] freshness rescan 실패 ({path.name}): {e}")
+        return None
+    return record_frame(path, df, date_col, writer="scan")
+
+
+def last_valid_dates(entry: Optional[Dict[str, Any]], columns: Iterable[str]) -> Dict[str, Optional[str]]:
+    cols = (entry or {}).get("columns") or {}
+    return {c: cols.get(c) for c in columns if c in cols}
+
+
+def market_calendar_as_of(
+    entry: Optional[Dict[str, Any]],
+    calendar_cols: Iterable[str],
+    min_agree: int = 4,
+) -> Optional[Dict[str, Any]]:
+    """calendar 컬럼 마지막 유효 날짜 중 최신값 + 그 날짜에 도달한 컬럼 수."""
+    last = [d for d in last_valid_dates(entry, calendar_cols).values() if d]
+    if not last:
+        return None
+    latest = max(last)
+    count = sum(1 for d in last if d == latest)
+    return {"date": latest, "count": count, "total": len(last), "agreed": count >= min_agree}
+
+
+# -------------------------
+# Report
+# -------------------------
+def resolve_dataset(name: str) -> Tuple[str, Dict[str, Any]]:
+    """DATASETS key 또는 파일명(macro_data.csv) → (key, spec). 둘 다 아니면 date 컬럼 'date' 가정."""
+    if name in DATASETS:
+        return name, DATASETS[name]
+    for key, spec in DATASETS.items():
+        if spec["file"] == name:
+            return key, spec
+    return name, {"file": name, "date_col": "date", "core": []}
+
+
+def freshness_report(
+    data_dir: Path = DATA_DIR,
+    names: Optional[Iterable[str]] = None,
+    show_columns: bool = False,
+) -> List[str]:
+    """dataset별 마지막 날짜 / 날짜 수 / 뒤처진 컬럼 / source as-of 요약 (workflow debug step용)."""
+    data_dir = Path(data_dir)
+    today = pd.Timestamp.now(tz="UTC").date()
+    lines = [f"== data freshness ({data_dir}) =="]
+
+    for name in names or list(DATASETS):
+        name, spec = resolve_dataset(name)
+        path = data_dir / spec["file"]
+        reader = None
+        if name == "macro_data":
+            from scripts.macro_schema import read_macro_csv
+            reader = read_macro_csv
+
+        entry = dataset_freshness(path, spec["date_col"], reader)
+        if entry is None:
+            lines.append(f"❌ {name:<28} missing ({spec['file']})")
+            continue
+
+        last = entry.get("last_date")
+        age = (today - pd.Timestamp(last).date()).days if last else None
+        flag = "⚠️" if age is None or age > STALE_AFTER_DAYS else "✅"
+        cols = entry.get("columns") or {}
+        lagging = sorted(c for c, d in cols.items() if d is not None and last and d < last)
+        empty = sorted(c for c, d in cols.items() if d is None)
+
+        age_txt = f"{age}d" if age is not None else "?"
+        lines.append(
+            f"{flag} {name:<28} last={last} age={age_txt} dates={entry.get('dates')} "
+            f"first={entry.get('first_date')} cols={len(cols)} via={entry.get('writer')}"
+        )
+        core = last_valid_dates(entry, spec.get("core", []))
+        if core:
+            lines.append("     core: " + ", ".join(f"{c}={d}" for c, d in core.items()))
+        if lagging:
+            shown = lagging if show_columns else lagging[:8]
+            more = "" if len(shown) == len(lagging) else f" (+{len(lagging) - len(shown)})"
+            lines.append("     lagging: " + ", ".join(f"{c}={cols[c]}" for c in shown) + more)
+        if empty:
+            lines.append(f"     empty: {', '.join(empty[:8])}" + ("" if len(empty) <= 8 else f" (+{len(empty) - 8})"))
+        if entry.get("source_as_of"):
+            src = {k: v for k, v in entry["source_as_of"].items() if not k.startswith("_")}
+            lines.append(
+                "     source as-of: " + ", ".join(f"{k}={v}" for k, v in sorted(src.items()))
+                + f" (fetched {entry['source_as_of'].get('_fetched_at')})"
+            )
+        if show_columns:
+            # 기존 workflow의 head -n 1 / head -n 6 debug step 대체: 파일 header 순서 + 첫 row date 원문
+            try:
+                head = pd.read_csv(path, nrows=1, dtype=str)
+                lines.append("     header: " + ", ".join(map(str, head.columns)))
+                if spec["date_col"] in head.columns and len(head):
+                    lines.append(f"     raw {spec['date_col']}[0]: {head[spec['date_col']].iloc[0]!r}")
+            except Exception as e:
+                lines.append(f"     header: read failed ({e})")
+            for c, d in cols.items():
+                lines.append(f"       {c:<24} {d}")
+
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Data freshness index / report")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--datasets", nargs="*", default=None, help=f"DATASETS key 또는 파일명. 기본: 전체 ({', '.join(DATASETS)})")
+    parser.add_argument("--columns", action="store_true", help="컬럼별 마지막 유효 날짜 전체 출력")
+    parser.add_argument("--rebuild", action="store_true", help="index 무시하고 전체 rescan")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    if args.rebuild:
+        _index_path(data_dir / "x").unlink(missing_ok=True)
+
+    for line in freshness_report(data_dir, args.datasets, args.columns):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,8 @@ from filters.strategist_filters import (
     build_strategist_commentary,
     correlation_break_filter,
     correlation_break_state,
+    CORR65_PAIRS,
+    CORR66_PAIRS,
     divergence_monitor_filter,
     geopolitical_early_warning_filter,
     sector_correlation_break_filter,
@@ -38,11 +40,21 @@ from scripts.data_processing import (
     download_all_etfs_and_save,
     load_etf_data_from_csv,
 )
-from scripts.fetch_expectation_data import fetch_expectation_data
-from scripts.fetch_sentiment import fetch_cnn_fear_greed
+from scripts.signal_cache import flush_signal_refreshes, get_signal, prefetch_signals
 from scripts.risk_alerts import check_regime_change_and_alert
+from scripts.alert_dispatcher import flush_alerts
+from scripts.flow_engine import record_flow_day
 from scripts.fetch_positioning_data import get_recent_pos_slope
+from scripts.gex_engine import classify_gex, gex_regime_conflict
 from scripts.pm_final_brief import generate_pm_final_brief
+from scripts.market_snapshot import build_market_snapshot
+from scripts.macro_schema import normalize_macro_frame, read_macro_csv
+from scripts.freshness_index import dataset_freshness, last_valid_dates
+from scripts.log_store import upsert_log_rows
+from scripts.report_index import update_index as update_report_index
+from scripts.correlation_engine import update_correlation_engine
+from scripts.risk_model import current_portfolio_risk
+from scripts.scenario_engine import capture_state, scenario_report_lines
 
 
 
@@ -54,7 +66,27 @@ REPORTS_DIR = BASE_DIR / "reports"
 BACKTEST_DATA_DIR = DATA_DIR / "backtests"
 BACKTEST_REPORTS_DIR = REPORTS_DIR / "backtests"
 
-def infer_expected_as_of_date_from_market_calendar(df: pd.DataFrame) -> str:
+def load_macro_freshness(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    macro_data.csv freshness index entry (컬럼별 마지막 유효 날짜).
+    index가 지금 frame과 다르면(xlsx 사용 / 마지막 날짜 불일치) None → 기존 full scan 경로.
+    """
+    if (DATA_DIR / "macro_data.xlsx").exists() or df is None or df.empty:
+        return None
+    try:
+        entry = dataset_freshness(DATA_DIR / "macro_data.csv", "date", read_macro_csv)
+    except Exception as e:
+        print(f"[WARN] macro freshness index 실패 → full scan: {e}")
+        return None
+    if entry is None or entry.get("last_date") != pd.to_datetime(df["date"]).max().strftime("%Y-%m-%d"):
+        return None
+    return entry
+
+
+def infer_expected_as_of_date_from_market_calendar(
+    df: pd.DataFrame,
+    freshness: Optional[Dict[str, Any]] = None,
+) -> str:
     calendar_cols = ["SPY", "QQQ", "HYG", "LQD", "IWM"]
 
     existing_cols = [col for col in calendar_cols if col in df.columns]
@@ -62,18 +94,24 @@ def infer_expected_as_of_date_from_market_calendar(df: pd.DataFrame) -> str:
     if not existing_cols:
         return pd.to_datetime(df["date"]).max().strftime("%Y-%m-%d")
 
-    tmp = df[["date"] + existing_cols].copy()
-    tmp["date"] = pd.to_datetime(tmp["date"], errors="coerce")
+    indexed = last_valid_dates(freshness, existing_cols) if freshness is not None else {}
+
+    if len(indexed) == len(existing_cols):
+        # freshness index: 컬럼별 마지막 유효 날짜 → O(columns)
+        last_dates = [pd.Timestamp(d) for d in indexed.values() if d]
+    else:
+        tmp = df[["date"] + existing_cols].copy()
+        tmp["date"] = pd.to_datetime(tmp["date"], errors="coerce")
 
-    for col in existing_cols:
-        tmp[col] = pd.to_numeric(tmp[col], errors="coerce")
+        for col in existing_cols:
+            tmp[col] = pd.to_numeric(tmp[col], errors="coerce")
 
-    last_dates = []
+        last_dates = []
 
-    for col in existing_cols:
-        valid_rows = tmp[tmp[col].notna()]
-        if not valid_rows.empty:
-            last_dates.append(pd.to_datetime(valid_rows["date"]).max())
+        for col in existing_cols:
+            valid_rows = tmp[tmp[col].notna()]
+            if not valid_rows.empty:
+                last_dates.append(pd.to_datetime(valid_rows["date"]).max())
 
     if not last_dates:
         return pd.to_datetime(df["date"]).max().strftime("%Y-%m-%d")
@@ -662,6 +700,12 @@ def interpret_sew_event(event_type: str) -> str:
         "VOL_CRUSH_SQUEEZE": "변동성 압축 기반 상승 / 감마 구조 영향",
         
         "POSITION_UNWIND_RISK": "포지션 과열 상태 / 향후 급격한 언와인딩 위험",
+
+        "CROSS_ASSET_SHOCK": "다자산 동시 극단 움직임 / 상관 붕괴형 충격",
+
+        "SECTOR_WIDE_SELLOFF": "섹터 전반 동반 하락 / 변동성 확대 속 breadth 악화",
+
+        "GLOBAL_RISK_CONTAGION": "국가 ETF 동반 약세 / 글로벌 리스크 전이",
     }
 
     return mapping.get(event_type, "해석 불가")
@@ -881,93 +925,32 @@ def load_macro_df() -> pd.DataFrame:
       - data/macro_data.xlsx
       - data/macro_data.csv
 
-    Robust to:
-      - duplicated columns
-      - mixed 'date'/'datetime'
-      - schema changes causing bad/epoch rows
-      - occasional malformed rows (skip bad lines)
-      - occasional single-row CSV (won't crash report pipeline)
+    macro_data.csv 스키마(컬럼/타입/날짜 정책)는 scripts/macro_schema.py에 선언되어 있고,
+    drift 보정은 writer(write_macro_csv)에서 한 번만 수행한다.
+    여기서는 검증 loader만 사용 (정상 파일이면 repair 경로 없음).
 
     Output:
       - Always returns a DataFrame with a valid 'date' (datetime64)
-      - Sorted by date ascending
+      - Sorted by date ascending, one row per date
     """
     xlsx_path = DATA_DIR / "macro_data.xlsx"
     csv_path = DATA_DIR / "macro_data.csv"
 
     if xlsx_path.exists():
         print(f"[DEBUG] load_macro_df: loading XLSX -> {xlsx_path}")
-        df = pd.read_excel(xlsx_path)
+        df = normalize_macro_frame(pd.read_excel(xlsx_path))
     elif csv_path.exists():
         print(f"[DEBUG] load_macro_df: loading CSV -> {csv_path}")
-        try:
-            df = pd.read_csv(csv_path)
-        except Exception:
-            df = pd.read_csv(csv_path, on_bad_lines="skip")
+        df = read_macro_csv(csv_path)
     else:
         raise FileNotFoundError(
             f"data 폴더에 macro_data.xlsx 또는 macro_data.csv 가 없습니다: {DATA_DIR}"
         )
 
-    if df is None or df.empty:
-        raise ValueError("macro_data가 비어있습니다.")
-
-    # ✅ drop duplicated column names (keep first)
-    df = df.loc[:, ~df.columns.duplicated()].copy()
-
-    # ✅ remove pandas auto columns if exist
-    # (가끔 저장/복구 과정에서 "Unnamed: 0" 같은 게 생김)
-    df = df.loc[:, [c for c in df.columns if not str(c).startswith("Unnamed:")]]
-
-    cols = list(df.columns)
-
-    # --------------------------------------------------
-    # ✅ 핵심 FIX:
-    # - 절대 df["date"]를 datetime으로 통째로 덮어쓰지 말 것
-    # - date가 비었거나(=NaT) epoch(1970~)처럼 깨진 경우만 datetime으로 보정
-    # --------------------------------------------------
-    if "datetime" in df.columns:
-        dt = pd.to_datetime(df["datetime"], errors="coerce")
-
-        if "date" not in df.columns:
-            # date가 없으면 새로 생성
-            df["date"] = dt
-        else:
-            d = pd.to_datetime(df["date"], errors="coerce")
-
-            # 1) date가 NaT인 곳만 datetime으로 채움
-            d = d.where(d.notna(), dt)
-
-            # 2) epoch(1970~)처럼 깨진 date는 datetime으로 교체 (datetime이 유효한 경우만)
-            bad_epoch = d.notna() & (d.dt.year <= 1971) & dt.notna()
-            d = d.where(~bad_epoch, dt)
-
-            df["date"] = d
-
-    # --------------------------------------------------
-    # ✅ choose the best datetime column and normalize to "date"
-    # --------------------------------------------------
-    if "date" in df.columns:
-        dt_col = "date"
-    elif "datetime" in df.columns:
-        dt_col = "datetime"
-    else:
-        # fallback: first column is usually datetime-like
-        dt_col = cols[0]
-        df = df.rename(columns={dt_col: "date"})
-        dt_col = "date"
-
-    if dt_col != "date":
-        df = df.rename(columns={dt_col: "date"})
-
-    # parse + clean
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-
     # --------------------------------------------------
     # ✅ SAFETY: allow >=1 row
     # --------------------------------------------------
-    if len(df) < 1:
+    if df is None or len(df) < 1:
         raise ValueError("macro_data에 유효한 date row가 없습니다.")
 
     return df
@@ -1586,7 +1569,8 @@ def load_positioning_df() -> pd.DataFrame:
 
     df["date"] = pd.to_datetime(df["date"], errors="coerce")
     df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-    return df[cols]
+    # GEX_* / GAMMA_SOURCE / POSITIONING_STALE 등 추가 컬럼은 뒤에 그대로 유지
+    return df[cols + [c for c in df.columns if c not in cols]]
 
 
 # -------------------------
@@ -1594,44 +1578,18 @@ def load_positioning_df() -> pd.DataFrame:
 # -------------------------
 def build_market_data(df: pd.DataFrame, today_idx: int) -> Dict[str, Any]:
     """
-    Builds market_data dict using:
+    Builds market_data using:
       - today value = df.iloc[today_idx][col]
       - prev value  = last available non-null value BEFORE today_idx
     This fixes "newly added columns" (XLK/XLF/XLE/XLRE) missing-prev issue.
-    """
-    market_data: Dict[str, Any] = {}
-
-    def _to_num(x):
-        v = pd.to_numeric(x, errors="coerce")
-        return None if pd.isna(v) else float(v)
-
-    def _find_prev_value(col: str) -> float | None:
-        # scan backwards for last non-null
-        for j in range(today_idx - 1, -1, -1):
-            v = _to_num(df.iloc[j].get(col))
-            if v is not None:
-                return v
-        return None
-
-    today_row = df.iloc[today_idx]
-
-    for col in df.columns:
-        if col == "date" or col == "datetime":
-            continue
-
-        today_v = _to_num(today_row.get(col))
-        if today_v is None:
-            continue
-
-        prev_v = _find_prev_value(col)
-        if prev_v is None:
-            # still store today (but pct_change is None)
-            market_data[col] = {"today": today_v, "prev": None, "pct_change": None}
-            continue
-
-        pct = 0.0 if prev_v == 0 else ((today_v - prev_v) / prev_v) * 100.0
-        market_data[col] = {"today": today_v, "prev": prev_v, "pct_change": pct}
 
+    Returns a MarketSnapshot (dict-compatible):
+      - 컬럼 값은 float 배열에 저장, 기존 market_data["VIX"]["today"] 접근 그대로 유지
+      - 이후 attach_* 레이어가 넣는 ad-hoc 키는 snapshot extras에 저장
+      - _DATA_DIR: 필터가 쓰는 data 파일 경로 기준 (DATA_DIR 재지정 시 그대로 따름)
+    """
+    market_data = build_market_snapshot(df, today_idx)
+    market_data["_DATA_DIR"] = str(DATA_DIR)
     return market_data
 
 
@@ -1980,12 +1938,23 @@ def attach_expectation_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
       - market_data["_EXP_ASOF"] (optional)
       - market_data["EXPECTATIONS"] (raw, lightweight)
     So it won't break existing filters until you explicitly use it.
+
+    FRED 호출은 signal cache 경유 (리포트 시작 시 prefetch → 여기서 bounded wait, 실패 시 last-good):
+      - market_data["_EXP_CACHE"] : status / fetched_at / age_hours / stale / last_error
     """
     if market_data is None:
         market_data = {}
 
     try:
-        exp = fetch_expectation_data()
+        cached = get_signal("expectations", DATA_DIR)
+        exp = cached["value"]
+        market_data["_EXP_CACHE"] = cached["meta"]
+        market_data.setdefault("SIGNAL_CACHE", {})["expectations"] = cached["meta"]
+        print("[DEBUG] expectations cache:", cached["meta"])
+
+        if exp is None:
+            raise RuntimeError(f"no cached expectations (last_error={cached['meta']['last_error']})")
+
         # ✅ DEBUG: 액션 로그에서 확인 가능
         print("[DEBUG] fetch_expectation_data() type:", type(exp))
         if isinstance(exp, list):
@@ -2064,6 +2033,8 @@ def attach_positioning_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
     "GAMMA_FETCH_OK": 0,
     "CTA_FETCH_OK": 0,
     "_POS_ASOF": None,
+    "_POS_FEATURE_ASOF": None,
+    "_POS_STALE": False,
     }
 
     if pos_df.empty:
@@ -2073,6 +2044,14 @@ def attach_positioning_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
     latest = pos_df.iloc[-1]
     market_data["_POS_ASOF"] = pd.to_datetime(latest["date"]).strftime("%Y-%m-%d")
 
+    # price panel download 실패로 이전 값이 이어진 row (fetch_positioning_data에서 표시)
+    feature_asof = latest.get("POSITIONING_AS_OF")
+    market_data["_POS_FEATURE_ASOF"] = str(feature_asof) if pd.notna(feature_asof) else None
+    stale = pd.to_numeric(latest.get("POSITIONING_STALE"), errors="coerce")
+    market_data["_POS_STALE"] = bool(pd.notna(stale) and stale > 0)
+    if market_data["_POS_STALE"]:
+        print(f"[WARN] positioning features stale (feature as_of={market_data['_POS_FEATURE_ASOF']})")
+
     for col in [
         "SP500_POS_Z",
         "US10Y_POS_Z",
@@ -2087,6 +2066,32 @@ def attach_positioning_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
         except Exception:
             market_data[col] = defaults[col]
 
+    # strike-level GEX (없으면 PCR proxy만 존재하는 과거 row)
+    source = latest.get("GAMMA_SOURCE")
+    market_data["GAMMA_SOURCE"] = str(source) if pd.notna(source) else "PCR_PROXY"
+    market_data["GEX"] = {}
+
+    if market_data["GAMMA_SOURCE"] == "GEX":
+        gex = {}
+        for col, key in [
+            ("GEX_TOTAL_BN", "total_gex_bn"),
+            ("GEX_ZERO_GAMMA", "zero_gamma"),
+            ("GEX_SPOT", "spot"),
+            ("GEX_CALL_WALL", "call_wall"),
+            ("GEX_PUT_WALL", "put_wall"),
+        ]:
+            val = pd.to_numeric(latest.get(col), errors="coerce")
+            gex[key] = float(val) if pd.notna(val) else None
+
+        if gex["total_gex_bn"] is not None:
+            gex["regime"] = classify_gex(gex["total_gex_bn"], gex["spot"], gex["zero_gamma"])
+            gex["regime_conflict"] = gex_regime_conflict(gex["total_gex_bn"], gex["spot"], gex["zero_gamma"])
+            gex["flip_distance_pct"] = (
+                round((gex["spot"] / gex["zero_gamma"] - 1.0) * 100.0, 2)
+                if gex["spot"] and gex["zero_gamma"] else None
+            )
+            market_data["GEX"] = gex
+
     return market_data
 
 # -------------------------
@@ -2127,6 +2132,31 @@ def attach_sentiment_proxy_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
     }
     return market_data
 
+def attach_cnn_fear_greed_layer(market_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    CNN Fear&Greed를 signal cache에서 읽어 cross-check용으로만 기록 (SENTIMENT는 proxy 유지).
+      - market_data["CNN_FEAR_GREED"] = {"value", "as_of"(fetched_at), "stale", "status"}
+    scrape는 리포트 시작 시 prefetch → 여기서 짧게만 기다림 (실패 / 시간 초과면 last-good + stale).
+    """
+    if market_data is None:
+        market_data = {}
+
+    try:
+        cached = get_signal("fear_greed", DATA_DIR)
+    except Exception as e:
+        print(f"[WARN] CNN fear&greed cache 실패: {e}")
+        return market_data
+
+    meta = cached["meta"]
+    market_data.setdefault("SIGNAL_CACHE", {})["fear_greed"] = meta
+    market_data["CNN_FEAR_GREED"] = {
+        "value": cached["value"],
+        "as_of": meta["fetched_at"],
+        "stale": meta["stale"],
+        "status": meta["status"],
+    }
+    return market_data
+
 def load_sovereign_yields_df() -> pd.DataFrame:
     csv_path = DATA_DIR / "sovereign_yields.csv"
     if not csv_path.exists() or csv_path.stat().st_size == 0:
@@ -2248,15 +2278,51 @@ def attach_sovereign_spread_layer(market_data: Dict[str, Any]) -> Dict[str, Any]
 
     return market_data
 
+def _effective_idx_from_freshness(
+    df: pd.DataFrame,
+    cols: List[str],
+    min_valid_count: int,
+    freshness: Dict[str, Any],
+    max_back: int = 30,
+) -> Optional[int]:
+    """
+    컬럼별 마지막 유효 날짜 중 min_valid_count번째로 최근 날짜 이후에는
+    min_valid_count개 이상 채워진 row가 있을 수 없음 → 그 날짜부터 뒤로 짧게만 확인.
+    index와 frame이 안 맞거나 max_back 안에서 못 찾으면 None (full scan fallback).
+    """
+    last = last_valid_dates(freshness, cols)
+    if len(last) < len(cols):
+        return None
+
+    recent = sorted((d for d in last.values() if d), reverse=True)
+    if len(recent) < min_valid_count:
+        return None
+
+    candidate = pd.Timestamp(recent[min_valid_count - 1])
+    days = pd.to_datetime(df["date"])
+    pos = int(days.searchsorted(candidate, side="right")) - 1
+    if pos < 0 or days.iloc[pos] != candidate:
+        return None
+
+    lo = max(0, pos - max_back)
+    window = df[cols].iloc[lo: pos + 1].apply(pd.to_numeric, errors="coerce")
+    ok = (window.notna().sum(axis=1) >= min_valid_count).to_numpy()
+    if not ok.any():
+        return None
+    return lo + int(len(ok) - 1 - ok[::-1].argmax())
+
+
 def _find_effective_market_idx(
     df: pd.DataFrame,
     core_cols: Optional[List[str]] = None,
     min_valid_count: int = 4,
+    freshness: Optional[Dict[str, Any]] = None,
 ) -> int:
     """
     마지막 행이 비어 있을 수 있으므로,
     핵심 지표가 충분히 채워진 마지막 유효 row index를 찾는다.
     기본은 core 5개 중 4개 이상 값이 있는 마지막 행.
+    freshness(macro_data freshness index)가 있으면 전체 frame copy / scan 없이 찾는다.
     """
     if core_cols is None:
         core_cols = ["US10Y", "DXY", "WTI", "VIX", "USDKRW"]
@@ -2265,6 +2331,11 @@ def _find_effective_market_idx(
     if not existing:
         return len(df) - 1
 
+    if freshness is not None and len(existing) >= min_valid_count:
+        idx = _effective_idx_from_freshness(df, existing, min_valid_count, freshness)
+        if idx is not None:
+            return idx
+
     tmp = df.copy()
     for c in existing:
         tmp[c] = pd.to_numeric(tmp[c], errors="coerce")
@@ -2378,34 +2449,16 @@ def generate_war_room_history(institutional_flow: dict | None = None):
         today_data["FLOW_DRIFT_LABEL"] = flow.get("drift_label", "N/A")
         today_data["FLOW_GAMMA_STATE"] = flow.get("gamma_state", "N/A")
 
-        # ✅ 기존 파일 처리
-        if not os.path.exists(output_path):
-            today_data.to_csv(output_path, index=False)
-            print(f"✅ {output_path} 신규 생성 완료.")
-        else:
-            existing_df = pd.read_csv(output_path)
-
-            if "date" in existing_df.columns:
-                existing_df["date"] = pd.to_datetime(
-                    existing_df["date"], errors="coerce"
-                ).dt.strftime("%Y-%m-%d")
-                existing_df = existing_df.dropna(subset=["date"])
-
-            # ✅ 기존 파일 안의 중복 컬럼도 정리
-            existing_df = cleanup_duplicate_columns(existing_df)
-
-            # ✅ anchor_date 이전까지만 남기고, anchor_date는 새 today_data로 교체
-            existing_df = existing_df[existing_df["date"] < anchor_date]
-
-            final_df = pd.concat([existing_df, today_data], ignore_index=True)
-
-            # ✅ concat 후에도 한 번 더 중복 컬럼 정리
-            final_df = cleanup_duplicate_columns(final_df)
-
-            final_df = final_df.sort_values("date").reset_index(drop=True)
-            final_df.to_csv(output_path, index=False)
+        # ✅ anchor_date 이후 row는 제거하고 anchor_date는 새 today_data로 교체
+        #    (append segment + date index, 컬럼 변화 시 compaction에서 중복 컬럼 정리)
+        mode = upsert_log_rows(
+            output_path,
+            today_data,
+            drop_after=True,
+            normalize=cleanup_duplicate_columns,
+        )
 
-            print(f"✅ {output_path}에 오늘자({anchor_date}) 보정 데이터 반영 완료.")
+        print(f"✅ {output_path}에 오늘자({anchor_date}) 보정 데이터 반영 완료. ({mode})")
 
     except Exception as e:
         print(f"❌ 데이터팩 생성 중 에러: {e}")
@@ -2414,6 +2467,12 @@ def generate_war_room_history(institutional_flow: dict | None = None):
 def generate_daily_report() -> None:
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
+    # 외부 signal(FRED expectations / CNN F&G) refresh를 먼저 시작 → data load와 겹쳐서 진행
+    try:
+        prefetch_signals(DATA_DIR)
+    except Exception as e:
+        print(f"[WARN] signal prefetch 실패: {e}")
+
     # -----------------------------
     # 0) ETF 통합 파일 확인 / 없을 때만 생성
     # -----------------------------
@@ -2434,21 +2493,19 @@ def generate_daily_report() -> None:
     # -----------------------------
     # 1) 기존 매크로 데이터 로드
     # -----------------------------
+    # load_macro_df는 스키마 검증된 frame(date datetime64, 정렬/중복 제거 완료)을 반환
     df = load_macro_df()
-
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-
     df = merge_sovereign_spreads_into_macro_df(df)
 
-    # 🔥 MERGE 후 재정렬
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
+    # readiness / stale 판단은 freshness index(컬럼별 마지막 유효 날짜)로
+    macro_freshness = load_macro_freshness(df)
+    print("[DEBUG] macro freshness index:", "hit" if macro_freshness is not None else "miss → full scan")
 
     today_idx = _find_effective_market_idx(
         df,
         core_cols=["US10Y", "DXY", "WTI", "VIX", "USDKRW"],
         min_valid_count=4,
+        freshness=macro_freshness,
     )
 
     # 🔥 DATE GUARD: KST 기준 오늘 날짜 row는 리포트 기준 데이터로 사용 금지
@@ -2464,7 +2521,7 @@ def generate_daily_report() -> None:
 
     data_as_of_date = pd.to_datetime(df.iloc[today_idx]["date"]).strftime("%Y-%m-%d")
     report_date = pd.Timestamp.now(tz="Asia/Seoul").strftime("%Y-%m-%d")
-    expected_as_of_date = infer_expected_as_of_date_from_market_calendar(df)
+    expected_as_of_date = infer_expected_as_of_date_from_market_calendar(df, macro_freshness)
     print("[DEBUG] expected_as_of_date =", expected_as_of_date)
 
     if data_as_of_date < expected_as_of_date:
@@ -2533,6 +2590,7 @@ def generate_daily_report() -> None:
     market_data = attach_geo_similarity_layer(market_data) or market_data
 
     market_data = attach_sentiment_proxy_layer(market_data) or market_data
+    market_data = attach_cnn_fear_greed_layer(market_data) or market_data
     market_data = attach_drift_data_layer(market_data) or market_data
     market_data = attach_growth_sustainability_layer(market_data, df, today_idx)
     market_data = attach_breadth_layer(market_data, df, today_idx) or market_data
@@ -2555,6 +2613,7 @@ def generate_daily_report() -> None:
     #market_data = normalize_market_data_structure(market_data)
     # Regime change monitor
     regime_result = check_regime_change_and_alert(market_data, data_as_of_date)
+    market_data["DATA_AS_OF_DATE"] = data_as_of_date
 
     # -------------------------
     # 4) FINAL_STATE 이후 overlay / RAROC 먼저 반영
@@ -2658,11 +2717,27 @@ def generate_daily_report() -> None:
         },
     )
 
+    # EWMA 공분산 ex-ante risk (직전 allocation 기준) → Filter 15 vol-target
+    try:
+        market_data["RISK_MODEL"] = current_portfolio_risk(DATA_DIR)
+    except Exception as e:
+        print(f"[WARN] risk model 실패 → Filter 15 vol-target skip: {e}")
+
+    # what-if 평가는 Filter 15 실행 전 recovery state 기준
+    scenario_pre_state = capture_state(market_data)
+
     # -------------------------
     # 6) Commentary block 생성
     # -------------------------
     commentary_block = build_strategist_commentary(market_data)
 
+    # 6.1) What-if: US10Y / DXY / VIX / HY_OAS / NET_LIQ shock → 13/15 state 민감도
+    scenario_lines = []
+    try:
+        scenario_lines = scenario_report_lines(market_data, scenario_pre_state)
+    except Exception as e:
+        print(f"[WARN] scenario engine 실패 → what-if section skip: {e}")
+
     # Filter15 실행 후 갱신된 state를 다음 Production run용으로 저장.
     save_filter15_state(
         market_data=market_data,
@@ -2691,6 +2766,17 @@ def generate_daily_report() -> None:
 
     print("[DEBUG][FLOW FOR HISTORY]", flow_for_history)
 
+    # flow score / transition / persistence를 날짜별 history table에 기록
+    if flow_for_history.get("features"):
+        try:
+            flow_row = record_flow_day(data_as_of_date, flow_for_history["features"])
+            print(
+                f"[DEBUG][FLOW HISTORY] {data_as_of_date} score={flow_row['FLOW_SCORE']} "
+                f"transition={flow_row['TRANSITION_STATE']} persistence={flow_row['PERSISTENCE_DAYS']}"
+            )
+        except Exception as e:
+            print(f"[WARN] flow history 기록 실패: {e}")
+
     generate_war_room_history(
 
     institutional_flow=flow_for_history
@@ -2790,6 +2876,12 @@ def generate_daily_report() -> None:
     # -------------------------
     # 10) 6.5 / 6.6 결과 생성
     # -------------------------
+    # rolling / EWMA correlation matrix 증분 update (새 날짜만 O(N²))
+    try:
+        market_data["CORR_ENGINE"] = update_correlation_engine(DATA_DIR, watch=CORR65_PAIRS + CORR66_PAIRS)
+    except Exception as e:
+        print(f"[WARN] correlation engine 실패 → 6.5/6.6 당일 heuristic만 사용: {e}")
+
     correlation_break_text = correlation_break_filter(market_data)
     sector_corr_break_text = sector_correlation_break_filter(market_data)
     
@@ -3169,9 +3261,41 @@ def generate_daily_report() -> None:
         lines.append("")
         lines.extend(country_risk_lines)
 
+    if scenario_lines:
+        lines.append("")
+        lines.append("---")
+        lines.append("")
+        lines.extend(scenario_lines)
+
+    # report charts: 입력 데이터가 바뀐 chart만 다시 렌더 (Agg, downsample, 병렬)
+    try:
+        from scripts.chart_pipeline import update_report_charts
+
+        charts = update_report_charts(DATA_DIR, Path("insights"))
+        chart_lines = [
+            f"![{name}](../insights/{Path(info['path']).name})"
+            for name, info in charts.items()
+            if info["status"] in ("rendered", "cached")
+        ]
+        if chart_lines:
+            lines.append("")
+            lines.append("---")
+            lines.append("")
+            lines.append("## 📈 Macro & Liquidity Charts")
+            lines.append("")
+            lines.extend(chart_lines)
+    except Exception as e:
+        print(f"⚠️ Chart rendering failed: {e}")
+
     report_path = REPORTS_DIR / f"daily_report_{report_date}.md"
     report_path.write_text("\n".join(lines), encoding="utf-8")
     print(f"[OK] Report written: {report_path}")
+
+    # report index (SQLite): 바뀐 report만 증분 반영 (첫 실행 시 전체 구축)
+    try:
+        print(f"[DEBUG] report index: {update_report_index()}")
+    except Exception as e:
+        print(f"⚠️ Report index update failed: {e}")
     return market_data
 
     
@@ -3336,6 +3460,8 @@ if __name__ == "__main__":
     """generate_final_state_history()"""
     # 기존 리포트 실행
     real_market_data = generate_daily_report()
+    flush_alerts()
+    flush_signal_refreshes()
     #generate_war_room_history()
     # =========================
     # 🔥 ETF BACKTEST DEBUG BLOCK
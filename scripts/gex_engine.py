@@ -0,0 +1,401 @@
+# scripts/gex_engine.py
+from __future__ import annotations
+
+import argparse
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from scripts.market_backend import get_market_backend
+
+# =========================================================
+# Dealer Gamma Exposure (GEX) Engine
+# ---------------------------------------------------------
+# - near-dated option chain 전체를 병렬 fetch -> snapshot CSV 캐시
+#     data/options/<SYMBOL>/<YYYY-MM-DD>.csv.gz
+#     (같은 날 재실행 / backtest / 검증은 snapshot만으로 재현 가능)
+# - 모든 contract의 Black-Scholes gamma를 NumPy array 연산 한 번으로 계산
+# - dealer sign convention (일반적인 GEX 관례):
+#     call OI = dealer long gamma (+), put OI = dealer short gamma (-)
+# - GEX 단위: spot 1% 이동당 dealer hedge notional ($)
+#     gamma * OI * 100 * S^2 * 0.01
+# - zero-gamma level: spot grid 전체에서 총 GEX를 재계산 (grid x contract 2D 연산)
+#   후 부호가 바뀌는 지점을 선형 보간
+# - regime: 현재 spot의 총 GEX 부호 기준 (|GEX|가 GEX_NEUTRAL_BN 미만이면 spot vs zero-gamma로 판단)
+#   spot vs zero-gamma 위치가 부호와 반대면 regime_conflict로 표시
+# - chain / spot / 기준 시각(as_of) 모두 market backend 경유 (live / record / replay)
+#   -> replay에서는 recorded as_of 기준으로 만기 선택 (실행 시각 datetime.now() 미사용)
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OPTIONS_DIR = BASE_DIR / "data" / "options"
+
+CONTRACT_MULTIPLIER = 100
+RISK_FREE_RATE = 0.04
+
+MAX_DAYS_TO_EXPIRY = 45
+MAX_EXPIRIES = 12
+FETCH_WORKERS = 6
+
+MIN_IV = 0.01
+MAX_IV = 5.0
+MIN_T_YEARS = 1.0 / (365.0 * 24.0)    # 만기 당일: 최소 1시간
+
+ZERO_GAMMA_RANGE = 0.15               # spot ±15% grid
+ZERO_GAMMA_POINTS = 121
+
+# DEALER_GAMMA_BIAS(1.0 중립, >1.5 안정, <0.5 run risk) 스케일 유지용
+GEX_BIAS_SCALE_BN = 5.0
+
+# |총 GEX|가 이보다 작으면 부호 대신 spot vs zero-gamma로 regime 판단 ($bn per 1%)
+GEX_NEUTRAL_BN = 0.05
+
+SNAPSHOT_COLUMNS = ["as_of", "spot", "expiry", "type", "strike", "open_interest", "iv"]
+
+
+# -------------------------
+# Chain fetch / snapshot cache
+# -------------------------
+def snapshot_path(symbol: str, day: str, root: Path = OPTIONS_DIR) -> Path:
+    return Path(root) / symbol / f"{day}.csv.gz"
+
+
+def chain_as_of(symbol: str = "SPY") -> pd.Timestamp:
+    """chain fetch 기준 시각 (UTC). backend clock (replay면 recorded 시각)."""
+    ts = pd.Timestamp(get_market_backend().now(f"{symbol} option chain"))
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+
+
+def _chain_rows(table: pd.DataFrame, expiry: str, opt_type: str) -> pd.DataFrame:
+    out = pd.DataFrame({
+        "expiry": expiry,
+        "type": opt_type,
+        "strike": pd.to_numeric(table.get("strike"), errors="coerce"),
+        "open_interest": pd.to_numeric(table.get("openInterest"), errors="coerce"),
+        "iv": pd.to_numeric(table.get("impliedVolatility"), errors="coerce"),
+    })
+    return out
+
+
+def fetch_option_chains(
+    symbol: str = "SPY",
+    max_days: int = MAX_DAYS_TO_EXPIRY,
+    max_expiries: int = MAX_EXPIRIES,
+    workers: int = FETCH_WORKERS,
+    as_of: Any = None,
+) -> pd.DataFrame:
+    """
+    near-dated 만기 chain을 병렬로 받아 SNAPSHOT_COLUMNS 형식 long frame으로 반환.
+    as_of: 만기 필터 / snapshot as_of 기준 시각 (기본: backend clock)
+    """
+    backend = get_market_backend()
+    if as_of is None:
+        now = chain_as_of(symbol)
+    else:
+        now = pd.Timestamp(as_of)
+        now = now.tz_localize("UTC") if now.tz is None else now.tz_convert("UTC")
+
+    expirations = []
+    for exp in backend.option_expirations(symbol):
+        days = (pd.Timestamp(exp).date() - now.date()).days
+        if 0 <= days <= max_days:
+            expirations.append(exp)
+    expirations = expirations[:max_expiries]
+
+    if not expirations:
+        raise ValueError(f"{symbol} option expirations is empty")
+
+    hist = backend.history(symbol, period="5d")
+    if hist.empty:
+        raise ValueError(f"{symbol} spot history empty")
+    spot = float(hist["Close"].dropna().iloc[-1])
+
+    def _fetch(exp: str) -> Optional[pd.DataFrame]:
+        try:
+            calls, puts = backend.option_chain(symbol, exp)
+            return pd.concat(
+                [_chain_rows(calls, exp, "C"), _chain_rows(puts, exp, "P")],
+                ignore_index=True,
+            )
+        except Exception as e:
+            print(f"   ⚠️ option chain fetch 실패 ({exp}): {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(expirations)))) as pool:
+        frames = [f for f in pool.map(_fetch, expirations) if f is not None]
+
+    if not frames:
+        raise ValueError(f"{symbol} option chains all failed")
+
+    chain = pd.concat(frames, ignore_index=True)
+    chain.insert(0, "spot", spot)
+    chain.insert(0, "as_of", now.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+    print(f"   📅 option chains: {len(frames)}/{len(expirations)} expiries, {len(chain)} contracts")
+    return chain[SNAPSHOT_COLUMNS]
+
+
+def save_chain_snapshot(chain: pd.DataFrame, path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    chain.to_csv(tmp_path, index=False, compression="gzip")
+    os.replace(tmp_path, path)
+
+
+def load_chain_snapshot(path: Path) -> pd.DataFrame:
+    chain = pd.read_csv(path)
+    missing = [c for c in SNAPSHOT_COLUMNS if c not in chain.columns]
+    if missing:
+        raise ValueError(f"chain snapshot missing columns: {missing}")
+    return chain
+
+
+def get_option_chains(symbol: str = "SPY", root: Path = OPTIONS_DIR, refresh: bool = False) -> pd.DataFrame:
+    """오늘(backend clock 기준) snapshot이 있으면 재사용, 없으면 fetch 후 저장."""
+    as_of = chain_as_of(symbol)
+    path = snapshot_path(symbol, as_of.strftime("%Y-%m-%d"), root)
+
+    if path.exists() and not refresh:
+        print(f"   ♻️ option chain cache hit: {path}")
+        return load_chain_snapshot(path)
+
+    chain = fetch_option_chains(symbol, as_of=as_of)
+    try:
+        save_chain_snapshot(chain, path)
+    except Exception as e:
+        print(f"   ⚠️ option chain cache 저장 실패: {e}")
+    return chain
+
+
+# -------------------------
+# Vectorized Black-Scholes gamma
+# -------------------------
+def _norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+
+
+def bs_gamma(
+    spot: Any,
+    strike: np.ndarray,
+    t_years: np.ndarray,
+    iv: np.ndarray,
+    r: float = RISK_FREE_RATE,
+) -> np.ndarray:
+    """
+    Black-Scholes gamma (call/put 동일). spot은 scalar 또는 (G, 1) grid.
+    broadcasting 규칙을 그대로 따르므로 grid x contract 계산도 한 번에 가능.
+    """
+    s = np.asarray(spot, dtype="float64")
+    vol_t = iv * np.sqrt(t_years)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(s / strike) + (r + 0.5 * iv * iv) * t_years) / vol_t
+        gamma = _norm_pdf(d1) / (s * vol_t)
+
+    return np.where(np.isfinite(gamma), gamma, 0.0)
+
+
+def _prepare(chain: pd.DataFrame, as_of: Optional[pd.Timestamp] = None) -> Dict[str, np.ndarray]:
+    df = chain.copy()
+    df["strike"] = pd.to_numeric(df["strike"], errors="coerce")
+    df["open_interest"] = pd.to_numeric(df["open_interest"], errors="coerce").fillna(0.0)
+    df["iv"] = pd.to_numeric(df["iv"], errors="coerce")
+
+    df = df[
+        (df["open_interest"] > 0)
+        & (df["strike"] > 0)
+        & df["iv"].between(MIN_IV, MAX_IV)
+        & df["type"].isin(["C", "P"])
+    ]
+
+    if as_of is None:
+        as_of = pd.Timestamp(str(chain["as_of"].iloc[0])) if len(chain) else pd.Timestamp.now(tz="UTC")
+    as_of = as_of.tz_localize("UTC") if as_of.tz is None else as_of.tz_convert("UTC")
+
+    # 만기일 16:00 ET ~= 20:00 UTC
+    expiry_ts = pd.to_datetime(df["expiry"]).dt.tz_localize("UTC") + pd.Timedelta(hours=20)
+    t_years = (expiry_ts - as_of).dt.total_seconds().to_numpy() / (365.0 * 24 * 3600)
+
+    return {
+        "expiry": df["expiry"].astype(str).to_numpy(),
+        "sign": np.where(df["type"].to_numpy() == "C", 1.0, -1.0),
+        "strike": df["strike"].to_numpy(dtype="float64"),
+        "oi": df["open_interest"].to_numpy(dtype="float64"),
+        "iv": df["iv"].to_numpy(dtype="float64"),
+        "t": np.maximum(t_years, MIN_T_YEARS),
+    }
+
+
+def _gex_per_contract(c: Dict[str, np.ndarray], spot: Any) -> np.ndarray:
+    s = np.asarray(spot, dtype="float64")
+    gamma = bs_gamma(s, c["strike"], c["t"], c["iv"])
+    return c["sign"] * gamma * c["oi"] * CONTRACT_MULTIPLIER * s * s * 0.01
+
+
+def zero_gamma_level(c: Dict[str, np.ndarray], spot: float) -> Optional[float]:
+    """spot grid에서 총 GEX 부호가 바뀌는 지점 (spot에 가장 가까운 것)."""
+    if c["strike"].size == 0:
+        return None
+
+    grid = np.linspace(spot * (1 - ZERO_GAMMA_RANGE), spot * (1 + ZERO_GAMMA_RANGE), ZERO_GAMMA_POINTS)
+    total = _gex_per_contract(c, grid[:, None]).sum(axis=1)
+
+    flips = np.nonzero(np.sign(total[:-1]) * np.sign(total[1:]) < 0)[0]
+    if flips.size == 0:
+        return None
+
+    x0, x1 = grid[flips], grid[flips + 1]
+    y0, y1 = total[flips], total[flips + 1]
+    levels = x0 - y0 * (x1 - x0) / (y1 - y0)
+
+    return float(levels[np.argmin(np.abs(levels - spot))])
+
+
+# -------------------------
+# Aggregation
+# -------------------------
+def _flip_side(spot: Optional[float], zero_gamma: Optional[float]) -> Optional[str]:
+    if zero_gamma is None or spot is None:
+        return None
+    return "LONG_GAMMA" if spot >= zero_gamma else "SHORT_GAMMA"
+
+
+def classify_gex(total_gex_bn: Optional[float], spot: Optional[float], zero_gamma: Optional[float]) -> str:
+    """총 GEX 부호가 우선, 0 근처(|GEX| < GEX_NEUTRAL_BN)만 spot vs zero-gamma로 tie-break."""
+    if total_gex_bn is None:
+        return "UNKNOWN"
+    flip_side = _flip_side(spot, zero_gamma)
+    if flip_side is not None and abs(total_gex_bn) < GEX_NEUTRAL_BN:
+        return flip_side
+    return "LONG_GAMMA" if total_gex_bn >= 0 else "SHORT_GAMMA"
+
+
+def gex_regime_conflict(total_gex_bn: Optional[float], spot: Optional[float], zero_gamma: Optional[float]) -> bool:
+    """spot vs zero-gamma 위치가 총 GEX 부호와 반대인지 (0 근처는 conflict 아님)."""
+    flip_side = _flip_side(spot, zero_gamma)
+    if total_gex_bn is None or flip_side is None or abs(total_gex_bn) < GEX_NEUTRAL_BN:
+        return False
+    return flip_side != classify_gex(total_gex_bn, spot, zero_gamma)
+
+
+def gex_to_bias(total_gex_bn: float) -> float:
+    """기존 DEALER_GAMMA_BIAS 스케일(0~2, 1.0 중립)로 변환."""
+    return round(1.0 + math.tanh(total_gex_bn / GEX_BIAS_SCALE_BN), 2)
+
+
+def compute_gex(chain: pd.DataFrame, spot: Optional[float] = None, as_of: Any = None) -> Dict[str, Any]:
+    """
+    chain snapshot -> strike / expiry별 dealer GEX + zero-gamma level.
+    Return dict (단위: $bn per 1% move)
+    """
+    if spot is None:
+        spot = float(pd.to_numeric(chain["spot"], errors="coerce").dropna().iloc[-1])
+    as_of_ts = pd.Timestamp(as_of) if as_of is not None else None
+
+    c = _prepare(chain, as_of_ts)
+    gex = _gex_per_contract(c, spot)
+
+    strikes, strike_idx = np.unique(c["strike"], return_inverse=True)
+    by_strike = np.bincount(strike_idx, weights=gex, minlength=strikes.size)
+
+    expiries, expiry_idx = np.unique(c["expiry"], return_inverse=True)
+    by_expiry = np.bincount(expiry_idx, weights=gex, minlength=expiries.size)
+
+    call_gex = float(gex[c["sign"] > 0].sum())
+    put_gex = float(gex[c["sign"] < 0].sum())
+    total = call_gex + put_gex
+
+    zero_gamma = zero_gamma_level(c, spot)
+    total_bn = total / 1e9
+
+    result: Dict[str, Any] = {
+        "spot": round(float(spot), 2),
+        "contracts": int(gex.size),
+        "total_gex_bn": round(total_bn, 3),
+        "call_gex_bn": round(call_gex / 1e9, 3),
+        "put_gex_bn": round(put_gex / 1e9, 3),
+        "zero_gamma": round(zero_gamma, 2) if zero_gamma is not None else None,
+        "flip_distance_pct": (
+            round((spot / zero_gamma - 1.0) * 100.0, 2) if zero_gamma else None
+        ),
+        "call_wall": float(strikes[np.argmax(by_strike)]) if strikes.size else None,
+        "put_wall": float(strikes[np.argmin(by_strike)]) if strikes.size else None,
+        "regime": classify_gex(total_bn, spot, zero_gamma),
+        "regime_conflict": gex_regime_conflict(total_bn, spot, zero_gamma),
+        "by_strike": pd.Series(by_strike / 1e9, index=strikes),
+        "by_expiry": {str(k): round(float(v) / 1e9, 3) for k, v in zip(expiries, by_expiry)},
+    }
+    return result
+
+
+def gex_positioning_fields(gex: Dict[str, Any]) -> Dict[str, Any]:
+    """positioning_data.csv 컬럼 형식 (DEALER_GAMMA_BIAS는 실제 GEX 기반으로 대체)."""
+    regime = gex.get("regime", "UNKNOWN")
+
+    if regime == "SHORT_GAMMA":
+        label = "DEALER_SHORT_GAMMA"
+    elif gex.get("total_gex_bn", 0.0) >= GEX_BIAS_SCALE_BN * 0.55:
+        label = "DEALER_LONG_GAMMA_STRONG"
+    else:
+        label = "DEALER_LONG_GAMMA"
+
+    return {
+        "DEALER_GAMMA_BIAS": gex_to_bias(gex["total_gex_bn"]),
+        "DEALER_GAMMA_LABEL": label,
+        "GAMMA_SOURCE": "GEX",
+        "GEX_TOTAL_BN": gex["total_gex_bn"],
+        "GEX_ZERO_GAMMA": gex["zero_gamma"],
+        "GEX_SPOT": gex["spot"],
+        "GEX_CALL_WALL": gex["call_wall"],
+        "GEX_PUT_WALL": gex["put_wall"],
+    }
+
+
+def summarize_gex(gex: Dict[str, Any], top: int = 5) -> List[str]:
+    lines = [
+        f"   spot={gex['spot']} total={gex['total_gex_bn']}bn "
+        f"(call {gex['call_gex_bn']} / put {gex['put_gex_bn']})",
+        f"   zero_gamma={gex['zero_gamma']} flip_distance={gex['flip_distance_pct']}% regime={gex['regime']}"
+        + (" (⚠️ spot vs zero-gamma와 GEX 부호 불일치)" if gex.get("regime_conflict") else ""),
+        f"   call_wall={gex['call_wall']} put_wall={gex['put_wall']}",
+    ]
+
+    by_strike = gex["by_strike"]
+    if len(by_strike):
+        biggest = by_strike.abs().sort_values(ascending=False).head(top).index
+        lines.append(
+            "   top strikes: "
+            + ", ".join(f"{k:g}={by_strike[k]:+.3f}bn" for k in sorted(biggest))
+        )
+
+    for exp, v in gex["by_expiry"].items():
+        lines.append(f"   {exp}: {v:+.3f}bn")
+
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dealer gamma exposure from option chain snapshot")
+    parser.add_argument("--symbol", default="SPY")
+    parser.add_argument("--snapshot", default=None, help="저장된 chain snapshot (csv/csv.gz). 없으면 fetch")
+    parser.add_argument("--as-of", default=None, help="만기까지 시간 계산 기준 시각 (기본: snapshot as_of)")
+    parser.add_argument("--refresh", action="store_true", help="오늘 cache 무시하고 다시 fetch")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        chain = load_chain_snapshot(Path(args.snapshot))
+    else:
+        chain = get_option_chains(args.symbol, refresh=args.refresh)
+
+    gex = compute_gex(chain, as_of=args.as_of)
+    print("\n".join(summarize_gex(gex)))
+
+
+if __name__ == "__main__":
+    main()
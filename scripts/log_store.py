@@ -0,0 +1,560 @@
+# scripts/log_store.py
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from scripts.freshness_index import record_frame, record_tail
+
+# =========================================================
+# Daily Log Store (upsert-by-date append writer)
+# ---------------------------------------------------------
+# 대상: paper_portfolio_log / trade_log / positioning_data /
+#       market_data_history / paper_portfolio_performance
+#       (+ derived series: sovereign_spreads / liquidity_data / sentiment_proxy,
+#        read_log_tail / replace_log_tail로 여러 날짜 꼬리만 교체)
+#
+# 구조:
+# - CSV 파일 자체는 그대로 유지 (기존 pd.read_csv consumer 호환)
+# - 마지막 compaction 이후의 row들은 파일 끝에 append-only로 쌓인다 (segment)
+# - 옆에 작은 date index(<file>.idx.json)를 두고
+#     최근 INDEX_TAIL_KEYS개 date -> [start_offset, end_offset] 블록, 전체 날짜 수,
+#     header, committed size, tail fingerprint 저장
+#     (index 크기는 history 길이와 무관하게 상한 고정)
+#
+# 쓰기 경로:
+# - 새 날짜(> 마지막 날짜): 파일 끝에 append                          -> O(1)
+# - 같은 날짜 재실행: 해당 블록 offset에서 truncate 후 append         -> O(1)
+# - 과거 날짜(index 꼬리 밖) / 새 컬럼 / index 손상:
+#     compaction (정렬+dedupe 후 atomic rewrite)
+# - COMPACT_EVERY번 append마다 한 번 compaction (외부 편집 정리용)
+# - 쓰기마다 freshness index(컬럼별 마지막 유효 날짜)도 같이 갱신 (freshness_index)
+#
+# Crash 안전성 (redo journal):
+# 1) cut offset + 새 꼬리 bytes + commit할 index를 <file>.journal.json에 atomic write
+# 2) CSV truncate(cut) + write + fsync
+# 3) index atomic replace -> journal 삭제
+# - 다음 open 때 journal이 남아 있으면 1)의 내용으로 2~3을 다시 수행 (idempotent)
+#   -> truncate와 write 사이 / write 도중 crash에도 옛 블록 유실이나 torn row 없음
+# - journal 이전 포맷 파일: committed size 뒤 newline 없는 꼬리는 torn write로 보고 잘라냄
+# - 그 외 불일치(외부 rewrite 등)는 파일을 읽기만 해서 index 재구성
+# =========================================================
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".idx.json"
+JOURNAL_SUFFIX = ".journal.json"
+INDEX_TAIL_KEYS = 256
+KEY_FORMAT = "%Y-%m-%d"
+COMPACT_EVERY = 256
+TAIL_FINGERPRINT_BYTES = 64
+LINE_TERMINATOR = "\n"
+
+ColumnOrderFn = Callable[[List[str]], List[str]]
+NormalizeFn = Callable[[pd.DataFrame], pd.DataFrame]
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def _index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _journal_path(path: Path) -> Path:
+    return path.with_name(path.name + JOURNAL_SUFFIX)
+
+
+def _normalize_keys(s: pd.Series) -> pd.Series:
+    return pd.to_datetime(s, errors="coerce").dt.strftime(KEY_FORMAT)
+
+
+def _tail_bytes(path: Path, size: int) -> str:
+    if size <= 0:
+        return ""
+    start = max(0, size - TAIL_FINGERPRINT_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(size - start).decode("utf-8", errors="replace")
+
+
+def _rows_to_bytes(df: pd.DataFrame, header: bool) -> bytes:
+    return df.to_csv(index=False, header=header, lineterminator=LINE_TERMINATOR).encode("utf-8")
+
+
+def _write_json_atomic(target: Path, obj: Dict[str, Any]) -> None:
+    tmp_path = target.with_suffix(target.suffix + ".tmp")
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, target)
+
+
+def _write_index(path: Path, idx: Dict[str, Any]) -> None:
+    _write_json_atomic(_index_path(path), idx)
+
+
+def _trim_blocks(blocks: Dict[str, List[int]]) -> Dict[str, List[int]]:
+    """index에는 최근 INDEX_TAIL_KEYS개 날짜 블록만 유지."""
+    if len(blocks) <= INDEX_TAIL_KEYS:
+        return blocks
+    keep = sorted(blocks)[-INDEX_TAIL_KEYS:]
+    return {key: blocks[key] for key in keep}
+
+
+def _tail_covers(idx: Dict[str, Any], key: str) -> bool:
+    """key 이후 블록이 모두 index 꼬리 안에 있는지 (index 밖 과거 날짜면 False)."""
+    blocks: Dict[str, List[int]] = idx["blocks"]
+    if int(idx.get("n_keys", len(blocks))) <= len(blocks):
+        return True
+    return bool(blocks) and key >= min(blocks)
+
+
+# -------------------------
+# Redo journal
+# -------------------------
+def _apply_journal(path: Path, journal: Dict[str, Any]) -> None:
+    cut = int(journal["cut"])
+    payload = journal["payload"].encode("utf-8")
+
+    with open(path, "r+b") as f:
+        f.truncate(cut)
+        f.seek(cut)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+    _write_index(path, journal["index"])
+    _journal_path(path).unlink(missing_ok=True)
+
+
+def _recover_journal(path: Path) -> None:
+    """이전 실행이 tail write 도중 중단됐으면 journal 기준으로 다시 수행."""
+    journal_path = _journal_path(path)
+    if not journal_path.exists():
+        return
+
+    try:
+        with open(journal_path, "r", encoding="utf-8") as f:
+            journal = json.load(f)
+        if not path.exists() or path.stat().st_size < int(journal["cut"]):
+            raise ValueError("log shorter than journal cut")
+    except Exception as e:
+        print(f"[WARN][LOG STORE] {path.name}: unusable journal dropped ({e})")
+        journal_path.unlink(missing_ok=True)
+        return
+
+    print(f"[WARN][LOG STORE] {path.name}: interrupted write detected -> redo from journal")
+    _apply_journal(path, journal)
+
+
+def _write_tail(path: Path, idx: Dict[str, Any], cut: int, payload: bytes) -> None:
+    """cut 이후를 payload로 교체하고 idx commit (journal -> data -> index 순서)."""
+    with open(path, "rb") as f:
+        start = max(0, cut - TAIL_FINGERPRINT_BYTES)
+        f.seek(start)
+        before = f.read(cut - start)
+
+    idx["size"] = cut + len(payload)
+    idx["tail"] = (before + payload)[-TAIL_FINGERPRINT_BYTES:].decode("utf-8", errors="replace")
+
+    journal = {"cut": cut, "payload": payload.decode("utf-8"), "index": idx}
+    _write_json_atomic(_journal_path(path), journal)
+    _apply_journal(path, journal)
+
+
+def _scan_index(path: Path, key_col: str) -> Optional[Dict[str, Any]]:
+    """
+    CSV를 읽기만 해서 date index 재구성 (rewrite 없음).
+    날짜 블록이 정렬/연속이 아니거나 파일 끝 newline이 없으면 None -> compaction 필요.
+    """
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+
+    blocks: Dict[str, List[int]] = {}
+    last_key: Optional[str] = None
+
+    with open(path, "rb") as f:
+        header_line = f.readline()
+        if not header_line.endswith(b"\n"):
+            return None
+
+        header = next(csv.reader([header_line.decode("utf-8").rstrip("\r\n")]), [])
+        if key_col not in header:
+            return None
+        key_pos = header.index(key_col)
+
+        offset = len(header_line)
+        for line in iter(f.readline, b""):
+            start = offset
+            offset += len(line)
+
+            if not line.endswith(b"\n"):
+                return None
+            if not line.strip():
+                continue
+
+            fields = next(csv.reader([line.decode("utf-8").rstrip("\r\n")]), [])
+            key = fields[key_pos] if key_pos < len(fields) else ""
+            if len(key) != 10:
+                return None
+
+            if key == last_key:
+                blocks[key][1] = offset
+                continue
+
+            if last_key is not None and (key < last_key or key in blocks):
+                return None
+
+            blocks[key] = [start, offset]
+            last_key = key
+
+    return {
+        "version": INDEX_VERSION,
+        "key_col": key_col,
+        "header": header,
+        "size": offset,
+        "tail": _tail_bytes(path, offset),
+        "last_key": last_key,
+        "n_keys": len(blocks),
+        "blocks": _trim_blocks(blocks),
+        "appends_since_compact": 0,
+    }
+
+
+def _load_index(path: Path, key_col: str) -> Optional[Dict[str, Any]]:
+    """
+    committed index 로드 + 파일과 정합성 확인.
+    - 파일이 committed size보다 길고 꼬리가 newline으로 안 끝남 -> torn append, 잘라냄
+    - 그 외 불일치 -> scan으로 재구성
+    중단된 tail write(journal)가 있으면 먼저 redo.
+    """
+    _recover_journal(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+
+    idx: Optional[Dict[str, Any]] = None
+    idx_path = _index_path(path)
+    if idx_path.exists():
+        try:
+            with open(idx_path, "r", encoding="utf-8") as f:
+                idx = json.load(f)
+        except Exception:
+            idx = None
+
+    if (
+        not isinstance(idx, dict)
+        or idx.get("version") != INDEX_VERSION
+        or idx.get("key_col") != key_col
+    ):
+        return _scan_index(path, key_col)
+
+    size = int(idx.get("size", -1))
+    actual = path.stat().st_size
+
+    if actual < size or _tail_bytes(path, size) != idx.get("tail"):
+        return _scan_index(path, key_col)
+
+    if actual > size:
+        with open(path, "rb") as f:
+            f.seek(actual - 1)
+            ends_clean = f.read(1) == b"\n"
+
+        if ends_clean:
+            # 외부에서 완전한 row가 추가된 경우: 읽기만 해서 재구성
+            return _scan_index(path, key_col)
+
+        print(f"[WARN][LOG STORE] {path.name}: torn append detected -> truncate to {size} bytes")
+        with open(path, "r+b") as f:
+            f.truncate(size)
+            f.flush()
+            os.fsync(f.fileno())
+
+    return idx
+
+
+# -------------------------
+# Compaction
+# -------------------------
+def compact_log(
+    path: Path,
+    key_col: str = "date",
+    new_rows: Optional[pd.DataFrame] = None,
+    drop_after: bool = False,
+    column_order: Optional[ColumnOrderFn] = None,
+    normalize: Optional[NormalizeFn] = None,
+    drop_from: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    전체 파일 정리 후 atomic rewrite + index 재생성.
+    new_rows가 있으면 같은 날짜(drop_after=True면 그 이후 날짜까지) 교체 후 반영.
+    drop_from: drop_after 기준 날짜 (기본 new_rows 첫 날짜, source에서 빠진 날짜 삭제용)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _recover_journal(path)
+
+    if path.exists() and path.stat().st_size > 0:
+        try:
+            df = pd.read_csv(path)
+        except Exception as e:
+            print(f"[WARN][LOG STORE] {path.name} read failed during compaction: {e}")
+            df = pd.DataFrame()
+    else:
+        df = pd.DataFrame()
+
+    if not df.empty and key_col in df.columns:
+        df[key_col] = _normalize_keys(df[key_col])
+        df = df.dropna(subset=[key_col])
+
+    if new_rows is not None and not new_rows.empty:
+        target = str(new_rows[key_col].iloc[0])
+        if drop_after and drop_from is not None:
+            target = min(target, str(drop_from))
+        if not df.empty and key_col in df.columns:
+            keep = df[key_col] < target if drop_after else df[key_col] != target
+            df = df[keep]
+        df = pd.concat([df, new_rows], ignore_index=True)
+    elif drop_after and drop_from is not None and not df.empty and key_col in df.columns:
+        df = df[df[key_col] < str(drop_from)]
+
+    if normalize is not None:
+        df = normalize(df)
+
+    if key_col in df.columns:
+        df = df.sort_values(key_col, kind="mergesort").reset_index(drop=True)
+
+    if column_order is not None:
+        df = df.reindex(columns=column_order(list(df.columns)))
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_rows_to_bytes(df, header=True))
+        f.flush()
+        os.fsync(f.fileno())
+
+    # 같은 filesystem 안에서 atomic replace.
+    os.replace(tmp_path, path)
+
+    idx = _scan_index(path, key_col)
+    if idx is not None:
+        _write_index(path, idx)
+    else:
+        _index_path(path).unlink(missing_ok=True)
+
+    record_frame(path, df, key_col)
+    return df
+
+
+# -------------------------
+# Upsert
+# -------------------------
+def upsert_log_rows(
+    path: Path,
+    rows: pd.DataFrame,
+    key_col: str = "date",
+    drop_after: bool = False,
+    column_order: Optional[ColumnOrderFn] = None,
+    normalize: Optional[NormalizeFn] = None,
+) -> str:
+    """
+    한 날짜의 row(들)를 overwrite-safe로 반영.
+      - rows는 모두 같은 key_col 값을 가져야 함
+      - drop_after=True면 그 날짜 이후 row도 제거 (anchor 기준 교체)
+    Return: "append" | "replace" | "compact"
+    """
+    path = Path(path)
+    rows = rows.copy()
+
+    if rows.empty or key_col not in rows.columns:
+        raise ValueError(f"rows must contain '{key_col}'")
+
+    rows[key_col] = _normalize_keys(rows[key_col])
+    if rows[key_col].isna().any() or rows[key_col].nunique() != 1:
+        raise ValueError(f"rows must share one valid '{key_col}' value")
+
+    target = str(rows[key_col].iloc[0])
+
+    if normalize is not None:
+        rows = normalize(rows)
+
+    idx = _load_index(path, key_col)
+
+    def _compact() -> str:
+        compact_log(path, key_col, rows, drop_after, column_order, normalize)
+        return "compact"
+
+    if idx is None:
+        return _compact()
+
+    header: List[str] = list(idx["header"])
+    if any(c not in header for c in rows.columns):
+        return _compact()
+
+    if int(idx.get("appends_since_compact", 0)) + 1 >= COMPACT_EVERY:
+        return _compact()
+
+    blocks: Dict[str, List[int]] = idx["blocks"]
+    last_key: Optional[str] = idx.get("last_key")
+    size = int(idx["size"])
+
+    if last_key is None or target > last_key:
+        cut = size
+        mode = "append"
+    elif (target == last_key or drop_after) and _tail_covers(idx, target):
+        cut = min(start for key, (start, _) in blocks.items() if key >= target)
+        mode = "replace"
+    else:
+        return _compact()
+
+    payload = _rows_to_bytes(rows.reindex(columns=header), header=False)
+
+    n_keys = int(idx.get("n_keys", len(blocks))) - sum(1 for key in blocks if key >= target) + 1
+    blocks = {key: span for key, span in blocks.items() if key < target}
+    blocks[target] = [cut, cut + len(payload)]
+
+    idx.update(
+        {
+            "last_key": target,
+            "n_keys": n_keys,
+            "blocks": _trim_blocks(blocks),
+            "appends_since_compact": int(idx.get("appends_since_compact", 0)) + 1,
+        }
+    )
+    _write_tail(path, idx, cut, payload)
+    record_tail(path, rows, target, n_keys, size, key_col)
+
+    return mode
+
+
+# -------------------------
+# Multi-date tail (derived series 용)
+# -------------------------
+def read_log_tail(path: Path, n_keys: int, key_col: str = "date") -> pd.DataFrame:
+    """
+    마지막 n_keys개 날짜 블록만 읽기 (index offset 사용, 전체 파일 read 없음).
+    index를 만들 수 없으면 전체 read 후 tail.
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame()
+
+    idx = _load_index(path, key_col)
+    if idx is None:
+        df = pd.read_csv(path)
+        if key_col in df.columns:
+            keys = sorted(set(_normalize_keys(df[key_col]).dropna()))[-n_keys:] if n_keys > 0 else []
+            df = df[_normalize_keys(df[key_col]).isin(keys)]
+        return df.reset_index(drop=True)
+
+    blocks: Dict[str, List[int]] = idx["blocks"]
+    if n_keys > len(blocks) and int(idx.get("n_keys", len(blocks))) > len(blocks):
+        # index 꼬리보다 긴 구간 요청: 전체 read 후 tail
+        df = pd.read_csv(path)
+        keys = sorted(set(_normalize_keys(df[key_col]).dropna()))[-n_keys:]
+        return df[_normalize_keys(df[key_col]).isin(keys)].reset_index(drop=True)
+
+    keys = sorted(blocks)[-n_keys:] if n_keys > 0 else []
+    if not keys:
+        return pd.DataFrame(columns=idx["header"])
+
+    start = blocks[keys[0]][0]
+    with open(path, "rb") as f:
+        f.seek(start)
+        body = f.read(int(idx["size"]) - start)
+
+    header = _rows_to_bytes(pd.DataFrame(columns=idx["header"]), header=True)
+    return pd.read_csv(io.BytesIO(header + body))
+
+
+def count_log_keys(path: Path, key_col: str = "date") -> int:
+    idx = _load_index(Path(path), key_col)
+    return int(idx.get("n_keys", len(idx["blocks"]))) if idx is not None else 0
+
+
+def replace_log_tail(
+    path: Path,
+    rows: pd.DataFrame,
+    key_col: str = "date",
+    column_order: Optional[ColumnOrderFn] = None,
+    from_key: Optional[str] = None,
+) -> str:
+    """
+    여러 날짜 row를 한 번에 반영: rows의 첫 날짜(from_key가 더 이르면 from_key) 이후
+    기존 row는 모두 rows로 교체 (from_key: source에서 빠진 날짜까지 지우기 위한 기준).
+      - 기준 날짜가 기존 마지막 날짜 이하이면 그 블록 offset에서 truncate 후 append
+      - 새 컬럼 / index 없음이면 compaction
+    Return: "append" | "replace" | "compact" | "noop"
+    """
+    path = Path(path)
+    rows = rows.copy()
+
+    if rows.empty and from_key is None:
+        return "noop"
+    if key_col not in rows.columns:
+        raise ValueError(f"rows must contain '{key_col}'")
+
+    rows[key_col] = _normalize_keys(rows[key_col])
+    rows = rows.dropna(subset=[key_col]).sort_values(key_col, kind="mergesort").reset_index(drop=True)
+    first = str(rows[key_col].iloc[0]) if len(rows) else str(from_key)
+    if from_key is not None:
+        first = min(first, str(from_key))
+
+    idx = _load_index(path, key_col)
+
+    # 교체할 row 없이 꼬리 날짜만 삭제되는 경우도 compaction (드묾)
+    if (
+        idx is None
+        or rows.empty
+        or any(c not in idx["header"] for c in rows.columns)
+        or not _tail_covers(idx, first)
+    ):
+        compact_log(path, key_col, rows, drop_after=True, column_order=column_order, drop_from=first)
+        return "compact"
+
+    header: List[str] = list(idx["header"])
+    blocks: Dict[str, List[int]] = idx["blocks"]
+    last_key: Optional[str] = idx.get("last_key")
+    size = int(idx["size"])
+
+    if last_key is None or first > last_key:
+        cut = size
+        mode = "append"
+    else:
+        cut = min(start for key, (start, _) in blocks.items() if key >= first)
+        mode = "replace"
+
+    # 날짜별 offset 계산하면서 payload 구성
+    ordered = rows.reindex(columns=header)
+    new_blocks = {key: span for key, span in blocks.items() if key < first}
+    n_keys = int(idx.get("n_keys", len(blocks))) - (len(blocks) - len(new_blocks))
+    chunks: List[bytes] = []
+    offset = cut
+
+    for key, part in ordered.groupby(key_col, sort=True):
+        chunk = _rows_to_bytes(part, header=False)
+        new_blocks[str(key)] = [offset, offset + len(chunk)]
+        chunks.append(chunk)
+        offset += len(chunk)
+        n_keys += 1
+
+    idx.update(
+        {
+            "last_key": str(rows[key_col].iloc[-1]),
+            "n_keys": n_keys,
+            "blocks": _trim_blocks(new_blocks),
+            "appends_since_compact": int(idx.get("appends_since_compact", 0)) + 1,
+        }
+    )
+    _write_tail(path, idx, cut, b"".join(chunks))
+    record_tail(path, rows, first, n_keys, size, key_col)
+
+    return mode
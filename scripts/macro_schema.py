@@ -0,0 +1,264 @@
+# scripts/macro_schema.py
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from scripts.freshness_index import record_frame
+
+# =========================================================
+# macro_data.csv Schema Registry
+# ---------------------------------------------------------
+# 원칙:
+# - 스키마(컬럼/타입/날짜 정책)는 여기 한 곳에서만 선언
+# - drift 보정은 write 시점에 한 번만 수행 (write_macro_csv)
+# - reader(read_macro_csv)는 검증만 하고, 정상 파일이면 repair 경로를 타지 않음
+# - 파일 rewrite는 atomic replace (중간 실패 시 기존 파일 유지)
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+MACRO_CSV_PATH = DATA_DIR / "macro_data.csv"
+
+SCHEMA_VERSION = 1
+
+# 날짜 정책
+DATE_COL = "date"
+MIRROR_DATE_COL = "datetime"     # 기존 consumer 호환용: date와 항상 동일 값
+DATE_FORMAT = "%Y-%m-%d"
+MIN_VALID_YEAR = 1972            # 1970~1971 epoch row는 깨진 날짜로 간주
+
+# 값 컬럼 (scripts/fetch_macro_data.INDICATORS 순서와 동일하게 유지)
+VALUE_COLUMNS: List[str] = [
+    "US10Y", "DXY", "WTI", "VIX", "USDKRW", "HYG", "LQD",
+    "XLK", "XLF", "XLE", "XLRE",
+    "QQQ", "SPY", "XLI", "XLY", "RSP", "QQQE", "SMH", "SOXX", "IWM",
+    "VIX3M", "VIX9D",
+    "GOLD", "USDCNH", "USDJPY", "USDMXN",
+    "SEA", "BDRY", "ITA", "XAR", "EEM", "EMB",
+]
+
+MACRO_COLUMNS: List[str] = [MIRROR_DATE_COL, DATE_COL] + VALUE_COLUMNS
+
+MACRO_DTYPES: Dict[str, str] = {col: "float64" for col in VALUE_COLUMNS}
+
+
+# -------------------------
+# Normalize / Validate
+# -------------------------
+def _parse_dates(s: pd.Series) -> pd.Series:
+    return pd.to_datetime(s, errors="coerce").dt.normalize()
+
+
+def normalize_macro_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    스키마 drift 보정 (write 시점 전용).
+      - 중복 컬럼 / Unnamed 컬럼 제거
+      - date가 NaT 또는 epoch(1970~)이면 datetime 값으로 복구
+      - 같은 date는 마지막 row만 유지, date 오름차순
+      - 값 컬럼 float64 강제, 누락 컬럼은 NaN으로 추가
+      - 스키마에 없는 컬럼은 뒤에 유지 (데이터 유실 방지)
+    """
+    if df is None:
+        df = pd.DataFrame()
+
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+    df = df.loc[:, [c for c in df.columns if not str(c).startswith("Unnamed:")]]
+
+    if DATE_COL not in df.columns and MIRROR_DATE_COL not in df.columns and len(df.columns) > 0:
+        # fallback: 첫 컬럼이 날짜인 경우
+        df = df.rename(columns={df.columns[0]: DATE_COL})
+
+    d = _parse_dates(df[DATE_COL]) if DATE_COL in df.columns else pd.Series(pd.NaT, index=df.index)
+
+    if MIRROR_DATE_COL in df.columns:
+        dt = _parse_dates(df[MIRROR_DATE_COL])
+        d = d.where(d.notna(), dt)
+        bad_epoch = d.notna() & (d.dt.year < MIN_VALID_YEAR) & dt.notna()
+        d = d.where(~bad_epoch, dt)
+
+    df[DATE_COL] = d
+    df = df.dropna(subset=[DATE_COL])
+    df = df[df[DATE_COL].dt.year >= MIN_VALID_YEAR]
+
+    df = (
+        df.drop_duplicates(subset=[DATE_COL], keep="last")
+        .sort_values(DATE_COL)
+        .reset_index(drop=True)
+    )
+
+    for col in VALUE_COLUMNS:
+        if col not in df.columns:
+            df[col] = float("nan")
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+
+    df[MIRROR_DATE_COL] = df[DATE_COL]
+
+    extra_cols = [c for c in df.columns if c not in MACRO_COLUMNS]
+    if extra_cols:
+        print(f"[WARN][MACRO SCHEMA] undeclared columns kept: {extra_cols}")
+
+    return df[MACRO_COLUMNS + extra_cols]
+
+
+def validate_macro_frame(df: pd.DataFrame) -> List[str]:
+    """
+    정상 파일인지 빠르게 확인 (vectorized, O(rows)).
+    빈 리스트면 스키마 일치.
+    """
+    problems: List[str] = []
+
+    if list(df.columns[: len(MACRO_COLUMNS)]) != MACRO_COLUMNS:
+        problems.append("column order/header mismatch")
+        return problems
+
+    if df.columns.duplicated().any():
+        problems.append("duplicated columns")
+
+    d = df[DATE_COL]
+    if not pd.api.types.is_datetime64_any_dtype(d):
+        problems.append("date not parsed")
+        return problems
+
+    if d.isna().any():
+        problems.append("invalid date rows")
+    elif (d.dt.year < MIN_VALID_YEAR).any():
+        problems.append("epoch date rows")
+
+    if d.duplicated().any():
+        problems.append("duplicated dates")
+
+    if not d.is_monotonic_increasing:
+        problems.append("dates not sorted")
+
+    return problems
+
+
+# -------------------------
+# Reader
+# -------------------------
+def _read_drifted_csv(path: Path) -> pd.DataFrame:
+    """
+    헤더보다 필드가 많거나 적은 row가 섞인 구버전 파일 전용.
+    (과거 repair_macro_csv의 pad/truncate 규칙을 메모리에서만 적용, 파일은 건드리지 않음)
+    """
+    lines = path.read_text(encoding="utf-8").splitlines()
+    if not lines:
+        return pd.DataFrame(columns=MACRO_COLUMNS)
+
+    header = [h.strip() for h in lines[0].split(",") if h.strip()]
+    for col in MACRO_COLUMNS:
+        if col not in header:
+            header.append(col)
+
+    n = len(header)
+    rows = []
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+        parts = line.split(",")
+        if len(parts) < n:
+            parts = parts + [""] * (n - len(parts))
+        rows.append(parts[:n])
+
+    df = pd.DataFrame(rows, columns=header)
+    return df.replace("", pd.NA)
+
+
+def read_macro_csv(path: Path = MACRO_CSV_PATH) -> pd.DataFrame:
+    """
+    스키마 검증 loader.
+      - 정상 파일: read_csv 한 번 + 검증만 (repair 없음)
+      - drift 파일: 메모리에서만 보정 후 반환 (다음 write_macro_csv 때 파일이 정리됨)
+    Output: date(datetime64) 오름차순 DataFrame
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return normalize_macro_frame(pd.DataFrame(columns=MACRO_COLUMNS))
+
+    try:
+        df = pd.read_csv(path, dtype=MACRO_DTYPES)
+        df[DATE_COL] = pd.to_datetime(df[DATE_COL], format=DATE_FORMAT, errors="coerce")
+        problems = validate_macro_frame(df)
+    except Exception as e:
+        df = None
+        problems = [f"{type(e).__name__}: {e}"]
+
+    if not problems:
+        df[MIRROR_DATE_COL] = df[DATE_COL]
+        return df
+
+    print(f"[WARN][MACRO SCHEMA] {path.name} drift detected -> in-memory normalize: {problems}")
+
+    if df is None:
+        df = _read_drifted_csv(path)
+
+    return normalize_macro_frame(df)
+
+
+# -------------------------
+# Writer
+# -------------------------
+def write_macro_csv(df: pd.DataFrame, path: Path = MACRO_CSV_PATH) -> pd.DataFrame:
+    """
+    스키마 보정 후 atomic write.
+    모든 macro_data.csv writer는 이 함수를 통해 저장한다.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    out = normalize_macro_frame(df)
+    to_save = out.copy()
+    to_save[DATE_COL] = to_save[DATE_COL].dt.strftime(DATE_FORMAT)
+    to_save[MIRROR_DATE_COL] = to_save[DATE_COL]
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    to_save.to_csv(tmp_path, index=False)
+
+    # 같은 filesystem 안에서 atomic replace.
+    os.replace(tmp_path, path)
+
+    # 컬럼별 마지막 유효 날짜 (readiness / stale 판단용)
+    record_frame(path, out, DATE_COL)
+    return out
+
+
+def upsert_macro_row(
+    values: Dict[str, Any],
+    market_date: str,
+    path: Path = MACRO_CSV_PATH,
+) -> pd.DataFrame:
+    """
+    기준일 row 1개를 overwrite-safe로 반영 (같은 date는 교체).
+    """
+    row: Dict[str, Any] = {MIRROR_DATE_COL: market_date, DATE_COL: market_date}
+    row.update(values)
+
+    existing = read_macro_csv(path)
+    new_row = pd.DataFrame([row])
+    new_row[DATE_COL] = _parse_dates(new_row[DATE_COL])
+
+    if new_row[DATE_COL].isna().any():
+        raise ValueError(f"invalid market_date: {market_date}")
+
+    existing = existing[existing[DATE_COL] != new_row[DATE_COL].iloc[0]]
+    return write_macro_csv(pd.concat([existing, new_row], ignore_index=True), path)
+
+
+def describe_schema() -> Dict[str, Any]:
+    return {
+        "version": SCHEMA_VERSION,
+        "columns": MACRO_COLUMNS,
+        "dtypes": MACRO_DTYPES,
+        "date_policy": {
+            "column": DATE_COL,
+            "mirror": MIRROR_DATE_COL,
+            "format": DATE_FORMAT,
+            "unique": True,
+            "sorted": True,
+            "min_year": MIN_VALID_YEAR,
+        },
+    }
@@ -0,0 +1,268 @@
+# scripts/market_backend.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# =========================================================
+# Market Data Backend (live / record / replay)
+# ---------------------------------------------------------
+# 모든 외부 시세 호출(yfinance download / Ticker history / option chain,
+# FRED/CBOE CSV, Treasury HTML, FRED text)은
+# get_market_backend()를 통해서만 나간다.
+#
+# MARKET_BACKEND 환경변수:
+#   live   (기본) : 기존과 동일하게 외부 호출
+#   record         : live 호출 + 응답을 fixture archive에 저장
+#   replay         : 네트워크 없이 fixture archive에서만 응답 (disk speed)
+#
+# MARKET_FIXTURE_DIR: fixture archive 위치 (기본 data/fixtures/market)
+#
+# now(label): 시세 기준 시각 (option 만기 필터 등). record는 시각도 fixture로 저장,
+#   replay는 저장된 시각을 돌려줌 -> 만기 선택 / time-to-expiry가 실행 시각과 무관하게 재현
+#
+# replay에서 fixture가 없으면 NaN/0.0으로 숨기지 않고 FixtureMissingError를 올린다.
+# (호출부 기존 except 처리는 그대로, 로그에 [REPLAY MISS]가 남음)
+#
+# replay 적용 범위 (daily pipeline writers):
+#   fetch_macro_data / fetch_etf_data / fetch_country_etf_data_combined /
+#   data_processing / fetch_liquidity_data / fetch_credit_spread_data /
+#   fetch_sovereign_yields / fred_data_fetcher / fetch_sentiment /
+#   fetch_expectation_data / fetch_positioning_data / positioning_features /
+#   gex_engine / bar_archive / anomaly_detectors / monitor_sew
+# 범위 밖 (직접 호출 유지): 일회성 rebuild_* / backfill_* / build_macro_data_backtest,
+#   experiments/, alert_dispatcher 메일 발송 (시세가 아님)
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_FIXTURE_DIR = BASE_DIR / "data" / "fixtures" / "market"
+
+BACKEND_ENV = "MARKET_BACKEND"
+FIXTURE_DIR_ENV = "MARKET_FIXTURE_DIR"
+
+BACKEND_MODES = ("live", "record", "replay")
+
+
+class FixtureMissingError(LookupError):
+    """replay 모드에서 요청에 해당하는 fixture가 없을 때."""
+
+
+def _fixture_key(method: str, target: Any, params: Dict[str, Any]) -> str:
+    if not isinstance(target, str):
+        # yf.download(TICKERS, ...) 처럼 ticker list 요청
+        target = " ".join(str(t) for t in target)
+    payload = json.dumps(
+        {"method": method, "target": target, "params": params},
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    safe_target = re.sub(r"[^A-Za-z0-9]+", "_", target)[:40].strip("_")
+    return f"{method}_{safe_target}_{digest}"
+
+
+# -------------------------
+# Live
+# -------------------------
+class LiveMarketBackend:
+    """외부 호출 그대로 (기존 동작)."""
+
+    mode = "live"
+
+    def download(self, ticker: Any, **kwargs: Any) -> pd.DataFrame:
+        import yfinance as yf
+
+        return yf.download(ticker, **kwargs)
+
+    def history(self, ticker: str, **kwargs: Any) -> pd.DataFrame:
+        import yfinance as yf
+
+        return yf.Ticker(ticker).history(**kwargs)
+
+    def option_expirations(self, ticker: str) -> List[str]:
+        import yfinance as yf
+
+        return list(yf.Ticker(ticker).options or [])
+
+    def option_chain(self, ticker: str, expiry: str) -> List[pd.DataFrame]:
+        """[calls, puts]"""
+        import yfinance as yf
+
+        opt = yf.Ticker(ticker).option_chain(expiry)
+        return [opt.calls, opt.puts]
+
+    def read_csv_url(self, url: str, **kwargs: Any) -> pd.DataFrame:
+        return pd.read_csv(url, **kwargs)
+
+    def read_html(self, url: str, **kwargs: Any) -> List[pd.DataFrame]:
+        return pd.read_html(url, **kwargs)
+
+    def get_text(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 20) -> str:
+        import requests
+
+        r = requests.get(url, headers=headers, timeout=timeout)
+        r.raise_for_status()
+        return r.text
+
+    def now(self, label: str = "clock") -> pd.Timestamp:
+        return pd.Timestamp.now(tz="UTC")
+
+
+# -------------------------
+# Record
+# -------------------------
+class RecordingMarketBackend(LiveMarketBackend):
+    """live 호출 결과를 fixture archive에 저장 (DataFrame 구조 그대로 pickle)."""
+
+    mode = "record"
+
+    def __init__(self, fixture_dir: Path = DEFAULT_FIXTURE_DIR):
+        self.fixture_dir = Path(fixture_dir)
+        self.fixture_dir.mkdir(parents=True, exist_ok=True)
+
+    def _store(self, key: str, value: Any) -> None:
+        path = self.fixture_dir / f"{key}.pkl"
+        tmp_path = path.with_suffix(".pkl.tmp")
+        pd.to_pickle(value, tmp_path)
+        os.replace(tmp_path, path)
+
+    def download(self, ticker: Any, **kwargs: Any) -> pd.DataFrame:
+        df = super().download(ticker, **kwargs)
+        self._store(_fixture_key("download", ticker, kwargs), df)
+        return df
+
+    def history(self, ticker: str, **kwargs: Any) -> pd.DataFrame:
+        df = super().history(ticker, **kwargs)
+        self._store(_fixture_key("history", ticker, kwargs), df)
+        return df
+
+    def option_expirations(self, ticker: str) -> List[str]:
+        expirations = super().option_expirations(ticker)
+        self._store(_fixture_key("option_expirations", ticker, {}), expirations)
+        return expirations
+
+    def option_chain(self, ticker: str, expiry: str) -> List[pd.DataFrame]:
+        tables = super().option_chain(ticker, expiry)
+        self._store(_fixture_key("option_chain", ticker, {"expiry": expiry}), tables)
+        return tables
+
+    def read_csv_url(self, url: str, **kwargs: Any) -> pd.DataFrame:
+        df = super().read_csv_url(url, **kwargs)
+        self._store(_fixture_key("read_csv_url", url, kwargs), df)
+        return df
+
+    def read_html(self, url: str, **kwargs: Any) -> List[pd.DataFrame]:
+        tables = super().read_html(url, **kwargs)
+        self._store(_fixture_key("read_html", url, kwargs), tables)
+        return tables
+
+    def get_text(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 20) -> str:
+        # headers/timeout은 응답 내용과 무관하므로 key에서 제외
+        text = super().get_text(url, headers=headers, timeout=timeout)
+        self._store(_fixture_key("get_text", url, {}), text)
+        return text
+
+    def now(self, label: str = "clock") -> pd.Timestamp:
+        ts = super().now(label)
+        self._store(_fixture_key("now", label, {}), ts)
+        return ts
+
+
+# -------------------------
+# Replay
+# -------------------------
+class ReplayMarketBackend:
+    """fixture archive에서만 응답. 네트워크 접근 없음."""
+
+    mode = "replay"
+
+    def __init__(self, fixture_dir: Path = DEFAULT_FIXTURE_DIR):
+        self.fixture_dir = Path(fixture_dir)
+        self._cache: Dict[str, Any] = {}
+
+    def _load(self, method: str, target: str, params: Dict[str, Any]) -> Any:
+        key = _fixture_key(method, target, params)
+
+        if key not in self._cache:
+            path = self.fixture_dir / f"{key}.pkl"
+            if not path.exists():
+                print(f"[REPLAY MISS] {method} {target} {params}")
+                raise FixtureMissingError(f"no fixture for {method} {target} ({key})")
+            self._cache[key] = pd.read_pickle(path)
+
+        value = self._cache[key]
+        # 호출부가 in-place 수정해도 다음 replay 결과가 바뀌지 않도록 복사본 반환
+        if isinstance(value, pd.DataFrame):
+            return value.copy()
+        if isinstance(value, list):
+            return [v.copy() if isinstance(v, pd.DataFrame) else v for v in value]
+        return value
+
+    def download(self, ticker: Any, **kwargs: Any) -> pd.DataFrame:
+        return self._load("download", ticker, kwargs)
+
+    def history(self, ticker: str, **kwargs: Any) -> pd.DataFrame:
+        return self._load("history", ticker, kwargs)
+
+    def option_expirations(self, ticker: str) -> List[str]:
+        return self._load("option_expirations", ticker, {})
+
+    def option_chain(self, ticker: str, expiry: str) -> List[pd.DataFrame]:
+        return self._load("option_chain", ticker, {"expiry": expiry})
+
+    def read_csv_url(self, url: str, **kwargs: Any) -> pd.DataFrame:
+        return self._load("read_csv_url", url, kwargs)
+
+    def read_html(self, url: str, **kwargs: Any) -> List[pd.DataFrame]:
+        return self._load("read_html", url, kwargs)
+
+    def get_text(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 20) -> str:
+        return self._load("get_text", url, {})
+
+    def now(self, label: str = "clock") -> pd.Timestamp:
+        return self._load("now", label, {})
+
+
+# -------------------------
+# Registry
+# -------------------------
+_BACKEND: Optional[Any] = None
+
+
+def make_market_backend(mode: str, fixture_dir: Optional[Path] = None) -> Any:
+    mode = (mode or "live").strip().lower()
+    fixture_dir = Path(fixture_dir) if fixture_dir else DEFAULT_FIXTURE_DIR
+
+    if mode == "live":
+        return LiveMarketBackend()
+    if mode == "record":
+        return RecordingMarketBackend(fixture_dir)
+    if mode == "replay":
+        return ReplayMarketBackend(fixture_dir)
+
+    raise ValueError(f"unknown {BACKEND_ENV}={mode!r} (expected one of {BACKEND_MODES})")
+
+
+def get_market_backend() -> Any:
+    """환경변수 기준 backend (프로세스당 1회 생성)."""
+    global _BACKEND
+
+    if _BACKEND is None:
+        fixture_dir = os.environ.get(FIXTURE_DIR_ENV)
+        _BACKEND = make_market_backend(os.environ.get(BACKEND_ENV, "live"), fixture_dir)
+        if _BACKEND.mode != "live":
+            print(f"[DEBUG][MARKET BACKEND] mode={_BACKEND.mode} dir={_BACKEND.fixture_dir}")
+
+    return _BACKEND
+
+
+def set_market_backend(backend: Optional[Any]) -> None:
+    """benchmark/backtest에서 backend 교체용 (None이면 환경변수 기준으로 재생성)."""
+    global _BACKEND
+    _BACKEND = backend
@@ -0,0 +1,374 @@
+# scripts/market_snapshot.py
+from __future__ import annotations
+
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# Market Snapshot
+# ---------------------------------------------------------
+# 목적:
+# - 기존 market_data(dict of dict) 구조를 그대로 유지하면서
+#   컬럼 값(today / prev / pct_change)은 연속 float64 배열에 저장
+# - 필터는 기존처럼 market_data["VIX"]["today"], .get() 사용 가능
+# - _get_series 등은 snapshot.today("VIX") 같은 typed 접근으로 O(1) 조회
+# - 백테스트 replay 시 수천 개 snapshot을 하나의 행렬 view로 공유
+# =========================================================
+
+# 고정 컬럼 레지스트리 (순서 = 배열 index, append-only)
+MARKET_COLUMNS: List[str] = [
+    # core macro
+    "US10Y", "DXY", "WTI", "VIX", "USDKRW",
+    # credit / sector / breadth
+    "HYG", "LQD",
+    "XLK", "XLF", "XLE", "XLRE", "XLI", "XLY",
+    "QQQ", "SPY", "RSP", "QQQE", "SMH", "SOXX", "IWM",
+    # vol structure
+    "VIX3M", "VIX9D",
+    # fx / commodity / geo
+    "GOLD", "USDCNH", "USDJPY", "USDMXN",
+    "SEA", "BDRY", "ITA", "XAR", "EEM", "EMB",
+    # sovereign spreads (merge_sovereign_spreads_into_macro_df)
+    "KR10Y_SPREAD", "JP10Y_SPREAD", "CN10Y_SPREAD", "DE10Y_SPREAD",
+    "IL10Y_SPREAD", "TR10Y_SPREAD", "GB10Y_SPREAD", "MX10Y_SPREAD",
+    # FRED / credit layers
+    "HY_OAS", "FCI", "REAL_RATE", "T10Y2Y", "T10YIE", "DFII10", "DGS2",
+]
+
+SERIES_FIELDS = ("today", "prev", "pct_change")
+
+
+class ColumnRegistry:
+    """
+    컬럼 이름 → 배열 index 매핑.
+    새 컬럼은 뒤에만 추가되므로 기존 snapshot의 index는 절대 바뀌지 않는다.
+    """
+
+    __slots__ = ("_names", "_index")
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        for name in names:
+            self.register(name)
+
+    def register(self, name: str) -> int:
+        idx = self._index.get(name)
+        if idx is None:
+            idx = len(self._names)
+            self._names.append(name)
+            self._index[name] = idx
+        return idx
+
+    def index_of(self, name: str) -> Optional[int]:
+        return self._index.get(name)
+
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+COLUMN_REGISTRY = ColumnRegistry(MARKET_COLUMNS)
+
+
+def _nan_to_none(x: float) -> Optional[float]:
+    return None if np.isnan(x) else float(x)
+
+
+class _SeriesView(dict):
+    """
+    snapshot 컬럼 하나의 dict 호환 view.
+    today/prev/pct_change 외 키를 쓰면(예: NET_LIQ["dir"]) snapshot의 extras로 승격되어
+    이후 조회에서도 그대로 유지된다.
+    """
+
+    __slots__ = ("_snapshot", "_name")
+
+    def __init__(self, snapshot: "MarketSnapshot", name: str, payload: Dict[str, Any]):
+        super().__init__(payload)
+        self._snapshot = snapshot
+        self._name = name
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        self._snapshot._promote(self._name, dict(self))
+
+
+class MarketSnapshot(MutableMapping):
+    """
+    market_data dict를 대체하는 compact snapshot.
+
+    - 레지스트리 컬럼: today / prev / pct 세 개의 float64 배열 (NaN = 결측)
+    - 그 외 ad-hoc 키(COUNTRY_RISK_*, BREADTH_*_PREV2, FINAL_STATE 등): extras dict
+    - 기존 필터는 Mapping 인터페이스로 그대로 동작
+    """
+
+    __slots__ = ("_registry", "_today", "_prev", "_pct", "_extras")
+
+    def __init__(
+        self,
+        today: Optional[np.ndarray] = None,
+        prev: Optional[np.ndarray] = None,
+        pct: Optional[np.ndarray] = None,
+        registry: ColumnRegistry = COLUMN_REGISTRY,
+    ):
+        n = len(registry)
+        self._registry = registry
+        self._today = today if today is not None else np.full(n, np.nan)
+        self._prev = prev if prev is not None else np.full(n, np.nan)
+        self._pct = pct if pct is not None else np.full(n, np.nan)
+        self._extras: Dict[str, Any] = {}
+
+    # -------------------------
+    # Typed O(1) access
+    # -------------------------
+    def _slot(self, name: str) -> Optional[int]:
+        idx = self._registry.index_of(name)
+        if idx is None or idx >= len(self._today):
+            return None
+        return idx
+
+    def has_column(self, name: str) -> bool:
+        if name in self._extras:
+            return False
+        idx = self._slot(name)
+        return idx is not None and not np.isnan(self._today[idx])
+
+    def today(self, name: str, default: Optional[float] = None) -> Optional[float]:
+        idx = self._slot(name)
+        if idx is None or name in self._extras:
+            return default
+        v = self._today[idx]
+        return default if np.isnan(v) else float(v)
+
+    def prev(self, name: str, default: Optional[float] = None) -> Optional[float]:
+        idx = self._slot(name)
+        if idx is None or name in self._extras:
+            return default
+        v = self._prev[idx]
+        return default if np.isnan(v) else float(v)
+
+    def pct_change(self, name: str, default: Optional[float] = None) -> Optional[float]:
+        idx = self._slot(name)
+        if idx is None or name in self._extras:
+            return default
+        v = self._pct[idx]
+        return default if np.isnan(v) else float(v)
+
+    def set_series(
+        self,
+        name: str,
+        today: Optional[float],
+        prev: Optional[float] = None,
+        pct_change: Optional[float] = None,
+    ) -> None:
+        idx = self._ensure_slot(name)
+        self._own()
+        self._extras.pop(name, None)
+        self._today[idx] = np.nan if today is None else float(today)
+        self._prev[idx] = np.nan if prev is None else float(prev)
+        self._pct[idx] = np.nan if pct_change is None else float(pct_change)
+
+    def _ensure_slot(self, name: str) -> int:
+        idx = self._registry.register(name)
+        if idx >= len(self._today):
+            grow = len(self._registry) - len(self._today)
+            pad = np.full(grow, np.nan)
+            self._today = np.concatenate([self._today, pad])
+            self._prev = np.concatenate([self._prev, pad])
+            self._pct = np.concatenate([self._pct, pad])
+        return idx
+
+    def _own(self) -> None:
+        # 공유 행렬 view일 수 있으므로 쓰기 전에 복사 (copy-on-write)
+        if not self._today.flags.owndata:
+            self._today = self._today.copy()
+        if not self._prev.flags.owndata:
+            self._prev = self._prev.copy()
+        if not self._pct.flags.owndata:
+            self._pct = self._pct.copy()
+
+    def _clear_slot(self, name: str) -> None:
+        idx = self._slot(name)
+        if idx is None:
+            return
+        self._own()
+        self._today[idx] = np.nan
+        self._prev[idx] = np.nan
+        self._pct[idx] = np.nan
+
+    def _promote(self, name: str, payload: Dict[str, Any]) -> None:
+        self._clear_slot(name)
+        self._extras[name] = payload
+
+    # -------------------------
+    # Mapping interface
+    # -------------------------
+    def __getitem__(self, key: str) -> Any:
+        if key in self._extras:
+            return self._extras[key]
+
+        idx = self._slot(key)
+        if idx is None or np.isnan(self._today[idx]):
+            raise KeyError(key)
+
+        return _SeriesView(
+            self,
+            key,
+            {
+                "today": float(self._today[idx]),
+                "prev": _nan_to_none(self._prev[idx]),
+                "pct_change": _nan_to_none(self._pct[idx]),
+            },
+        )
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if (
+            key in self._registry
+            and isinstance(value, dict)
+            and not isinstance(value, _SeriesView)
+            and value.get("today") is not None
+            and set(value.keys()) <= set(SERIES_FIELDS)
+        ):
+            try:
+                self.set_series(
+                    key,
+                    float(value["today"]),
+                    None if value.get("prev") is None else float(value["prev"]),
+                    None if value.get("pct_change") is None else float(value["pct_change"]),
+                )
+                return
+            except (TypeError, ValueError):
+                pass
+
+        if isinstance(value, _SeriesView):
+            value = dict(value)
+
+        self._clear_slot(key)
+        self._extras[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._extras:
+            del self._extras[key]
+            return
+        if not self.has_column(key):
+            raise KeyError(key)
+        self._clear_slot(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._extras:
+            return True
+        return isinstance(key, str) and self.has_column(key)
+
+    def __iter__(self) -> Iterator[str]:
+        names = self._registry.names
+        for idx in np.flatnonzero(~np.isnan(self._today)):
+            name = names[idx]
+            if name not in self._extras:
+                yield name
+        yield from list(self._extras.keys())
+
+    def __len__(self) -> int:
+        n_cols = int(np.count_nonzero(~np.isnan(self._today)))
+        shadowed = sum(1 for k in self._extras if self.has_column(k))
+        return n_cols - shadowed + len(self._extras)
+
+    def __repr__(self) -> str:
+        return f"MarketSnapshot(columns={int(np.count_nonzero(~np.isnan(self._today)))}, extras={len(self._extras)})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """기존 build_market_data와 동일한 plain dict 구조로 변환 (직렬화/디버그용)."""
+        return {k: (dict(v) if isinstance(v, _SeriesView) else v) for k, v in self.items()}
+
+
+# =========================================================
+# Builders
+# =========================================================
+def _numeric_matrix(df: pd.DataFrame, registry: ColumnRegistry) -> np.ndarray:
+    """
+    df 숫자 컬럼을 registry 순서의 (rows × registry) float64 행렬로 변환.
+    df에 없는 registry 컬럼은 NaN.
+    """
+    value_cols = [c for c in df.columns if c not in ("date", "datetime")]
+    for col in value_cols:
+        registry.register(str(col))
+
+    mat = np.full((len(df), len(registry)), np.nan)
+    for col in value_cols:
+        idx = registry.index_of(str(col))
+        mat[:, idx] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+    return mat
+
+
+def _prev_matrix(mat: np.ndarray) -> np.ndarray:
+    """각 row 기준 '직전 row까지의 마지막 유효값' 행렬 (forward-fill 후 1칸 shift)."""
+    filled = pd.DataFrame(mat).ffill().to_numpy(dtype=float)
+    prev = np.full_like(filled, np.nan)
+    if len(filled) > 1:
+        prev[1:] = filled[:-1]
+    return prev
+
+
+def _pct_matrix(today: np.ndarray, prev: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (today - prev) / prev * 100.0
+    pct = np.where(prev == 0, 0.0, pct)
+    pct[np.isnan(today) | np.isnan(prev)] = np.nan
+    return pct
+
+
+def build_market_snapshot(
+    df: pd.DataFrame,
+    today_idx: int,
+    registry: ColumnRegistry = COLUMN_REGISTRY,
+) -> MarketSnapshot:
+    """
+    build_market_data(df, today_idx)와 같은 규칙으로 snapshot 생성.
+      - today = df.iloc[today_idx][col]
+      - prev  = today_idx 이전 마지막 non-null 값
+    """
+    mat = _numeric_matrix(df.iloc[: today_idx + 1], registry)
+    today = mat[today_idx].copy()
+
+    prev = np.full(len(registry), np.nan)
+    if today_idx > 0:
+        prev = pd.DataFrame(mat[:today_idx]).ffill().to_numpy(dtype=float)[-1]
+
+    return MarketSnapshot(
+        today=today,
+        prev=prev.copy(),
+        pct=_pct_matrix(today, prev),
+        registry=registry,
+    )
+
+
+def build_market_snapshots(
+    df: pd.DataFrame,
+    registry: ColumnRegistry = COLUMN_REGISTRY,
+) -> List[MarketSnapshot]:
+    """
+    Daily replay 백테스트용: 전체 history를 한 번에 snapshot 리스트로 변환.
+    모든 snapshot은 세 개의 공유 행렬의 row view라서 추가 메모리가 거의 없다.
+    """
+    today_mat = _numeric_matrix(df, registry)
+    prev_mat = _prev_matrix(today_mat)
+    pct_mat = _pct_matrix(today_mat, prev_mat)
+
+    return [
+        MarketSnapshot(
+            today=today_mat[i],
+            prev=prev_mat[i],
+            pct=pct_mat[i],
+            registry=registry,
+        )
+        for i in range(len(df))
+    ]
@@ -1,12 +1,20 @@
 import os
 import json
-import requests
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+from scripts.market_backend import get_market_backend
+from scripts.anomaly_detectors import (
+    CORE_PROXIES,
+    INTERVAL as WIDE_INTERVAL,
+    run_detector_cycle,
+)
+from scripts.bar_archive import load_bars
+from scripts.alert_dispatcher import ALERT_WINDOWS, enqueue_alert, flush_alerts, start_sender
+from scripts.flow_engine import latest_flow_row, transition_info_from_row
+
 
 # ---------------------------
 # 0. Credit State Helper
@@ -327,10 +335,19 @@ def volatility_controlled_exposure_filter(
 # ---------------------------
 # 5. Event Signature 분류
 # ---------------------------
+# wide universe detector (scripts/anomaly_detectors) 기반 event
+WIDE_EVENT_TYPES = [
+    "CROSS_ASSET_SHOCK",
+    "SECTOR_WIDE_SELLOFF",
+    "GLOBAL_RISK_CONTAGION",
+]
+
+
 def detect_event_signature(
     z_map: Dict[str, float],
     context: Dict[str, Any],
     market_snap: Dict[str, Any],
+    wide: Optional[Dict[str, Any]] = None,
 ) -> str:
     spy_z = float(z_map.get("SPY", 0.0) or 0.0)
     qqq_z = float(z_map.get("QQQ", 0.0) or 0.0)
@@ -363,9 +380,27 @@ def detect_event_signature(
             return "VOL_CRUSH_SQUEEZE"
         return "RISK_ON_SQUEEZE"
 
+    # POSITION_UNWIND_RISK는 decision_layer의 증가 억제 조건이라 wide event보다 먼저 판정
     if pos_z > 2.2 and abs(pos_slope) > 0.5:
         return "POSITION_UNWIND_RISK"
 
+    # core 5개 proxy로는 안 잡히는 breadth 이벤트 (wide universe)
+    if wide:
+        n_scored = int(wide.get("n_scored", 0) or 0)
+        n_extreme = int(wide.get("n_extreme", 0) or 0)
+        groups = wide.get("groups", {}) or {}
+        sector_down = float(groups.get("sector", {}).get("down", 0.0) or 0.0)
+        country_down = float(groups.get("country", {}).get("down", 0.0) or 0.0)
+
+        if n_scored > 0 and n_extreme >= 3 and n_extreme >= 0.1 * n_scored:
+            return "CROSS_ASSET_SHOCK"
+
+        if sector_down >= 0.6 and vix_z > 1.5:
+            return "SECTOR_WIDE_SELLOFF"
+
+        if country_down >= 0.5:
+            return "GLOBAL_RISK_CONTAGION"
+
     return "NORMAL"
 
 
@@ -378,7 +413,7 @@ def download_intraday_prices(
     interval: str = "5m",
 ) -> Optional[np.ndarray]:
     try:
-        df = yf.download(
+        df = get_market_backend().download(
             ticker,
             period=period,
             interval=interval,
@@ -420,6 +455,7 @@ def save_sew_state(
     deadman_reason: str,
     z_map: Dict[str, float],
     market_snap: Dict[str, Any],
+    wide: Optional[Dict[str, Any]] = None,
 ):
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
@@ -444,6 +480,9 @@ def save_sew_state(
         "assets": assets,
     }
 
+    if wide:
+        payload["wide"] = wide
+
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
 
@@ -611,13 +650,20 @@ def check_market_anomaly():
     csv_path = "data/market_data_history.csv"
     context = load_war_room_context(csv_path) or {}
 
-    tickers = {
-        "SPY": "SPY",
-        "QQQ": "QQQ",
-        "VIX": "^VIX",
-        "DXY": "UUP",
-        "WTI": "USO",
-    }
+    tickers = dict(CORE_PROXIES)
+
+    # ---------------------------
+    # Wide universe detector (core + macro + sector + country 5m bar)
+    # download는 여기서 한 번 → core 5개도 archive에서 읽음
+    # ---------------------------
+    wide: Dict[str, Any] = {}
+    fresh: Dict[str, bool] = {}
+    try:
+        detector = run_detector_cycle()
+        wide = detector["wide"]
+        fresh = detector["fresh"]
+    except Exception as e:
+        print(f"[WARN][SEW DETECTOR] wide detector 실패 → core 5개만 감시: {e}")
 
     market_snap: Dict[str, Any] = {}
     summary_lines = []
@@ -632,7 +678,11 @@ def check_market_anomaly():
     for name, ticker in tickers.items():
         try:
             print(f"🔍 {name} 데이터 수집 시도... ({ticker})")
-            prices = download_intraday_prices(ticker, period="5d", interval="5m")
+            if fresh.get(ticker):
+                prices = np.asarray(load_bars(ticker, WIDE_INTERVAL)["close"][-400:], dtype=float)
+                prices = prices[np.isfinite(prices)]
+            else:
+                prices = download_intraday_prices(ticker, period="5d", interval="5m")
 
             if prices is None or len(prices) < 2:
                 print(f"⚠️ {name} 데이터 부족 또는 수집 실패")
@@ -684,29 +734,43 @@ def check_market_anomaly():
     elif spike_count >= 2:
         is_spiking = True
 
-    event_type = detect_event_signature(z_map, context, market_snap)
+    event_type = detect_event_signature(z_map, context, market_snap, wide=wide)
 
     # ---------------------------
     # Institutional Flow Change Monitor
     # ---------------------------
     current_flow_state, current_flow_score = extract_current_flow_from_context(context)
 
-    prev_flow = load_previous_flow_state()
-    prev_flow_state = str(prev_flow.get("flow_state", "N/A") or "N/A").upper()
+    # 아침 리포트가 기록한 flow history(같은 날짜 row)가 있으면 그 transition / persistence 사용
+    # (10분 cron마다 snapshot끼리 비교하면 persistence가 실행 횟수만큼 누적됨)
+    flow_row = None
     try:
-        prev_flow_score = int(float(prev_flow.get("flow_score", 0) or 0))
-    except Exception:
-        prev_flow_score = 0
+        flow_row = latest_flow_row(as_of=context.get("date")) if context.get("date") else None
+    except Exception as e:
+        print(f"[WARN] flow history read 실패 → flow_state.json 사용: {e}")
 
-    prev_persistence_days = int(prev_flow.get("persistence_days", 0) or 0)
+    if flow_row is not None:
+        transition_info = transition_info_from_row(flow_row)
+        prev_flow_state = str(transition_info.get("prev_flow_state", "N/A") or "N/A").upper()
+        prev_flow_score = int(transition_info.get("prev_flow_score", 0))
+        print(f"[FLOW MONITOR] flow history row 사용: {context.get('date')}")
+    else:
+        prev_flow = load_previous_flow_state()
+        prev_flow_state = str(prev_flow.get("flow_state", "N/A") or "N/A").upper()
+        try:
+            prev_flow_score = int(float(prev_flow.get("flow_score", 0) or 0))
+        except Exception:
+            prev_flow_score = 0
 
-    transition_info = classify_flow_transition(
-        prev_flow_state=prev_flow_state,
-        prev_flow_score=prev_flow_score,
-        current_flow_state=current_flow_state,
-        current_flow_score=current_flow_score,
-        prev_persistence_days=prev_persistence_days,
-    )
+        prev_persistence_days = int(prev_flow.get("persistence_days", 0) or 0)
+
+        transition_info = classify_flow_transition(
+            prev_flow_state=prev_flow_state,
+            prev_flow_score=prev_flow_score,
+            current_flow_state=current_flow_state,
+            current_flow_score=current_flow_score,
+            prev_persistence_days=prev_persistence_days,
+        )
 
     flow_change_alert, flow_alert_level, flow_alert_msg = evaluate_flow_change(
         prev_flow_state=prev_flow_state,
@@ -821,6 +885,7 @@ def check_market_anomaly():
         deadman_reason=status_msg,
         z_map=z_map,
         market_snap=market_snap,
+        wide=wide,
     )
 
     # ---------------------------
@@ -846,6 +911,13 @@ def check_market_anomaly():
         or sew_status in ["WATCH", "ALERT", "DEADMAN", "RISK_COMPRESSION"]
         or bool(corr_msg)
         or flow_change_alert
+        or event_type in WIDE_EVENT_TYPES
+    )
+
+    wide_txt = (
+        f"wide={wide.get('n_scored', 0)} alert={wide.get('n_alert', 0)} extreme={wide.get('n_extreme', 0)}"
+        if wide
+        else "wide=N/A"
     )
 
     os.makedirs("insights", exist_ok=True)
@@ -865,6 +937,7 @@ def check_market_anomaly():
                 f"{status_msg} | "
                 f"spike={spike_count} extreme={extreme_count} | "
                 f"corr_break={'YES' if bool(corr_msg) else 'NO'} | "
+                f"{wide_txt} | "
                 f"email={'YES' if should_email_alert else 'NO'} | "
                 f"z={z_map}\n"
             )
@@ -880,6 +953,7 @@ def check_market_anomaly():
                 f"Exp={recommended_exp}% | "
                 f"spike={spike_count} extreme={extreme_count} | "
                 f"corr_break={'YES' if bool(corr_msg) else 'NO'} | "
+                f"{wide_txt} | "
                 f"z={z_map}\n"
             )
 
@@ -942,10 +1016,6 @@ POS_Z 단독 과열이나 일반 flow 변화는 이메일 발송 대상에서 
 ─────────────────────────────────────────
         """.strip()
 
-        api_key = os.getenv("RESEND_API_KEY")
-        resend_from = os.getenv("RESEND_FROM")
-        resend_to = os.getenv("RESEND_TO")
-
         print(
             f"DEBUG: should_email_alert={should_email_alert}, "
             f"recommended_exp={recommended_exp}, "
@@ -957,46 +1027,17 @@ POS_Z 단독 과열이나 일반 flow 변화는 이메일 발송 대상에서 
             f"corr_msg_exists={bool(corr_msg)}, "
             f"z_map={z_map}"
         )
-        print(f"DEBUG: RESEND_FROM={resend_from}, RESEND_TO={resend_to}")
-
-        email_sent = False
-
-        if api_key and resend_from and resend_to:
-            try:
-                resp = requests.post(
-                    "https://api.resend.com/emails",
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "from": resend_from,
-                        "to": [resend_to],
-                        "subject": subject,
-                        "text": body,
-                    },
-                    timeout=15,
-                )
-                print(f"✅ Resend status: {resp.status_code}")
-                print(f"✅ Resend response: {resp.text}")
-
-                if resp.status_code in [200, 201]:
-                    email_sent = True
-                else:
-                    print("❌ 이메일 API 호출은 되었지만 성공 응답이 아닙니다.")
-
-            except Exception as e:
-                print(f"❌ 이메일 발송 실패: {e}")
-        else:
-            print("❌ RESEND_API_KEY / RESEND_FROM / RESEND_TO 환경변수 확인 필요")
-
-        if email_sent:
-            print(f"📧 HARD 알림 발송 완료: {sew_status} | {event_type} | {credit_state}")
-        else:
-            print(f"⚠️ HARD 알림 미발송: {sew_status} | {event_type} | {credit_state}")
+
+        # 발송은 alert queue의 background sender가 담당 (탐지 cycle은 파일 기록만)
+        # 같은 event 유형은 window(30분) 안에서 1통으로 합침
+        queued = enqueue_alert(f"SEW_HARD:{event_type}", subject, body, window_sec=ALERT_WINDOWS["SEW_HARD"])
+        start_sender()
+        print(f"📨 HARD 알림 {queued['action']}: {queued['id']} (count={queued['count']}) | {sew_status} | {event_type} | {credit_state}")
     else:
         print(f"📝 Log only: {sew_status} | {event_type} | {status_msg}")
 
 
 if __name__ == "__main__":
-    check_market_anomaly()
\ No newline at end of file
+    start_sender()   # 이전 실행의 미발송 alert는 탐지와 병렬로 재시도
+    check_market_anomaly()
+    flush_alerts()
\ No newline at end of file
@@ -0,0 +1,418 @@
+# scripts/performance_engine.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from scripts.sector_allocation_engine import SECTOR_ETF
+
+# =========================================================
+# Time-varying Weight Performance / Attribution Engine
+# ---------------------------------------------------------
+# 입력:
+#   weight history : date x ticker (비중, 합 <= 1, 나머지 = 현금 수익률 0)
+#                    paper_portfolio_log.csv / simulate_portfolio daily / static dict
+#   return panel   : date x ticker 일일 수익률 (fraction, etf_returns.calculate_returns 형식)
+#
+# 규칙:
+#   return date d 에는 date <= d 인 가장 최근 weight row 적용 (live 채점 규칙과 동일)
+#   수익률 NaN → 0 (etf_returns.build_portfolio_returns의 fillna(0)과 동일)
+#
+# 계산 (scheme 여러 개를 T x S 행렬로 한 번에):
+#   - 일일 포트폴리오 수익률          : row-wise dot
+#   - rolling vol / Sharpe / TE        : cumsum 기반 단일 pass (window 길이와 무관)
+#   - running drawdown                 : cumprod / cummax 단일 pass
+#   - ETF / sector attribution         : 복리 연결 기여도 (합 = 누적 수익률)
+# 결과는 weight history hash + return panel fingerprint 기준 LRU cache
+# =========================================================
+
+PORTFOLIO_LOG_PATH = "data/paper_portfolio_log.csv"
+
+RISK_FREE_RATE_ANNUAL = 0.03
+TRADING_DAYS = 252
+ROLLING_WINDOW = 63
+
+WEIGHT_META_COLS = {"date", "CASH", "cash_weight", "Cash", "total_exposure", "recommended_exposure"}
+
+BENCHMARK_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "SPY": {"SPY": 1.0},
+    "60_40": {"SPY": 0.6, "BND": 0.4},
+}
+
+ETF_SECTOR = {etf: sector for sector, etf in SECTOR_ETF.items()}
+OTHER_SECTOR = "Other"
+
+CACHE_SIZE = 128
+_RESULT_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+# -------------------------
+# Weight history sources
+# -------------------------
+def _clean_weight_frame(df: pd.DataFrame, scale: float) -> pd.DataFrame:
+    index = pd.DatetimeIndex(pd.to_datetime(df.index, errors="coerce")).normalize()
+    if all(pd.api.types.is_numeric_dtype(t) for t in df.dtypes):
+        values = df.to_numpy(dtype="float64", copy=True)
+    else:
+        values = df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+    values = np.nan_to_num(values, nan=0.0) / scale
+
+    df = pd.DataFrame(values, index=index, columns=df.columns)
+    df = df[~df.index.isna()]
+    if not df.index.is_monotonic_increasing or df.index.has_duplicates:
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df.loc[:, (df != 0).any(axis=0)] if len(df) else df
+
+
+def weights_from_portfolio_log(path: str = PORTFOLIO_LOG_PATH) -> pd.DataFrame:
+    """paper_portfolio_log.csv (% 단위) → date x ETF 비중 (fraction)."""
+    if not os.path.exists(path):
+        return pd.DataFrame()
+
+    df = pd.read_csv(path)
+    if df.empty or "date" not in df.columns:
+        return pd.DataFrame()
+
+    cols = [c for c in df.columns if c not in WEIGHT_META_COLS]
+    return _clean_weight_frame(df.set_index("date")[cols], 100.0)
+
+
+def weights_from_simulation(daily: pd.DataFrame) -> pd.DataFrame:
+    """simulate_portfolio daily (w_<etf>, % 단위) → date x ETF 비중 (fraction)."""
+    cols = [c for c in daily.columns if c.startswith("w_")]
+    frame = daily.set_index("date")[cols].rename(columns=lambda c: c[2:])
+    return _clean_weight_frame(frame, 100.0)
+
+
+def static_weights(weights: Mapping[str, float], start: Any = "1900-01-01") -> pd.DataFrame:
+    """고정 비중 dict → 1-row weight history."""
+    return pd.DataFrame([dict(weights)], index=pd.DatetimeIndex([pd.Timestamp(start)]))
+
+
+def returns_from_prices(prices: pd.DataFrame) -> pd.DataFrame:
+    """close panel → 일일 수익률 (fraction). 전일/당일 close 없으면 NaN."""
+    prices = prices.sort_index()
+    return prices.pct_change(fill_method=None)
+
+
+def weight_history_hash(weights: pd.DataFrame) -> str:
+    frame = weights.sort_index(axis=1)
+    h = hashlib.sha1()
+    h.update("|".join(map(str, frame.columns)).encode())
+    h.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _panel_fingerprint(returns: pd.DataFrame) -> str:
+    return weight_history_hash(returns.fillna(0.0))
+
+
+# -------------------------
+# Kernels
+# -------------------------
+def align_weights(weights: pd.DataFrame, dates: pd.DatetimeIndex, tickers: List[str]) -> np.ndarray:
+    """weight history를 return date에 as-of 정렬 → T x K (weight row 이전 날짜는 0)."""
+    w = weights.reindex(columns=tickers).fillna(0.0).to_numpy(dtype="float64")
+    idx = np.searchsorted(weights.index.to_numpy(dtype="datetime64[ns]"), dates.to_numpy(dtype="datetime64[ns]"), side="right") - 1
+    out = np.zeros((len(dates), len(tickers)))
+    live = idx >= 0
+    out[live] = w[idx[live]]
+    return out
+
+
+def _rolling_sums(x: np.ndarray, window: int) -> np.ndarray:
+    c = np.vstack([np.zeros((1,) + x.shape[1:]), np.cumsum(x, axis=0)])
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = c[window:] - c[:-window]
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """T x S rolling 표본표준편차 (cumsum 1 pass, 열 평균 중심화로 상쇄 오차 완화)."""
+    if window < 2:
+        return np.full(x.shape, np.nan)
+    centered = x - np.nanmean(x, axis=0) if len(x) else x
+    s1 = _rolling_sums(centered, window)
+    s2 = _rolling_sums(centered * centered, window)
+    var = (s2 - s1 * s1 / window) / (window - 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def rolling_metrics(
+    port: np.ndarray,
+    bench: Optional[np.ndarray] = None,
+    window: int = ROLLING_WINDOW,
+    risk_free_rate_annual: float = RISK_FREE_RATE_ANNUAL,
+) -> Dict[str, np.ndarray]:
+    """port: T x S 일일 수익률 → rolling vol / Sharpe / drawdown / tracking error (T x S)."""
+    daily_rf = risk_free_rate_annual / TRADING_DAYS
+    mean = _rolling_sums(port, window) / window
+    std = rolling_std(port, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, (mean - daily_rf) / std * np.sqrt(TRADING_DAYS), np.nan)
+
+    curve = np.cumprod(1.0 + port, axis=0)
+    drawdown = curve / np.maximum.accumulate(curve, axis=0) - 1.0
+
+    out = {
+        "rolling_vol": std * np.sqrt(TRADING_DAYS),
+        "rolling_sharpe": sharpe,
+        "drawdown": drawdown,
+    }
+    if bench is not None:
+        out["rolling_tracking_error"] = rolling_std(port - bench.reshape(-1, 1), window) * np.sqrt(TRADING_DAYS)
+    return out
+
+
+def period_metrics(port: np.ndarray, risk_free_rate_annual: float = RISK_FREE_RATE_ANNUAL) -> Dict[str, np.ndarray]:
+    """etf_returns.calculate_performance_metrics와 같은 정의, S개 열 동시 계산."""
+    daily_rf = risk_free_rate_annual / TRADING_DAYS
+    mean = port.mean(axis=0)
+    std = port.std(axis=0, ddof=1) if len(port) > 1 else np.full(port.shape[1], np.nan)
+
+    annual_return = (1 + mean) ** TRADING_DAYS - 1
+    annual_vol = std * np.sqrt(TRADING_DAYS)
+    curve = np.cumprod(1.0 + port, axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std != 0, (mean - daily_rf) / std * np.sqrt(TRADING_DAYS), np.nan)
+        raroc = np.where(annual_vol != 0, (annual_return - risk_free_rate_annual) / annual_vol, np.nan)
+
+    return {
+        "Cumulative Return": curve[-1] - 1 if len(port) else np.full(port.shape[1], np.nan),
+        "Annual Return": annual_return,
+        "Annual Volatility": annual_vol,
+        "Sharpe Ratio": sharpe,
+        "RAROC Proxy": raroc,
+        "Max Drawdown": (curve / np.maximum.accumulate(curve, axis=0) - 1.0).min(axis=0) if len(port) else np.full(port.shape[1], np.nan),
+    }
+
+
+def active_metrics(port: np.ndarray, bench: np.ndarray) -> Dict[str, np.ndarray]:
+    """etf_returns.calculate_active_metrics와 같은 정의 (S개 열 vs 벤치마크 1개)."""
+    active = port - bench.reshape(-1, 1)
+    cum_port = np.prod(1 + port, axis=0) - 1
+    cum_bench = float(np.prod(1 + bench) - 1)
+    te = active.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS) if len(port) > 1 else np.full(port.shape[1], np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ir = np.where(te != 0, active.mean(axis=0) * TRADING_DAYS / te, np.nan)
+
+    return {
+        "Portfolio Cumulative Return": cum_port,
+        "Benchmark Cumulative Return": np.full(port.shape[1], cum_bench),
+        "Active Return": cum_port - cum_bench,
+        "Tracking Error": te,
+        "Information Ratio": ir,
+    }
+
+
+def linked_attribution(weights: np.ndarray, returns: np.ndarray) -> np.ndarray:
+    """
+    ETF별 누적 수익률 기여도 (T x K → K).
+    기여도_i = Σ_t w_ti r_ti · Π_{s<t}(1 + r_p,s) → 합계 = 포트폴리오 누적 수익률
+    """
+    contrib = weights * returns
+    port = contrib.sum(axis=1)
+    growth = np.concatenate([[1.0], np.cumprod(1.0 + port)[:-1]])
+    return (contrib * growth.reshape(-1, 1)).sum(axis=0)
+
+
+# -------------------------
+# Engine
+# -------------------------
+def _prepare_returns(returns: pd.DataFrame) -> pd.DataFrame:
+    returns = returns.copy()
+    returns.index = pd.to_datetime(returns.index, errors="coerce").normalize()
+    returns = returns[~returns.index.isna()]
+    return returns[~returns.index.duplicated(keep="last")].sort_index()
+
+
+def evaluate_weight_history(
+    weights: pd.DataFrame,
+    returns: pd.DataFrame,
+    window: int = ROLLING_WINDOW,
+    sector_map: Optional[Mapping[str, str]] = None,
+    risk_free_rate_annual: float = RISK_FREE_RATE_ANNUAL,
+    _fingerprint: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    weight history 1개 평가 (cache 사용).
+    _fingerprint: evaluate_schemes 내부 호출용 (returns가 이미 정리된 panel일 때)
+    Return: {"hash", "returns"(Series), "metrics", "rolling"(DataFrame),
+             "attribution_etf"(DataFrame), "attribution_sector"(DataFrame)}
+    """
+    if _fingerprint is None:
+        returns = _prepare_returns(returns)
+    weights = _clean_weight_frame(weights, 1.0)
+    w_hash = weight_history_hash(weights)
+    fingerprint = _fingerprint or _panel_fingerprint(returns)
+    key = f"{w_hash}:{fingerprint}:{window}:{risk_free_rate_annual}:{sorted((sector_map or {}).items())}"
+
+    if key in _RESULT_CACHE:
+        _RESULT_CACHE.move_to_end(key)
+        return _RESULT_CACHE[key]
+
+    start = weights.index.min() if len(weights) else returns.index.min()
+    panel = returns[returns.index >= start]
+    tickers = [c for c in weights.columns if c in panel.columns]
+    missing = [c for c in weights.columns if c not in panel.columns]
+    if missing:
+        print(f"[WARN] performance_engine: no returns for {missing} (기여도 0)")
+
+    r = panel.reindex(columns=tickers).fillna(0.0).to_numpy(dtype="float64")
+    w = align_weights(weights, panel.index, tickers)
+    port = (w * r).sum(axis=1)
+
+    rolling = rolling_metrics(port.reshape(-1, 1), window=window, risk_free_rate_annual=risk_free_rate_annual)
+    metrics = {k: float(v[0]) for k, v in period_metrics(port.reshape(-1, 1), risk_free_rate_annual).items()}
+
+    contrib = linked_attribution(w, r)
+    avg_weight = w.mean(axis=0) if len(w) else np.zeros(len(tickers))
+    attribution_etf = pd.DataFrame(
+        {"avg_weight": avg_weight, "contribution": contrib},
+        index=pd.Index(tickers, name="ticker"),
+    ).sort_values("contribution", ascending=False)
+
+    smap = dict(ETF_SECTOR)
+    smap.update(sector_map or {})
+    attribution_sector = (
+        attribution_etf.assign(sector=[smap.get(t, OTHER_SECTOR) for t in attribution_etf.index])
+        .groupby("sector")[["avg_weight", "contribution"]]
+        .sum()
+        .sort_values("contribution", ascending=False)
+    )
+
+    result = {
+        "hash": w_hash,
+        "returns": pd.Series(port, index=panel.index, name="portfolio_return"),
+        "metrics": metrics,
+        "rolling": pd.DataFrame({k: v[:, 0] for k, v in rolling.items()}, index=panel.index),
+        "attribution_etf": attribution_etf,
+        "attribution_sector": attribution_sector,
+    }
+
+    _RESULT_CACHE[key] = result
+    while len(_RESULT_CACHE) > CACHE_SIZE:
+        _RESULT_CACHE.popitem(last=False)
+
+    return result
+
+
+def evaluate_schemes(
+    schemes: Mapping[str, pd.DataFrame],
+    returns: pd.DataFrame,
+    benchmarks: Optional[Mapping[str, Mapping[str, float]]] = None,
+    window: int = ROLLING_WINDOW,
+    risk_free_rate_annual: float = RISK_FREE_RATE_ANNUAL,
+) -> Dict[str, Any]:
+    """
+    여러 weight scheme + benchmark(SPY, 60/40)를 공통 기간에서 비교.
+    Return: {"comparison"(metric x scheme), "active"({benchmark: DataFrame}),
+             "returns"(date x scheme), "rolling"({metric: date x scheme}), "results"}
+    """
+    returns = _prepare_returns(returns)
+    fingerprint = _panel_fingerprint(returns)
+    benchmarks = BENCHMARK_WEIGHTS if benchmarks is None else benchmarks
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, weights in schemes.items():
+        results[name] = evaluate_weight_history(
+            weights, returns, window, risk_free_rate_annual=risk_free_rate_annual, _fingerprint=fingerprint
+        )
+
+    bench_returns: Dict[str, pd.Series] = {}
+    for name, bw in benchmarks.items():
+        available = {k: v for k, v in bw.items() if k in returns.columns}
+        if not available:
+            print(f"[WARN] benchmark {name}: no return columns")
+            continue
+        # etf_returns.build_portfolio_returns와 동일하게 사용 가능 ETF로 재정규화
+        total = sum(available.values())
+        bench_weights = static_weights({k: v / total for k, v in available.items()}, returns.index.min())
+        bench_returns[name] = evaluate_weight_history(
+            bench_weights, returns, window, risk_free_rate_annual=risk_free_rate_annual, _fingerprint=fingerprint
+        )["returns"]
+
+    names = list(results) + list(bench_returns)
+    if not names:
+        return {"comparison": pd.DataFrame(), "active": {}, "returns": pd.DataFrame(), "rolling": {}, "results": results}
+
+    # 공통 기간 (가장 늦게 시작한 scheme 기준)
+    start = max(s["returns"].index.min() for s in results.values()) if results else returns.index.min()
+    frame = pd.DataFrame(
+        {**{n: r["returns"] for n, r in results.items()}, **bench_returns}
+    ).loc[lambda f: f.index >= start].fillna(0.0)
+    port = frame.to_numpy(dtype="float64")
+
+    comparison = pd.DataFrame(period_metrics(port, risk_free_rate_annual), index=names).T
+
+    active: Dict[str, pd.DataFrame] = {}
+    rolling: Dict[str, pd.DataFrame] = {}
+    for bname in bench_returns:
+        bench = frame[bname].to_numpy(dtype="float64")
+        active[bname] = pd.DataFrame(active_metrics(port, bench), index=names).T
+        te = rolling_std(port - bench.reshape(-1, 1), window) * np.sqrt(TRADING_DAYS)
+        rolling[f"rolling_tracking_error_{bname}"] = pd.DataFrame(te, index=frame.index, columns=names)
+
+    for metric, arr in rolling_metrics(port, window=window, risk_free_rate_annual=risk_free_rate_annual).items():
+        rolling[metric] = pd.DataFrame(arr, index=frame.index, columns=names)
+
+    return {"comparison": comparison, "active": active, "returns": frame, "rolling": rolling, "results": results}
+
+
+def clear_cache() -> None:
+    _RESULT_CACHE.clear()
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main() -> None:
+    from scripts.etf_returns import base_weights, calculate_returns
+
+    parser = argparse.ArgumentParser(description="Time-varying weight performance / attribution")
+    parser.add_argument("--portfolio-log", default=PORTFOLIO_LOG_PATH)
+    parser.add_argument("--window", type=int, default=ROLLING_WINDOW)
+    args = parser.parse_args()
+
+    paper = weights_from_portfolio_log(args.portfolio_log)
+    tickers = sorted(set(paper.columns) | set(base_weights) | {"SPY", "BND"})
+    returns = calculate_returns({t: 1.0 for t in tickers})
+    if returns is None:
+        print("❌ 수익률 데이터가 없습니다.")
+        return
+
+    t0 = time.perf_counter()
+    schemes = {"Base": static_weights(base_weights, returns.index.min())}
+    if not paper.empty:
+        schemes["Paper"] = paper
+
+    out = evaluate_schemes(schemes, returns, window=args.window)
+    elapsed = time.perf_counter() - t0
+
+    print("-" * 60)
+    print("📊 Scheme Comparison")
+    print(out["comparison"].round(4))
+    for bname, table in out["active"].items():
+        print("-" * 60)
+        print(f"📊 Active vs {bname}")
+        print(table.round(4))
+    for name, res in out["results"].items():
+        print("-" * 60)
+        print(f"📊 {name} Attribution (sector)")
+        print(res["attribution_sector"].round(4))
+    print(f"[DEBUG] evaluate_schemes elapsed {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# scripts/positioning_features.py
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from scripts.market_backend import get_market_backend
+
+# =========================================================
+# Positioning Feature Engine (live / backtest 공용)
+# ---------------------------------------------------------
+# - SP500 / US10Y / DXY positioning Z-score : 최근 252 관측치 rolling (min 21)
+# - CTA momentum score                      : SPY vs MA50 / MA200 (±0.5씩)
+#
+# 입력은 날짜 x ticker 가격 panel 하나.
+#   live     : data/positioning_prices.csv (매일 최근 구간만 download 후 merge)
+#   backtest : data/backtest/macro_data_2008.csv (같은 ticker 컬럼)
+# 같은 panel이면 live의 오늘 값 == backtest의 같은 날짜 값.
+#
+# 각 feature는 해당 ticker의 유효 관측치만으로 계산 (휴장일 NaN row는 window에서 제외)
+# 후 panel 날짜로 forward-fill.
+# download 실패로 기존 panel 값이 이어지는 경우를 숨기지 않도록 latest feature마다
+# <FEATURE>_AS_OF (source ticker 마지막 유효 관측일)와 STALE 목록을 같이 반환.
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PANEL_PATH = BASE_DIR / "data" / "positioning_prices.csv"
+
+Z_WINDOW = 252
+MIN_Z_PERIODS = 21
+CTA_FAST = 50
+CTA_SLOW = 200
+
+POSITIONING_TICKERS: Dict[str, str] = {
+    "SP500_POS_Z": "SPY",
+    "US10Y_POS_Z": "^TNX",
+    "DXY_POS_Z": "DX-Y.NYB",
+}
+CTA_TICKER = "SPY"
+
+PANEL_TICKERS = sorted(set(POSITIONING_TICKERS.values()) | {CTA_TICKER})
+
+FULL_PERIOD = "2y"          # panel이 없거나 오래됐을 때 / 가격 조정(배당 등) 감지 시
+INCREMENTAL_PERIOD = "1mo"  # 평소 daily update
+STALE_DAYS = 20
+FEATURE_STALE_DAYS = 4      # 기준일 대비 이보다 오래된 관측치면 stale (주말 + 휴장 1일 여유)
+ADJUST_TOLERANCE = 1e-6     # overlap 구간 상대 오차가 이보다 크면 전체 재다운로드
+
+
+# -------------------------
+# Vectorized features
+# -------------------------
+def rolling_zscore(series: pd.Series) -> pd.Series:
+    """현재 시점까지의 최근 252개 유효 가격으로 Z-score 계산."""
+    values = pd.to_numeric(series, errors="coerce").dropna()
+    mean = values.rolling(Z_WINDOW, min_periods=MIN_Z_PERIODS).mean()
+    std = values.rolling(Z_WINDOW, min_periods=MIN_Z_PERIODS).std()
+
+    z = (values - mean) / std.replace(0, np.nan)
+    return z.replace([np.inf, -np.inf], np.nan)
+
+
+def cta_momentum(series: pd.Series) -> pd.DataFrame:
+    """CTA 추세 규칙: price > MA이면 +0.5, < MA이면 -0.5 (MA50, MA200). MA200 전에는 0 / OK=0."""
+    price = pd.to_numeric(series, errors="coerce").dropna()
+    ma_fast = price.rolling(CTA_FAST, min_periods=CTA_FAST).mean()
+    ma_slow = price.rolling(CTA_SLOW, min_periods=CTA_SLOW).mean()
+
+    score = (
+        np.sign(price - ma_fast).fillna(0.0) * 0.5
+        + np.sign(price - ma_slow).fillna(0.0) * 0.5
+    )
+    ok = (ma_fast.notna() & ma_slow.notna()).astype(int)
+
+    return pd.DataFrame({
+        "CTA_MOMENTUM_SCORE": score.where(ok.eq(1), 0.0),
+        "CTA_FETCH_OK": ok,
+    })
+
+
+def compute_positioning_features(panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    panel: date index x ticker 가격 컬럼
+    Return: date index x [SP500_POS_Z, US10Y_POS_Z, DXY_POS_Z, CTA_MOMENTUM_SCORE, CTA_FETCH_OK]
+    """
+    out = pd.DataFrame(index=panel.index)
+
+    for col, ticker in POSITIONING_TICKERS.items():
+        if ticker in panel.columns:
+            out[col] = rolling_zscore(panel[ticker])
+        else:
+            out[col] = np.nan
+
+    if CTA_TICKER in panel.columns:
+        cta = cta_momentum(panel[CTA_TICKER])
+        out["CTA_MOMENTUM_SCORE"] = cta["CTA_MOMENTUM_SCORE"]
+        out["CTA_FETCH_OK"] = cta["CTA_FETCH_OK"]
+    else:
+        out["CTA_MOMENTUM_SCORE"] = np.nan
+        out["CTA_FETCH_OK"] = np.nan
+
+    # 해당 ticker 휴장일은 직전 값 유지
+    out = out.ffill()
+    out["CTA_MOMENTUM_SCORE"] = out["CTA_MOMENTUM_SCORE"].fillna(0.0)
+    out["CTA_FETCH_OK"] = out["CTA_FETCH_OK"].fillna(0).astype(int)
+    return out
+
+
+def feature_as_of(panel: pd.DataFrame) -> Dict[str, Optional[str]]:
+    """feature별 source ticker의 마지막 유효 관측일 (없으면 None)."""
+    sources = {**POSITIONING_TICKERS, "CTA_MOMENTUM_SCORE": CTA_TICKER}
+    out: Dict[str, Optional[str]] = {}
+    for col, ticker in sources.items():
+        valid = panel[ticker].dropna() if ticker in panel.columns else pd.Series(dtype="float64")
+        out[col] = str(valid.index[-1]) if len(valid) else None
+    return out
+
+
+def latest_positioning_features(panel: pd.DataFrame, as_of: Any = None) -> Dict[str, Any]:
+    """
+    panel 마지막 row의 feature + feature별 as-of.
+    as_of: stale 판정 기준일 (기본 panel 마지막 날짜). 기준일보다 FEATURE_STALE_DAYS 넘게
+    오래된 feature(download 실패로 기존 값 유지 등)는 STALE 목록에 포함.
+    """
+    feats = compute_positioning_features(panel)
+    if feats.empty:
+        return {}
+
+    row = feats.iloc[-1]
+    ref = pd.Timestamp(as_of if as_of is not None else feats.index[-1]).normalize()
+    feature_dates = feature_as_of(panel)
+    stale = [
+        col for col, day in feature_dates.items()
+        if day is None or (ref - pd.Timestamp(day)).days > FEATURE_STALE_DAYS
+    ]
+
+    return {
+        "as_of": str(feats.index[-1]),
+        **{
+            col: (float(row[col]) if pd.notna(row[col]) else None)
+            for col in POSITIONING_TICKERS
+        },
+        "CTA_MOMENTUM_SCORE": float(row["CTA_MOMENTUM_SCORE"]),
+        "CTA_FETCH_OK": int(row["CTA_FETCH_OK"]),
+        **{f"{col}_AS_OF": day for col, day in feature_dates.items()},
+        "STALE": stale,
+    }
+
+
+# -------------------------
+# Price panel (incremental)
+# -------------------------
+def load_price_panel(path: Path = PANEL_PATH) -> pd.DataFrame:
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame(columns=PANEL_TICKERS)
+
+    df = pd.read_csv(path)
+    if df.empty or "date" not in df.columns:
+        return pd.DataFrame(columns=PANEL_TICKERS)
+
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    df = df.dropna(subset=["date"]).drop_duplicates("date", keep="last").set_index("date").sort_index()
+    return df.apply(pd.to_numeric, errors="coerce")
+
+
+def save_price_panel(panel: pd.DataFrame, path: Path = PANEL_PATH) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    panel.rename_axis("date").reset_index().to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _download_close(ticker: str, period: str) -> pd.Series:
+    df = get_market_backend().download(
+        ticker,
+        period=period,
+        interval="1d",
+        progress=False,
+        auto_adjust=True,
+        threads=False,
+    )
+    if df is None or df.empty:
+        return pd.Series(dtype="float64")
+
+    close = df["Close"]
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+
+    close = pd.to_numeric(close, errors="coerce").dropna()
+    idx = pd.DatetimeIndex(close.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    close.index = idx.strftime("%Y-%m-%d")
+    return close[~close.index.duplicated(keep="last")]
+
+
+def _needs_full_refresh(existing: pd.Series, fresh: pd.Series) -> bool:
+    """배당/분할로 adjusted close가 재계산됐으면 overlap 구간 값이 달라짐."""
+    overlap = existing.dropna().index.intersection(fresh.index)
+    if len(overlap) == 0:
+        return True
+
+    # 마지막 날은 장중 값일 수 있으므로 비교에서 제외
+    overlap = overlap[:-1] if len(overlap) > 1 else overlap
+    old = existing.loc[overlap].to_numpy(dtype="float64")
+    new = fresh.loc[overlap].to_numpy(dtype="float64")
+    rel = np.abs(new / old - 1.0)
+    return bool(np.nanmax(rel) > ADJUST_TOLERANCE)
+
+
+def update_price_panel(path: Path = PANEL_PATH) -> pd.DataFrame:
+    """
+    최근 구간만 download해서 panel에 merge (같은 날짜는 신규 값 우선).
+    panel이 없거나 STALE_DAYS 이상 밀렸거나 가격 조정이 감지된 ticker만 FULL_PERIOD 재다운로드.
+    """
+    panel = load_price_panel(path)
+
+    stale = True
+    if not panel.empty:
+        last = pd.Timestamp(panel.index[-1])
+        stale = (pd.Timestamp.now().normalize() - last).days > STALE_DAYS
+
+    columns: Dict[str, pd.Series] = {}
+
+    for ticker in PANEL_TICKERS:
+        existing = panel[ticker].dropna() if ticker in panel.columns else pd.Series(dtype="float64")
+        period = FULL_PERIOD if (stale or existing.empty) else INCREMENTAL_PERIOD
+
+        try:
+            fresh = _download_close(ticker, period)
+
+            if period == INCREMENTAL_PERIOD and not fresh.empty and _needs_full_refresh(existing, fresh):
+                print(f"   ⚠️ {ticker}: 가격 조정 감지 → {FULL_PERIOD} 재다운로드")
+                existing = pd.Series(dtype="float64")
+                fresh = _download_close(ticker, FULL_PERIOD)
+
+            print(f"   ✅ {ticker}: {len(fresh)} rows ({period})")
+        except Exception as e:
+            print(f"   ⚠️ {ticker} download 실패 (기존 panel 유지): {e}")
+            fresh = pd.Series(dtype="float64")
+
+        merged = pd.concat([existing, fresh])
+        columns[ticker] = merged[~merged.index.duplicated(keep="last")]
+
+    out = pd.DataFrame(columns).sort_index()
+    out.index.name = "date"
+
+    if not out.empty:
+        save_price_panel(out, path)
+
+    return out
+
+
+def panel_from_macro_backtest(df: pd.DataFrame) -> pd.DataFrame:
+    """macro_data_2008.csv 형식(Date + yfinance ticker 컬럼) -> panel."""
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = (
+        df.dropna(subset=["Date"])
+        .sort_values("Date")
+        .drop_duplicates("Date", keep="last")
+    )
+
+    panel = pd.DataFrame(index=df["Date"].dt.strftime("%Y-%m-%d"))
+    for ticker in PANEL_TICKERS:
+        panel[ticker] = pd.to_numeric(df[ticker], errors="coerce").to_numpy() if ticker in df.columns else np.nan
+
+    panel.index.name = "date"
+    return panel
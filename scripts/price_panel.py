@@ -0,0 +1,588 @@
+# scripts/price_panel.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.bar_archive import BAR_DTYPE
+from scripts.market_snapshot import ColumnRegistry
+
+# =========================================================
+# Consolidated Price Panel (dates x tickers close, memmap)
+# ---------------------------------------------------------
+# 파일: data/price_panel/
+#   closes.npy    : float64 (n_dates, n_tickers), Fortran order
+#                   → ticker 1개 = 연속 메모리 → column() 은 zero-copy view
+#   dates.npy     : datetime64[ns] 오름차순 (거래일 00:00)
+#   registry.json : ticker 순서(append-only, ColumnRegistry) / ticker별 source / source 파일 stat
+#   raw_closes.npy / raw_dates.npy :
+#                   splice 전 source별 원본 close ("TICKER@source" 컬럼, registry "raw_columns")
+#
+# spliced series (기본, precedence=None) — 같은 ticker가 여러 파일에 있으면:
+#   - 마지막 날짜가 가장 최신인 source가 primary (동률이면 관측치 많은 쪽 → PANEL_SOURCES 순서)
+#   - 나머지 source는 primary 시작일 이전 구간만 앞에 이어 붙임
+#     (첫 overlap 날짜의 가격 비율로 scale → 배당 조정 시점 차이로 생기는 가짜 점프 제거)
+#   - overlap이 없는 source는 이어 붙이지 않음
+#
+# consumer별 precedence (SOURCE_PRECEDENCE):
+#   - series/frame(..., precedence=[...]) → 목록 순서대로 처음 존재하는 source의 raw close
+#     (splice / scale 없음 → 원래 읽던 파일과 같은 값 / 같은 기간)
+#
+# 증분:
+#   source 파일 (size, mtime_ns) 동일 → 그대로 사용
+#   다르면 sha1 비교 (CI checkout은 mtime만 바뀜) → 내용이 바뀐 경우에만 재구축
+#   PANEL_VERSION 다르면 재구축
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+PANEL_DIRNAME = "price_panel"
+PANEL_VERSION = 2
+
+# source: (kind, 파일 pattern(data_dir 기준 glob), ticker regex(파일명) or None=wide)
+#   kind:
+#     bars      : bar_archive 1d record (.bin)
+#     yf_ticker : yfinance multi-row header CSV (Price/Ticker/Date 3줄, 0열 Date / 1열 Close)
+#     wide      : Date + ticker 컬럼
+#     close     : Date(tz 포함 가능) + Close
+PANEL_SOURCES: Dict[str, Dict[str, Any]] = {
+    "bars_1d": {"kind": "bars", "glob": "bars/1d/*.bin", "ticker_re": r"^([A-Za-z0-9_]+)\.bin$"},
+    "country_combined": {"kind": "wide", "glob": "country_etf_data_combined.csv", "ticker_re": None},
+    "etf_data": {"kind": "yf_ticker", "glob": "*_data.csv", "ticker_re": r"^([A-Z0-9]+)_data\.csv$"},
+    "legacy_etf": {"kind": "close", "glob": "*_etf_data.csv", "ticker_re": r"^([A-Z0-9]+)_etf_data\.csv$"},
+}
+
+# consumer별 source 우선순위 (raw, splice 없음)
+SOURCE_PRECEDENCE: Dict[str, List[str]] = {
+    "etf_returns": ["etf_data"],             # <SYM>_data.csv (per-ticker 파일 기간 그대로)
+    "country_risk": ["country_combined"],    # country_etf_data_combined.csv
+}
+
+_PANELS: Dict[str, "PricePanel"] = {}
+_REFRESHED: Set[str] = set()   # source 변경 확인을 마친 data_dir (process당 1회)
+
+
+def panel_dir(data_dir: Path = DATA_DIR) -> Path:
+    return Path(data_dir) / PANEL_DIRNAME
+
+
+# -------------------------
+# Source readers
+# -------------------------
+def _to_dates(values) -> pd.DatetimeIndex:
+    """'2023-01-03', '2023-01-03 00:00:00-05:00' 모두 거래소 기준 날짜 (앞 10자리)."""
+    s = pd.Series(values).astype(str).str[:10]
+    return pd.DatetimeIndex(pd.to_datetime(s, format="%Y-%m-%d", errors="coerce"))
+
+
+def _clean_series(dates: pd.DatetimeIndex, values) -> pd.Series:
+    s = pd.Series(pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64"), index=dates)
+    s = s[s.index.notna() & np.isfinite(s.to_numpy())]
+    s = s.sort_index()
+    return s[~s.index.duplicated(keep="last")]
+
+
+def _read_source_file(kind: str, path: Path, ticker: Optional[str]) -> Dict[str, pd.Series]:
+    if kind == "bars":
+        n = path.stat().st_size // BAR_DTYPE.itemsize
+        if n == 0:
+            return {}
+        bars = np.fromfile(path, dtype=BAR_DTYPE, count=n)
+        dates = pd.DatetimeIndex(pd.to_datetime(bars["ts"])).normalize()
+        return {ticker: _clean_series(dates, bars["close"])}
+
+    if kind == "yf_ticker":
+        df = pd.read_csv(path, skiprows=3, header=None, usecols=[0, 1])
+        return {ticker: _clean_series(_to_dates(df.iloc[:, 0]), df.iloc[:, 1])}
+
+    if kind == "close":
+        df = pd.read_csv(path)
+        if "Date" not in df.columns or "Close" not in df.columns:
+            return {}
+        return {ticker: _clean_series(_to_dates(df["Date"]), df["Close"])}
+
+    if kind == "wide":
+        df = pd.read_csv(path)
+        date_col = "Date" if "Date" in df.columns else ("date" if "date" in df.columns else None)
+        if date_col is None:
+            return {}
+        dates = _to_dates(df[date_col])
+        return {
+            str(col): _clean_series(dates, df[col])
+            for col in df.columns
+            if col != date_col and not str(col).startswith("Unnamed")
+        }
+
+    raise ValueError(f"unknown price source kind: {kind}")
+
+
+def source_files(data_dir: Path = DATA_DIR) -> List[Dict[str, Any]]:
+    """PANEL_SOURCES 순서대로 (source, kind, path, ticker)."""
+    data_dir = Path(data_dir)
+    out: List[Dict[str, Any]] = []
+
+    for name, spec in PANEL_SOURCES.items():
+        ticker_re = re.compile(spec["ticker_re"]) if spec["ticker_re"] else None
+        for path in sorted(data_dir.glob(spec["glob"])):
+            ticker = None
+            if ticker_re is not None:
+                m = ticker_re.match(path.name)
+                if not m:
+                    continue
+                ticker = m.group(1)
+            out.append({"source": name, "kind": spec["kind"], "path": path, "ticker": ticker})
+
+    return out
+
+
+def _file_stat(path: Path) -> Dict[str, Any]:
+    st = path.stat()
+    return {"size": int(st.st_size), "mtime_ns": int(st.st_mtime_ns)}
+
+
+def _sha1(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+# -------------------------
+# Splice
+# -------------------------
+def splice_sources(candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    같은 ticker의 source별 series → 1개 series.
+    candidates: [{"source", "series", "priority"}], priority 작을수록 우선 (동률 tie-break).
+    """
+    candidates = [c for c in candidates if len(c["series"]) > 0]
+    if not candidates:
+        return {"series": pd.Series(dtype="float64"), "primary": None, "extended": []}
+
+    ordered = sorted(
+        candidates,
+        key=lambda c: (-c["series"].index[-1].value, -len(c["series"]), c["priority"]),
+    )
+
+    primary = ordered[0]
+    series = primary["series"]
+    extended: List[str] = []
+
+    for cand in ordered[1:]:
+        older = cand["series"]
+        first = series.index[0]
+        if older.index[0] >= first:
+            continue
+
+        overlap = older.index.intersection(series.index)
+        if len(overlap) == 0:
+            print(f"⚠️ {cand['source']} 구간이 {primary['source']}와 겹치지 않음 → 이어 붙이지 않음")
+            continue
+
+        anchor = overlap[0]
+        base = float(older.loc[anchor])
+        if base == 0:
+            continue
+
+        scale = float(series.loc[anchor]) / base
+        head = older[older.index < first] * scale
+        series = pd.concat([head, series])
+        extended.append(cand["source"])
+
+    return {"series": series, "primary": primary["source"], "extended": extended}
+
+
+# -------------------------
+# Build / refresh
+# -------------------------
+def _load_registry(data_dir: Path) -> Optional[Dict[str, Any]]:
+    path = panel_dir(data_dir) / "registry.json"
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ price panel registry 읽기 실패: {e}")
+        return None
+
+
+def _write_registry(data_dir: Path, registry: Dict[str, Any]) -> None:
+    path = panel_dir(data_dir) / "registry.json"
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _save_array(path: Path, arr: np.ndarray) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp_path, path)
+
+
+def _sources_unchanged(data_dir: Path, registry: Optional[Dict[str, Any]], files: List[Dict[str, Any]]) -> Optional[bool]:
+    """
+    True  : 모든 source 동일 (stat 또는 sha1) → 재구축 불필요
+    False : 내용 변경 / 추가 / 삭제
+    stat만 바뀌고 sha1 동일하면 registry의 stat을 갱신 (다음 호출은 stat 비교로 끝남).
+    """
+    if registry is None or registry.get("version") != PANEL_VERSION:
+        return False
+
+    known: Dict[str, Dict[str, Any]] = registry.get("files", {})
+    current = {f["path"].relative_to(data_dir).as_posix(): f["path"] for f in files}
+    if set(known) != set(current):
+        return False
+
+    touched = False
+    for rel, path in current.items():
+        prev = known[rel]
+        stat = _file_stat(path)
+        if stat["size"] == prev["size"] and stat["mtime_ns"] == prev["mtime_ns"]:
+            continue
+        if stat["size"] != prev["size"] or _sha1(path) != prev["sha1"]:
+            return False
+        prev.update(stat)
+        touched = True
+
+    if touched:
+        _write_registry(data_dir, registry)
+    return True
+
+
+def _to_matrix(series: Dict[str, pd.Series], columns: Sequence[str]) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    """{column: series} → (union dates, Fortran-order float64 matrix)."""
+    dates = pd.DatetimeIndex([])
+    for s in series.values():
+        dates = dates.union(s.index)
+    dates = dates.sort_values()
+
+    closes = np.full((len(dates), len(columns)), np.nan, dtype="float64", order="F")
+    for j, col in enumerate(columns):
+        s = series.get(col)
+        if s is not None and len(s):
+            closes[dates.get_indexer(s.index), j] = s.to_numpy(dtype="float64")
+    return dates, closes
+
+
+def build_price_panel(data_dir: Path = DATA_DIR, force: bool = False) -> bool:
+    """
+    source 파일 → data/price_panel/ (변경 없으면 skip).
+    반환: 재구축 여부.
+    """
+    data_dir = Path(data_dir)
+    files = source_files(data_dir)
+    registry = _load_registry(data_dir)
+
+    if not force and _sources_unchanged(data_dir, registry, files):
+        return False
+
+    t0 = time.perf_counter()
+    priority = {name: i for i, name in enumerate(PANEL_SOURCES)}
+    candidates: Dict[str, List[Dict[str, Any]]] = {}
+    file_meta: Dict[str, Dict[str, Any]] = {}
+
+    for f in files:
+        rel = f["path"].relative_to(data_dir).as_posix()
+        try:
+            parsed = _read_source_file(f["kind"], f["path"], f["ticker"])
+        except Exception as e:
+            print(f"⚠️ price source 읽기 실패 ({rel}): {e}")
+            parsed = {}
+
+        file_meta[rel] = {**_file_stat(f["path"]), "sha1": _sha1(f["path"])}
+        for ticker, series in parsed.items():
+            candidates.setdefault(ticker, []).append(
+                {"source": f["source"], "series": series, "priority": priority[f["source"]]}
+            )
+
+    # 기존 ticker 순서 유지, 새 ticker는 뒤에 추가
+    prev_tickers = registry.get("tickers", []) if registry and registry.get("version") == PANEL_VERSION else []
+    tickers = ColumnRegistry(prev_tickers)
+    for ticker in sorted(candidates):
+        tickers.register(ticker)
+
+    spliced: Dict[str, pd.Series] = {}
+    provenance: Dict[str, Dict[str, Any]] = {}
+    raw: Dict[str, pd.Series] = {}
+    for ticker in tickers.names:
+        result = splice_sources(candidates.get(ticker, []))
+        spliced[ticker] = result["series"]
+        provenance[ticker] = {"primary": result["primary"], "extended": result["extended"]}
+        for cand in candidates.get(ticker, []):
+            if len(cand["series"]):
+                raw[f"{ticker}@{cand['source']}"] = cand["series"]
+
+    dates, closes = _to_matrix(spliced, tickers.names)
+    raw_columns = sorted(raw)
+    raw_dates, raw_closes = _to_matrix(raw, raw_columns)
+
+    out_dir = panel_dir(data_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _save_array(out_dir / "closes.npy", closes)
+    _save_array(out_dir / "dates.npy", dates.to_numpy(dtype="datetime64[ns]"))
+    _save_array(out_dir / "raw_closes.npy", raw_closes)
+    _save_array(out_dir / "raw_dates.npy", raw_dates.to_numpy(dtype="datetime64[ns]"))
+    _write_registry(
+        data_dir,
+        {
+            "version": PANEL_VERSION,
+            "tickers": list(tickers.names),
+            "sources": provenance,
+            "raw_columns": raw_columns,
+            "files": file_meta,
+            "built_at": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+        },
+    )
+    _PANELS.pop(str(data_dir.resolve()), None)
+
+    print(
+        f"✅ price panel rebuilt: {len(dates)} dates x {len(tickers)} tickers "
+        f"from {len(files)} files ({(time.perf_counter() - t0) * 1000:.0f} ms)"
+    )
+    return True
+
+
+# -------------------------
+# Read
+# -------------------------
+class PricePanel:
+    """
+    memmap된 dates x tickers close panel.
+    column(ticker) 는 파일 memmap의 zero-copy view (read-only).
+    raw_series(ticker, source) 는 splice 전 source별 원본 close.
+    """
+
+    __slots__ = ("dates", "closes", "registry", "sources", "raw_dates", "raw_closes", "raw_registry")
+
+    def __init__(
+        self,
+        dates: pd.DatetimeIndex,
+        closes: np.ndarray,
+        tickers: Sequence[str],
+        sources: Dict[str, Any],
+        raw_dates: Optional[pd.DatetimeIndex] = None,
+        raw_closes: Optional[np.ndarray] = None,
+        raw_columns: Sequence[str] = (),
+    ):
+        self.dates = dates
+        self.closes = closes
+        self.registry = ColumnRegistry(tickers)
+        self.sources = sources
+        self.raw_dates = raw_dates if raw_dates is not None else pd.DatetimeIndex([])
+        self.raw_closes = raw_closes if raw_closes is not None else np.empty((0, 0))
+        self.raw_registry = ColumnRegistry(raw_columns)
+
+    @property
+    def tickers(self) -> List[str]:
+        return self.registry.names
+
+    def __contains__(self, ticker: object) -> bool:
+        return ticker in self.registry
+
+    def _rows(self, start: Optional[Any], end: Optional[Any]) -> slice:
+        lo = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start), side="left"))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), side="right"))
+        return slice(lo, hi)
+
+    def column(self, ticker: str, start: Optional[Any] = None, end: Optional[Any] = None) -> Optional[np.ndarray]:
+        j = self.registry.index_of(ticker)
+        if j is None:
+            return None
+        return self.closes[self._rows(start, end), j]
+
+    def raw_sources(self, ticker: str) -> List[str]:
+        prefix = f"{ticker}@"
+        return [name[len(prefix):] for name in self.raw_registry.names if name.startswith(prefix)]
+
+    def raw_series(self, ticker: str, source: str, start: Optional[Any] = None, end: Optional[Any] = None) -> pd.Series:
+        """splice 전 source 원본 close (해당 source 거래일만). 없으면 빈 series."""
+        j = self.raw_registry.index_of(f"{ticker}@{source}")
+        if j is None:
+            return pd.Series(dtype="float64", name=ticker)
+
+        lo = 0 if start is None else int(self.raw_dates.searchsorted(pd.Timestamp(start), side="left"))
+        hi = len(self.raw_dates) if end is None else int(self.raw_dates.searchsorted(pd.Timestamp(end), side="right"))
+        s = pd.Series(self.raw_closes[lo:hi, j], index=self.raw_dates[lo:hi], name=ticker, copy=False)
+        return s.dropna()
+
+    def series(
+        self,
+        ticker: str,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        dropna: bool = True,
+        precedence: Optional[Sequence[str]] = None,
+    ) -> pd.Series:
+        """
+        ticker close series (기본: 해당 ticker 거래일만).
+        precedence가 있으면 그 순서대로 처음 존재하는 source의 raw close (splice 없음).
+        """
+        if precedence is not None:
+            for source in precedence:
+                s = self.raw_series(ticker, source, start, end)
+                if len(s):
+                    return s
+            return pd.Series(dtype="float64", name=ticker)
+
+        rows = self._rows(start, end)
+        col = self.column(ticker)
+        if col is None:
+            return pd.Series(dtype="float64", name=ticker)
+
+        s = pd.Series(col[rows], index=self.dates[rows], name=ticker, copy=False)
+        return s.dropna() if dropna else s
+
+    def frame(
+        self,
+        tickers: Optional[Sequence[str]] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        precedence: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        dates x tickers DataFrame. 없는 ticker는 NaN 컬럼.
+        tickers=None 이면 전체 panel view (copy 없음).
+        precedence가 있으면 ticker별 raw close를 날짜 union으로 정렬 (series 참고).
+        """
+        if precedence is not None:
+            tickers = list(self.tickers if tickers is None else tickers)
+            cols = {t: self.series(t, start, end, precedence=precedence) for t in tickers}
+            out = pd.DataFrame(cols).reindex(columns=tickers)
+            out.index.name = "Date"
+            return out
+
+        rows = self._rows(start, end)
+        index = self.dates[rows].rename("Date")
+
+        if tickers is None:
+            return pd.DataFrame(self.closes[rows], index=index, columns=list(self.tickers), copy=False)
+
+        tickers = list(tickers)
+        cols = [self.registry.index_of(t) for t in tickers]
+        out = np.full((rows.stop - rows.start, len(tickers)), np.nan, dtype="float64", order="F")
+        for k, j in enumerate(cols):
+            if j is not None:
+                out[:, k] = self.closes[rows, j]
+        return pd.DataFrame(out, index=index, columns=tickers, copy=False)
+
+
+def load_price_panel(data_dir: Path = DATA_DIR) -> Optional[PricePanel]:
+    directory = panel_dir(data_dir)
+    registry = _load_registry(data_dir)
+    if (
+        registry is None
+        or registry.get("version") != PANEL_VERSION
+        or not (directory / "closes.npy").exists()
+        or not (directory / "raw_closes.npy").exists()
+    ):
+        return None
+
+    closes = np.load(directory / "closes.npy", mmap_mode="r")
+    dates = pd.DatetimeIndex(np.load(directory / "dates.npy"))
+    tickers = registry.get("tickers", [])
+
+    if closes.shape != (len(dates), len(tickers)):
+        print(f"⚠️ price panel shape mismatch: {closes.shape} vs ({len(dates)}, {len(tickers)})")
+        return None
+
+    raw_columns = registry.get("raw_columns", [])
+    raw_dates = pd.DatetimeIndex(np.load(directory / "raw_dates.npy"))
+    raw_closes = np.load(directory / "raw_closes.npy", mmap_mode="r")
+    if raw_closes.shape != (len(raw_dates), len(raw_columns)):
+        print(f"⚠️ price panel raw shape mismatch: {raw_closes.shape} vs ({len(raw_dates)}, {len(raw_columns)})")
+        return None
+
+    return PricePanel(dates, closes, tickers, registry.get("sources", {}), raw_dates, raw_closes, raw_columns)
+
+
+def get_price_panel(data_dir: Path = DATA_DIR, refresh: bool = True) -> PricePanel:
+    """
+    process 단위 공유 panel.
+    refresh=True 면 process당 1회만 source 변경 여부(stat → sha1)를 확인해 필요할 때만 재구축
+    (ticker별 panel_return_pct 호출마다 source stat을 다시 보지 않음).
+    """
+    key = str(Path(data_dir).resolve())
+    rebuilt = False
+    if refresh and key not in _REFRESHED:
+        rebuilt = build_price_panel(data_dir)
+        _REFRESHED.add(key)
+
+    panel = None if rebuilt else _PANELS.get(key)
+    if panel is None:
+        panel = load_price_panel(data_dir)
+        if panel is None:
+            build_price_panel(data_dir, force=True)
+            panel = load_price_panel(data_dir)
+        if panel is None:
+            raise RuntimeError(f"price panel unavailable: {panel_dir(data_dir)}")
+        _PANELS[key] = panel
+
+    return panel
+
+
+def panel_return_pct(ticker: str, target_date: Any, data_dir: Path = DATA_DIR) -> Optional[float]:
+    """
+    panel 기준 target_date 1D 수익률 (%) = 직전 거래일 close 대비 target close.
+    target close 또는 직전 close가 panel에 없으면 None (호출 측에서 download fallback).
+    """
+    try:
+        panel = get_price_panel(data_dir)
+    except Exception as e:
+        print(f"⚠️ price panel unavailable: {e}")
+        return None
+
+    closes = panel.series(ticker, end=target_date)
+    if len(closes) < 2 or closes.index[-1] != pd.Timestamp(target_date).normalize():
+        return None
+
+    prev_close = float(closes.iloc[-2])
+    today_close = float(closes.iloc[-1])
+    if prev_close == 0:
+        return None
+
+    return round(((today_close - prev_close) / prev_close) * 100.0, 4)
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Consolidated dates x tickers close panel")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_build = sub.add_parser("build", help="source 파일 → data/price_panel (변경 시)")
+    p_build.add_argument("--data-dir", default=str(DATA_DIR))
+    p_build.add_argument("--force", action="store_true")
+
+    p_show = sub.add_parser("show", help="ticker별 기간 / source")
+    p_show.add_argument("--data-dir", default=str(DATA_DIR))
+
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        if not build_price_panel(Path(args.data_dir), force=args.force):
+            print("[INFO] price panel up to date")
+        return
+
+    panel = get_price_panel(Path(args.data_dir))
+    print(f"{len(panel.dates)} dates x {len(panel.tickers)} tickers")
+    for ticker in panel.tickers:
+        s = panel.series(ticker)
+        src = panel.sources.get(ticker, {})
+        span = f"{s.index[0].date()} ~ {s.index[-1].date()}" if len(s) else "-"
+        ext = f" (+{','.join(src.get('extended', []))})" if src.get("extended") else ""
+        raw = ", ".join(f"{name}:{len(panel.raw_series(ticker, name))}" for name in panel.raw_sources(ticker))
+        print(f"{ticker:6s} {len(s):6d}  {span}  {src.get('primary')}{ext}  [raw {raw}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ from typing import Dict, List
 import pandas as pd
 import yfinance as yf
 
+from scripts.macro_schema import write_macro_csv
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 CSV_PATH = DATA_DIR / "macro_data.csv"
@@ -163,7 +165,7 @@ def main() -> None:
         CSV_PATH.replace(bak)
         print(f"[OK] existing macro_data.csv backed up -> {bak}")
 
-    out.to_csv(CSV_PATH, index=False)
+    out = write_macro_csv(out, CSV_PATH)
     print(f"[DONE] rebuilt macro_data.csv rows={len(out)} -> {CSV_PATH}")
 
 
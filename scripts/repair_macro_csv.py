@@ -3,65 +3,51 @@ from __future__ import annotations
 
 from pathlib import Path
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-CSV_PATH = BASE_DIR / "data" / "macro_data.csv"
+import pandas as pd
+
+from scripts.macro_schema import (
+    MACRO_CSV_PATH,
+    read_macro_csv,
+    validate_macro_frame,
+    write_macro_csv,
+)
+
+CSV_PATH = MACRO_CSV_PATH
 
-# ✅ 너가 현재 macro_data에 넣는 "정답 컬럼"을 여기 고정
-EXPECTED_COLS = [
-    "date",
-    "US10Y", "DXY", "WTI", "VIX", "USDKRW", "HYG", "LQD",
-    "XLK", "XLF", "XLE", "XLRE",
-]
 
 def repair_csv(path: Path) -> None:
+    """
+    1회성 마이그레이션 용도.
+    스키마(scripts/macro_schema.py)와 이미 일치하면 파일을 건드리지 않는다.
+    drift가 있을 때만 백업 1회 + schema writer로 한 번 정리한다.
+
+    일일 파이프라인에서는 더 이상 호출하지 않는다.
+    (모든 writer가 write_macro_csv를 사용하므로 drift가 생기지 않음)
+    """
     if (not path.exists()) or path.stat().st_size == 0:
         print("[SKIP] macro_data.csv not found or empty.")
         return
 
-    lines = path.read_text(encoding="utf-8").splitlines()
-    if not lines:
-        print("[SKIP] macro_data.csv has no lines.")
-        return
-
-    # 헤더 파싱
-    header = lines[0].split(",")
-    header = [h.strip() for h in header if h.strip()]
-
-    # 헤더가 date부터 시작한다고 가정
-    # 헤더에 EXPECTED_COLS 없는 것 붙이기
-    final_header = header[:]
-    for c in EXPECTED_COLS:
-        if c not in final_header:
-            final_header.append(c)
-
-    target_n = len(final_header)
+    try:
+        raw = pd.read_csv(path)
+        raw["date"] = pd.to_datetime(raw["date"], format="%Y-%m-%d", errors="coerce")
+        problems = validate_macro_frame(raw)
+    except Exception as e:
+        problems = [f"{type(e).__name__}: {e}"]
 
-    fixed = []
-    fixed.append(",".join(final_header))
-
-    # 각 row를 target_n으로 pad/truncate
-    for i, line in enumerate(lines[1:], start=2):
-        if not line.strip():
-            continue
-        parts = line.split(",")
-
-        # 너무 짧으면 빈칸 padding
-        if len(parts) < target_n:
-            parts = parts + [""] * (target_n - len(parts))
-
-        # 너무 길면 잘라내기 (보통 header 부족으로 생긴 extra 필드)
-        elif len(parts) > target_n:
-            parts = parts[:target_n]
+    if not problems:
+        print("[SKIP] macro_data.csv already matches schema.")
+        return
 
-        fixed.append(",".join(parts))
+    df = read_macro_csv(path)
 
     # 원본 백업
     bak = path.with_suffix(".csv.bak")
-    bak.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    bak.write_bytes(path.read_bytes())
+
+    write_macro_csv(df, path)
+    print(f"[OK] macro_data.csv migrated to schema ({problems}). backup saved -> {bak}")
 
-    # 정규화 저장
-    path.write_text("\n".join(fixed) + "\n", encoding="utf-8")
-    print(f"[OK] macro_data.csv repaired. backup saved -> {bak}")
 
 if __name__ == "__main__":
     repair_csv(CSV_PATH)
@@ -0,0 +1,501 @@
+# scripts/report_index.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# =========================================================
+# Daily Report Index (SQLite + FTS5)
+# ---------------------------------------------------------
+# 대상: reports/daily_report_YYYY-MM-DD.md
+#
+# tables:
+#   reports        : 1 row / report (REPORT_FIELDS 구조화 필드 + 파일 메타)
+#   report_weights : 19) Execution Layer ETF 비중 (report_date, sector, etf, weight, action)
+#   report_text    : FTS5, heading 단위 section 본문 (commentary 검색)
+#
+# 증분 인덱싱:
+#   파일 (size, mtime_ns) 동일 → skip
+#   다르면 sha1 비교 (CI checkout은 mtime만 바뀜) → 내용이 바뀐 report만 재파싱
+#   사라진 report는 index에서 삭제
+#   REPORT_FIELDS / schema 변경 시 INDEX_VERSION 올리면 전체 재구축
+#
+# data/report_index.sqlite는 gitignore (reports/에서 언제든 재구축, 전체 ~1-2s)
+#   -> CI에서는 generate_report 끝에서 매번 재구축 / 로컬은 `report_index.py index`
+#   -> query / search / weights는 DB가 없거나 비어 있으면 자동으로 먼저 구축
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REPORTS_DIR = BASE_DIR / "reports"
+INDEX_PATH = BASE_DIR / "data" / "report_index.sqlite"
+
+REPORT_GLOB = "daily_report_*.md"
+REPORT_DATE_RE = re.compile(r"daily_report_(\d{4}-\d{2}-\d{2})\.md$")
+INDEX_VERSION = 1
+
+_NUM = r"(-?\d+(?:\.\d+)?)"
+
+# field: (section heading 포함 문자열 or None=전체, regex(group 1), type)
+#   type: TEXT / REAL / LABEL(앞쪽 emoji·기호 제거)
+REPORT_FIELDS: Dict[str, Tuple[Optional[str], str, str]] = {
+    "data_as_of": (None, r"\*\*Data as of:\*\*\s*(\d{4}-\d{2}-\d{2})", "TEXT"),
+    "regime": ("Market Regime Filter", r"\*\*판정:\*\*\s*\*\*([^|*\n]+)", "TEXT"),
+    "phase": (None, r"\*\*Operational Phase:\*\*\s*([^(\n]+)", "TEXT"),
+    "structural_regime": (None, r"\*\*Structural Regime:\*\*\s*\**([A-Z_]+)", "TEXT"),
+    "final_action": (None, r"\*\*Final Action:\*\*\s*\*\*([^*\n]+)\*\*", "TEXT"),
+    "risk_action": (None, r"Final Risk Action:\*\*\s*\*\*([^*\n]+)\*\*", "TEXT"),
+    "risk_budget": (None, r"\*\*Risk Budget \(0~100\):\*\*\s*\*\*" + _NUM, "REAL"),
+    "recommended_exposure": (None, r"Recommended Exposure:\*\*\s*\*\*" + _NUM + "%", "REAL"),
+    "final_exposure": (None, r"\*\*Final Exposure:\*\*\s*\*\*" + _NUM + "%", "REAL"),
+    "flow_state": (None, r"\*\*(?:Raw )?Flow State:\*\*\s*\*\*([^*\n]+)\*\*", "LABEL"),
+    "flow_transition": (None, r"\*\*Transition State:\*\*\s*\*\*([^*\n]+)\*\*", "LABEL"),
+    "flow_score": (None, r"\*\*Flow Score:\*\*\s*" + _NUM, "REAL"),
+    "sew_status": (None, r"^- \*\*SEW:\*\*\s*([A-Z_]+)", "TEXT"),
+    "sew_event": (None, r"\*\*Event Type:\*\*\s*([A-Z_]+)", "TEXT"),
+    "system_status": (None, r"시스템 상태:\s*\S*\s*([A-Z_]+)", "TEXT"),
+    "vix": (None, r"\*\*VIX Level:\*\*\s*" + _NUM, "REAL"),
+    "cash_weight": ("Tactical Asset Allocation", r"\*\*Cash & Hedge\*\*.*?\*\*" + _NUM + r"%\*\*", "REAL"),
+}
+
+WEIGHT_SECTION = "Execution Layer (ETF Mapping)"
+WEIGHT_ROW_RE = re.compile(
+    r"^\|\s*([^|]+?)\s*\|\s*([A-Z]{2,5})\s*\|\s*" + _NUM + r"%\s*\|\s*([^|]*?)\s*\|",
+    re.M,
+)
+HEADING_RE = re.compile(r"^(#{1,3})\s+(.*)$", re.M)
+
+META_COLUMNS = ["report_date", "path", "size", "mtime_ns", "sha1", "indexed_at"]
+
+
+# -------------------------
+# Parsing
+# -------------------------
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """heading(#~###) 단위 (title, body). 첫 heading 이전 내용은 title=''."""
+    sections: List[Tuple[str, str]] = []
+    matches = list(HEADING_RE.finditer(text))
+
+    head = text[: matches[0].start()] if matches else text
+    if head.strip():
+        sections.append(("", head.strip()))
+
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[m.end():end].strip()
+        sections.append((m.group(2).strip(), body))
+
+    return sections
+
+
+def _clean_label(val: str) -> str:
+    return re.sub(r"^[^A-Za-z0-9]+", "", val).strip()
+
+
+def parse_report(text: str, report_date: str) -> Dict[str, Any]:
+    """report markdown → {"fields": {...}, "weights": [...], "sections": [(title, body)]}"""
+    sections = split_sections(text)
+    fields: Dict[str, Any] = {}
+
+    for name, (section, pattern, kind) in REPORT_FIELDS.items():
+        scope = text
+        if section:
+            scope = "\n".join(body for title, body in sections if section in title)
+
+        m = re.search(pattern, scope, re.M)
+        if not m:
+            fields[name] = None
+            continue
+
+        val = m.group(1).strip()
+        if kind == "REAL":
+            try:
+                fields[name] = float(val)
+            except ValueError:
+                fields[name] = None
+        elif kind == "LABEL":
+            fields[name] = _clean_label(val) or None
+        else:
+            fields[name] = val or None
+
+    weights: List[Dict[str, Any]] = []
+    for title, body in sections:
+        if WEIGHT_SECTION not in title:
+            continue
+        for m in WEIGHT_ROW_RE.finditer(body):
+            if m.group(1) in ("Sector", ":---"):
+                continue
+            weights.append(
+                {
+                    "report_date": report_date,
+                    "sector": m.group(1),
+                    "etf": m.group(2),
+                    "weight": float(m.group(3)),
+                    "action": m.group(4) or None,
+                }
+            )
+
+    return {"fields": fields, "weights": weights, "sections": sections}
+
+
+# -------------------------
+# Schema
+# -------------------------
+def _report_columns() -> List[str]:
+    return META_COLUMNS + list(REPORT_FIELDS.keys())
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    field_cols = ", ".join(
+        f"{name} {'REAL' if kind == 'REAL' else 'TEXT'}" for name, (_, _, kind) in REPORT_FIELDS.items()
+    )
+    conn.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS reports (
+            report_date TEXT PRIMARY KEY,
+            path TEXT,
+            size INTEGER,
+            mtime_ns INTEGER,
+            sha1 TEXT,
+            indexed_at TEXT,
+            {field_cols}
+        );
+        CREATE TABLE IF NOT EXISTS report_weights (
+            report_date TEXT,
+            sector TEXT,
+            etf TEXT,
+            weight REAL,
+            action TEXT,
+            PRIMARY KEY (report_date, etf)
+        );
+        CREATE INDEX IF NOT EXISTS report_weights_etf ON report_weights (etf, report_date);
+        CREATE VIRTUAL TABLE IF NOT EXISTS report_text USING fts5(
+            report_date UNINDEXED,
+            section,
+            body
+        );
+        """
+    )
+
+
+def _drop_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(
+        """
+        DROP TABLE IF EXISTS reports;
+        DROP TABLE IF EXISTS report_weights;
+        DROP TABLE IF EXISTS report_text;
+        DROP TABLE IF EXISTS index_meta;
+        """
+    )
+
+
+def open_index(path: Path = INDEX_PATH) -> sqlite3.Connection:
+    """index DB 연결 (schema 생성 / INDEX_VERSION 다르면 재구축)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+
+    version = None
+    try:
+        row = conn.execute("SELECT value FROM index_meta WHERE key = 'version'").fetchone()
+        version = row["value"] if row else None
+    except sqlite3.OperationalError:
+        pass
+
+    if version != str(INDEX_VERSION):
+        _drop_schema(conn)
+        _create_schema(conn)
+        conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('version', ?)", (str(INDEX_VERSION),))
+        conn.commit()
+
+    return conn
+
+
+# -------------------------
+# Indexing
+# -------------------------
+def report_date_of(path: Path) -> Optional[str]:
+    m = REPORT_DATE_RE.search(Path(path).name)
+    return m.group(1) if m else None
+
+
+def _delete_report(conn: sqlite3.Connection, report_date: str) -> None:
+    conn.execute("DELETE FROM reports WHERE report_date = ?", (report_date,))
+    conn.execute("DELETE FROM report_weights WHERE report_date = ?", (report_date,))
+    conn.execute("DELETE FROM report_text WHERE report_date = ?", (report_date,))
+
+
+def _write_report(conn: sqlite3.Connection, path: Path, report_date: str, raw: bytes, stat, sha1: str) -> None:
+    parsed = parse_report(raw.decode("utf-8", errors="replace"), report_date)
+
+    _delete_report(conn, report_date)
+
+    row = {
+        "report_date": report_date,
+        "path": str(path.name),
+        "size": int(stat.st_size),
+        "mtime_ns": int(stat.st_mtime_ns),
+        "sha1": sha1,
+        "indexed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        **parsed["fields"],
+    }
+    cols = _report_columns()
+    conn.execute(
+        f"INSERT INTO reports ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+        [row.get(c) for c in cols],
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO report_weights (report_date, sector, etf, weight, action) VALUES (?, ?, ?, ?, ?)",
+        [(w["report_date"], w["sector"], w["etf"], w["weight"], w["action"]) for w in parsed["weights"]],
+    )
+    conn.executemany(
+        "INSERT INTO report_text (report_date, section, body) VALUES (?, ?, ?)",
+        [(report_date, title, body) for title, body in parsed["sections"] if body],
+    )
+
+
+def index_report(path: Path, conn: Optional[sqlite3.Connection] = None, force: bool = False) -> str:
+    """
+    report 1개 인덱싱. Return: "skip" / "touch"(내용 동일, mtime만 갱신) / "indexed"
+    generate_report에서 report 작성 직후 호출.
+    """
+    path = Path(path)
+    report_date = report_date_of(path)
+    if report_date is None:
+        return "skip"
+
+    own = conn is None
+    conn = conn or open_index()
+    try:
+        stat = path.stat()
+        prev = conn.execute(
+            "SELECT size, mtime_ns, sha1 FROM reports WHERE report_date = ?", (report_date,)
+        ).fetchone()
+
+        if not force and prev and prev["size"] == stat.st_size and prev["mtime_ns"] == stat.st_mtime_ns:
+            return "skip"
+
+        raw = path.read_bytes()
+        sha1 = hashlib.sha1(raw).hexdigest()
+
+        if not force and prev and prev["sha1"] == sha1:
+            conn.execute(
+                "UPDATE reports SET size = ?, mtime_ns = ? WHERE report_date = ?",
+                (int(stat.st_size), int(stat.st_mtime_ns), report_date),
+            )
+            status = "touch"
+        else:
+            _write_report(conn, path, report_date, raw, stat, sha1)
+            status = "indexed"
+
+        if own:
+            conn.commit()
+        return status
+    finally:
+        if own:
+            conn.close()
+
+
+def update_index(
+    reports_dir: Path = REPORTS_DIR,
+    index_path: Path = INDEX_PATH,
+    full: bool = False,
+) -> Dict[str, int]:
+    """reports_dir 전체를 증분 인덱싱. Return: status별 개수"""
+    counts = {"indexed": 0, "touch": 0, "skip": 0, "removed": 0}
+    conn = open_index(index_path)
+    try:
+        paths = sorted(Path(reports_dir).glob(REPORT_GLOB))
+        on_disk = set()
+
+        for path in paths:
+            report_date = report_date_of(path)
+            if report_date is None:
+                continue
+            on_disk.add(report_date)
+            try:
+                counts[index_report(path, conn, force=full)] += 1
+            except Exception as e:
+                print(f"⚠️ report index failed for {path.name}: {e}")
+
+        indexed = [r["report_date"] for r in conn.execute("SELECT report_date FROM reports")]
+        for report_date in indexed:
+            if report_date not in on_disk:
+                _delete_report(conn, report_date)
+                counts["removed"] += 1
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    return counts
+
+
+# -------------------------
+# Query API
+# -------------------------
+def _open_for_query(index_path: Path = INDEX_PATH, reports_dir: Path = REPORTS_DIR) -> sqlite3.Connection:
+    """
+    조회용 연결. DB가 없거나 비어 있으면 (fresh clone: index는 .gitignore) 먼저 update_index로 구축.
+    빈 결과가 "report 없음"인지 "index 없음"인지 구분되지 않는 문제 방지.
+    """
+    index_path = Path(index_path)
+    empty = not index_path.exists()
+    if not empty:
+        conn = open_index(index_path)
+        try:
+            empty = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0] == 0
+        finally:
+            conn.close()
+
+    if empty:
+        counts = update_index(reports_dir, index_path)
+        print(f"[report index] built {index_path.name} from {reports_dir}: {counts}")
+    return open_index(index_path)
+
+
+def query_reports(
+    where: Optional[str] = None,
+    params: Sequence[Any] = (),
+    columns: Optional[List[str]] = None,
+    order: str = "report_date",
+    limit: Optional[int] = None,
+    index_path: Path = INDEX_PATH,
+) -> List[Dict[str, Any]]:
+    """
+    구조화 필드 조회. where는 SQL 조건식 (예: "risk_budget < ?", params=(40,))
+    """
+    columns = columns or ["report_date"] + list(REPORT_FIELDS.keys())
+    sql = f"SELECT {', '.join(columns)} FROM reports"
+    if where:
+        sql += f" WHERE {where}"
+    sql += f" ORDER BY {order}"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+
+    conn = _open_for_query(index_path)
+    try:
+        return [dict(r) for r in conn.execute(sql, tuple(params))]
+    finally:
+        conn.close()
+
+
+def fts_phrase(text: str) -> str:
+    """입력 전체를 FTS5 phrase 1개로 ("risk-off", "S&P 500"도 문법 오류 없이 검색)."""
+    return '"' + str(text).replace('"', '""') + '"'
+
+
+def search_reports(
+    text: str,
+    limit: int = 20,
+    index_path: Path = INDEX_PATH,
+    raw: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    commentary 전문 검색. 최신 report 순.
+    기본은 입력을 phrase로 검색, raw=True면 FTS5 MATCH 문법 그대로 (AND / OR / NEAR / prefix* 등).
+    """
+    if not raw:
+        text = fts_phrase(text)
+    conn = _open_for_query(index_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT report_date, section, snippet(report_text, 2, '[', ']', ' … ', 12) AS snippet
+            FROM report_text
+            WHERE report_text MATCH ?
+            ORDER BY report_date DESC, rank
+            LIMIT ?
+            """,
+            (text, int(limit)),
+        )
+        return [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def report_weights(
+    report_date: Optional[str] = None,
+    etf: Optional[str] = None,
+    index_path: Path = INDEX_PATH,
+) -> List[Dict[str, Any]]:
+    """Execution Layer ETF 비중 (날짜 또는 ETF 기준)."""
+    clauses, params = [], []
+    if report_date:
+        clauses.append("report_date = ?")
+        params.append(report_date)
+    if etf:
+        clauses.append("etf = ?")
+        params.append(etf.upper())
+
+    sql = "SELECT report_date, sector, etf, weight, action FROM report_weights"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY report_date, weight DESC"
+
+    conn = _open_for_query(index_path)
+    try:
+        return [dict(r) for r in conn.execute(sql, tuple(params))]
+    finally:
+        conn.close()
+
+
+# -------------------------
+# CLI
+# -------------------------
+def _print_rows(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        print("(no rows)")
+        return
+    cols = list(rows[0].keys())
+    print(" | ".join(cols))
+    for r in rows:
+        print(" | ".join("" if r[c] is None else str(r[c]) for c in cols))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Daily report index (SQLite + FTS5)")
+    sub = parser.add_subparsers(dest="cmd")
+
+    p_index = sub.add_parser("index", help="reports/ 증분 인덱싱")
+    p_index.add_argument("--full", action="store_true", help="전체 재파싱")
+
+    p_query = sub.add_parser("query", help='구조화 필드 조회 (예: --where "risk_budget < 40")')
+    p_query.add_argument("--where", default=None)
+    p_query.add_argument("--fields", default=None, help="콤마 구분 컬럼 (기본: 전체 필드)")
+    p_query.add_argument("--limit", type=int, default=None)
+
+    p_search = sub.add_parser("search", help='commentary 전문 검색 (예: "CONFIRMED_FLOW")')
+    p_search.add_argument("text")
+    p_search.add_argument("--limit", type=int, default=20)
+    p_search.add_argument("--raw", action="store_true", help="FTS5 MATCH 문법 그대로 사용 (기본: phrase 검색)")
+
+    p_weights = sub.add_parser("weights", help="Execution Layer ETF 비중")
+    p_weights.add_argument("--date", default=None)
+    p_weights.add_argument("--etf", default=None)
+
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+
+    if args.cmd == "query":
+        fields = ["report_date"] + args.fields.split(",") if args.fields else None
+        _print_rows(query_reports(args.where, columns=fields, limit=args.limit))
+    elif args.cmd == "search":
+        _print_rows(search_reports(args.text, limit=args.limit, raw=args.raw))
+    elif args.cmd == "weights":
+        _print_rows(report_weights(args.date, args.etf))
+    else:
+        counts = update_index(full=bool(getattr(args, "full", False)))
+        print(f"✅ report index: {counts} -> {INDEX_PATH}")
+
+    print(f"[DEBUG] elapsed {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
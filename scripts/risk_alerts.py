@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Dict, Any, Tuple, Optional
 
 from filters.strategist_filters import get_regime_label
+from scripts.alert_dispatcher import enqueue_alert, send_resend, start_sender
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 INSIGHTS_DIR = BASE_DIR / "insights"
@@ -41,32 +42,8 @@ def write_regime_alert_file(as_of_date: str, prev_regime: str, new_regime: str)
 
 
 def send_email_resend(subject: str, body: str) -> Tuple[bool, str]:
-    """
-    Requires:
-      - RESEND_API_KEY (GitHub Secret)
-      - RESEND_FROM (e.g. "alerts@yourdomain.com")  *Resend에서 발신 도메인 인증 필요할 수 있음*
-      - RESEND_TO   (e.g. "seyeon8143@gmail.com")
-    """
-    api_key = os.getenv("RESEND_API_KEY")
-    from_email = os.getenv("RESEND_FROM")
-    to_email = os.getenv("RESEND_TO")
-
-    if not api_key or not from_email or not to_email:
-        return False, "RESEND env missing (RESEND_API_KEY/RESEND_FROM/RESEND_TO)"
-
-    try:
-        import requests  # needs 'requests' in dependencies
-        r = requests.post(
-            "https://api.resend.com/emails",
-            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-            json={"from": from_email, "to": [to_email], "subject": subject, "text": body},
-            timeout=20,
-        )
-        if 200 <= r.status_code < 300:
-            return True, "sent"
-        return False, f"resend http {r.status_code}: {r.text}"
-    except Exception as e:
-        return False, f"exception: {e}"
+    """동기 발송 (수동 확인용). 탐지 경로에서는 enqueue_alert 사용."""
+    return send_resend(subject, body)
 
 
 def check_regime_change_and_alert(market_data: Dict[str, Any], as_of_date: str) -> Dict[str, Any]:
@@ -75,8 +52,8 @@ def check_regime_change_and_alert(market_data: Dict[str, Any], as_of_date: str)
       status: "DETECTED" | "NOT_DETECTED" | "BASELINE_SET"
       prev_regime, current_regime
       alert_file_created: bool
-      email_sent: bool
-      email_note: str
+      email_sent: bool   (False: 발송은 alert queue에서 비동기 처리)
+      email_note: str    (queue 처리 결과: queued / coalesced / suppressed)
     """
     current = get_regime_label(market_data)
 
@@ -107,7 +84,10 @@ def check_regime_change_and_alert(market_data: Dict[str, Any], as_of_date: str)
             f"- Current : {current}\n\n"
             f"File created: insights/risk_alerts.txt"
         )
-        ok, note = send_email_resend(subject, body)
+        # 발송은 background sender가 담당 (메일 API 지연이 리포트 생성을 막지 않도록)
+        queued = enqueue_alert("REGIME_CHANGE", subject, body)
+        start_sender()
+        ok, note = False, f"{queued['action']} ({queued['id']})"
 
         _save_state({"last_regime": current, "last_date": as_of_date})
 
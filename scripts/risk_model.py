@@ -0,0 +1,412 @@
+# scripts/risk_model.py
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from scripts.data_processing import country_etf_list
+from scripts.macro_schema import DATE_COL, MACRO_CSV_PATH, read_macro_csv
+from scripts.performance_engine import ETF_SECTOR, weights_from_portfolio_log
+from scripts.price_panel import get_price_panel
+from scripts.sector_allocation_engine import SECTOR_ETF
+
+# =========================================================
+# EWMA Covariance Risk Model (RiskMetrics, incremental)
+# ---------------------------------------------------------
+# universe : sector ETF 11 + country ETF (중복 제거)
+# 가격     : price panel 우선, panel에 없는 ticker는 macro_data.csv 같은 이름 컬럼
+# 수익률   : ticker별 유효 close끼리 simple return (fraction), 날짜는 union grid
+#
+# 공분산 (평균 0 가정, RiskMetrics λ = 0.94):
+#   S = λ·S + (1-λ)·r rᵀ      (pair 둘 다 관측된 날만, 아니면 그대로 유지)
+#   W = λ·W + (1-λ)           (같은 mask, bias 보정용 가중치 합)
+#   Σ = S / W                 (pair 관측 MIN_OBS 미만이면 NaN)
+#   → 하루 update O(N²), state(S, W, n) 저장 후 다음 날 새 행만 반영
+#
+# 출력:
+#   portfolio_risk(weights)  : ex-ante vol (연율 %), ticker / sector별 MCR·risk contribution,
+#                              vol-target exposure (risky basket vol 기준)
+#   ex_ante_vol_history(w)   : backtest용, 날짜별 Σ_t history(memmap)로 한 번에 계산
+#
+# 저장: data/risk_model/
+#   registry.json : tickers / 날짜 수 / source fingerprint
+#   dates.bin     : int64 epoch day, append-only
+#   cov.bin       : float32 Σ upper triangle(대각 포함), 하루 1 row, append-only
+#   state.npz     : S / W / n (증분 update용)
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+STORE_DIRNAME = "risk_model"
+MODEL_VERSION = 1
+
+LAMBDA = 0.94
+MIN_OBS = 20
+TRADING_DAYS = 252
+
+# risky basket(100% 투자 기준) 연율 vol이 이 값을 넘으면 exposure 감속
+TARGET_VOL = 18.0
+
+# 기본값은 권고(suggestion)만 리포트에 표시. True(또는 env VOL_TARGET_HARD_CAP=1)일 때만
+# Filter 15가 total exposure를 vol-target exposure로 실제 cap
+# covered_weight / invested_weight가 이 값 미만이면 ex-ante vol이 포트폴리오를 대표하지 못함
+# → Filter 15는 vol-target 권고 / cap을 생략하고 coverage만 표시
+MIN_COVERAGE = 0.8
+
+VOL_TARGET_HARD_CAP = os.getenv("VOL_TARGET_HARD_CAP", "").strip().lower() in ("1", "true", "yes", "on")
+
+RISK_UNIVERSE: List[str] = list(dict.fromkeys(list(SECTOR_ETF.values()) + list(country_etf_list)))
+
+
+def store_dir(data_dir: Path = DATA_DIR) -> Path:
+    return Path(data_dir) / STORE_DIRNAME
+
+
+def risk_group(ticker: str) -> str:
+    """sector ETF → sector 이름, 그 외(country 등) → ticker."""
+    return ETF_SECTOR.get(ticker, ticker)
+
+
+# -------------------------
+# Returns
+# -------------------------
+def universe_returns(data_dir: Path = DATA_DIR, tickers: Sequence[str] = RISK_UNIVERSE) -> pd.DataFrame:
+    """date x ticker simple return. ticker별로 자기 유효 close끼리만 수익률 계산."""
+    panel = get_price_panel(Path(data_dir))
+    series: Dict[str, pd.Series] = {}
+    for t in tickers:
+        if t in panel:
+            s = panel.series(t)
+            if len(s) > 1:
+                series[t] = s
+
+    missing = [t for t in tickers if t not in series]
+    macro_path = Path(data_dir) / MACRO_CSV_PATH.name
+    if missing and macro_path.exists():
+        macro = read_macro_csv(macro_path).set_index(DATE_COL)
+        for t in missing:
+            if t in macro.columns:
+                s = pd.to_numeric(macro[t], errors="coerce").dropna()
+                s = s[s > 0]
+                if len(s) > 1:
+                    series[t] = s[~s.index.duplicated(keep="last")].sort_index()
+
+    cols = [t for t in tickers if t in series]
+    if not cols:
+        return pd.DataFrame()
+
+    return pd.DataFrame({t: series[t].pct_change().iloc[1:] for t in cols})[cols].sort_index()
+
+
+# -------------------------
+# State
+# -------------------------
+class EwmaCovariance:
+    """RiskMetrics EWMA 공분산 (pair mask + bias 보정)."""
+
+    __slots__ = ("tickers", "s", "w", "n", "n_days")
+
+    def __init__(self, tickers: Sequence[str]):
+        k = len(tickers)
+        self.tickers = list(tickers)
+        self.s = np.zeros((k, k))
+        self.w = np.zeros((k, k))
+        self.n = np.zeros((k, k), dtype=np.int64)
+        self.n_days = 0
+
+    def update(self, r: np.ndarray) -> None:
+        r = np.asarray(r, dtype=float)
+        m = np.isfinite(r)
+        mm = m[:, None] & m[None, :]
+        r0 = np.where(m, r, 0.0)
+
+        self.s = np.where(mm, LAMBDA * self.s + (1.0 - LAMBDA) * np.outer(r0, r0), self.s)
+        self.w = np.where(mm, LAMBDA * self.w + (1.0 - LAMBDA), self.w)
+        self.n += mm
+        self.n_days += 1
+
+    def cov(self) -> np.ndarray:
+        """일간 공분산 (관측 부족 pair는 NaN)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = self.s / self.w
+        return np.where(self.n >= MIN_OBS, cov, np.nan)
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, tickers=np.array(self.tickers), s=self.s, w=self.w, n=self.n, n_days=self.n_days)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["EwmaCovariance"]:
+        if not path.exists():
+            return None
+        with np.load(path) as saved:
+            model = cls([str(t) for t in saved["tickers"]])
+            model.s, model.w, model.n = saved["s"], saved["w"], saved["n"]
+            model.n_days = int(saved["n_days"])
+        return model
+
+
+# -------------------------
+# Store
+# -------------------------
+def _fingerprint(returns: pd.DataFrame) -> str:
+    values = np.ascontiguousarray(returns.to_numpy(dtype=float))
+    return hashlib.sha1(values.tobytes() + "|".join(returns.columns).encode()).hexdigest()
+
+
+def _load_registry(data_dir: Path) -> Optional[Dict[str, Any]]:
+    path = store_dir(data_dir) / "registry.json"
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN][RISK MODEL] registry read failed → rebuild: {e}")
+        return None
+
+
+def _append(path: Path, arr: np.ndarray) -> None:
+    with open(path, "ab") as f:
+        f.write(np.ascontiguousarray(arr).tobytes())
+
+
+def update_risk_model(data_dir: Path = DATA_DIR, force: bool = False) -> EwmaCovariance:
+    """새 날짜만 EWMA 공분산에 반영하고 Σ history에 append (이미 반영된 구간이 바뀌면 전체 replay)."""
+    out_dir = store_dir(data_dir)
+    returns = universe_returns(data_dir)
+    tickers = list(returns.columns)
+    iu = np.triu_indices(len(tickers))
+
+    registry = None if force else _load_registry(data_dir)
+    model = None
+    start = 0
+    if registry and registry.get("version") == MODEL_VERSION and registry.get("tickers") == tickers:
+        n_done = int(registry.get("n_days", 0))
+        if n_done <= len(returns) and registry.get("fingerprint") == _fingerprint(returns.iloc[:n_done]):
+            try:
+                model = EwmaCovariance.load(out_dir / "state.npz")
+            except Exception as e:
+                print(f"[WARN][RISK MODEL] state load failed → rebuild: {e}")
+            if model is not None and model.n_days == n_done and model.tickers == tickers:
+                start = n_done
+            else:
+                model = None
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if model is None:
+        model = EwmaCovariance(tickers)
+        for f in out_dir.glob("*.bin"):
+            f.unlink()
+
+    new = returns.iloc[start:]
+    if new.empty:
+        return model
+
+    rows = []
+    for r in new.to_numpy(dtype=float):
+        model.update(r)
+        rows.append(model.cov()[iu].astype("<f4"))
+
+    _append(out_dir / "cov.bin", np.vstack(rows))
+    _append(out_dir / "dates.bin", new.index.values.astype("datetime64[D]").astype("<i8"))
+
+    model.save(out_dir / "state.npz")
+    registry = {
+        "version": MODEL_VERSION,
+        "tickers": tickers,
+        "lambda": LAMBDA,
+        "n_days": int(model.n_days),
+        "last_date": str(new.index[-1].date()),
+        "fingerprint": _fingerprint(returns),
+    }
+    tmp_path = out_dir / "registry.json.tmp"
+    tmp_path.write_text(json.dumps(registry, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, out_dir / "registry.json")
+
+    print(f"[RISK MODEL] +{len(new)} day(s) → {model.n_days} days x {len(tickers)} ETFs ({'append' if start else 'rebuild'})")
+    return model
+
+
+def load_cov_history(data_dir: Path = DATA_DIR) -> Optional[Dict[str, Any]]:
+    """backtest용 Σ history: {"dates", "tickers", "cov"(T, N, N) 일간 공분산}."""
+    registry = _load_registry(data_dir)
+    path = store_dir(data_dir) / "cov.bin"
+    if registry is None or not path.exists():
+        return None
+
+    tickers = registry["tickers"]
+    k = len(tickers)
+    iu = np.triu_indices(k)
+    n = int(registry["n_days"])
+
+    dates = np.memmap(store_dir(data_dir) / "dates.bin", dtype="<i8", mode="r", shape=(n,))
+    packed = np.memmap(path, dtype="<f4", mode="r", shape=(n, len(iu[0])))
+
+    cov = np.empty((n, k, k))
+    cov[:, iu[0], iu[1]] = packed
+    cov[:, iu[1], iu[0]] = packed
+    return {
+        "dates": pd.DatetimeIndex(np.asarray(dates).astype("datetime64[D]")),
+        "tickers": tickers,
+        "cov": cov,
+    }
+
+
+# -------------------------
+# Portfolio risk
+# -------------------------
+def _weight_vector(weights: Mapping[str, float], tickers: Sequence[str]) -> np.ndarray:
+    return np.array([float(weights.get(t, 0.0) or 0.0) for t in tickers])
+
+
+def portfolio_risk(
+    weights: Mapping[str, float],
+    model: EwmaCovariance,
+    target_vol: float = TARGET_VOL,
+) -> Dict[str, Any]:
+    """
+    weights: ETF → 총자산 대비 비중 (fraction, 현금 제외 합 = 투자 비중)
+    공분산이 없는 ETF는 제외하고 covered_weight로 표시.
+    """
+    cov = model.cov()
+    w_all = _weight_vector(weights, model.tickers)
+    valid = np.isfinite(np.diag(cov))
+    usable = valid & (w_all != 0)
+    if usable.any():
+        sub = cov[np.ix_(usable, usable)]
+        usable[usable] = np.isfinite(sub).all(axis=1)
+
+    invested = float(sum(abs(float(v or 0.0)) for v in weights.values()))
+    w = np.where(usable, w_all, 0.0)
+    covered = float(np.abs(w).sum())
+    if covered <= 0:
+        return {"available": False, "covered_weight": 0.0, "invested_weight": round(invested, 4), "coverage": 0.0}
+    coverage = covered / invested if invested > 0 else 0.0
+
+    c = np.nan_to_num(cov)
+    sigma_w = c @ w
+    var = float(w @ sigma_w)
+    vol_daily = float(np.sqrt(max(var, 0.0)))
+    ann = np.sqrt(TRADING_DAYS) * 100.0
+
+    mcr = np.where(usable, sigma_w / vol_daily, 0.0) if vol_daily > 0 else np.zeros_like(w)
+    contrib = w * mcr
+
+    by_ticker = {}
+    by_group: Dict[str, Dict[str, float]] = {}
+    for i, t in enumerate(model.tickers):
+        if not usable[i]:
+            continue
+        share = float(contrib[i] / vol_daily) if vol_daily > 0 else 0.0
+        by_ticker[t] = {
+            "weight": round(float(w[i]), 4),
+            "mcr": round(float(mcr[i] * ann), 3),           # ∂σ/∂w (연율 %)
+            "contribution": round(float(contrib[i] * ann), 3),
+            "share": round(share, 4),
+        }
+        g = by_group.setdefault(risk_group(t), {"weight": 0.0, "contribution": 0.0, "share": 0.0})
+        g["weight"] += float(w[i])
+        g["contribution"] += float(contrib[i] * ann)
+        g["share"] += share
+
+    for g in by_group.values():
+        for k in g:
+            g[k] = round(g[k], 4)
+
+    # risky basket(투자분 100% 기준) vol → vol-target exposure
+    basket_vol = vol_daily / covered * ann
+    vol_target_exposure = 100 if basket_vol <= 0 else int(round(min(100.0, 100.0 * target_vol / basket_vol)))
+
+    return {
+        "available": True,
+        "ex_ante_vol": round(vol_daily * ann, 3),
+        "basket_vol": round(basket_vol, 3),
+        "target_vol": target_vol,
+        "vol_target_exposure": vol_target_exposure,
+        "hard_cap": VOL_TARGET_HARD_CAP,
+        "covered_weight": round(covered, 4),
+        "invested_weight": round(invested, 4),
+        "coverage": round(coverage, 4),
+        "min_coverage": MIN_COVERAGE,
+        "by_ticker": by_ticker,
+        "by_group": dict(sorted(by_group.items(), key=lambda kv: -kv[1]["share"])),
+        "n_days": int(model.n_days),
+    }
+
+
+def ex_ante_vol_history(
+    weights: pd.DataFrame,
+    data_dir: Path = DATA_DIR,
+    target_vol: float = TARGET_VOL,
+) -> pd.DataFrame:
+    """
+    backtest용: date x ETF 비중(fraction) → 날짜별 ex-ante vol / vol-target exposure.
+    비중은 Σ 날짜 기준 as-of(ffill)로 맞추고, Σ_t는 그 날 종가까지 반영된 값.
+    """
+    hist = load_cov_history(data_dir)
+    if hist is None or weights.empty:
+        return pd.DataFrame(columns=["ex_ante_vol", "basket_vol", "vol_target_exposure"])
+
+    dates, tickers = hist["dates"], hist["tickers"]
+    w = weights.copy()
+    w.index = pd.DatetimeIndex(pd.to_datetime(w.index))
+    w = w.sort_index().reindex(columns=tickers).fillna(0.0)
+    w = w.reindex(w.index.union(dates)).ffill().reindex(dates).fillna(0.0).to_numpy()
+
+    cov = hist["cov"]
+    ok = np.isfinite(np.einsum("tii->ti", cov)) & (w != 0)
+    w_ok = np.where(ok, w, 0.0)
+    c = np.nan_to_num(cov)
+
+    var = np.einsum("ti,tij,tj->t", w_ok, c, w_ok)
+    vol = np.sqrt(np.maximum(var, 0.0)) * np.sqrt(TRADING_DAYS) * 100.0
+    covered = np.abs(w_ok).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        basket = np.where(covered > 0, vol / covered, np.nan)
+        vt = np.where(basket > 0, np.minimum(100.0, 100.0 * target_vol / basket), 100.0)
+
+    return pd.DataFrame(
+        {"ex_ante_vol": vol, "basket_vol": basket, "vol_target_exposure": np.round(vt)},
+        index=dates,
+    )
+
+
+def current_portfolio_risk(data_dir: Path = DATA_DIR, log_path: Optional[str] = None) -> Dict[str, Any]:
+    """모델 증분 update → 최근 paper portfolio 비중의 ex-ante risk (Filter 15용)."""
+    model = update_risk_model(data_dir)
+    log_path = log_path or str(Path(data_dir) / "paper_portfolio_log.csv")
+    hist = weights_from_portfolio_log(log_path)
+    if hist.empty:
+        return {"available": False, "reason": "no allocation history"}
+
+    weights = hist.iloc[-1]
+    risk = portfolio_risk(weights[weights != 0].to_dict(), model)
+    risk["weights_date"] = str(pd.Timestamp(hist.index[-1]).date())
+    return risk
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EWMA covariance risk model")
+    parser.add_argument("command", choices=["build", "show"], nargs="?", default="build")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    model = update_risk_model(data_dir, force=args.force)
+    if args.command == "show":
+        vols = np.sqrt(np.diag(model.cov()) * TRADING_DAYS) * 100.0
+        print(pd.Series(vols, index=model.tickers).round(2).to_string())
+        print(json.dumps(current_portfolio_risk(data_dir), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
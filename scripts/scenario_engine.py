@@ -0,0 +1,387 @@
+# scripts/scenario_engine.py
+from __future__ import annotations
+
+import contextlib
+import io
+import itertools
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from filters.strategist_filters import (
+    market_regime_filter,
+    narrative_engine_filter,
+    policy_filter_with_expectations,
+    structural_filter,
+    volatility_controlled_exposure_filter,
+)
+from scripts.market_snapshot import MarketSnapshot
+
+# =========================================================
+# What-if Scenario Engine (Filter 13 / 15 state machine)
+# ---------------------------------------------------------
+# base market_data(리포트 실행 직후 상태) + shock grid → 시나리오별 state만 계산
+#
+# shock (SHOCK_SPECS):
+#   kind=abs : today += shock x scale   (US10Y / HY_OAS: bp → %p)
+#   kind=pct : today *= 1 + shock / 100 (DXY / VIX / NET_LIQ)
+#   prev는 그대로, pct_change는 (today - prev) / prev 로 다시 계산
+#
+# state chain (SCENARIO_CHAIN, build_strategist_commentary 순서):
+#   market_regime(MARKET_REGIME / MACRO_NARRATIVE / CROSS_ASSET_TAPE)
+#   → policy(POLICY_BIAS_LINE) → structural(STRUCT_V2_STATE)
+#   → 13 narrative(RISK_BUDGET / risk_action) → 15 exposure(RECOMMENDED_EXPOSURE / SEW_STATUS)
+#   그 외 필드(flow / drift / gamma 등)는 base 값 그대로
+#   → 필터 텍스트는 버리고 stdout도 막음 (state-only)
+#
+# snapshot:
+#   레지스트리 컬럼은 (n_scenarios x columns) 공유 행렬의 row view (build_market_snapshots와 같은 방식)
+#   extras는 시나리오별 shallow copy (chain은 top-level key만 새로 씀)
+#   Filter 15 recovery state(FILTER15_*)는 리포트 실행 전 값으로 되돌린 뒤 평가
+#
+# 병렬: 시나리오 chunk를 forkserver pool로 (core 1개면 순차)
+# =========================================================
+
+SHOCK_SPECS: Dict[str, Dict[str, Any]] = {
+    "US10Y": {"kind": "abs", "scale": 0.01, "unit": "bp", "grid": [-50, -25, -10, 0, 10, 25, 50]},
+    "DXY": {"kind": "pct", "unit": "%", "grid": [-2.0, -1.0, -0.5, 0.0, 0.5, 1.0, 2.0]},
+    "VIX": {"kind": "pct", "unit": "%", "grid": [-30, -15, 0, 15, 30, 60, 100]},
+    "HY_OAS": {"kind": "abs", "scale": 0.01, "unit": "bp", "grid": [-50, -25, 0, 25, 50, 100, 200]},
+    "NET_LIQ": {"kind": "pct", "unit": "%", "grid": [-3.0, -1.0, -0.5, 0.0, 0.5, 1.0, 3.0]},
+}
+
+# flip 탐색용 1차원 sweep (한쪽 방향당)
+SWEEP_STEPS: Dict[str, List[float]] = {
+    "US10Y": [5, 10, 15, 20, 25, 35, 50, 75, 100],
+    "DXY": [0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0],
+    "VIX": [2, 5, 10, 15, 20, 30, 50, 75, 100],
+    "HY_OAS": [10, 25, 50, 75, 100, 150, 200, 300],
+    "NET_LIQ": [0.25, 0.5, 1.0, 2.0, 3.0, 5.0],
+}
+
+# 리포트용 2차원 surface
+REPORT_SURFACES = [("VIX", "HY_OAS"), ("US10Y", "DXY")]
+
+SCENARIO_CHAIN: List[Callable[[Dict[str, Any]], str]] = [
+    market_regime_filter,
+    policy_filter_with_expectations,
+    structural_filter,
+    narrative_engine_filter,
+    volatility_controlled_exposure_filter,
+]
+
+FILTER15_STATE_KEYS = [
+    "FILTER15_PREV_DEADMAN",
+    "FILTER15_RECOVERY_ACTIVE",
+    "FILTER15_RECOVERY_COMPLETED",
+    "FILTER15_RECOVERY_STREAK",
+    "FILTER15_PREV_HY_OAS",
+]
+
+OUTPUT_COLUMNS = [
+    "risk_budget",
+    "risk_action",
+    "phase",
+    "phase_cap",
+    "recommended_exposure",
+    "sew_status",
+]
+
+PARALLEL_MIN_SCENARIOS = 4096
+CHUNK_SIZE = 512
+
+
+# -------------------------
+# Base / shock application
+# -------------------------
+def capture_state(market_data: Mapping[str, Any]) -> Dict[str, Any]:
+    """리포트 필터 실행 전 Filter 15 recovery state (시나리오 평가 기준)."""
+    return {k: market_data.get(k) for k in FILTER15_STATE_KEYS}
+
+
+def _series(market_data: Mapping[str, Any], key: str) -> Dict[str, Optional[float]]:
+    raw = market_data.get(key)
+    if not isinstance(raw, Mapping):
+        return {"today": None, "prev": None, "pct_change": None}
+
+    def f(x):
+        try:
+            return None if x is None else float(x)
+        except (TypeError, ValueError):
+            return None
+
+    return {"today": f(raw.get("today")), "prev": f(raw.get("prev")), "pct_change": f(raw.get("pct_change"))}
+
+
+def _shocked(base: Dict[str, Optional[float]], spec: Mapping[str, Any], shock: np.ndarray) -> Dict[str, np.ndarray]:
+    """(n,) shock → shock 반영 today / pct_change 배열."""
+    today, prev = base["today"], base["prev"]
+    n = len(shock)
+    if today is None:
+        return {"today": np.full(n, np.nan), "pct_change": np.full(n, np.nan)}
+
+    if spec["kind"] == "abs":
+        new_today = today + shock * spec["scale"]
+    else:
+        new_today = today * (1.0 + shock / 100.0)
+
+    if prev is not None and prev != 0:
+        pct = (new_today - prev) / prev * 100.0
+    else:
+        # prev 없으면 base pct_change 위에 shock을 더해 근사
+        pct = np.full(n, np.nan) if base["pct_change"] is None else base["pct_change"] + (new_today / today - 1.0) * 100.0
+    return {"today": new_today, "pct_change": pct}
+
+
+def perturbed_snapshots(
+    base: Mapping[str, Any],
+    shocks: pd.DataFrame,
+    pre_state: Optional[Mapping[str, Any]] = None,
+) -> List[MarketSnapshot]:
+    """
+    shocks: (n_scenarios x factor) DataFrame (factor ⊂ SHOCK_SPECS, 단위는 spec 기준)
+    반환: 시나리오별 MarketSnapshot (레지스트리 컬럼은 공유 행렬 row view)
+    """
+    if isinstance(base, MarketSnapshot):
+        template = base
+    else:
+        template = MarketSnapshot()
+        for k, v in base.items():
+            template[k] = v
+
+    n = len(shocks)
+    today = np.tile(template._today, (n, 1))
+    prev = np.tile(template._prev, (n, 1))
+    pct = np.tile(template._pct, (n, 1))
+    extras_base = dict(template._extras)
+    if pre_state:
+        extras_base.update(pre_state)
+
+    extra_cols: Dict[str, Dict[str, np.ndarray]] = {}
+    for factor in shocks.columns:
+        spec = SHOCK_SPECS[factor]
+        base_series = _series(template, factor)
+        moved = _shocked(base_series, spec, shocks[factor].to_numpy(dtype=float))
+
+        idx = template._slot(factor)
+        if idx is not None and factor not in template._extras:
+            today[:, idx] = moved["today"]
+            pct[:, idx] = moved["pct_change"]
+        else:
+            extra_cols[factor] = moved
+
+    snaps = []
+    for i in range(n):
+        snap = MarketSnapshot(today=today[i], prev=prev[i], pct=pct[i], registry=template._registry)
+        extras = dict(extras_base)
+        for factor, moved in extra_cols.items():
+            payload = dict(extras.get(factor) or {})
+            payload["today"] = float(moved["today"][i])
+            payload["pct_change"] = None if np.isnan(moved["pct_change"][i]) else float(moved["pct_change"][i])
+            extras[factor] = payload
+        snap._extras = extras
+        snaps.append(snap)
+    return snaps
+
+
+# -------------------------
+# State-only evaluation
+# -------------------------
+def evaluate_state(market_data: MarketSnapshot) -> Dict[str, Any]:
+    """SCENARIO_CHAIN 실행 → 13 / 15 state만 반환 (텍스트 / stdout 버림)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for fn in SCENARIO_CHAIN:
+            fn(market_data)
+
+    final_state = market_data.get("FINAL_STATE", {}) or {}
+    return {
+        "risk_budget": market_data.get("RISK_BUDGET"),
+        "risk_action": final_state.get("risk_action"),
+        "phase": market_data.get("MARKET_REGIME"),
+        "phase_cap": market_data.get("PHASE_CAP"),
+        "recommended_exposure": market_data.get("RECOMMENDED_EXPOSURE"),
+        "sew_status": market_data.get("SEW_STATUS"),
+    }
+
+
+def _evaluate_chunk(base: Mapping[str, Any], shocks: pd.DataFrame, pre_state: Optional[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for snap in perturbed_snapshots(base, shocks, pre_state):
+        try:
+            out.append(evaluate_state(snap))
+        except Exception as e:
+            out.append({"error": f"{type(e).__name__}: {e}"})
+    return out
+
+
+def _worker_context():
+    """chart_pipeline과 같은 방식: forkserver + 이 module preload."""
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return mp.get_context("spawn")
+
+
+def run_scenarios(
+    base: Mapping[str, Any],
+    shocks: pd.DataFrame,
+    pre_state: Optional[Mapping[str, Any]] = None,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    shocks 각 row를 평가해 shock 컬럼 + OUTPUT_COLUMNS DataFrame 반환.
+    시나리오가 PARALLEL_MIN_SCENARIOS 이상이고 core가 2개 이상이면 chunk 단위 병렬.
+    """
+    shocks = shocks.reset_index(drop=True)
+    chunks = [shocks.iloc[i: i + CHUNK_SIZE] for i in range(0, len(shocks), CHUNK_SIZE)]
+    if isinstance(base, MarketSnapshot):
+        base_payload = base
+    else:
+        base_payload = dict(base)
+
+    n = min(len(chunks), workers or (os.cpu_count() or 1))
+    rows: List[Dict[str, Any]] = []
+    if n > 1 and len(shocks) >= PARALLEL_MIN_SCENARIOS:
+        try:
+            with ProcessPoolExecutor(max_workers=n, mp_context=_worker_context()) as pool:
+                futures = [pool.submit(_evaluate_chunk, base_payload, c, pre_state) for c in chunks]
+                for f in futures:
+                    rows.extend(f.result())
+        except Exception as e:
+            print(f"⚠️ scenario worker pool failed ({e}) → 순차 평가")
+            rows = []
+
+    if len(rows) != len(shocks):
+        rows = []
+        for c in chunks:
+            rows.extend(_evaluate_chunk(base_payload, c, pre_state))
+
+    return pd.concat([shocks, pd.DataFrame(rows, index=shocks.index)], axis=1)
+
+
+# -------------------------
+# Grids / surfaces
+# -------------------------
+def shock_grid(factors: Optional[Mapping[str, Sequence[float]]] = None) -> pd.DataFrame:
+    """factor → shock 목록의 cartesian product (기본: SHOCK_SPECS 전체 grid)."""
+    factors = factors or {k: spec["grid"] for k, spec in SHOCK_SPECS.items()}
+    names = list(factors)
+    return pd.DataFrame(list(itertools.product(*(factors[k] for k in names))), columns=names, dtype=float)
+
+
+def sensitivity_surface(results: pd.DataFrame, x: str, y: str, value: str = "recommended_exposure") -> pd.DataFrame:
+    """run_scenarios 결과 → y(행) x x(열) surface (다른 factor는 평균)."""
+    return results.pivot_table(index=y, columns=x, values=value, aggfunc="mean")
+
+
+def flip_distances(
+    base: Mapping[str, Any],
+    pre_state: Optional[Mapping[str, Any]] = None,
+    steps: Mapping[str, Sequence[float]] = SWEEP_STEPS,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    factor 하나씩 위/아래로 sweep → base risk_action이 바뀌는 가장 작은 shock.
+    반환: factor / direction / shock / unit / to_action / exposure (flip 없으면 shock NaN)
+    """
+    rows = [{k: 0.0 for k in steps}]
+    meta = [("BASE", 0, 0.0)]
+    for factor, levels in steps.items():
+        for sign in (1, -1):
+            for s in levels:
+                row = {k: 0.0 for k in steps}
+                row[factor] = sign * float(s)
+                rows.append(row)
+                meta.append((factor, sign, sign * float(s)))
+
+    results = run_scenarios(base, pd.DataFrame(rows), pre_state, workers)
+    base_action = results.iloc[0]["risk_action"]
+
+    out = []
+    for factor in steps:
+        for sign in (1, -1):
+            hit = None
+            for i, (f, sg, shock) in enumerate(meta):
+                if f == factor and sg == sign and results.iloc[i]["risk_action"] != base_action:
+                    hit = (shock, results.iloc[i])
+                    break
+            out.append({
+                "factor": factor,
+                "direction": "UP" if sign > 0 else "DOWN",
+                "shock": np.nan if hit is None else hit[0],
+                "unit": SHOCK_SPECS[factor]["unit"],
+                "to_action": None if hit is None else hit[1]["risk_action"],
+                "exposure": None if hit is None else hit[1]["recommended_exposure"],
+            })
+
+    flips = pd.DataFrame(out)
+    flips.attrs["base"] = results.iloc[0][OUTPUT_COLUMNS].to_dict()
+    return flips
+
+
+def _relative_distance(flips: pd.DataFrame) -> pd.Series:
+    """factor별 sweep 최대폭 대비 flip shock 비율 (단위가 달라도 비교 가능)."""
+    widest = {k: max(v) for k, v in SWEEP_STEPS.items()}
+    return flips["shock"].abs() / flips["factor"].map(widest)
+
+
+# -------------------------
+# Report
+# -------------------------
+def scenario_report_lines(
+    market_data: Mapping[str, Any],
+    pre_state: Optional[Mapping[str, Any]] = None,
+    top_n: int = 4,
+    workers: Optional[int] = None,
+) -> List[str]:
+    """daily report용: action flip에 가장 가까운 입력 + exposure surface."""
+    flips = flip_distances(market_data, pre_state, workers=workers)
+    base = flips.attrs["base"]
+
+    lines = []
+    lines.append("## 🧪 What-if Sensitivity (Filter 13 / 15)")
+    lines.append("")
+    lines.append(
+        f"- **Base:** Risk Action={base['risk_action']} / Budget={base['risk_budget']} / "
+        f"Exposure={base['recommended_exposure']}% / Phase={base['phase']}"
+    )
+
+    live = (
+        market_data.get("RISK_BUDGET"),
+        (market_data.get("FINAL_STATE") or {}).get("risk_action"),
+        market_data.get("RECOMMENDED_EXPOSURE"),
+    )
+    if live != (base["risk_budget"], base["risk_action"], base["recommended_exposure"]):
+        # 체인 밖 필드가 13/15에 영향 → 결과는 참고용
+        lines.append(f"- ⚠️ base 재계산이 실제 값과 다름 (live={live}) → 민감도는 참고용")
+
+    hits = flips.dropna(subset=["shock"]).copy()
+    if hits.empty:
+        lines.append("- **Closest Flip:** sweep 범위 안에서 risk action 변화 없음")
+    else:
+        hits["distance"] = _relative_distance(hits)
+        hits = hits.sort_values("distance").head(top_n)
+        lines.append("- **Closest to Flipping:**")
+        for row in hits.itertuples(index=False):
+            lines.append(
+                f"  - {row.factor} {row.shock:+g}{row.unit} → **{row.to_action}** (Exposure {row.exposure}%)"
+            )
+
+    for x, y in REPORT_SURFACES:
+        grid = shock_grid({x: SHOCK_SPECS[x]["grid"], y: SHOCK_SPECS[y]["grid"]})
+        surface = sensitivity_surface(run_scenarios(market_data, grid, pre_state, workers), x, y)
+
+        lines.append("")
+        lines.append(f"**Recommended Exposure (%) — {y} ({SHOCK_SPECS[y]['unit']}) x {x} ({SHOCK_SPECS[x]['unit']})**")
+        lines.append("")
+        lines.append(f"| {y} \\ {x} | " + " | ".join(f"{c:+g}" for c in surface.columns) + " |")
+        lines.append("|" + "---|" * (len(surface.columns) + 1))
+        for idx, row in surface.iterrows():
+            lines.append(f"| {idx:+g} | " + " | ".join("N/A" if pd.isna(v) else f"{v:.0f}" for v in row) + " |")
+
+    return lines
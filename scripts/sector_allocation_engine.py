@@ -0,0 +1,1608 @@
+# scripts/sector_allocation_engine.py
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from filters.participation_quality import classify_participation_quality, mode_policy
+from scripts.log_store import upsert_log_rows
+
+# =========================================================
+# Sector Allocation Engine (Filter 18, sectors x dates kernel)
+# ---------------------------------------------------------
+# sector_allocation_filter / build_tactical_allocation 의 점수·비중 규칙을
+# (date x sector) 배열 위에서 한 번에 계산.
+#   live   : filter가 오늘 market_data에서 input 1 row를 뽑아 같은 kernel 호출 (row 0 사용)
+#   history: data/sector_allocation_inputs.csv 전체를 한 번에 계산
+#
+# 1) sector_score_kernel   : VOL / LIQ / CURVE / CREDIT / PHASE(macro profile) / MOM / FLOW
+#                            -> theory vs flow 분류 -> correlation break -> conflict resolver
+#                            (Financials cap 포함)
+# 2) tactical_weight_kernel: classification multiplier -> base weight -> deleveraging cut
+#                            -> regime cap / participation cap -> residual -> compression
+# 3) path-dependent 단계 (전일 상태 의존, 날짜 순 scan):
+#    rank persistence 3D / rebalance threshold / execution ceiling
+#    -> filter와 history가 같은 step 함수 사용
+#
+# 소수점 처리: 기존 dict 로직의 Python round()와 합산 순서(ow 정렬 순)를 그대로 따름
+# -> 모든 날짜에서 daily filter 결과와 동일
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+ALLOCATION_INPUTS_FILE = "sector_allocation_inputs.csv"
+
+SECTOR_ETF = {
+    "Technology": "XLK",
+    "Financials": "XLF",
+    "Energy": "XLE",
+    "Industrials": "XLI",
+    "Materials": "XLB",
+    "Consumer Discretionary": "XLY",
+    "Consumer Staples": "XLP",
+    "Health Care": "XLV",
+    "Utilities": "XLU",
+    "Real Estate": "XLRE",
+    "Communication Services": "XLC",
+}
+SECTORS = list(SECTOR_ETF.keys())
+SECTOR_INDEX = {s: i for i, s in enumerate(SECTORS)}
+N_SECTORS = len(SECTORS)
+
+PRIORITY = {
+    "VOL": 7,
+    "LIQ": 6,
+    "CURVE": 5,
+    "CREDIT": 4,
+    "PHASE": 3,
+    "FLOW": 2,
+    "MOM": 1,
+}
+
+# -------------------------
+# Score rule tables: key -> [(sector, pts, why template)]
+# -------------------------
+VOL_RULES = {
+    3: [
+        ("Utilities", 4, "{vix_label} → 최우선 피난처 ({vix_detail})"),
+        ("Consumer Staples", 3, "{vix_label} → 경기 비탄력적 섹터 선호 ({vix_detail})"),
+        ("Health Care", 2, "{vix_label} → 방어/현금흐름 선호 ({vix_detail})"),
+        ("Technology", -4, "{vix_label} → 고베타/멀티플 압박 ({vix_detail})"),
+        ("Consumer Discretionary", -2, "{vix_label} → 경기민감 소비 부담 ({vix_detail})"),
+    ],
+    2: [
+        ("Utilities", 3, "{vix_label} → 방어주 우위 ({vix_detail})"),
+        ("Consumer Staples", 2, "{vix_label} → 필수소비 선호 ({vix_detail})"),
+        ("Technology", -3, "{vix_label} → 위험자산 회피 ({vix_detail})"),
+    ],
+    -2: [
+        ("Technology", 2, "{vix_label} → 성장주 베팅 유효 ({vix_detail})"),
+        ("Consumer Discretionary", 1, "{vix_label} → 경기민감 소비 회복 ({vix_detail})"),
+        ("Utilities", -1, "{vix_label} → 방어주 상대매력 둔화 ({vix_detail})"),
+    ],
+}
+
+# 🔧 v3.4: Liquidity는 중요하지만 단독으로 섹터를 지배하지 않도록 완화
+LIQ_RULES = {
+    "TIGHT": [
+        ("Consumer Staples", 2, "유동성 긴축 → 방어적 필수소비 선호"),
+        ("Health Care", 2, "유동성 긴축 → 안정적 현금흐름 선호"),
+        ("Utilities", 1, "유동성 긴축 → 방어주 버퍼"),
+        ("Technology", -2, "유동성 긴축 → 고밸류에이션 부담"),
+        ("Real Estate", -1.5, "유동성 긴축 → 조달비용 상승 부담"),
+        ("Consumer Discretionary", -1, "유동성 긴축 → 경기민감 소비 부담"),
+    ],
+    "EASY": [
+        ("Technology", 2, "유동성 완화 → 성장주/베타 우호"),
+        ("Industrials", 1.5, "유동성 완화 → 경기민감 회복"),
+        ("Consumer Discretionary", 1.5, "유동성 완화 → 소비 민감주 우호"),
+        ("Financials", 1, "유동성 완화 → 위험선호 회복"),
+        ("Utilities", -1, "유동성 완화 → 방어주 상대매력 저하"),
+    ],
+}
+
+CURVE_RULES = {
+    "INVERTED": [
+        ("Financials", -3, "수익률 곡선 역전({t10y2y:.2f}) → 은행 수익성 악화"),
+        ("Utilities", 2, "역전 커브 → 침체 방어주 선호"),
+        ("Consumer Staples", 1, "역전 커브 → 경기 방어 필요"),
+    ],
+    "FLAT / FRAGILE": [
+        ("Health Care", 1, "플랫 커브({t10y2y:.2f}) → 방어/퀄리티 선호"),
+        ("Consumer Staples", 1, "플랫 커브({t10y2y:.2f}) → 경기 민감도 낮은 섹터 선호"),
+    ],
+    "MODERATE STEEP": [
+        ("Financials", 2, "완만한 스티프닝({t10y2y:.2f}) → 예대마진 개선"),
+        ("Industrials", 1, "완만한 스티프닝({t10y2y:.2f}) → 성장 기대 반영"),
+    ],
+    "STEEP / REFLATION": [
+        ("Financials", 3, "가파른 스티프닝({t10y2y:.2f}) → 금융주 우호"),
+        ("Energy", 1, "가파른 스티프닝({t10y2y:.2f}) → 리플레이션 민감 섹터"),
+        ("Materials", 1, "가파른 스티프닝({t10y2y:.2f}) → 경기재개/실물 민감"),
+    ],
+}
+
+CREDIT_RULES = [
+    ("Financials", -2, "크레딧 리스크 감지 → 금융주 변동성 확대"),
+    ("Real Estate", -3, "크레딧 리스크 감지 → 부동산 금융 위축"),
+    ("Consumer Staples", 1, "크레딧 리스크 감지 → 방어주 선호"),
+    ("Health Care", 1, "크레딧 리스크 감지 → 퀄리티 선호"),
+]
+
+PROFILE_RULES = {
+    "DOLLAR_LIQUIDITY_STRESS": [
+        ("Consumer Staples", 1.5, "Dollar Liquidity Stress → 달러 강세/유동성 압박에서 방어주 선호"),
+        ("Health Care", 1.0, "Dollar Liquidity Stress → 퀄리티/현금흐름 선호"),
+        ("Utilities", 0.5, "Dollar Liquidity Stress → 방어적 버퍼"),
+        ("Technology", -1.0, "Dollar Liquidity Stress → 고밸류 성장주 부담"),
+        ("Financials", -1.0, "Dollar Liquidity Stress → 크레딧/달러 조달 부담"),
+        ("Real Estate", -1.0, "Dollar Liquidity Stress → 조달비용 부담"),
+    ],
+    "STAGFLATION_STRESS": [
+        ("Energy", 1.5, "Stagflation Stress → 유가/인플레 압력 수혜"),
+        ("Materials", 0.5, "Stagflation Stress → 원자재 민감 섹터 일부 우호"),
+        ("Utilities", -1.0, "Stagflation Stress → 금리 상승에 취약"),
+        ("Real Estate", -1.0, "Stagflation Stress → 조달비용 부담"),
+        ("Technology", -1.0, "Stagflation Stress → 장기금리 상승 부담"),
+        ("Consumer Discretionary", -0.5, "Stagflation Stress → 소비 여력 압박"),
+    ],
+    "GROWTH_SCARE": [
+        ("Consumer Staples", 1.5, "Growth Scare → 경기방어 필수소비 선호"),
+        ("Health Care", 1.5, "Growth Scare → 퀄리티/방어 선호"),
+        ("Utilities", 0.5, "Growth Scare → 금리 하락 시 방어주 일부 우호"),
+        ("Industrials", -0.5, "Growth Scare → 경기민감 부담"),
+        ("Consumer Discretionary", -0.5, "Growth Scare → 소비민감 부담"),
+        ("Financials", -0.5, "Growth Scare → 성장 둔화 시 금융 베타 부담"),
+    ],
+    "SOFT_RISK_OFF_DISINFLATION": [
+        ("Health Care", 1.2, "Soft Risk-Off Disinflation → 금리 안정/퀄리티 방어 우위"),
+        ("Consumer Staples", 0.8, "Soft Risk-Off Disinflation → 필수소비 방어 보완"),
+        ("Technology", 0.5, "Soft Risk-Off Disinflation → 금리 안정으로 리더 섹터 일부 유지"),
+        ("Consumer Discretionary", -0.5, "Soft Risk-Off Disinflation → 소비 베타는 일부 제한"),
+        ("Industrials", -0.5, "Soft Risk-Off Disinflation → 경기민감 과열 억제"),
+    ],
+    "SOFT_RISK_ON_DISINFLATION": [
+        ("Technology", 1.0, "Soft Risk-On Disinflation → 금리 안정으로 성장주 일부 우호"),
+        ("Health Care", 0.5, "Soft Risk-On Disinflation → 퀄리티 보완"),
+        ("Consumer Discretionary", 0.5, "Soft Risk-On Disinflation → 낮은 변동성에서 소비 베타 일부 회복"),
+        ("Utilities", -0.5, "Soft Risk-On Disinflation → 방어주 상대매력 일부 둔화"),
+    ],
+    "DISINFLATION_RISK_ON": [
+        ("Technology", 1.5, "Disinflation Risk-On → 성장주/장기 듀레이션 우호"),
+        ("Consumer Discretionary", 1.0, "Disinflation Risk-On → 소비 베타 우호"),
+        ("Communication Services", 0.5, "Disinflation Risk-On → 플랫폼/성장 섹터 우호"),
+        ("Utilities", -0.5, "Disinflation Risk-On → 방어주 상대매력 둔화"),
+    ],
+    "EARLY_RISK_ON": [
+        ("Technology", 1.0, "Early Risk-On → 초기 리더 섹터 선호"),
+        ("Industrials", 1.0, "Early Risk-On → 경기민감 회복 관찰"),
+        ("Consumer Discretionary", 0.5, "Early Risk-On → 소비 베타 일부 회복"),
+        ("Consumer Staples", -0.5, "Early Risk-On → 방어주 상대매력 둔화"),
+    ],
+    "REFLATION_RISK_ON": [
+        ("Industrials", 1.5, "Reflation Risk-On → 경기민감 우호"),
+        ("Financials", 1.0, "Reflation Risk-On → 커브/성장 기대 우호"),
+        ("Energy", 1.0, "Reflation Risk-On → 에너지/실물자산 우호"),
+        ("Materials", 0.5, "Reflation Risk-On → 원자재/산업재 우호"),
+    ],
+    "EVENT_TRANSITION": [
+        ("Health Care", 1.0, "{phase} → 관망 구간 방어/퀄리티 선호"),
+        ("Consumer Staples", 1.0, "{phase} → 관망 구간 필수소비 선호"),
+        ("Technology", -0.5, "{phase} → 이벤트 전 성장주 베타 일부 제한"),
+        ("Industrials", -0.5, "{phase} → 이벤트 전 경기민감 베팅 제한"),
+    ],
+    "BALANCED": [
+        ("Health Care", 0.5, "Balanced Macro Profile → 퀄리티 보완"),
+        ("Consumer Staples", 0.5, "Balanced Macro Profile → 방어 보완"),
+    ],
+}
+
+MOM_WHY_UP = "Relative Strength 강세 (vs SPY) → 자금 유입 확인"
+MOM_WHY_DOWN = "Relative Strength 약세 (vs SPY) → 소외 섹터"
+
+# flow_score >= 4 일 때만 적용 (drift label 1개 + gamma 1개)
+FLOW_DRIFT_RULES = {
+    "DISINFLATION_RISK_ON": (
+        [
+            ("Technology", 1.5, "Flow Overlay → DISINFLATION_RISK_ON 수혜"),
+            ("Consumer Discretionary", 1.0, "Flow Overlay → 소비/성장 베타 우호"),
+            ("Communication Services", 0.5, "Flow Overlay → 성장/플랫폼 수혜"),
+        ],
+        "DISINFLATION_RISK_ON → XLK/XLY/XLC 가점",
+    ),
+    "OIL_SHOCK": (
+        [
+            ("Energy", 1.5, "Flow Overlay → OIL_SHOCK 수혜"),
+            ("Materials", 1.0, "Flow Overlay → 원자재/실물 우호"),
+            ("Consumer Discretionary", -1.0, "Flow Overlay → 유가 쇼크 시 소비 부담"),
+        ],
+        "OIL_SHOCK → XLE/XLB 가점, XLY 감점",
+    ),
+    "NEUTRAL": (
+        [
+            ("Technology", 0.5, "Flow Overlay → 초기 흐름에서 성장주 선행 반응"),
+            ("Industrials", 0.5, "Flow Overlay → 경기민감 확인용 가점"),
+        ],
+        "NEUTRAL + FLOW ACTIVE → XLK/XLI 소폭 가점",
+    ),
+}
+FLOW_GAMMA_RULES = {
+    "POSITIVE": (
+        [
+            ("Technology", 1.0, "Gamma Overlay → POSITIVE, 추세 지속 우호"),
+            ("Industrials", 0.5, "Gamma Overlay → 경기민감 추세 확인"),
+        ],
+        "Gamma POSITIVE → 리더 섹터 가점",
+    ),
+    "TRANSITION": (
+        [
+            ("Technology", 0.5, "Gamma Overlay → TRANSITION, 초기 리더 형성"),
+        ],
+        "Gamma TRANSITION → 초기 리더 소폭 가점",
+    ),
+}
+
+# regime controller -> (aligned theory w, aligned flow w, trap penalty mult)
+CONTROLLER_WEIGHTS = {
+    "FLOW_MARKET": (0.45, 0.55, 0.8),
+    "THEORY_MARKET": (0.75, 0.25, 1.2),
+    "DISLOCATION": (0.50, 0.50, 1.35),
+    "BALANCED": (0.65, 0.35, 1.0),
+}
+
+# classification -> divergence flag
+CLASS_DIV_FLAGS = {
+    "HIGH_CONVICTION_ALIGNED": "ALIGNED",
+    "FLOW_WEAK": "NEGATIVE_DIVERGENCE",
+    "THEORY_TRAP": "NEGATIVE_DIVERGENCE",
+    "POSITIVE_DIVERGENCE": "POSITIVE_DIVERGENCE",
+    "TACTICAL_MOMENTUM_ONLY": "POSITIVE_DIVERGENCE",
+    "AVOID": "ALIGNED",
+    "NEUTRAL": "ALIGNED",
+    "ALIGNED": "ALIGNED",
+}
+
+# correlation break type -> [(sector, delta)] (score * 0.90 이후 적용, 없는 type은 DEFAULT)
+CORR_BREAK_ADJUSTMENTS = {
+    "MACRO_TIGHTENING_TECH_RALLY": [
+        ("Technology", 0.5), ("Communication Services", 0.3),
+        ("Financials", -0.5), ("Industrials", -0.5), ("Consumer Discretionary", -0.5), ("Real Estate", -0.5),
+    ],
+    "XLF_BETRAYAL": [("Financials", -0.8)],
+    "ENERGY_BETRAYAL": [("Energy", -0.8), ("Materials", -0.3)],
+    "GROWTH_FAILED_ON_RATE_RELIEF": [
+        ("Technology", -0.5), ("Communication Services", -0.3),
+        ("Consumer Staples", 0.3), ("Health Care", 0.3), ("Utilities", 0.3),
+    ],
+    "FINANCIALS_WEAK_ON_RATE_RELIEF": [("Financials", -0.5)],
+    "FINANCIALS_RESILIENCE_UNDER_VOL": [
+        ("Financials", 0.3), ("Technology", -0.3), ("Consumer Discretionary", -0.3),
+    ],
+    "DEFAULT": [("Real Estate", -0.2), ("Consumer Discretionary", -0.2), ("Financials", -0.2)],
+}
+
+# conflict resolver 기록 (rule -> sector, bucket, why)
+RESOLVER_NOTES = {
+    "TECH_ZERO": ("Technology", "VOL", "Conflict Resolver → VIX 고점 + 유동성 긴축으로 성장주 긍정점수 제거"),
+    "RE_PENALTY": ("Real Estate", "VOL", "Conflict Resolver → VIX 고점 + 유동성 긴축으로 RE 추가 감점"),
+    "FIN_CAP": ("Financials", "VOL", "Financials Cap → VIX 고점 + 유동성 긴축으로 금융주 상단 제한"),
+    "FIN_CREDIT": ("Financials", "CREDIT", "Conflict Resolver → 커브 우호보다 크레딧 리스크 우선"),
+    "IND_EVENT": ("Industrials", "PHASE", "Conflict Resolver → 이벤트 관망으로 경기민감 가점 일부 축소"),
+    "ENE_EVENT": ("Energy", "PHASE", "Conflict Resolver → 이벤트 관망으로 리플레이션 베팅 일부 축소"),
+}
+
+# -------------------------
+# Weight rule tables
+# -------------------------
+SECTOR_STYLE = {
+    "Technology": "HIGH_BETA",
+    "Communication Services": "HIGH_BETA",
+    "Real Estate": "HIGH_BETA",
+
+    "Consumer Discretionary": "CYCLICAL",
+    "Industrials": "CYCLICAL",
+    "Materials": "CYCLICAL",
+    "Energy": "CYCLICAL",
+    "Financials": "CYCLICAL",
+
+    "Consumer Staples": "DEFENSIVE",
+    "Health Care": "DEFENSIVE",
+    "Utilities": "DEFENSIVE",
+}
+STYLE_CAP_KEYS = {"HIGH_BETA": "high_beta_cap", "CYCLICAL": "cyclical_cap", "SMALL_CAP": "small_cap_cap"}
+
+CLASS_MULTIPLIERS = {
+    "HIGH_CONVICTION_ALIGNED": 1.15,
+    "THEORY_TRAP": 0.40,
+    "POSITIVE_DIVERGENCE": 1.10,
+    "AVOID": 0.0,
+}
+FLOW_WEAK_PENALTY = 0.60
+DIV_MULTIPLIERS = {"NEGATIVE_DIVERGENCE": 0.60, "POSITIVE_DIVERGENCE": 1.15}
+
+REGIME_CAPS = {
+    "SOFT_RISK_OFF_DISINFLATION": {
+        "Technology": 28.0,
+        "Health Care": 18.0,
+        "Consumer Staples": 15.0,
+        "Consumer Discretionary": 10.0,
+        "Industrials": 10.0,
+    },
+    "SOFT_RISK_ON_DISINFLATION": {
+        "Technology": 32.0,
+        "Consumer Discretionary": 16.0,
+        "Health Care": 16.0,
+        "Industrials": 14.0,
+    },
+    "DISINFLATION_RISK_ON": {
+        "Technology": 35.0,
+        "Consumer Discretionary": 20.0,
+        "Communication Services": 18.0,
+        "Industrials": 15.0,
+    },
+    "EARLY_RISK_ON": {
+        "Technology": 30.0,
+        "Industrials": 18.0,
+        "Consumer Discretionary": 16.0,
+        "Financials": 14.0,
+    },
+    "REFLATION_RISK_ON": {
+        "Industrials": 24.0,
+        "Financials": 22.0,
+        "Energy": 20.0,
+        "Materials": 18.0,
+    },
+    "STAGFLATION_STRESS": {
+        "Energy": 24.0,
+        "Materials": 18.0,
+        "Consumer Staples": 18.0,
+        "Health Care": 16.0,
+        "Technology": 12.0,
+    },
+    "DOLLAR_LIQUIDITY_STRESS": {
+        "Consumer Staples": 20.0,
+        "Health Care": 18.0,
+        "Utilities": 16.0,
+        "Technology": 12.0,
+        "Financials": 8.0,
+        "Real Estate": 6.0,
+    },
+    "GROWTH_SCARE": {
+        "Health Care": 22.0,
+        "Consumer Staples": 20.0,
+        "Utilities": 18.0,
+        "Technology": 14.0,
+        "Industrials": 8.0,
+        "Consumer Discretionary": 8.0,
+    },
+    "EVENT_TRANSITION": {
+        "Health Care": 18.0,
+        "Consumer Staples": 18.0,
+        "Technology": 18.0,
+        "Industrials": 10.0,
+        "Consumer Discretionary": 10.0,
+    },
+}
+# 6.1) GROWTH_SCARE + BROAD leadership -> cap 완화 (floor)
+GROWTH_SCARE_BROAD_CAPS = {"Technology": 18.0, "Industrials": 12.0, "Consumer Discretionary": 12.0}
+
+HARD_CASH_MODES = {
+    "COMPRESSED_SQUEEZE",
+    "VOL_STRUCTURE_DEFENSE",
+    "FAILED_BREADTH_MODE",
+    "CAP_RESTRICTED",
+    "DEFENSIVE_SELECTIVE",
+}
+
+MAX_CUT_RATIO = 0.5
+RANK_CONFIRM_DAYS = 3
+HOLD_THRESHOLD = 2.0
+REBALANCE_THRESHOLD = 5.0
+DEFAULT_PREV_EXPOSURE = 50.0   # load_previous_exposure 기본값
+
+QUALITY_DEFAULTS = {
+    "leadership_state": "NARROW",
+    "breadth_score": 0,
+    "leader_type": "NONE",
+    "participation_signal": "WEAK",
+    "positioning_state": "ELEVATED",
+    "positioning_score": -1,
+    "squeeze_risk": "MEDIUM",
+    "gamma_signal": "STABLE",
+    "vol_structure": "COMPRESSION",
+}
+QUALITY_SOURCE_KEYS = {
+    "leadership_state": "LEADERSHIP_STATE",
+    "breadth_score": "BREADTH_SCORE_18",
+    "leader_type": "LEADER_TYPE",
+    "participation_signal": "PARTICIPATION_SIGNAL",
+    "positioning_state": "POSITIONING_STATE",
+    "positioning_score": "POSITIONING_SCORE_18",
+    "squeeze_risk": "SQUEEZE_RISK",
+    "gamma_signal": "GAMMA_SIGNAL",
+    "vol_structure": "VOL_STRUCTURE",
+}
+
+MOM_COLUMNS = [f"MOM_{etf}" for etf in SECTOR_ETF.values()]
+INPUT_COLUMNS = (
+    [
+        "VIX", "VIX_SCORE", "T10Y2Y", "US10Y_PCT", "DXY_PCT", "WTI_PCT",
+        "PHASE", "LIQ_DIR", "LIQ_LVL", "CREDIT_CALM",
+        "FLOW_SCORE", "DRIFT_LABEL", "GAMMA_STATE",
+        "CORR_BREAK", "CORR_BREAK_TYPE", "EXPOSURE",
+    ]
+    + MOM_COLUMNS
+    + list(QUALITY_SOURCE_KEYS.values())
+)
+HISTORY_COLUMNS = (
+    ["date", "MACRO_PROFILE", "REGIME_CONTROLLER", "AVG_DIVERGENCE", "DIVERGENCE_DISPERSION",
+     "PARTICIPATION_MODE", "VIX", "EXPOSURE", "PREV_EXPOSURE", "DELEVERAGING", "RANK_ACTION", "RAW_RANK", "ACCEPTED_RANK"]
+    + [f"SCORE_{etf}" for etf in SECTOR_ETF.values()]
+    + [f"TARGET_{etf}" for etf in SECTOR_ETF.values()]
+    + [f"WEIGHT_{etf}" for etf in SECTOR_ETF.values()]
+    + ["ALLOCATED_EQUITY", "CASH"]
+)
+
+
+# -------------------------
+# Helpers
+# -------------------------
+_round_cell = np.vectorize(lambda x, nd: round(float(x), nd), otypes=[float])
+
+
+def _pyround(a: np.ndarray, nd: int) -> np.ndarray:
+    """Python round() 그대로 (np.round와 .5 경계 처리가 다름)."""
+    a = np.asarray(a, dtype="float64")
+    if a.size == 0:
+        return a.copy()
+    return _round_cell(a, nd)
+
+
+def _ordered_sum(values: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """dict 삽입 순서(order) 그대로 누적합 -> Python sum()과 같은 float 결과."""
+    acc = np.zeros(values.shape[0], dtype="float64")
+    for k in range(values.shape[1]):
+        acc = acc + np.take_along_axis(values, order[:, k:k + 1], axis=1)[:, 0]
+    return acc
+
+
+def _fill_rules(out: np.ndarray, mask: np.ndarray, rules: List[Tuple[str, float, str]]) -> None:
+    for sector, pts, _why in rules:
+        out[mask, SECTOR_INDEX[sector]] = pts
+
+
+def _tristate(val: Any) -> Any:
+    """credit_calm: True / False / None (CSV 왕복 포함)."""
+    if val is True or val is False:
+        return val
+    if isinstance(val, (bool, np.bool_)):
+        return bool(val)
+    text = str(val).strip().upper()
+    if text in ("TRUE", "1", "1.0"):
+        return True
+    if text in ("FALSE", "0", "0.0"):
+        return False
+    return None
+
+
+def _num(panel: pd.DataFrame, col: str, default: float = np.nan) -> np.ndarray:
+    if col not in panel.columns:
+        return np.full(len(panel), default, dtype="float64")
+    out = pd.to_numeric(panel[col], errors="coerce").astype("float64").to_numpy()
+    if not np.isnan(default):
+        out = np.where(np.isnan(out), default, out)
+    return out
+
+
+def _text(panel: pd.DataFrame, col: str, default: str) -> np.ndarray:
+    if col not in panel.columns:
+        return np.full(len(panel), default, dtype=object)
+    return panel[col].where(panel[col].notna(), default).astype(str).to_numpy(dtype=object)
+
+
+def _contains(arr: np.ndarray, token: str) -> np.ndarray:
+    return np.array([token in str(x) for x in arr], dtype=bool)
+
+
+# -------------------------
+# Input extraction (live)
+# -------------------------
+def allocation_inputs_from_market_data(
+    market_data: Dict[str, Any],
+    vix_score: int,
+    corr_break: bool,
+    corr_break_type: str,
+) -> Dict[str, Any]:
+    """sector_allocation_filter가 읽는 입력을 input row 하나로 정리 (kernel / history 공용)."""
+    state = market_data.get("FINAL_STATE", {}) or {}
+
+    def fetch_val(key: str, default):
+        val = state.get(key.upper())
+        if val is None:
+            val = state.get(key.lower())
+        if val is None:
+            node = market_data.get(key.upper(), {})
+            if isinstance(node, dict):
+                val = node.get("today")
+        try:
+            return float(val) if val is not None else default
+        except Exception:
+            return default
+
+    def fetch_state_str(key: str, default: str) -> str:
+        val = state.get(key)
+        if val is None:
+            val = state.get(key.upper())
+        if val is None:
+            val = state.get(key.lower())
+        return str(val if val is not None else default).upper()
+
+    def pct(key: str) -> float:
+        node = market_data.get(key, {}) or {}
+        return float(node.get("pct_change", 0) or 0)
+
+    inst_flow = market_data.get("INSTITUTIONAL_FLOW", {}) or {}
+    try:
+        flow_score = int(inst_flow.get("score", 0))
+    except Exception:
+        flow_score = 0
+
+    t10y2y = fetch_val("T10Y2Y", None)
+
+    row: Dict[str, Any] = {
+        "VIX": fetch_val("VIX", 20.0),
+        "VIX_SCORE": vix_score,
+        "T10Y2Y": np.nan if t10y2y is None else float(t10y2y),
+        "US10Y_PCT": pct("US10Y"),
+        "DXY_PCT": pct("DXY"),
+        "WTI_PCT": pct("WTI"),
+        "PHASE": fetch_state_str("phase", "N/A"),
+        "LIQ_DIR": fetch_state_str("liquidity_dir", "N/A"),
+        "LIQ_LVL": fetch_state_str("liquidity_level_bucket", "N/A"),
+        "CREDIT_CALM": state.get("credit_calm", None),
+        "FLOW_SCORE": flow_score,
+        "DRIFT_LABEL": str(
+            inst_flow.get("drift_label")
+            or state.get("drift_label")
+            or market_data.get("DRIFT_LABEL")
+            or "N/A"
+        ).upper(),
+        "GAMMA_STATE": str(
+            inst_flow.get("gamma_state")
+            or market_data.get("GAMMA_STATE")
+            or "N/A"
+        ).upper(),
+        "CORR_BREAK": bool(corr_break),
+        "CORR_BREAK_TYPE": str(corr_break_type or "NONE"),
+        "EXPOSURE": float(market_data.get("RECOMMENDED_EXPOSURE", 50.0)),
+    }
+
+    momentum = market_data.get("MOMENTUM_SCORES", {}) or {}
+    for etf, col in zip(SECTOR_ETF.values(), MOM_COLUMNS):
+        row[col] = momentum.get(etf, 0)
+
+    for key, src in QUALITY_SOURCE_KEYS.items():
+        row[src] = market_data.get(src, QUALITY_DEFAULTS[key])
+
+    return row
+
+
+def quality_context_from_row(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """input row -> build_tactical_allocation의 market_quality_context."""
+    ctx = {}
+    for key, src in QUALITY_SOURCE_KEYS.items():
+        val = row.get(src, QUALITY_DEFAULTS[key])
+        if val is None or (isinstance(val, float) and np.isnan(val)):
+            val = QUALITY_DEFAULTS[key]
+        ctx[key] = val
+    return ctx
+
+
+# -------------------------
+# Score kernel
+# -------------------------
+def curve_segments(t10y2y: np.ndarray) -> np.ndarray:
+    missing = np.isnan(t10y2y)
+    t = np.where(missing, 0.0, t10y2y)
+    return np.select(
+        [missing, t < 0, t < 0.25, t < 0.75],
+        ["N/A", "INVERTED", "FLAT / FRAGILE", "MODERATE STEEP"],
+        default="STEEP / REFLATION",
+    ).astype(object)
+
+
+def macro_profile_kernel(
+    phase: np.ndarray,
+    us10y_pct: np.ndarray,
+    dxy_pct: np.ndarray,
+    wti_pct: np.ndarray,
+    vix: np.ndarray,
+    credit_calm: np.ndarray,
+    liq_easy: np.ndarray,
+    liq_tight: np.ndarray,
+    flow_score: np.ndarray,
+) -> np.ndarray:
+    """
+    Macro Regime Profile Inference Layer (vectorized)
+    - FINAL_STATE phase를 덮어쓰지 않음, PHASE 점수 보조용
+    - 조건은 위에서부터 첫 매칭
+    """
+    norm = np.array(
+        [str(p).upper().replace("–", "-").replace("—", "-").replace("−", "-") for p in phase],
+        dtype=object,
+    )
+    risk_on = _contains(norm, "RISK-ON")
+    risk_off = _contains(norm, "RISK-OFF")
+    event = _contains(norm, "EVENT-WATCHING") | _contains(norm, "WAITING")
+    calm_true = np.array([c is True for c in credit_calm], dtype=bool)
+    calm_false = np.array([c is False for c in credit_calm], dtype=bool)
+
+    conditions = [
+        (dxy_pct > 0) & liq_tight & calm_false,
+        (us10y_pct > 0) & (wti_pct > 0) & (dxy_pct > 0) & (vix >= 18),
+        (us10y_pct < 0) & (wti_pct < 0) & (vix >= 18),
+        risk_off & calm_true & (vix < 20),
+        risk_on & (dxy_pct <= 0) & (vix < 24),
+        risk_on & (us10y_pct <= 0) & (wti_pct <= 0) & (vix < 20) & liq_easy & calm_true,
+        risk_on & (flow_score >= 4) & (vix < 24),
+        risk_on & (us10y_pct > 0) & (wti_pct > 0),
+        event,
+        risk_on,
+        risk_off,
+    ]
+    choices = [
+        "DOLLAR_LIQUIDITY_STRESS",
+        "STAGFLATION_STRESS",
+        "GROWTH_SCARE",
+        "SOFT_RISK_OFF_DISINFLATION",
+        "DISINFLATION_RISK_ON",
+        "SOFT_RISK_ON_DISINFLATION",
+        "EARLY_RISK_ON",
+        "REFLATION_RISK_ON",
+        "EVENT_TRANSITION",
+        "EARLY_RISK_ON",
+        "SOFT_RISK_OFF_DISINFLATION",
+    ]
+    return np.select(conditions, choices, default="BALANCED").astype(object)
+
+
+def sector_score_kernel(panel: pd.DataFrame) -> Dict[str, Any]:
+    """
+    panel: row = 날짜, 컬럼 = INPUT_COLUMNS
+    Return: dict
+      buckets      : {bucket: (D, S) pts}  (FLOW는 FLOW_DRIFT / FLOW_GAMMA 분리)
+      theory / flow / divergence / final : (D, S)
+      classification / div_flags         : (D, S) object
+      resolver     : {rule: (D,) bool}, fin_cap_from: (D,) Financials cap 직전 점수
+      macro_profile / regime_controller / avg_divergence / dispersion / ... : (D,)
+    """
+    n = len(panel)
+    vix = _num(panel, "VIX", 20.0)
+    vix_score = _num(panel, "VIX_SCORE", 0.0)
+    t10y2y = _num(panel, "T10Y2Y")
+    us10y_pct = _num(panel, "US10Y_PCT", 0.0)
+    dxy_pct = _num(panel, "DXY_PCT", 0.0)
+    wti_pct = _num(panel, "WTI_PCT", 0.0)
+    phase = _text(panel, "PHASE", "N/A")
+    liq_dir = _text(panel, "LIQ_DIR", "N/A")
+    liq_lvl = _text(panel, "LIQ_LVL", "N/A")
+    credit_calm = np.array(
+        [_tristate(v) for v in (panel["CREDIT_CALM"] if "CREDIT_CALM" in panel.columns else [None] * n)],
+        dtype=object,
+    )
+    calm_false = np.array([c is False for c in credit_calm], dtype=bool)
+    flow_score = _num(panel, "FLOW_SCORE", 0.0)
+    drift_label = _text(panel, "DRIFT_LABEL", "N/A")
+    gamma_state = _text(panel, "GAMMA_STATE", "N/A")
+    corr_break = np.array([_tristate(v) is True for v in (panel["CORR_BREAK"] if "CORR_BREAK" in panel.columns else [None] * n)], dtype=bool)
+    corr_type = _text(panel, "CORR_BREAK_TYPE", "NONE")
+    mom = np.column_stack([_num(panel, col, 0.0) for col in MOM_COLUMNS]) if n else np.zeros((0, N_SECTORS))
+
+    shape = (n, N_SECTORS)
+    buckets = {b: np.zeros(shape) for b in ["VOL", "LIQ", "CURVE", "CREDIT", "PHASE", "MOM", "FLOW_DRIFT", "FLOW_GAMMA"]}
+
+    # A) VOLATILITY
+    _fill_rules(buckets["VOL"], vix_score >= 3, VOL_RULES[3])
+    _fill_rules(buckets["VOL"], vix_score == 2, VOL_RULES[2])
+    _fill_rules(buckets["VOL"], vix_score == -2, VOL_RULES[-2])
+
+    # B) LIQUIDITY
+    liq_tight = (liq_dir == "DOWN") | (liq_lvl == "LOW")
+    liq_easy = (liq_dir == "UP") & ((liq_lvl == "MID") | (liq_lvl == "HIGH"))
+    _fill_rules(buckets["LIQ"], liq_tight, LIQ_RULES["TIGHT"])
+    _fill_rules(buckets["LIQ"], ~liq_tight & liq_easy, LIQ_RULES["EASY"])
+
+    # C) CURVE (T10Y2Y 결측이면 skip)
+    segment = curve_segments(t10y2y)
+    for seg, rules in CURVE_RULES.items():
+        _fill_rules(buckets["CURVE"], segment == seg, rules)
+
+    # D) CREDIT
+    _fill_rules(buckets["CREDIT"], calm_false, CREDIT_RULES)
+
+    # E) PHASE + Macro Regime Profile
+    profile = macro_profile_kernel(
+        phase, us10y_pct, dxy_pct, wti_pct, vix, credit_calm, liq_easy, liq_tight, flow_score
+    )
+    for name, rules in PROFILE_RULES.items():
+        _fill_rules(buckets["PHASE"], profile == name, rules)
+
+    # F) MOMENTUM (0 / NaN은 driver 없음)
+    buckets["MOM"] = np.where(np.isnan(mom), 0.0, mom)
+
+    # G) FLOW / GAMMA / DRIFT overlay (ADD ONLY)
+    flow_active = flow_score >= 4
+    for label, (rules, _note) in FLOW_DRIFT_RULES.items():
+        _fill_rules(buckets["FLOW_DRIFT"], flow_active & (drift_label == label), rules)
+    gamma_positive = _contains(gamma_state, "POSITIVE")
+    gamma_transition = _contains(gamma_state, "TRANSITION")
+    _fill_rules(buckets["FLOW_GAMMA"], flow_active & gamma_positive, FLOW_GAMMA_RULES["POSITIVE"][0])
+    _fill_rules(buckets["FLOW_GAMMA"], flow_active & ~gamma_positive & gamma_transition, FLOW_GAMMA_RULES["TRANSITION"][0])
+
+    # 날짜별 적용 rule key (driver 문구 / flow note 재구성용)
+    vol_key = np.select([vix_score >= 3, vix_score == 2, vix_score == -2], [3, 2, -2], default=0)
+    drift_rule = np.where(
+        flow_active & np.isin(drift_label, list(FLOW_DRIFT_RULES)), drift_label, ""
+    ).astype(object)
+    gamma_rule = np.select(
+        [flow_active & gamma_positive, flow_active & gamma_transition], ["POSITIVE", "TRANSITION"], default=""
+    ).astype(object)
+
+    # H-1) Theory / Flow / Divergence (driver 추가 순서대로 누적)
+    theo_raw = 0.0 + buckets["VOL"] + buckets["LIQ"] + buckets["CURVE"] + buckets["CREDIT"] + buckets["PHASE"]
+    momentum_component = 0.0 + buckets["MOM"]
+    flow_component = 0.0 + buckets["FLOW_DRIFT"] + buckets["FLOW_GAMMA"]
+    market_flow = (
+        (0.35 * momentum_component)
+        + (0.30 * flow_component)
+        + (0.20 * momentum_component)
+        + (0.15 * momentum_component)
+    )
+    theory = _pyround(theo_raw, 2)
+    flow = _pyround(market_flow, 2)
+    divergence = _pyround(market_flow - theo_raw, 2)
+
+    # H-2) Regime Controller (날짜별 scalar, Python float 연산)
+    avg_divergence = np.zeros(n)
+    dispersion = np.zeros(n)
+    for i in range(n):
+        vals = [float(x) for x in divergence[i]]
+        avg = round(sum(vals) / len(vals), 2)
+        variance = sum((x - avg) ** 2 for x in vals) / len(vals)
+        avg_divergence[i] = avg
+        dispersion[i] = round(variance ** 0.5, 2)
+
+    controller = np.select(
+        [dispersion > 1.5, avg_divergence > 1.0, avg_divergence < -1.0],
+        ["DISLOCATION", "FLOW_MARKET", "THEORY_MARKET"],
+        default="BALANCED",
+    ).astype(object)
+
+    # H-3) Regime-aware Classification / Final Score
+    tw = np.array([CONTROLLER_WEIGHTS[c][0] for c in controller]).reshape(-1, 1)
+    fw = np.array([CONTROLLER_WEIGHTS[c][1] for c in controller]).reshape(-1, 1)
+    tp = np.array([CONTROLLER_WEIGHTS[c][2] for c in controller]).reshape(-1, 1)
+
+    class_names = [
+        "HIGH_CONVICTION_ALIGNED", "FLOW_WEAK", "THEORY_TRAP", "POSITIVE_DIVERGENCE",
+        "TACTICAL_MOMENTUM_ONLY", "AVOID", "NEUTRAL",
+    ]
+    class_conditions = [
+        (theory >= 2.0) & (flow >= 1.0),
+        (theory >= 2.0) & (flow >= -0.5) & (flow < 1.0),
+        (theory >= 1.0) & (flow < -0.5),
+        (theory < 1.0) & (flow >= 1.5),
+        (theory >= -0.5) & (theory < 1.0) & (flow >= 0.5) & (flow < 1.5),
+        (theory < 0) & (flow < 0),
+        (theory == 0) & (flow == 0),
+    ]
+    class_finals = [
+        (tw * theory) + (fw * flow) + 0.3,
+        ((tw + 0.10) * theory) + ((fw - 0.10) * flow) - 0.3,
+        (tw * theory) + (fw * flow) - (1.8 * tp),
+        ((tw - 0.20) * theory) + ((fw + 0.20) * flow) + 0.4,
+        ((tw - 0.10) * theory) + ((fw + 0.10) * flow),
+        (0.50 * theory) + (0.50 * flow) - (0.3 * tp),
+        np.zeros(shape),
+    ]
+    classification = np.select(class_conditions, class_names, default="ALIGNED").astype(object)
+    final = np.select(class_conditions, class_finals, default=(tw * theory) + (fw * flow))
+
+    final = np.where((controller == "DISLOCATION").reshape(-1, 1), final * 0.90, final)
+    final = np.where((classification == "THEORY_TRAP") & (final > -0.3), -0.3, final)
+    final = _pyround(final, 2)
+    div_flags = np.vectorize(CLASS_DIV_FLAGS.get, otypes=[object])(classification) if n else classification
+
+    # H-4) Correlation Break
+    score = final.copy()
+    if corr_break.any():
+        score[corr_break] = _pyround(score[corr_break] * 0.90, 2)
+        for btype in np.unique(corr_type[corr_break]):
+            rows = corr_break & (corr_type == btype)
+            for sector, delta in CORR_BREAK_ADJUSTMENTS.get(btype, CORR_BREAK_ADJUSTMENTS["DEFAULT"]):
+                j = SECTOR_INDEX[sector]
+                score[rows, j] = _pyround(score[rows, j] + delta, 2)
+
+    # I) Conflict Resolver (Financials cap 포함, 순서 유지)
+    tech, re_, fin = SECTOR_INDEX["Technology"], SECTOR_INDEX["Real Estate"], SECTOR_INDEX["Financials"]
+    ind, ene = SECTOR_INDEX["Industrials"], SECTOR_INDEX["Energy"]
+    stress = (vix >= 28) & liq_tight
+    event_phase = _contains(phase, "EVENT-WATCHING") | _contains(phase, "WAITING")
+
+    resolver: Dict[str, np.ndarray] = {}
+    resolver["TECH_ZERO"] = stress & (score[:, tech] > 0)
+    score[resolver["TECH_ZERO"], tech] = 0.0
+    resolver["RE_PENALTY"] = stress & (score[:, re_] > -1)
+    score[resolver["RE_PENALTY"], re_] += -1
+
+    fin_cap_from = score[:, fin].copy()
+    fin_cap_candidate = (score[:, fin] > 0) & (vix >= 30) & liq_tight
+    capped = np.where(fin_cap_candidate, np.minimum(score[:, fin], 1), score[:, fin])
+    resolver["FIN_CAP"] = fin_cap_candidate & (capped != score[:, fin])
+    score[:, fin] = capped
+
+    resolver["FIN_CREDIT"] = (score[:, fin] > 0) & calm_false
+    score[resolver["FIN_CREDIT"], fin] += -1
+    resolver["IND_EVENT"] = event_phase & (score[:, ind] > 0)
+    score[resolver["IND_EVENT"], ind] += -1
+    resolver["ENE_EVENT"] = event_phase & (score[:, ene] > 0)
+    score[resolver["ENE_EVENT"], ene] += -1
+
+    return {
+        "buckets": buckets,
+        "vol_key": vol_key,
+        "drift_rule": drift_rule,
+        "gamma_rule": gamma_rule,
+        "theory": theory,
+        "flow": flow,
+        "divergence": divergence,
+        "final": final,
+        "score": score,
+        "classification": classification,
+        "div_flags": div_flags,
+        "resolver": resolver,
+        "fin_cap_from": fin_cap_from,
+        "macro_profile": profile,
+        "curve_segment": segment,
+        "regime_controller": controller,
+        "avg_divergence": avg_divergence,
+        "dispersion": dispersion,
+        "liq_tight": liq_tight,
+        "liq_easy": liq_easy,
+        "credit_calm": credit_calm,
+        "flow_score": flow_score.astype(int),
+        "vix": vix,
+        "momentum": buckets["MOM"],
+    }
+
+
+def row_dict(arr: np.ndarray, i: int) -> Dict[str, Any]:
+    """(D, S) 배열의 i번째 날짜 -> {sector: value}."""
+    return {s: (float(arr[i, j]) if arr.dtype.kind == "f" else arr[i, j]) for j, s in enumerate(SECTORS)}
+
+
+def scores_from_kernel(scored: Mapping[str, Any], i: int) -> Dict[str, Any]:
+    """
+    i번째 날짜 최종 점수 dict.
+    resolver가 정수 상수로 덮어쓴 값(Tech 0, Financials cap 1)은 기존 dict 로직처럼 int 유지.
+    """
+    score = row_dict(scored["score"], i)
+    resolver = scored["resolver"]
+    if resolver["TECH_ZERO"][i]:
+        score["Technology"] = 0
+    if resolver["FIN_CAP"][i]:
+        score["Financials"] = 0 if resolver["FIN_CREDIT"][i] else 1
+    return score
+
+
+def sector_score_drivers(
+    scored: Mapping[str, Any],
+    i: int,
+    context: Mapping[str, Any],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    i번째 날짜의 sector별 driver 목록 (report rationale / breakdown 용).
+    context: vix_label / vix_detail / t10y2y / phase (why 문구 format)
+    """
+    drivers: Dict[str, List[Dict[str, Any]]] = {s: [] for s in SECTORS}
+
+    def add(sector: str, pts: Any, why: str, bucket: str) -> None:
+        drivers[sector].append({
+            "pts": pts,
+            "why": why.format(**context),
+            "bucket": bucket,
+            "priority": PRIORITY[bucket],
+        })
+
+    def add_rules(rules: List[Tuple[str, float, str]], bucket: str) -> None:
+        for sector, pts, why in rules:
+            add(sector, pts, why, bucket)
+
+    vol_key = int(scored["vol_key"][i])
+    if vol_key in VOL_RULES:
+        add_rules(VOL_RULES[vol_key], "VOL")
+
+    if scored["liq_tight"][i]:
+        add_rules(LIQ_RULES["TIGHT"], "LIQ")
+    elif scored["liq_easy"][i]:
+        add_rules(LIQ_RULES["EASY"], "LIQ")
+
+    add_rules(CURVE_RULES.get(scored["curve_segment"][i], []), "CURVE")
+
+    if scored["credit_calm"][i] is False:
+        add_rules(CREDIT_RULES, "CREDIT")
+
+    add_rules(PROFILE_RULES[scored["macro_profile"][i]], "PHASE")
+
+    for sector, ticker in SECTOR_ETF.items():
+        m_score = context.get("momentum", {}).get(ticker, 0)
+        if m_score > 0:
+            add(sector, m_score, MOM_WHY_UP, "MOM")
+        elif m_score < 0:
+            add(sector, m_score, MOM_WHY_DOWN, "MOM")
+
+    for table, key in ((FLOW_DRIFT_RULES, scored["drift_rule"][i]), (FLOW_GAMMA_RULES, scored["gamma_rule"][i])):
+        if key:
+            add_rules(table[key][0], "FLOW")
+
+    resolver = scored["resolver"]
+    for rule, (sector, bucket, why) in RESOLVER_NOTES.items():
+        if not resolver[rule][i]:
+            continue
+        if rule == "TECH_ZERO":
+            pts = 0
+        elif rule == "FIN_CAP":
+            pts = 1 - float(scored["fin_cap_from"][i])
+        else:
+            pts = -1
+        add(sector, pts, why, bucket)
+
+    return drivers
+
+
+def sector_flow_notes(scored: Mapping[str, Any], i: int) -> List[str]:
+    notes: List[str] = []
+    for table, key in ((FLOW_DRIFT_RULES, scored["drift_rule"][i]), (FLOW_GAMMA_RULES, scored["gamma_rule"][i])):
+        if key:
+            notes.append(table[key][1])
+    return notes
+
+
+# -------------------------
+# Weight kernel
+# -------------------------
+def determine_cash_return_policy(
+    market_quality_context: Mapping[str, Any],
+    participation_mode: str,
+) -> bool:
+    """
+    Decide whether capped residual equity budget should be returned to cash.
+    """
+    if participation_mode in HARD_CASH_MODES:
+        return True
+
+    if market_quality_context.get("participation_signal", "WEAK") == "FAILED":
+        return True
+
+    if market_quality_context.get("positioning_state", "NORMAL") in ["STRESSED", "SQUEEZE_RISK"]:
+        return True
+
+    if market_quality_context.get("vol_structure", "NORMAL") in ["INVERTED_SHORT_TERM", "DISLOCATION"]:
+        return True
+
+    return False
+
+
+def participation_meta(quality: List[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """날짜별 participation quality / mode / cash return 여부 (scalar 규칙)."""
+    metas = []
+    for ctx in quality:
+        meta = dict(classify_participation_quality(ctx)) if ctx else {
+            "participation_quality": "NEUTRAL_PARTICIPATION",
+            "participation_quality_score": 0,
+            "participation_mode": "BALANCED",
+        }
+        mode = meta["participation_mode"]
+        meta["policy"] = mode_policy.get(mode, mode_policy["BALANCED"])
+        meta["cash_return_required"] = determine_cash_return_policy(ctx, mode)
+        metas.append(meta)
+    return metas
+
+
+def _allocation_order(score: np.ndarray, rescue: np.ndarray) -> np.ndarray:
+    """ow 정렬 (-score, sector명) + Tech rescue는 양수 섹터 뒤 -> dict 삽입 순서."""
+    name_rank = np.argsort(np.argsort(np.array(SECTORS, dtype=object)))
+    tier = np.where(score > 0, 0, 2)
+    tier[rescue, SECTOR_INDEX["Technology"]] = 1
+    neg = np.where(score > 0, -score, 0.0)
+    names = np.broadcast_to(name_rank, score.shape)
+    return np.lexsort((names, neg, tier), axis=1) if score.size else np.zeros(score.shape, dtype=int)
+
+
+def tactical_weight_kernel(
+    score: np.ndarray,
+    classification: np.ndarray,
+    div_flags: np.ndarray,
+    momentum: np.ndarray,
+    total_exposure: np.ndarray,
+    prev_exposure: np.ndarray,
+    deleveraging: np.ndarray,
+    macro_profile: np.ndarray,
+    quality: List[Mapping[str, Any]],
+) -> Dict[str, Any]:
+    """
+    18.5) Tactical Asset Allocation (v4.1) - (D, S) 배열 버전
+    momentum: deleveraging priority용 (ow 섹터만, 나머지 0)
+    Return: weights (D, S, 비보유 NaN) / order / adjusted / cap 기록 / cash 등
+    """
+    n = score.shape[0]
+    total_exposure = np.asarray(total_exposure, dtype="float64")
+    prev_exposure = np.asarray(prev_exposure, dtype="float64")
+    deleveraging = np.asarray(deleveraging, dtype=bool)
+    metas = participation_meta(quality)
+    tech = SECTOR_INDEX["Technology"]
+
+    # 1) Positive score universe (+ Tech rescue)
+    positive = score > 0
+    leadership = np.array([q.get("leadership_state") for q in quality], dtype=object)
+    signal = np.array([q.get("participation_signal") for q in quality], dtype=object)
+    rescue = (
+        ~positive[:, tech]
+        & (score[:, tech] > -1.0)
+        & np.isin(leadership, ["BROAD", "MODERATE"])
+        & np.isin(signal, ["PARTIAL", "CONFIRMED"])
+    )
+    raw = np.where(positive, score, 0.0)
+    raw[rescue, tech] = 0.3
+    universe = positive.copy()
+    universe[rescue, tech] = True
+    order = _allocation_order(score, rescue)
+
+    # 2) Classification adjustment
+    flow_weak_penalty = np.array([bool(m["policy"].get("flow_weak_penalty", False)) for m in metas]).reshape(-1, 1)
+    class_mult = np.ones(score.shape)
+    for name, mult in CLASS_MULTIPLIERS.items():
+        class_mult = np.where(classification == name, mult, class_mult)
+    class_mult = np.where((classification == "FLOW_WEAK") & flow_weak_penalty, FLOW_WEAK_PENALTY, class_mult)
+    div_mult = np.ones(score.shape)
+    for name, mult in DIV_MULTIPLIERS.items():
+        div_mult = np.where(div_flags == name, mult, div_mult)
+    multiplier = (1.0 * class_mult) * div_mult
+    adjusted = np.where(universe, raw * multiplier, 0.0)
+    member = universe & (adjusted > 0)
+    adjusted = np.where(member, adjusted, 0.0)
+
+    total_score_sum = _ordered_sum(adjusted, order)
+    active = total_score_sum > 0
+
+    # 3~4) Base exposure / initial weights
+    base_exposure = np.where(deleveraging, prev_exposure, total_exposure)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weights = np.where(member, (adjusted / total_score_sum.reshape(-1, 1)) * base_exposure.reshape(-1, 1), 0.0)
+
+    # 5) Deleveraging (priority 순으로 섹터당 최대 50% 컷)
+    if deleveraging.any():
+        w_count = member.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_weight = np.where(w_count > 0, _ordered_sum(weights, order) / np.maximum(w_count, 1), 0.0)
+        div_score = np.select(
+            [div_flags == "NEGATIVE_DIVERGENCE", div_flags == "POSITIVE_DIVERGENCE"], [4.0, -2.0], default=0.0
+        )
+        class_score = np.select(
+            [classification == "THEORY_TRAP", classification == "AVOID",
+             classification == "POSITIVE_DIVERGENCE", classification == "HIGH_CONVICTION_ALIGNED"],
+            [4.0, 5.0, -1.5, -4.0],
+            default=0.0,
+        )
+        mom_score = np.where(momentum < 0, np.abs(momentum) * 1.5, np.where(momentum > 0, -momentum * 1.0, 0.0))
+        score_penalty = np.where(score <= 0, np.abs(score) * 1.5, np.where(score >= 2, -2.0, -score * 0.5))
+        overweight = weights - avg_weight.reshape(-1, 1)
+        ow_score = np.where(overweight > 0, overweight * 0.15, 0.0)
+        priority = _pyround(div_score + class_score + mom_score + score_penalty + ow_score, 2)
+
+        # 같은 priority는 dict 순서 유지 (stable), 비보유 섹터는 맨 뒤
+        ordered_prio = np.take_along_axis(np.where(member, -priority, np.inf), order, axis=1)
+        cut_order = np.take_along_axis(order, np.argsort(ordered_prio, axis=1, kind="stable"), axis=1)
+
+        reduction = np.where(deleveraging, np.maximum(0.0, prev_exposure - total_exposure), 0.0)
+        for k in range(N_SECTORS):
+            j = cut_order[:, k]
+            current = weights[np.arange(n), j]
+            live = deleveraging & (reduction > 0) & member[np.arange(n), j] & (current > 0)
+            cut = np.minimum(current * MAX_CUT_RATIO, reduction)
+            weights[np.arange(n)[live], j[live]] = current[live] - cut[live]
+            reduction = np.where(live, reduction - cut, reduction)
+
+    # 6) Regime caps (+ GROWTH_SCARE broad leadership 완화)
+    caps = np.full(score.shape, np.inf)
+    for profile, table in REGIME_CAPS.items():
+        rows = macro_profile == profile
+        for sector, cap in table.items():
+            caps[rows, SECTOR_INDEX[sector]] = cap
+    relax = (macro_profile == "GROWTH_SCARE") & (leadership == "BROAD") & np.isin(signal, ["PARTIAL", "CONFIRMED"])
+    for sector, floor in GROWTH_SCARE_BROAD_CAPS.items():
+        j = SECTOR_INDEX[sector]
+        caps[relax, j] = np.maximum(caps[relax, j], floor)
+
+    regime_hit = member & (weights > caps)
+    regime_cap_from = np.where(regime_hit, weights, np.nan)
+    weights = np.where(regime_hit, caps, weights)
+
+    # 6.5) Participation quality caps (style별)
+    part_caps = np.full(score.shape, np.inf)
+    for sector, style in SECTOR_STYLE.items():
+        key = STYLE_CAP_KEYS.get(style)
+        if key is None:
+            continue
+        part_caps[:, SECTOR_INDEX[sector]] = [m["policy"].get(key, 1.0) * 100.0 for m in metas]
+    part_hit = member & (weights > part_caps)
+    part_cap_from = np.where(part_hit, weights, np.nan)
+    weights = np.where(part_hit, part_caps, weights)
+
+    # 6.6) Residual reallocation
+    cash_return = np.array([m["cash_return_required"] for m in metas], dtype=bool)
+    vol_structure = np.array([q.get("vol_structure") for q in quality], dtype=object)
+    positioning = np.array([q.get("positioning_state") for q in quality], dtype=object)
+    residual = np.maximum(0.0, total_exposure - _ordered_sum(weights, order))
+    can_redistribute = (
+        (residual > 0)
+        & ~cash_return
+        & (leadership == "BROAD")
+        & (signal == "CONFIRMED")
+        & (vol_structure == "NORMAL")
+        & ~np.isin(positioning, ["STRESSED", "SQUEEZE_RISK"])
+    )
+    allow_cyclical = np.array([bool(m["policy"].get("allow_cyclical_expansion", False)) for m in metas]).reshape(-1, 1)
+    cyclical = np.array([SECTOR_STYLE.get(s, "CORE") == "CYCLICAL" for s in SECTORS])
+    eligible = (
+        member
+        & ~np.isin(classification, ["THEORY_TRAP", "AVOID"])
+        & (div_flags != "NEGATIVE_DIVERGENCE")
+        & ~(cyclical & ~allow_cyclical)
+        & ~regime_hit
+        & ~part_hit
+        & can_redistribute.reshape(-1, 1)
+    )
+    eligible_sum = _ordered_sum(np.where(eligible, adjusted, 0.0), order)
+    reallocate = can_redistribute & (eligible_sum > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        add = (adjusted / eligible_sum.reshape(-1, 1)) * residual.reshape(-1, 1)
+    weights = np.where(eligible & reallocate.reshape(-1, 1), weights + add, weights)
+
+    realloc_action = np.where(
+        can_redistribute,
+        np.where(reallocate, "REALLOCATED_TO_ELIGIBLE_SECTORS", "REALLOCATION_SKIPPED_NO_ELIGIBLE_SECTOR"),
+        np.where(cash_return, "RETURN_TO_CASH", "REALLOCATION_CONDITIONS_NOT_MET"),
+    ).astype(object)
+
+    # 7) Exposure compression
+    current_sum = _ordered_sum(weights, order)
+    compress = (current_sum > total_exposure) & (current_sum > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(compress, total_exposure / current_sum, 1.0)
+    weights = np.where(compress.reshape(-1, 1), weights * scale.reshape(-1, 1), weights)
+
+    # 8) Rounding + residual cash
+    weights = _pyround(weights, 1)
+    allocated = _pyround(_ordered_sum(weights, order), 1)
+    residual_cash_return = _pyround(np.maximum(0.0, total_exposure - allocated), 1)
+    cash_action = np.where(
+        cash_return,
+        "RETURN_TO_CASH",
+        np.where(realloc_action == "REALLOCATED_TO_ELIGIBLE_SECTORS", "REALLOCATED", "UNALLOCATED_RESIDUAL_CASH"),
+    ).astype(object)
+    cash_weight = _pyround(100.0 - allocated, 1)
+
+    # Early exit 날짜: weights 없음, 현금 = 100 - exposure
+    member = member & active.reshape(-1, 1)
+    weights = np.where(member, weights, np.nan)
+    cash_weight = np.where(active, cash_weight, _pyround(100.0 - total_exposure, 1))
+
+    return {
+        "weights": weights,
+        "member": member,
+        "order": order,
+        "adjusted": adjusted,
+        "rescue": rescue,
+        "total_score_sum": np.where(active, _pyround(total_score_sum, 2), 0.0),
+        "active": active,
+        "regime_cap_from": regime_cap_from,
+        "part_cap_from": part_cap_from,
+        "regime_caps": caps,
+        "part_caps": part_caps,
+        "allocated_equity": allocated,
+        "residual_cash_return": residual_cash_return,
+        "residual_cash_action": cash_action,
+        "residual_reallocation_action": realloc_action,
+        "cash_weight": cash_weight,
+        "participation": metas,
+    }
+
+
+def ordered_weights(weighted: Mapping[str, Any], i: int) -> Dict[str, float]:
+    """i번째 날짜 weights dict (build_tactical_allocation dict 삽입 순서 그대로)."""
+    out: Dict[str, float] = {}
+    for j in weighted["order"][i]:
+        if weighted["member"][i, j]:
+            out[SECTORS[j]] = float(weighted["weights"][i, j])
+    return out
+
+
+def cap_records(weighted: Mapping[str, Any], i: int, macro_profile: str) -> List[Dict[str, Any]]:
+    """i번째 날짜 cap_applied 기록 (regime cap -> participation cap 순)."""
+    records: List[Dict[str, Any]] = []
+    for sector in REGIME_CAPS.get(macro_profile, {}):
+        j = SECTOR_INDEX[sector]
+        original = weighted["regime_cap_from"][i, j]
+        if not np.isnan(original):
+            cap = float(weighted["regime_caps"][i, j])
+            records.append({
+                "sector": sector,
+                "original": round(float(original), 1),
+                "cap": round(cap, 1),
+                "reduced_by": round(float(original) - cap, 1),
+            })
+    mode = weighted["participation"][i]["participation_mode"]
+    for j in weighted["order"][i]:
+        original = weighted["part_cap_from"][i, j]
+        if weighted["member"][i, j] and not np.isnan(original):
+            cap = float(weighted["part_caps"][i, j])
+            records.append({
+                "sector": SECTORS[j],
+                "original": round(float(original), 1),
+                "cap": round(cap, 1),
+                "reduced_by": round(float(original) - cap, 1),
+                "reason": f"PARTICIPATION_CAP_{mode}",
+            })
+    return records
+
+
+# -------------------------
+# Path-dependent steps (filter / history 공용)
+# -------------------------
+def raw_sector_rank(score: Mapping[str, Any]) -> str:
+    """Research rank contract: positive sector score, 점수 내림차순 -> sector명."""
+    rows = []
+    for sector, value in score.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        if value > 0:
+            rows.append((sector, value))
+    rows.sort(key=lambda item: (-item[1], item[0]))
+    return "|".join(sector for sector, _ in rows)
+
+
+def rank_persistence_step(
+    rank_state: Mapping[str, Any],
+    raw_rank: str,
+    raw_target_weights: Dict[str, float],
+    deleveraging_required: bool,
+    today: str,
+    confirm_days: int = RANK_CONFIRM_DAYS,
+) -> Dict[str, Any]:
+    """
+    Filter18 Rank Persistence 3D (1일 step)
+    - normal days: 바뀐 sector rank는 confirm_days 거래일 유지되어야 채택
+    - deleveraging: 항상 즉시 채택 (persistence bypass)
+    - 같은 날짜 재실행은 confirmation 증가 없음
+    Return: weights / action / accepted_rank / pending_rank / pending_count / state_next
+    """
+    accepted_rank = str(rank_state.get("accepted_rank", "") or "")
+    accepted_target_weights = rank_state.get("accepted_target_weights", {}) or {}
+    if not isinstance(accepted_target_weights, dict):
+        accepted_target_weights = {}
+    pending_rank = str(rank_state.get("pending_rank", "") or "")
+    try:
+        pending_count = int(rank_state.get("pending_count", 0) or 0)
+    except Exception:
+        pending_count = 0
+    last_processed_date = str(rank_state.get("last_processed_date", "") or "")
+
+    # Research contract: 첫 state는 deleveraging이어도 INITIAL_ACCEPT로 기록
+    rank_state_was_uninitialized = not accepted_rank
+
+    if deleveraging_required or not accepted_rank or raw_rank == accepted_rank:
+        accepted_rank = raw_rank
+        accepted_target_weights = dict(raw_target_weights)
+        pending_rank = ""
+        pending_count = 0
+        weights = dict(raw_target_weights)
+
+        if rank_state_was_uninitialized:
+            action = "INITIAL_ACCEPT"
+        elif deleveraging_required:
+            action = "FORCED_DELEVERAGE_ACCEPT"
+        else:
+            action = "ACCEPTED_RANK_UPDATE"
+
+    else:
+        if last_processed_date != today:
+            if pending_rank == raw_rank:
+                pending_count += 1
+            else:
+                pending_rank = raw_rank
+                pending_count = 1
+
+        if pending_rank == raw_rank and pending_count >= confirm_days:
+            accepted_rank = raw_rank
+            accepted_target_weights = dict(raw_target_weights)
+            pending_rank = ""
+            pending_count = 0
+            weights = dict(raw_target_weights)
+            action = "RANK_CONFIRMED"
+        else:
+            # 확정 전까지 마지막 채택 portfolio 유지
+            weights = {str(sector): float(weight) for sector, weight in accepted_target_weights.items()}
+            action = "RANK_CHANGE_SUPPRESSED"
+
+    state_next = {
+        "accepted_rank": accepted_rank,
+        "accepted_target_weights": dict(accepted_target_weights),
+        "pending_rank": pending_rank,
+        "pending_count": pending_count,
+        "last_processed_date": today,
+        "last_output_target_weights": dict(weights),
+        "last_action": action,
+    }
+
+    return {
+        "weights": weights,
+        "cash_weight": round(100.0 - sum(weights.values()), 1),
+        "action": action,
+        "accepted_rank": accepted_rank,
+        "pending_rank": pending_rank,
+        "pending_count": pending_count,
+        "state_next": state_next,
+    }
+
+
+def rebalance_threshold_kernel(
+    target: np.ndarray,
+    prev: np.ndarray,
+    hold_threshold: float = HOLD_THRESHOLD,
+    rebalance_threshold: float = REBALANCE_THRESHOLD,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rebalancing Threshold (배열): prev NaN = NEW
+    - |변화| < hold      : 기존 비중 유지 (HOLD)
+    - |변화| < rebalance : SMALL ADJUST
+    - 그 외              : REBALANCE
+    """
+    target = np.asarray(target, dtype="float64")
+    prev = np.asarray(prev, dtype="float64")
+    is_new = np.isnan(prev)
+    abs_diff = np.abs(target - prev)
+    hold = ~is_new & (abs_diff < hold_threshold)
+    small = ~is_new & ~hold & (abs_diff < rebalance_threshold)
+
+    adjusted = np.where(hold, prev, target)
+    actions = np.select([is_new, hold, small], ["NEW", "HOLD", "SMALL ADJUST"], default="REBALANCE").astype(object)
+    return _pyround(adjusted, 1), actions
+
+
+def execution_ceiling_weights(weights: Mapping[str, Any], ceiling: float) -> Dict[str, float]:
+    """
+    FILTER18_EXECUTION_CEILING_RECONCILIATION_V1
+    Rank persistence가 복원한 비중이 오늘 허용 exposure를 넘지 않도록
+    비율 유지 압축 -> 0.1% 반올림 -> 최대 비중 섹터에서 잔차 제거.
+    """
+    try:
+        ceiling = max(0.0, float(ceiling))
+    except Exception:
+        ceiling = 0.0
+
+    out: Dict[str, float] = {}
+    for sector, weight in (weights or {}).items():
+        try:
+            w = float(weight)
+        except Exception:
+            w = 0.0
+        # long-only: 음수 비중 불가
+        out[sector] = max(0.0, w)
+
+    total = sum(out.values())
+    if total > ceiling and total > 0:
+        scale = ceiling / total
+        out = {sector: w * scale for sector, w in out.items()}
+
+    out = {sector: round(max(0.0, float(w)), 1) for sector, w in out.items()}
+
+    excess = sum(out.values()) - ceiling
+    if excess > 1e-9 and out:
+        largest = max(out, key=out.get)
+        out[largest] = round(max(0.0, out[largest] - excess), 1)
+
+    final_sum = sum(out.values())
+    if final_sum > ceiling + 1e-9 and final_sum > 0:
+        scale = ceiling / final_sum
+        out = {sector: round(w * scale, 1) for sector, w in out.items()}
+
+        final_excess = sum(out.values()) - ceiling
+        if final_excess > 1e-9 and out:
+            largest = max(out, key=out.get)
+            out[largest] = round(max(0.0, out[largest] - final_excess), 1)
+
+    return out
+
+
+# -------------------------
+# History
+# -------------------------
+def _clean_rank_state(state: Mapping[str, Any]) -> Dict[str, Any]:
+    """save/load_filter18_rank_state 왕복과 같은 정리 (round 4, key 정렬)."""
+    clean = dict(state)
+    for key in ["accepted_target_weights", "last_output_target_weights"]:
+        node = state.get(key, {}) or {}
+        clean[key] = {str(s): round(float(w), 4) for s, w in sorted(node.items())}
+    return clean
+
+
+def compute_allocation_history(
+    panel: pd.DataFrame,
+    prev_exposure: float = DEFAULT_PREV_EXPOSURE,
+    prev_etf_weights: Optional[Mapping[str, float]] = None,
+    rank_state: Optional[Mapping[str, Any]] = None,
+) -> pd.DataFrame:
+    """
+    panel: date + INPUT_COLUMNS (1 row / date)
+    점수·목표비중은 kernel 1회, 전일 portfolio에 의존하는 단계만 날짜 순 scan.
+    seed(prev_exposure / prev_etf_weights / rank_state) = panel 첫날 이전 저장 상태.
+    """
+    panel = panel.sort_values("date", kind="mergesort").reset_index(drop=True)
+    n = len(panel)
+    if n == 0:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    scored = sector_score_kernel(panel)
+    score = scored["score"]
+    exposure = _pyround(np.clip(_num(panel, "EXPOSURE", 50.0), 0.0, 100.0), 1)
+    vix = _num(panel, "VIX", 20.0)
+    quality = [quality_context_from_row(r) for r in panel.to_dict("records")]
+    momentum = np.where(score > 0, scored["momentum"], 0.0)
+
+    # 1차: 전일 저장 exposure = 전일 exposure 로 가정 (현금 100% 날짜는 scan에서 재계산)
+    assumed_prev = np.concatenate([[float(prev_exposure)], exposure[:-1]])
+    weighted = tactical_weight_kernel(
+        score, scored["classification"], scored["div_flags"], momentum,
+        exposure, assumed_prev, exposure < assumed_prev, scored["macro_profile"], quality,
+    )
+
+    prev_exp = float(prev_exposure)
+    prev_etf = dict(prev_etf_weights or {})
+    state = _clean_rank_state(rank_state or {})
+    rows = []
+
+    for i in range(n):
+        date = str(panel.at[i, "date"])
+        deleveraging = bool(exposure[i] < prev_exp)
+        day = weighted
+        k = i
+        if prev_exp != assumed_prev[i]:
+            day = tactical_weight_kernel(
+                score[i:i + 1], scored["classification"][i:i + 1], scored["div_flags"][i:i + 1],
+                momentum[i:i + 1], exposure[i:i + 1], np.array([prev_exp]), np.array([deleveraging]),
+                scored["macro_profile"][i:i + 1], quality[i:i + 1],
+            )
+            k = 0
+
+        raw_target = ordered_weights(day, k)
+        raw_rank = raw_sector_rank(scores_from_kernel(scored, i))
+        step = rank_persistence_step(state, raw_rank, raw_target, deleveraging, date)
+        weights = step["weights"]
+
+        if not deleveraging:
+            sectors = list(weights.keys())
+            target = np.array([weights[s] for s in sectors], dtype="float64")
+            prev = np.array([prev_etf.get(SECTOR_ETF.get(s, ""), np.nan) for s in sectors], dtype="float64")
+            adjusted, _actions = rebalance_threshold_kernel(target, prev)
+            weights = {s: float(w) for s, w in zip(sectors, adjusted)}
+
+        weights = execution_ceiling_weights(weights, exposure[i])
+
+        etf_weights = {
+            SECTOR_ETF[s]: round(w, 1) for s, w in weights.items() if w > 0 and s in SECTOR_ETF
+        }
+        allocated = round(sum(weights.values()), 1)
+        cash = round(100.0 - allocated, 1)
+        saved_exposure = float(exposure[i])
+        if saved_exposure <= 0 or not etf_weights:
+            etf_weights = {}
+            cash = 100.0
+            saved_exposure = 0.0
+
+        row = {
+            "date": date,
+            "MACRO_PROFILE": scored["macro_profile"][i],
+            "REGIME_CONTROLLER": scored["regime_controller"][i],
+            "AVG_DIVERGENCE": scored["avg_divergence"][i],
+            "DIVERGENCE_DISPERSION": scored["dispersion"][i],
+            "PARTICIPATION_MODE": day["participation"][k]["participation_mode"],
+            "VIX": float(vix[i]),
+            "EXPOSURE": float(exposure[i]),
+            "PREV_EXPOSURE": prev_exp,
+            "DELEVERAGING": deleveraging,
+            "RANK_ACTION": step["action"],
+            "RAW_RANK": raw_rank,
+            "ACCEPTED_RANK": step["accepted_rank"],
+            "ALLOCATED_EQUITY": allocated,
+            "CASH": cash,
+        }
+        for j, (sector, etf) in enumerate(SECTOR_ETF.items()):
+            row[f"SCORE_{etf}"] = float(score[i, j])
+            row[f"TARGET_{etf}"] = raw_target.get(sector, np.nan)
+            row[f"WEIGHT_{etf}"] = etf_weights.get(etf, 0.0)
+        rows.append(row)
+
+        # 다음 날짜 seed = 오늘 저장 상태 (paper portfolio / rank state 저장 규칙 그대로)
+        prev_exp = round(saved_exposure, 2)
+        prev_etf = {etf: float(round(w, 2)) for etf, w in etf_weights.items() if round(w, 2) > 0}
+        state = _clean_rank_state(step["state_next"])
+
+    return pd.DataFrame(rows).reindex(columns=HISTORY_COLUMNS)
+
+
+# -------------------------
+# Input store
+# -------------------------
+def allocation_inputs_path(data_dir: Optional[Path] = None) -> Path:
+    """호출 시점에 경로 결정 (report / benchmark가 바꾼 DATA_DIR 그대로 따름)."""
+    return Path(data_dir if data_dir is not None else DATA_DIR) / ALLOCATION_INPUTS_FILE
+
+
+def record_allocation_inputs(
+    date: str,
+    inputs: Dict[str, Any],
+    path: Optional[Path] = None,
+) -> str:
+    """오늘 input row upsert (같은 날짜 재실행은 교체)."""
+    row = {"date": str(pd.Timestamp(date).date())}
+    row.update({col: inputs.get(col) for col in INPUT_COLUMNS})
+    return upsert_log_rows(
+        Path(path) if path is not None else allocation_inputs_path(),
+        pd.DataFrame([row]),
+        column_order=lambda _cols: ["date"] + INPUT_COLUMNS,
+    )
+
+
+def load_allocation_inputs(path: Optional[Path] = None) -> pd.DataFrame:
+    path = Path(path) if path is not None else allocation_inputs_path()
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame(columns=["date"] + INPUT_COLUMNS)
+    df = pd.read_csv(path)
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    return df.dropna(subset=["date"]).drop_duplicates("date", keep="last").sort_values("date").reset_index(drop=True)
+
+
+# -------------------------
+# CLI
+# -------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Filter 18 sector allocation history")
+    parser.add_argument("--start", default=None)
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--out", default=None, help="history CSV 저장 경로")
+    args = parser.parse_args()
+
+    panel = load_allocation_inputs()
+    if args.start:
+        panel = panel[panel["date"] >= str(pd.Timestamp(args.start).date())]
+    if args.end:
+        panel = panel[panel["date"] <= str(pd.Timestamp(args.end).date())]
+
+    hist = compute_allocation_history(panel)
+    if args.out:
+        hist.to_csv(args.out, index=False)
+        print(f"✅ sector allocation history: {len(hist)} rows -> {args.out}")
+
+    cols = ["date", "MACRO_PROFILE", "REGIME_CONTROLLER", "RANK_ACTION", "CASH"] + [f"WEIGHT_{e}" for e in SECTOR_ETF.values()]
+    print(hist[cols].to_string(index=False) if not hist.empty else "(no rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# scripts/signal_cache.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from scripts.fetch_expectation_data import fetch_expectation_data
+from scripts.fetch_sentiment import fetch_cnn_fear_greed
+
+# =========================================================
+# External Signal Cache (TTL + stale-while-revalidate)
+# ---------------------------------------------------------
+# 외부 scrape / API(CNN Fear&Greed, FRED expectation proxy)를 리포트 경로에서 직접
+# 부르지 않는다 -> endpoint가 느리거나 막혀도 report latency는 일정.
+#
+# prefetch_signals(): 리포트 시작 시 FRESH 아닌 source refresh를 모두 background로 시작
+#   -> data load / 다른 layer 계산과 겹쳐서 진행
+#
+# get_signal(name):
+#   age <= ttl             : FRESH  -> cache 값 그대로
+#   ttl < age / cache 없음 : refresh(진행 중이면 그 thread) 결과를 최대 refresh_wait초 기다림
+#                            -> 성공하면 오늘 값 (FRESH)
+#                            -> 실패 / 시간 초과면 last-good + stale 표시 (STALE / EXPIRED / MISSING)
+#   age > max_stale        : EXPIRED -> 값은 반환하되 meta로 표시 (소비 측에서 판단)
+#   -> daily job(하루 1회)은 TTL이 항상 지나 있음: stale 표시는 refresh가 실패했을 때만 남음
+#
+# refresh:
+#   - source별 daemon thread 1개 (이미 진행 중이면 재시작 안 함)
+#   - 성공(validate 통과)한 값만 last-good으로 저장, 실패는 last_error만 갱신
+#   - backoff 동안(retry_after) 재시도 안 함 -> 막힌 endpoint 반복 호출 방지
+#   - flush_signal_refreshes(timeout): 프로세스 종료 전 진행 중 refresh 대기 (한도 있음)
+#
+# 저장: data/signal_cache/<name>.json
+#   value / fetched_at / as_of / last_attempt / last_error / fail_count (atomic write)
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+CACHE_DIRNAME = "signal_cache"
+
+RETRY_BACKOFF_SEC = 15 * 60   # 실패 후 재시도 간격 (fail_count배, 최대 6h)
+RETRY_BACKOFF_MAX_SEC = 6 * 3600
+
+
+def _expectations_ok(value: Any) -> bool:
+    # fetch_expectation_data는 series별 실패를 errors로 삼킴 -> series 하나도 없으면 실패
+    return isinstance(value, dict) and bool(value.get("series"))
+
+
+def _expectations_asof(value: Any) -> Optional[str]:
+    return value.get("as_of") if isinstance(value, dict) else None
+
+
+SIGNAL_SPECS: Dict[str, Dict[str, Any]] = {
+    "expectations": {
+        "fetch": fetch_expectation_data,        # FRED 월간/일간 series
+        "ttl_sec": 12 * 3600,
+        "max_stale_sec": 7 * 24 * 3600,
+        "refresh_wait_sec": 20.0,
+        "validate": _expectations_ok,
+        "as_of": _expectations_asof,
+    },
+    "fear_greed": {
+        "fetch": fetch_cnn_fear_greed,          # CNN HTML scrape
+        "ttl_sec": 3600,
+        "max_stale_sec": 3 * 24 * 3600,
+        "refresh_wait_sec": 10.0,               # 보조 지표 -> 짧게만 기다림
+        "validate": lambda v: v is not None,
+        "as_of": lambda v: None,
+    },
+}
+
+_lock = threading.Lock()
+_refreshing: Dict[str, threading.Thread] = {}
+
+
+# -------------------------
+# Storage
+# -------------------------
+def cache_path(name: str, data_dir: Path = DATA_DIR) -> Path:
+    return Path(data_dir) / CACHE_DIRNAME / f"{name}.json"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_ts(ts: Optional[str]) -> Optional[datetime]:
+    if not ts:
+        return None
+    try:
+        return datetime.fromisoformat(ts)
+    except ValueError:
+        return None
+
+
+def load_entry(name: str, data_dir: Path = DATA_DIR) -> Dict[str, Any]:
+    path = cache_path(name, data_dir)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN] signal cache {name} 손상 → 무시: {e}")
+        return {}
+
+
+def _save_entry(name: str, entry: Dict[str, Any], data_dir: Path) -> None:
+    path = cache_path(name, data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(json.dumps(entry, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+# -------------------------
+# Refresh
+# -------------------------
+def refresh_signal(name: str, data_dir: Path = DATA_DIR) -> Dict[str, Any]:
+    """
+    source 1개를 동기 fetch -> 성공이면 last-good 교체, 실패면 last_error만 기록.
+    Return: 저장된 entry
+    """
+    spec = SIGNAL_SPECS[name]
+    entry = load_entry(name, data_dir)
+    started = _now()
+
+    try:
+        value = spec["fetch"]()
+        ok = spec["validate"](value)
+        error = None if ok else "invalid / empty response"
+    except Exception as e:
+        value, ok, error = None, False, f"{type(e).__name__}: {e}"
+
+    entry["last_attempt"] = started.isoformat()
+    if ok:
+        entry.update({
+            "value": value,
+            "fetched_at": started.isoformat(),
+            "as_of": spec["as_of"](value),
+            "last_error": None,
+            "fail_count": 0,
+            "fetch_sec": round((_now() - started).total_seconds(), 3),
+        })
+    else:
+        entry["last_error"] = error
+        entry["fail_count"] = int(entry.get("fail_count") or 0) + 1
+        print(f"[WARN] signal refresh 실패 ({name}): {error} → last-good 유지")
+
+    _save_entry(name, entry, data_dir)
+    return entry
+
+
+def _run_refresh(name: str, data_dir: Path) -> None:
+    try:
+        refresh_signal(name, data_dir)
+    except Exception as e:
+        print(f"[WARN] signal refresh thread error ({name}): {type(e).__name__}: {e}")
+    finally:
+        with _lock:
+            _refreshing.pop(name, None)
+
+
+def _in_backoff(entry: Dict[str, Any]) -> bool:
+    fails = int(entry.get("fail_count") or 0)
+    last = _parse_ts(entry.get("last_attempt"))
+    if not fails or last is None:
+        return False
+    wait = min(RETRY_BACKOFF_SEC * fails, RETRY_BACKOFF_MAX_SEC)
+    return (_now() - last).total_seconds() < wait
+
+
+def start_refresh(name: str, data_dir: Path = DATA_DIR) -> Optional[threading.Thread]:
+    """background refresh 시작 (진행 중이면 기존 thread 반환)."""
+    with _lock:
+        worker = _refreshing.get(name)
+        if worker is not None and worker.is_alive():
+            return worker
+        worker = threading.Thread(
+            target=_run_refresh,
+            args=(name, Path(data_dir)),
+            name=f"signal-refresh-{name}",
+            daemon=True,
+        )
+        _refreshing[name] = worker
+        worker.start()
+    return worker
+
+
+def prefetch_signals(data_dir: Path = DATA_DIR) -> int:
+    """
+    FRESH가 아니고 backoff 중도 아닌 source refresh를 모두 background로 시작.
+    Return: 시작(또는 이미 진행 중)한 refresh 수
+    """
+    started = 0
+    for name in SIGNAL_SPECS:
+        entry = load_entry(name, data_dir)
+        if _meta(name, entry, refreshing=False)["status"] == "FRESH" or _in_backoff(entry):
+            continue
+        start_refresh(name, data_dir)
+        started += 1
+    return started
+
+
+def flush_signal_refreshes(timeout: float = 10.0) -> int:
+    """
+    진행 중 refresh를 합계 최대 timeout초 기다림.
+    Return: 아직 안 끝난 refresh 수 (daemon thread라 프로세스 종료 시 버려짐 → 다음 실행에서 재시도)
+    """
+    deadline = time.monotonic() + timeout
+    with _lock:
+        workers = list(_refreshing.values())
+    for worker in workers:
+        worker.join(max(0.0, deadline - time.monotonic()))
+
+    left = sum(1 for w in workers if w.is_alive())
+    if left:
+        print(f"⚠️ signal cache: refresh {left}건 미완료 (last-good 유지)")
+    return left
+
+
+# -------------------------
+# Read path
+# -------------------------
+def _meta(name: str, entry: Dict[str, Any], refreshing: bool) -> Dict[str, Any]:
+    spec = SIGNAL_SPECS[name]
+    fetched = _parse_ts(entry.get("fetched_at"))
+    age = None if fetched is None else (_now() - fetched).total_seconds()
+
+    if age is None:
+        status = "MISSING"
+    elif age <= spec["ttl_sec"]:
+        status = "FRESH"
+    elif age <= spec["max_stale_sec"]:
+        status = "STALE"
+    else:
+        status = "EXPIRED"
+
+    return {
+        "source": name,
+        "status": status,
+        "stale": status != "FRESH",
+        "fetched_at": entry.get("fetched_at"),
+        "as_of": entry.get("as_of"),
+        "age_hours": None if age is None else round(age / 3600.0, 2),
+        "ttl_hours": round(spec["ttl_sec"] / 3600.0, 2),
+        "refreshing": refreshing,
+        "last_error": entry.get("last_error"),
+    }
+
+
+def get_signal(
+    name: str,
+    data_dir: Path = DATA_DIR,
+    wait: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    FRESH면 cache 값, 아니면 refresh를 최대 wait초(기본 refresh_wait_sec) 기다린 뒤 값 반환.
+    refresh 실패 / 시간 초과면 last-good + stale meta.
+    Return: {"value": <today or last-good or None>, "meta": {...status / as-of / staleness...}}
+    """
+    spec = SIGNAL_SPECS[name]
+    entry = load_entry(name, data_dir)
+    meta = _meta(name, entry, refreshing=False)
+
+    if meta["status"] == "FRESH" or _in_backoff(entry):
+        return {"value": entry.get("value"), "meta": meta}
+
+    worker = start_refresh(name, data_dir)
+    wait = spec["refresh_wait_sec"] if wait is None else wait
+    if worker is not None and wait > 0:
+        worker.join(wait)
+    entry = load_entry(name, data_dir)
+
+    refreshing = worker is not None and worker.is_alive()
+    return {"value": entry.get("value"), "meta": _meta(name, entry, refreshing)}
+
+
+def signal_cache_summary(data_dir: Path = DATA_DIR) -> Dict[str, Dict[str, Any]]:
+    """refresh 없이 source별 상태만 (report / CLI용)."""
+    return {name: _meta(name, load_entry(name, data_dir), refreshing=name in _refreshing) for name in SIGNAL_SPECS}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="External signal cache (TTL + stale-while-revalidate)")
+    parser.add_argument("--refresh", nargs="*", metavar="NAME", help="동기 refresh (이름 없으면 전체)")
+    args = parser.parse_args()
+
+    if args.refresh is not None:
+        for name in args.refresh or list(SIGNAL_SPECS):
+            entry = refresh_signal(name)
+            print(f"[OK] {name}: fetched_at={entry.get('fetched_at')} error={entry.get('last_error')}")
+
+    for name, meta in signal_cache_summary().items():
+        print(f"{name:<14} {meta['status']:<8} age={meta['age_hours']}h as_of={meta['as_of']} error={meta['last_error']}")
+
+
+if __name__ == "__main__":
+    main()